@@ -0,0 +1,85 @@
+"""Espanso keyboard layout sync, off the layer switch critical path."""
+
+import logging
+import re
+import subprocess
+import threading
+import time
+from typing import Optional
+
+from .config import ESPANSO_CONFIG, ESPANSO_CONFIG_FILE, ESPANSO_DEBOUNCE
+from .state_manager import atomic_write_text
+
+# The keyboard_layout keys the layer switch manages, as the old sed calls matched them
+MANAGED_KEYS = ("layout", "variant")
+
+
+def apply_espanso_config(layout: str, logger: Optional[logging.Logger] = None) -> bool:
+    """
+    Make espanso's keyboard layout match a kanata layout.
+
+    The config file is rewritten, and espanso restarted, only when the
+    effective settings differ; returns True if a restart was done.
+    """
+    logger = logger or logging.getLogger(__name__)
+    wanted = ESPANSO_CONFIG[layout]
+    try:
+        current = ESPANSO_CONFIG_FILE.read_text()
+    except OSError as e:
+        logger.error(f"Failed to read espanso config: {e}")
+        return False
+
+    updated = current
+    for key in MANAGED_KEYS:
+        updated = re.sub(
+            rf"^  {key}: .*$", f"  {key}: {wanted[key]}", updated, flags=re.MULTILINE
+        )
+    if updated == current:
+        logger.debug(f"Espanso config already matches {layout}, no restart needed")
+        return False
+
+    try:
+        atomic_write_text(ESPANSO_CONFIG_FILE, updated)
+    except OSError as e:
+        logger.error(f"Failed to write espanso config: {e}")
+        return False
+    subprocess.run(["espanso", "restart"], check=False, capture_output=True)
+    logger.info(f"Updated espanso config to {layout} layout")
+    return True
+
+
+class EspansoUpdater:
+    """
+    Debounced background espanso sync.
+
+    schedule() returns immediately; the worker applies only the last layout
+    requested once no new request has arrived for ESPANSO_DEBOUNCE seconds,
+    so flipping layers quickly causes at most one restart.
+    """
+
+    def __init__(self, logger: Optional[logging.Logger] = None, debounce: float = ESPANSO_DEBOUNCE):
+        self.logger = logger or logging.getLogger(__name__)
+        self.debounce = debounce
+        self._cond = threading.Condition()
+        self._layout: Optional[str] = None
+        self._due = 0.0
+        threading.Thread(target=self._run, daemon=True, name="espanso-updater").start()
+
+    def schedule(self, layout: str):
+        with self._cond:
+            self._layout = layout
+            self._due = time.monotonic() + self.debounce
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._layout is None:
+                    self._cond.wait()
+                while (remaining := self._due - time.monotonic()) > 0:
+                    self._cond.wait(remaining)
+                layout, self._layout = self._layout, None
+            try:
+                apply_espanso_config(layout, self.logger)
+            except Exception as e:
+                self.logger.error(f"Failed to update espanso config: {e}")
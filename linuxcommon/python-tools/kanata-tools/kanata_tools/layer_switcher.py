@@ -3,15 +3,14 @@
 import json
 import logging
 import socket
-import subprocess
 import time
 from pathlib import Path
 from typing import Optional, Tuple
 
 from .config import (
     ACTIVE_LAYOUT_FILE,
-    ESPANSO_CONFIG,
-    ESPANSO_CONFIG_FILE,
+    CONTROL_SOCKET,
+    CONTROL_TIMEOUT,
     KANATA_HOST,
     KANATA_PORT,
     LAYER_NAMES,
@@ -19,6 +18,7 @@ from .config import (
     STATUS_CONFIG,
     STATUS_FILE,
 )
+from .espanso import apply_espanso_config
 from .state_manager import StateManager
 
 
@@ -84,6 +84,7 @@ class KanataLayerSwitcher:
         try:
             key = (self.current_layout, self.current_mod_state)
             status = STATUS_CONFIG[key]
+            STATUS_FILE.parent.mkdir(parents=True, exist_ok=True)
             with open(STATUS_FILE, "w") as f:
                 json.dump(status, f)
             self.logger.info(f"Updated status to: {self.current_layout}-{self.current_mod_state}")
@@ -100,29 +101,52 @@ class KanataLayerSwitcher:
             self.logger.error(f"Failed to write active layout file: {e}")
     
     def update_espanso_config(self):
-        """Update espanso configuration based on current layout."""
+        """Update espanso configuration based on current layout (restarts only on change)."""
         try:
-            new_config = ESPANSO_CONFIG[self.current_layout]
-            
-            subprocess.run([
-                "sed", "-i",
-                f"s/^  layout: .*/  layout: {new_config['layout']}/",
-                str(ESPANSO_CONFIG_FILE)
-            ], check=True)
-            
-            subprocess.run([
-                "sed", "-i",
-                f"s/^  variant: .*/  variant: {new_config['variant']}/",
-                str(ESPANSO_CONFIG_FILE)
-            ], check=True)
-            
-            subprocess.run(["espanso", "restart"], check=False, capture_output=True)
-            
-            self.logger.info(f"Updated espanso config to {self.current_layout} layout")
-            
+            apply_espanso_config(self.current_layout, self.logger)
         except Exception as e:
             self.logger.error(f"Failed to update espanso config: {e}")
     
+    def send_via_listener(self, layer_name: str) -> bool:
+        """
+        Ask the status listener daemon to switch layers over its open kanata
+        connection: one local round trip, no connect or settle delay. The
+        daemon then writes the status files and updates espanso itself.
+        """
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(CONTROL_TIMEOUT)
+                sock.connect(str(CONTROL_SOCKET))
+                sock.sendall(json.dumps({"op": "set", "layer": layer_name}).encode() + b"\n")
+                reply = b""
+                while not reply.endswith(b"\n"):
+                    chunk = sock.recv(4096)
+                    if not chunk:
+                        break
+                    reply += chunk
+            response = json.loads(reply)
+        except (OSError, ValueError) as e:
+            self.logger.debug(f"Status listener unavailable ({e}), connecting to Kanata directly")
+            return False
+        if not response.get("ok"):
+            self.logger.warning(f"Status listener refused layer change: {response.get('error')}")
+            return False
+        self.logger.info(f"Sent layer change to: {layer_name} (via status listener)")
+        return True
+    
+    def apply_layer(self, layer_name: str) -> bool:
+        """Switch kanata to layer_name and bring state files and espanso along."""
+        if self.send_via_listener(layer_name):
+            self.state_manager.save_temp_state(self.current_layout, self.current_mod_state)
+            return True
+        if self.send_layer_change(layer_name):
+            self.save_state()
+            self.update_status_file()
+            self.write_active_layout()
+            self.update_espanso_config()
+            return True
+        return False
+    
     def connect_to_kanata(self, retries: int = 2) -> Optional[socket.socket]:
         """Establish TCP connection to Kanata with retry logic."""
         for attempt in range(retries + 1):
@@ -141,7 +165,7 @@ class KanataLayerSwitcher:
         return None
     
     def send_layer_change(self, layer_name: str) -> bool:
-        """Send layer change command to Kanata."""
+        """Send layer change command to Kanata over a fresh connection (no daemon running)."""
         sock = self.connect_to_kanata()
         if not sock:
             return False
@@ -172,12 +196,7 @@ class KanataLayerSwitcher:
         
         self.logger.info(f"Switching layout to: {self.current_layout}")
         
-        if self.send_layer_change(layer_name):
-            self.save_state()
-            self.update_status_file()
-            self.write_active_layout()
-            self.update_espanso_config()
-        else:
+        if not self.apply_layer(layer_name):
             # Revert on failure
             self.current_layout = "qwe" if self.current_layout == "cmk" else "cmk"
     
@@ -199,14 +218,7 @@ class KanataLayerSwitcher:
         
         self.logger.info(f"Setting layer to: {layout}")
         
-        if self.send_layer_change(layer_name):
-            self.save_state()
-            self.update_status_file()
-            self.write_active_layout()
-            self.update_espanso_config()
-            return True
-        else:
-            return False
+        return self.apply_layer(layer_name)
     
     def initialize_on_start(self) -> bool:
         """Initialize Kanata with appropriate state based on reboot detection."""
@@ -225,11 +237,7 @@ class KanataLayerSwitcher:
         key = (self.current_layout, "base")
         layer_name = LAYER_NAMES.get(key, "colemak")  # Default to colemak if key not found
         
-        if self.send_layer_change(layer_name):
-            self.save_state()
-            self.update_status_file()
-            self.write_active_layout()
-            self.update_espanso_config()
+        if self.apply_layer(layer_name):
             self.logger.info(f"Successfully initialized to {self.current_layout}-{self.current_mod_state}")
             return True
         else:
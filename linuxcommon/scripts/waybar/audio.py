@@ -102,9 +102,9 @@ if __name__ == "__main__":
     command = sys.argv[1] if len(sys.argv) > 1 else "--get"
     if command == "--get":
         print(get_volume())
-    elif command == "--inc":
-        inc_volume()
-    elif command == "--dec":
-        dec_volume()
-    elif command == "--toggle":
-        toggle_mute()
+    elif command in ("--inc", "--dec", "--toggle"):
+        # The resident controller coalesces repeats; run pactl directly if it's down
+        from audio_controller import send_command
+
+        if not send_command("sink", command[2:]):
+            {"--inc": inc_volume, "--dec": dec_volume, "--toggle": toggle_mute}[command]()
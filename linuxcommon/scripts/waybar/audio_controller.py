@@ -0,0 +1,511 @@
+#!/usr/bin/env python3
+"""
+Audio controller: one resident process owning the default sink and source.
+
+It follows `pactl subscribe` and keeps volume/mute in memory, so reading the
+state never spawns pactl. audio.py and mic.py forward inc/dec/toggle here
+over a Unix socket; key and scroll repeats arriving within COALESCE_WINDOW
+are summed into one pactl call (+15% rather than three +5%), and a single
+notification is sent once the new volume has been read back.
+
+Waybar custom modules can follow a device with `audio_controller.py stream
+sink` (one JSON line per change).
+
+Usage:
+    audio_controller.py serve
+    audio_controller.py send sink inc
+    audio_controller.py send source toggle
+    audio_controller.py stream sink
+    audio_controller.py get source
+"""
+
+import argparse
+import json
+import logging
+import os
+import re
+import selectors
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+# Add the custom script path to PYTHONPATH
+sys.path.append("/home/rash/.config/scripts")
+try:
+    from _utils import logging_utils  # noqa: E402
+except ImportError:
+    # _utils only ships with linuxmini; audio.py/mic.py import this module on
+    # every machine, so fall back to plain logging
+    logging_utils = None
+
+STEP = 5  # Percent per inc/dec, as the old scripts used
+COALESCE_WINDOW = 0.04  # Commands arriving within this window become one pactl call
+EVENT_SETTLE = 0.02  # pactl subscribe emits bursts; refresh once they settle
+STREAM_RETRY_INTERVAL = 1
+CLIENT_TIMEOUT = 1
+MAX_CLIENT_BUFFER = 64 * 1024
+
+DEVICES = {
+    "sink": {
+        "target": "@DEFAULT_SINK@",
+        "label": "Volume",
+        "icons": ["", "", "󰕾", ""],
+        "muted_icon": "󰖁",
+        "switched": "Volume Switched {}",
+    },
+    "source": {
+        "target": "@DEFAULT_SOURCE@",
+        "label": "Mic-Level",
+        "icons": [""],
+        "muted_icon": "",
+        "switched": "Microphone Switched {}",
+    },
+}
+ACTIONS = ("inc", "dec", "toggle")
+UNKNOWN_OUTPUT = {"text": "?", "class": "unknown", "tooltip": "Audio controller not running"}
+
+EVENT_RE = re.compile(r"Event '(\w+)' on (sink|source|server) #")
+
+
+def socket_path():
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR") or f"/run/user/{os.getuid()}"
+    return os.path.join(runtime_dir, "audio_controller.sock")
+
+
+def pactl(*args):
+    return subprocess.run(["pactl", *args], capture_output=True, text=True).stdout
+
+
+def read_device(kind):
+    """Current {"volume", "muted"} of the default sink or source."""
+    target = DEVICES[kind]["target"]
+    volume = pactl(f"get-{kind}-volume", target).split()
+    mute = pactl(f"get-{kind}-mute", target)
+    try:
+        percent = int(volume[4].rstrip("%"))
+    except (IndexError, ValueError):
+        return None
+    return {"volume": percent, "muted": "yes" in mute}
+
+
+def waybar_output(kind, state):
+    """Waybar JSON for a device, matching the pulseaudio module formats."""
+    if state is None:
+        return UNKNOWN_OUTPUT
+    device = DEVICES[kind]
+    volume = state["volume"]
+    if state["muted"]:
+        return {
+            "text": device["muted_icon"],
+            "class": "muted",
+            "tooltip": f"{device['label']}: Muted",
+            "percentage": volume,
+        }
+    icons = device["icons"]
+    icon = icons[min(volume * len(icons) // 101, len(icons) - 1)]
+    return {
+        "text": f"{icon} {volume}%",
+        "class": "",
+        "tooltip": f"{device['label']}: {volume}%",
+        "percentage": volume,
+    }
+
+
+def notify(kind, state, toggled):
+    device = DEVICES[kind]
+    if toggled:
+        message = device["switched"].format("OFF" if state["muted"] else "ON")
+        command = ["notify-send", "-e", "-u", "low", message]
+    elif state["muted"]:
+        command = [
+            "notify-send", "-e",
+            "-h", "string:x-canonical-private-synchronous:volume_notif",
+            "-u", "low", f"{device['label']}: Muted",
+        ]
+    else:
+        command = [
+            "notify-send", "-e",
+            "-h", f"int:value:{state['volume']}",
+            "-h", "string:x-canonical-private-synchronous:volume_notif",
+            "-u", "low", f"{device['label']}: {state['volume']}%",
+        ]
+    subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+class Pending:
+    """Commands for one device waiting out the coalesce window."""
+
+    def __init__(self, deadline):
+        self.deadline = deadline
+        self.steps = 0
+        self.toggles = 0
+
+
+class Client:
+    def __init__(self, sock):
+        self.sock = sock
+        self.inbuf = b""
+        self.outbuf = b""
+        self.stream = None  # device kind this client follows
+
+    def queue(self, message):
+        self.outbuf += json.dumps(message, ensure_ascii=False).encode() + b"\n"
+
+
+class AudioController:
+    def __init__(self, path):
+        self.path = path
+        self.selector = selectors.DefaultSelector()
+        self.clients = {}
+        self.state = {kind: None for kind in DEVICES}
+        self.pending = {}  # kind -> Pending
+        self.dirty = set()  # kinds with server events not yet refreshed
+        self.refresh_at = None
+        self.notify_next = {}  # kind -> toggled, for commands awaiting the server's echo
+        self.stats = {"commands": 0, "pactl_calls": 0, "events": 0, "refreshes": 0}
+        self.monitor = None
+
+    def start(self):
+        self.start_monitor()
+        for kind in DEVICES:
+            self.refresh(kind)
+
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.listener.bind(self.path)
+        os.chmod(self.path, 0o600)
+        self.listener.listen(16)
+        self.listener.setblocking(False)
+        self.selector.register(self.listener, selectors.EVENT_READ, self.on_accept)
+        logging.info(f"Audio controller listening on {self.path}")
+
+    def start_monitor(self):
+        self.monitor = subprocess.Popen(
+            ["pactl", "subscribe"], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        )
+        os.set_blocking(self.monitor.stdout.fileno(), False)
+        self.monitor_buf = b""
+        self.selector.register(self.monitor.stdout, selectors.EVENT_READ, self.on_monitor)
+
+    def serve_forever(self):
+        while True:
+            timeout = self.next_timeout()
+            for key, mask in self.selector.select(timeout):
+                key.data(key.fileobj, mask)
+            self.run_due()
+
+    def next_timeout(self):
+        deadlines = [p.deadline for p in self.pending.values()]
+        if self.refresh_at is not None:
+            deadlines.append(self.refresh_at)
+        if not deadlines:
+            return None
+        return max(0, min(deadlines) - time.monotonic())
+
+    def run_due(self):
+        now = time.monotonic()
+        for kind, pending in list(self.pending.items()):
+            if pending.deadline <= now:
+                del self.pending[kind]
+                self.apply(kind, pending)
+        if self.refresh_at is not None and self.refresh_at <= now:
+            self.refresh_at = None
+            dirty, self.dirty = self.dirty, set()
+            for kind in dirty:
+                self.refresh(kind)
+
+    def close(self):
+        for client in list(self.clients.values()):
+            self.drop(client)
+        self.listener.close()
+        if self.monitor:
+            self.monitor.terminate()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    # ----- Server state -----
+
+    def on_monitor(self, stdout, _mask):
+        try:
+            data = os.read(stdout.fileno(), 65536)
+        except BlockingIOError:
+            return
+        if not data:
+            # pactl exits when the sound server restarts; follow the new one
+            logging.warning("pactl subscribe exited, restarting")
+            self.selector.unregister(stdout)
+            self.monitor.wait()
+            time.sleep(1)
+            self.start_monitor()
+            self.dirty.update(DEVICES)
+            self.refresh_at = time.monotonic()
+            return
+        self.monitor_buf += data
+        *lines, self.monitor_buf = self.monitor_buf.split(b"\n")
+        for line in lines:
+            match = EVENT_RE.match(line.decode(errors="replace"))
+            if not match or match.group(1) == "remove":
+                continue
+            self.stats["events"] += 1
+            facility = match.group(2)
+            # A server event is usually a default device change
+            self.dirty.update(DEVICES if facility == "server" else [facility])
+        if self.dirty and self.refresh_at is None:
+            self.refresh_at = time.monotonic() + EVENT_SETTLE
+
+    def refresh(self, kind):
+        state = read_device(kind)
+        self.stats["refreshes"] += 1
+        toggled = self.notify_next.pop(kind, None)
+        if toggled is not None and state is not None:
+            notify(kind, state, toggled)
+        if state == self.state[kind]:
+            return
+        self.state[kind] = state
+        logging.debug(f"{kind}: {state}")
+        message = {"kind": kind, "value": waybar_output(kind, state)}
+        for client in list(self.clients.values()):
+            if client.stream == kind:
+                client.queue(message)
+                self.flush(client)
+
+    # ----- Commands -----
+
+    def command(self, kind, action):
+        self.stats["commands"] += 1
+        pending = self.pending.get(kind)
+        if pending is None:
+            pending = self.pending[kind] = Pending(time.monotonic() + COALESCE_WINDOW)
+        if action == "toggle":
+            pending.toggles += 1
+        else:
+            pending.steps += 1 if action == "inc" else -1
+
+    def apply(self, kind, pending):
+        target = DEVICES[kind]["target"]
+        state = self.state[kind]
+        muted = state["muted"] if state else False
+        toggle = pending.toggles % 2 == 1
+        # As before, inc/dec on a muted device unmutes it instead of changing volume
+        if pending.steps and muted and not toggle:
+            toggle = True
+            steps = 0
+        else:
+            steps = pending.steps
+        if toggle:
+            self.stats["pactl_calls"] += 1
+            subprocess.run(["pactl", f"set-{kind}-mute", target, "toggle"])
+        if steps:
+            self.stats["pactl_calls"] += 1
+            subprocess.run(["pactl", f"set-{kind}-volume", target, f"{steps * STEP:+d}%"])
+        if toggle or steps:
+            self.notify_next[kind] = toggle and not steps
+            # Refresh now rather than waiting for the event round trip
+            self.dirty.add(kind)
+            self.refresh_at = time.monotonic()
+
+    # ----- Socket -----
+
+    def on_accept(self, listener, _mask):
+        try:
+            sock, _ = listener.accept()
+        except BlockingIOError:
+            return
+        sock.setblocking(False)
+        client = Client(sock)
+        self.clients[sock] = client
+        self.selector.register(sock, selectors.EVENT_READ, self.on_client)
+
+    def on_client(self, sock, mask):
+        client = self.clients.get(sock)
+        if client is None:
+            return
+        if mask & selectors.EVENT_READ:
+            try:
+                data = sock.recv(4096)
+            except BlockingIOError:
+                data = None
+            except OSError:
+                data = b""
+            if data == b"":
+                self.drop(client)
+                return
+            if data:
+                client.inbuf += data
+                while b"\n" in client.inbuf:
+                    line, client.inbuf = client.inbuf.split(b"\n", 1)
+                    if line.strip():
+                        self.handle(client, line.decode(errors="replace").split())
+        self.flush(client)
+
+    def handle(self, client, words):
+        if words == ["stats"]:
+            client.queue({"ok": True, "value": self.stats})
+            return
+        if len(words) != 2 or words[1] not in DEVICES:
+            client.queue({"ok": False, "error": f"Bad request: {' '.join(words)}"})
+            return
+        op, kind = words
+        if op in ACTIONS:
+            self.command(kind, op)
+            client.queue({"ok": True})
+        elif op == "get":
+            client.queue({"ok": True, "value": self.state[kind]})
+        elif op == "stream":
+            client.stream = kind
+            client.queue({"kind": kind, "value": waybar_output(kind, self.state[kind])})
+        else:
+            client.queue({"ok": False, "error": f"Unknown op: {op}"})
+
+    def flush(self, client):
+        if client.outbuf:
+            try:
+                sent = client.sock.send(client.outbuf)
+                client.outbuf = client.outbuf[sent:]
+            except BlockingIOError:
+                pass
+            except OSError:
+                self.drop(client)
+                return
+        if len(client.outbuf) > MAX_CLIENT_BUFFER:
+            self.drop(client)
+            return
+        events = selectors.EVENT_READ | (selectors.EVENT_WRITE if client.outbuf else 0)
+        self.selector.modify(client.sock, events, self.on_client)
+
+    def drop(self, client):
+        self.clients.pop(client.sock, None)
+        try:
+            self.selector.unregister(client.sock)
+        except (KeyError, ValueError):
+            pass
+        client.sock.close()
+
+
+def connect(timeout=CLIENT_TIMEOUT):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(socket_path())
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def request(line):
+    """Send one request line and return the reply; raises OSError if the daemon is down."""
+    with connect() as sock:
+        sock.sendall(line.encode() + b"\n")
+        reply = b""
+        while not reply.endswith(b"\n"):
+            chunk = sock.recv(4096)
+            if not chunk:
+                raise ConnectionError("Audio controller closed the connection")
+            reply += chunk
+    message = json.loads(reply)
+    if not message.get("ok"):
+        raise ValueError(message.get("error"))
+    return message.get("value")
+
+
+def send_command(kind, action):
+    """Forward inc/dec/toggle to the controller. Returns False if it isn't running."""
+    try:
+        request(f"{action} {kind}")
+    except OSError:
+        return False
+    return True
+
+
+def stream(kind):
+    """Print the device's waybar JSON and a line per change, reconnecting if needed."""
+    last_line = None
+
+    def emit(value):
+        nonlocal last_line
+        line = json.dumps(value, ensure_ascii=False)
+        if line != last_line:
+            print(line, flush=True)
+            last_line = line
+
+    while True:
+        try:
+            with connect(timeout=None) as sock:
+                sock.sendall(f"stream {kind}\n".encode())
+                with sock.makefile("rb") as lines:
+                    for line in lines:
+                        emit(json.loads(line)["value"])
+        except (OSError, ValueError) as e:
+            logging.debug(f"Audio controller unavailable: {e}")
+        emit(UNKNOWN_OUTPUT)
+        time.sleep(STREAM_RETRY_INTERVAL)
+
+
+def serve():
+    controller = AudioController(socket_path())
+    controller.start()
+    # systemctl stop: exit through finally so the socket is removed
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        controller.serve_forever()
+    except KeyboardInterrupt:
+        logging.info("Audio controller interrupted by user")
+    finally:
+        logging.info(f"Audio controller stats: {controller.stats}")
+        controller.close()
+
+
+def main():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--debug", action="store_true", help="Enable debug logging")
+    parser = argparse.ArgumentParser(description="Audio controller daemon and client")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("serve", parents=[common], help="Run the daemon")
+    send_parser = sub.add_parser("send", parents=[common], help="Send a volume command")
+    send_parser.add_argument("kind", choices=sorted(DEVICES))
+    send_parser.add_argument("action", choices=ACTIONS)
+    stream_parser = sub.add_parser(
+        "stream", parents=[common], help="Print waybar JSON on every change (waybar exec)"
+    )
+    stream_parser.add_argument("kind", choices=sorted(DEVICES))
+    get_parser = sub.add_parser("get", parents=[common], help="Print a device's state")
+    get_parser.add_argument("kind", choices=sorted(DEVICES))
+    sub.add_parser("stats", parents=[common], help="Print command/pactl call counters")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        if logging_utils is not None:
+            logging_utils.configure_logging()
+        else:
+            logging.basicConfig(format="%(asctime)s %(levelname)s %(message)s")
+        logging.getLogger().setLevel(logging.DEBUG if args.debug else logging.WARNING)
+        serve()
+        return 0
+
+    # Clients may run under waybar; stdout is the module output, so log to stderr only
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.WARNING, stream=sys.stderr)
+    try:
+        if args.command == "send":
+            if not send_command(args.kind, args.action):
+                print("Audio controller is not running", file=sys.stderr)
+                return 1
+        elif args.command == "stream":
+            stream(args.kind)
+        elif args.command == "get":
+            print(json.dumps(request(f"get {args.kind}")))
+        elif args.command == "stats":
+            print(json.dumps(request("stats")))
+    except (KeyboardInterrupt, BrokenPipeError):
+        pass
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -109,9 +109,9 @@ if __name__ == "__main__":
     command = sys.argv[1] if len(sys.argv) > 1 else "--get"
     if command == "--get":
         print(get_mic_volume())
-    elif command == "--inc":
-        inc_mic_volume()
-    elif command == "--dec":
-        dec_mic_volume()
-    elif command == "--toggle":
-        toggle_mic()
+    elif command in ("--inc", "--dec", "--toggle"):
+        # The resident controller coalesces repeats; run pactl directly if it's down
+        from audio_controller import send_command
+
+        if not send_command("source", command[2:]):
+            {"--inc": inc_mic_volume, "--dec": dec_mic_volume, "--toggle": toggle_mic}[command]()
@@ -1,11 +1,27 @@
 #!/usr/bin/env python3
 
-"""Waybar module to show special workspace indicators."""
+"""Waybar module to show special workspace indicators.
 
+One-shot mode prints the indicator for one monitor side and exits. Watch mode
+(--watch) is a resident service: it syncs once from hyprctl, then follows
+Hyprland's socket2 events and publishes a side's indicator on the status bus
+(special_workspaces_left/right) only when its counts or active special
+workspace change, serving both monitors from one process. Waybar modules
+follow those topics with `status_busd.py stream`.
+"""
+
+import argparse
 import json
 import os
+import socket
 import subprocess
 import sys
+import time
+
+SPECIAL_TYPES = ("stash", "secure", "full")
+MONITOR_SIDES = {"L32p-30": "right", "P27u-20": "left"}
+TOPIC = "special_workspaces_{side}"
+RECONNECT_DELAY = 5
 
 
 def get_current_monitor_side():
@@ -81,6 +97,21 @@ def get_active_special_workspace(monitor_side):
         return None
 
 
+def count_special_windows(workspace_names, monitor_side):
+    """Count windows per special workspace type for one monitor side.
+
+    Args:
+        workspace_names: Iterable of the workspace name of every window
+        monitor_side: "left" or "right" indicating which monitor
+    """
+    counts = {ws_type: 0 for ws_type in SPECIAL_TYPES}
+    for workspace_name in workspace_names:
+        for ws_type in SPECIAL_TYPES:
+            if workspace_name == f"special:{ws_type}-{monitor_side}":
+                counts[ws_type] += 1
+    return counts
+
+
 def get_special_workspace_counts(monitor_side):
     """Get count of windows in each special workspace for this monitor.
 
@@ -96,61 +127,36 @@ def get_special_workspace_counts(monitor_side):
         )
         clients = json.loads(result.stdout)
     except (subprocess.CalledProcessError, json.JSONDecodeError):
-        return {"stash": 0, "secure": 0, "full": 0}
-
-    counts = {"stash": 0, "secure": 0, "full": 0}
+        return {ws_type: 0 for ws_type in SPECIAL_TYPES}
 
-    for client in clients:
-        workspace_name = client.get("workspace", {}).get("name", "")
-
-        # Only count windows in THIS monitor's special workspaces
-        if workspace_name == f"special:stash-{monitor_side}":
-            counts["stash"] += 1
-        elif workspace_name == f"special:secure-{monitor_side}":
-            counts["secure"] += 1
-        elif workspace_name == f"special:full-{monitor_side}":
-            counts["full"] += 1
-
-    return counts
-
-
-def main():
-    """Generate waybar output."""
-    # Check if monitor side was passed as argument, otherwise detect it
-    if len(sys.argv) > 1:
-        monitor_side = sys.argv[1]
-    else:
-        monitor_side = get_current_monitor_side()
+    # Only count windows in THIS monitor's special workspaces
+    return count_special_windows(
+        (client.get("workspace", {}).get("name", "") for client in clients),
+        monitor_side
+    )
 
-    # If detection failed, show error
-    if monitor_side == "error":
-        print(json.dumps({
-            "text": " ERR ",
-            "tooltip": "WAYBAR_OUTPUT_NAME not set",
-            "class": "error"
-        }))
-        return
 
-    counts = get_special_workspace_counts(monitor_side)
-    active_workspace = get_active_special_workspace(monitor_side)
+def build_output(monitor_side, counts, active_workspace):
+    """Build the waybar JSON payload for one monitor side.
 
+    Args:
+        monitor_side: "left" or "right" indicating which monitor
+        counts: Window count per special workspace type
+        active_workspace: Name of the monitor's visible special workspace or None
+    """
     # Determine which workspace is active
     active_ws = None
-    if active_workspace == f"special:stash-{monitor_side}":
-        active_ws = "stash"
-    elif active_workspace == f"special:secure-{monitor_side}":
-        active_ws = "secure"
-    elif active_workspace == f"special:full-{monitor_side}":
-        active_ws = "full"
+    for ws_type in SPECIAL_TYPES:
+        if active_workspace == f"special:{ws_type}-{monitor_side}":
+            active_ws = ws_type
 
     # If all are empty AND we're not in a special workspace, show just a black circle
     if all(count == 0 for count in counts.values()) and not active_ws:
-        print(json.dumps({
+        return {
             "text": " ⚫ ",
             "tooltip": "All special workspaces empty",
             "class": "empty"
-        }))
-        return
+        }
 
     # Build indicator text
     indicators = []
@@ -193,11 +199,193 @@ def main():
     text = " " + " ".join(indicators) + " "
     tooltip = "\n".join(tooltip_lines) if tooltip_lines else "All special workspaces empty"
 
-    print(json.dumps({
+    return {
         "text": text,
         "tooltip": tooltip,
         "class": css_class
-    }))
+    }
+
+
+class SpecialWorkspaceState:
+    """In-memory view of special workspace occupancy, kept current from socket2 events."""
+
+    def __init__(self):
+        # {address_without_0x: workspace_name}
+        self.windows = {}
+        # {monitor_name: side}
+        self.monitor_sides = {}
+        # {side: active special workspace name or None}
+        self.active = {}
+
+    def sync(self):
+        """Rebuild the state from hyprctl (startup, reconnects and monitor changes)."""
+        monitors = run_hyprctl_json("monitors")
+        clients = run_hyprctl_json("clients")
+        if monitors is None or clients is None:
+            return False
+
+        self.monitor_sides = {}
+        self.active = {}
+        for monitor in monitors:
+            side = side_for_description(monitor.get("description", ""))
+            if side is None:
+                continue
+            self.monitor_sides[monitor.get("name", "")] = side
+            self.active[side] = (monitor.get("specialWorkspace") or {}).get("name") or None
+
+        self.windows = {
+            normalize_address(client.get("address", "")): client.get("workspace", {}).get("name", "")
+            for client in clients
+        }
+        return True
+
+    def apply_event(self, line):
+        """Apply one socket2 event line. Returns True if a resync is needed."""
+        event, _, data = line.partition(">>")
+        if event == "openwindow":
+            address, workspace_name = data.split(",", 2)[:2]
+            self.windows[normalize_address(address)] = workspace_name
+        elif event == "closewindow":
+            self.windows.pop(normalize_address(data), None)
+        elif event == "movewindowv2":
+            address, _, workspace_name = data.split(",", 2)
+            self.windows[normalize_address(address)] = workspace_name
+        elif event == "activespecial":
+            workspace_name, _, monitor_name = data.rpartition(",")
+            side = self.monitor_sides.get(monitor_name)
+            if side:
+                self.active[side] = workspace_name or None
+        elif event in ("monitoradded", "monitoraddedv2", "monitorremoved", "configreloaded"):
+            return True
+        return False
+
+    def outputs(self):
+        """Return the waybar payload for every known monitor side."""
+        return {
+            side: build_output(side, count_special_windows(self.windows.values(), side), self.active.get(side))
+            for side in sorted(set(self.monitor_sides.values()))
+        }
+
+
+def side_for_description(description):
+    """Map a monitor description to its side, or None for unknown monitors."""
+    for marker, side in MONITOR_SIDES.items():
+        if marker in description:
+            return side
+    return None
+
+
+def normalize_address(address):
+    """socket2 events omit the 0x prefix that hyprctl uses."""
+    return address[2:] if address.startswith("0x") else address
+
+
+def run_hyprctl_json(command):
+    """Run `hyprctl <command> -j` and return the parsed output, or None on error."""
+    try:
+        result = subprocess.run(
+            ["hyprctl", command, "-j"],
+            capture_output=True,
+            text=True,
+            check=True
+        )
+        return json.loads(result.stdout)
+    except (subprocess.CalledProcessError, json.JSONDecodeError, FileNotFoundError):
+        return None
+
+
+def socket2_path():
+    """Return the path of Hyprland's event socket."""
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR", f"/run/user/{os.getuid()}")
+    signature = os.environ.get("HYPRLAND_INSTANCE_SIGNATURE", "")
+    return f"{runtime_dir}/hypr/{signature}/.socket2.sock"
+
+
+def watch(follow_side=None):
+    """Follow Hyprland events and publish per-side output only on change.
+
+    Args:
+        follow_side: If set, also print that side's JSON lines to stdout
+    """
+    # Only watch mode needs the bus, so one-shot mode keeps working without _utils
+    sys.path.append("/home/rash/.config/scripts")
+    from _utils import status_bus
+
+    state = SpecialWorkspaceState()
+    last_outputs = {}
+
+    def publish():
+        for side, payload in state.outputs().items():
+            if last_outputs.get(side) == payload:
+                continue
+            last_outputs[side] = payload
+            status_bus.publish(TOPIC.format(side=side), payload)
+            if side == follow_side:
+                print(json.dumps(payload), flush=True)
+
+    while True:
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                # Connect before syncing so no event between the two is missed
+                sock.connect(socket2_path())
+                if state.sync():
+                    publish()
+
+                buffer = b""
+                while True:
+                    chunk = sock.recv(4096)
+                    if not chunk:
+                        break
+                    buffer += chunk
+                    *lines, buffer = buffer.split(b"\n")
+                    needs_sync = False
+                    for line in lines:
+                        needs_sync |= state.apply_event(line.decode("utf-8", errors="ignore"))
+                    if needs_sync:
+                        state.sync()
+                    publish()
+        except KeyboardInterrupt:
+            return
+        except (OSError, ValueError) as e:
+            print(f"Hyprland event socket error: {e}, reconnecting in {RECONNECT_DELAY}s...", file=sys.stderr)
+        time.sleep(RECONNECT_DELAY)
+
+
+def main():
+    """Generate waybar output."""
+    parser = argparse.ArgumentParser(description="Waybar special workspace indicators")
+    parser.add_argument("side", nargs="?", choices=["left", "right"], help="Monitor side (default: detect from WAYBAR_OUTPUT_NAME)")
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help=f"Run continuously, publishing {TOPIC} on change (and printing SIDE's lines if given)"
+    )
+    parser.add_argument("--detect-side", action="store_true", help="Print this waybar instance's monitor side and exit")
+    args = parser.parse_args()
+
+    if args.watch:
+        watch(follow_side=args.side)
+        return
+
+    if args.detect_side:
+        print(get_current_monitor_side())
+        return
+
+    # Check if monitor side was passed as argument, otherwise detect it
+    monitor_side = args.side or get_current_monitor_side()
+
+    # If detection failed, show error
+    if monitor_side == "error":
+        print(json.dumps({
+            "text": " ERR ",
+            "tooltip": "WAYBAR_OUTPUT_NAME not set",
+            "class": "error"
+        }))
+        return
+
+    counts = get_special_workspace_counts(monitor_side)
+    active_workspace = get_active_special_workspace(monitor_side)
+    print(json.dumps(build_output(monitor_side, counts, active_workspace)))
 
 
 if __name__ == "__main__":
@@ -1,7 +1,11 @@
 #!/usr/bin/env python3
 
+import argparse
 import json
 import logging
+import os
+import socket
+import struct
 import subprocess
 import sys
 import time
@@ -9,48 +13,372 @@ import time
 # Add the custom script path to PYTHONPATH
 sys.path.append("/home/rash/.config/scripts")
 from _utils import logging_utils
+from _utils import status_bus
 
-# Configure logging
-logging_utils.configure_logging()
-logging.info("Script launched.")
+"""
+Throughput probe for waybar.
 
+Probes run on a schedule but only while the machine is idle for the network
+(not while the webcam is in use, i.e. not in a call); a busy slot is retried
+shortly after instead of skipped. Every result goes into a fixed-size ring
+buffer file, and the tooltip shows min/median/p95 and the recent trend over
+that history. Output is published on the status bus ("speedtest").
 
-def parse_speedtest_output(json_str):
-    data = json.loads(json_str)
-    ping = data["ping"]
-    download = float(data["download"]) / 1000000
-    upload = float(data["upload"]) / 1000000
-    return ping, download, upload
+Two backends:
+  internet  speedtest++ against a public server (as before)
+  local     this script's own server on the LAN (`speedtest.py serve`), so
+            the LAN path can be measured, and the whole thing tested,
+            without internet
 
+Usage:
+    speedtest.py run [--backend local --server host[:port]] [--interval 900]
+    speedtest.py probe [--backend local --server 127.0.0.1]
+    speedtest.py serve [--port 5299]
+    speedtest.py stats
+"""
 
-def main():
-    output_file = "/tmp/speedtest_output.json"
-    interval = 900  # Interval in seconds (15 minutes)
+INTERVAL = 900  # Seconds between probes (15 minutes)
+BUSY_RETRY = 60  # Seconds to wait when a probe is due but the machine is busy
+HISTORY_FILE = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "speedtest_history.bin"
+)
+HISTORY_CAPACITY = 672  # One week at the default interval
+TREND_WINDOW = 4  # Latest results compared against the history median
+TREND_THRESHOLD = 0.1  # Relative change shown as a trend arrow
 
-    while True:
-        # Call the speedtest++ command and get the output
-        result = subprocess.run(
-            ["speedtest++", "--output", "json"], capture_output=True, text=True
-        )
-        if result.returncode == 0:
-            json_output = result.stdout
-            logging.info("Speedtest++ command completed successfully.")
-            logging.debug(f"Speedtest++ output: {json_output}")
-            # Parse and write the desired output to a file
-            ping, download, upload = parse_speedtest_output(json_output)
-            text_string = f"{ping} 󰱠 {download:.2f} 󰛴 {upload:.2f} 󰛶"
-            logging.info(f"Parsed output: {text_string}")
-            with open(output_file, "w") as f:
-                json.dump({"text": f"{text_string}", "tooltip": f"{text_string}"}, f)
-        else:
-            logging.error(
-                f"Speedtest++ command failed with return code {result.returncode}."
+LOCAL_PORT = 5299
+LOCAL_BYTES = 32 * 1024 * 1024  # Transferred each way per local probe
+LOCAL_CHUNK = 256 * 1024
+LOCAL_PINGS = 5
+LOCAL_TIMEOUT = 30
+
+
+def arg_parser():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--debug", action="store_true", help="Enable debug logging")
+    probe_options = argparse.ArgumentParser(add_help=False)
+    probe_options.add_argument(
+        "--backend", choices=["internet", "local"], default="internet",
+        help="internet (speedtest++) or local (speedtest.py serve on the LAN)",
+    )
+    probe_options.add_argument("--server", help="host[:port] of the local server")
+
+    parser = argparse.ArgumentParser(description="Scheduled throughput probe for waybar")
+    sub = parser.add_subparsers(dest="command")
+    run_parser = sub.add_parser(
+        "run", parents=[common, probe_options], help="Probe on a schedule (default)"
+    )
+    run_parser.add_argument("--interval", type=int, default=INTERVAL)
+    sub.add_parser("probe", parents=[common, probe_options], help="Probe once and record it")
+    serve_parser = sub.add_parser("serve", parents=[common], help="Run the local probe server")
+    serve_parser.add_argument("--host", default="0.0.0.0")
+    serve_parser.add_argument("--port", type=int, default=LOCAL_PORT)
+    sub.add_parser("stats", parents=[common], help="Print the history summary")
+    args = parser.parse_args()
+    if args.command is None:
+        # Plain `speedtest.py` keeps its old meaning
+        args = parser.parse_args(["run"] + sys.argv[1:])
+    if getattr(args, "backend", None) == "local" and not args.server:
+        parser.error("--backend local needs --server")
+    return args
+
+
+class RingHistory:
+    """
+    Fixed-size on-disk ring buffer of probe results.
+
+    Header: magic, capacity, next slot, count. Each record is
+    (timestamp, ping ms, download Mbit/s, upload Mbit/s). Appending rewrites
+    one record and the header, so the file never grows.
+    """
+
+    MAGIC = b"SPT1"
+    HEADER = struct.Struct("<4sIII")
+    RECORD = struct.Struct("<dfff")
+
+    def __init__(self, path, capacity=HISTORY_CAPACITY):
+        self.path = path
+        self.capacity = capacity
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if not self._valid():
+            with open(path, "wb") as f:
+                f.write(self.HEADER.pack(self.MAGIC, capacity, 0, 0))
+                f.write(b"\0" * self.RECORD.size * capacity)
+
+    def _valid(self):
+        try:
+            with open(self.path, "rb") as f:
+                magic, capacity, _next, _count = self.HEADER.unpack(f.read(self.HEADER.size))
+            return magic == self.MAGIC and capacity == self.capacity
+        except (OSError, struct.error):
+            return False
+
+    def append(self, timestamp, ping, download, upload):
+        with open(self.path, "r+b") as f:
+            magic, capacity, next_slot, count = self.HEADER.unpack(f.read(self.HEADER.size))
+            f.seek(self.HEADER.size + next_slot * self.RECORD.size)
+            f.write(self.RECORD.pack(timestamp, ping, download, upload))
+            f.seek(0)
+            f.write(
+                self.HEADER.pack(magic, capacity, (next_slot + 1) % capacity, min(count + 1, capacity))
             )
-            logging.error(f"Error output: {result.stderr}")
 
-        # Wait for the specified interval before running the test again
-        time.sleep(interval)
+    def records(self):
+        """All stored results, oldest first."""
+        with open(self.path, "rb") as f:
+            data = f.read()
+        _magic, capacity, next_slot, count = self.HEADER.unpack_from(data)
+        start = (next_slot - count) % capacity
+        return [
+            self.RECORD.unpack_from(data, self.HEADER.size + ((start + i) % capacity) * self.RECORD.size)
+            for i in range(count)
+        ]
+
+
+def percentile(sorted_values, fraction):
+    index = (len(sorted_values) - 1) * fraction
+    lower = int(index)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (index - lower)
+
+
+def summarize(values):
+    ordered = sorted(values)
+    return {
+        "min": ordered[0],
+        "median": percentile(ordered, 0.5),
+        "p95": percentile(ordered, 0.95),
+    }
+
+
+def trend(values):
+    """Arrow comparing the latest results with the history median."""
+    if len(values) <= TREND_WINDOW:
+        return ""
+    baseline = percentile(sorted(values), 0.5)
+    recent = percentile(sorted(values[-TREND_WINDOW:]), 0.5)
+    if baseline and recent > baseline * (1 + TREND_THRESHOLD):
+        return "↑"
+    if baseline and recent < baseline * (1 - TREND_THRESHOLD):
+        return "↓"
+    return "→"
+
+
+def build_output(records, backend):
+    if not records:
+        return {"text": "…", "tooltip": "No measurements yet", "class": "speedtest-pending"}
+    _timestamp, ping, download, upload = records[-1]
+    text = f"{ping:.0f} 󰱠 {download:.2f} 󰛴 {upload:.2f} 󰛶"
+
+    lines = [f"{backend} · {len(records)} probes"]
+    columns = [("ping ms", 1), ("down Mbit/s", 2), ("up Mbit/s", 3)]
+    for name, index in columns:
+        values = [record[index] for record in records]
+        stats = summarize(values)
+        lines.append(
+            f"{name:<12} min {stats['min']:.1f}  med {stats['median']:.1f}  "
+            f"p95 {stats['p95']:.1f}  {trend(values)}"
+        )
+    lines.append(time.strftime("last %H:%M", time.localtime(records[-1][0])))
+    return {"text": text, "tooltip": "\n".join(lines), "class": "speedtest"}
+
+
+# ----- Probes -----
+
+
+def probe_internet():
+    """(ping ms, download Mbit/s, upload Mbit/s) from speedtest++."""
+    result = subprocess.run(["speedtest++", "--output", "json"], capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"speedtest++ failed ({result.returncode}): {result.stderr.strip()}")
+    logging.debug(f"Speedtest++ output: {result.stdout}")
+    data = json.loads(result.stdout)
+    return (
+        float(data["ping"]),
+        float(data["download"]) / 1000000,
+        float(data["upload"]) / 1000000,
+    )
+
+
+def parse_server(server):
+    host, _, port = server.partition(":")
+    return host, int(port) if port else LOCAL_PORT
+
+
+def recv_exact(sock, count):
+    data = bytearray()
+    while len(data) < count:
+        chunk = sock.recv(count - len(data))
+        if not chunk:
+            raise ConnectionError("Server closed the connection")
+        data += chunk
+    return bytes(data)
+
+
+def probe_local(server, size=LOCAL_BYTES):
+    """
+    (ping ms, download Mbit/s, upload Mbit/s) against `speedtest.py serve`.
+
+    Ping is the median of a few one-byte round trips; throughput is timed
+    over a bulk transfer in each direction on the same connection.
+    """
+    with socket.create_connection(parse_server(server), timeout=LOCAL_TIMEOUT) as sock:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        rtts = []
+        for _ in range(LOCAL_PINGS):
+            start = time.perf_counter()
+            sock.sendall(b"P")
+            recv_exact(sock, 1)
+            rtts.append((time.perf_counter() - start) * 1000)
+
+        sock.sendall(b"D" + struct.pack("!Q", size))
+        start = time.perf_counter()
+        remaining = size
+        while remaining:
+            chunk = sock.recv(min(LOCAL_CHUNK, remaining))
+            if not chunk:
+                raise ConnectionError("Server closed the connection")
+            remaining -= len(chunk)
+        download = size * 8 / (time.perf_counter() - start) / 1000000
+
+        sock.sendall(b"U" + struct.pack("!Q", size))
+        payload = b"\0" * LOCAL_CHUNK
+        start = time.perf_counter()
+        remaining = size
+        while remaining:
+            sent = sock.send(payload[:min(LOCAL_CHUNK, remaining)])
+            remaining -= sent
+        recv_exact(sock, 1)  # Server acks once everything has arrived
+        upload = size * 8 / (time.perf_counter() - start) / 1000000
+
+    return sorted(rtts)[len(rtts) // 2], download, upload
+
+
+def serve(host, port):
+    """Local probe server: answers pings and streams bytes each way."""
+    import socketserver
+
+    class Handler(socketserver.BaseRequestHandler):
+        def handle(self):
+            sock = self.request
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            payload = b"\0" * LOCAL_CHUNK
+            try:
+                while True:
+                    op = sock.recv(1)
+                    if not op:
+                        return
+                    if op == b"P":
+                        sock.sendall(b"P")
+                        continue
+                    (size,) = struct.unpack("!Q", recv_exact(sock, 8))
+                    if op == b"D":
+                        while size:
+                            sent = sock.send(payload[:min(LOCAL_CHUNK, size)])
+                            size -= sent
+                    elif op == b"U":
+                        while size:
+                            chunk = sock.recv(min(LOCAL_CHUNK, size))
+                            if not chunk:
+                                return
+                            size -= len(chunk)
+                        sock.sendall(b"K")
+                    else:
+                        return
+            except OSError as e:
+                logging.debug(f"Probe client {self.client_address[0]} dropped: {e}")
+
+    class Server(socketserver.ThreadingTCPServer):
+        allow_reuse_address = True
+        daemon_threads = True
+
+    with Server((host, port), Handler) as server:
+        logging.info(f"Probe server listening on {host}:{port}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+# ----- Scheduling -----
+
+
+def is_busy():
+    """True while the network should be left alone (webcam in use = in a call)."""
+    try:
+        webcam = status_bus.get("webcam")
+    except (OSError, ValueError):
+        webcam = status_bus.read_file("webcam")
+    return webcam == "active"
+
+
+def probe_once(args, history):
+    if args.backend == "local":
+        ping, download, upload = probe_local(args.server)
+    else:
+        ping, download, upload = probe_internet()
+    logging.info(f"Probe: ping {ping:.1f} ms, down {download:.2f}, up {upload:.2f} Mbit/s")
+    history.append(time.time(), ping, download, upload)
+
+
+def publish(history, backend):
+    output = build_output(history.records(), backend)
+    try:
+        status_bus.publish("speedtest", output)
+    except (IOError, ValueError) as e:
+        logging.error(f"Failed to publish speedtest output: {e}")
+
+
+def run(args, history):
+    publish(history, args.backend)
+    records = history.records()
+    # Resume the schedule across restarts instead of probing on every start
+    next_probe = records[-1][0] + args.interval if records else time.time()
+
+    while True:
+        delay = next_probe - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        if is_busy():
+            logging.debug("Busy (webcam in use), postponing probe")
+            next_probe = time.time() + BUSY_RETRY
+            continue
+        try:
+            probe_once(args, history)
+            publish(history, args.backend)
+        except (OSError, RuntimeError, ValueError, KeyError) as e:
+            logging.error(f"Probe failed: {e}")
+        next_probe = time.time() + args.interval
+
+
+def main():
+    args = arg_parser()
+    logging_utils.configure_logging()
+    logging.getLogger().setLevel(logging.DEBUG if args.debug else logging.INFO)
+    logging.info("Script launched.")
+
+    if args.command == "serve":
+        serve(args.host, args.port)
+        return 0
+
+    history = RingHistory(HISTORY_FILE)
+    if args.command == "stats":
+        print(build_output(history.records(), "history")["tooltip"])
+    elif args.command == "probe":
+        try:
+            probe_once(args, history)
+        except (OSError, RuntimeError, ValueError, KeyError) as e:
+            logging.error(f"Probe failed: {e}")
+            return 1
+        publish(history, args.backend)
+        print(build_output(history.records(), args.backend)["tooltip"])
+    else:
+        try:
+            run(args, history)
+        except KeyboardInterrupt:
+            pass
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+Status bus: one resident process holding every status topic waybar and the
+idle scripts care about (see TOPICS in _utils/status_bus.py).
+
+Publishers send values over a Unix socket; waybar modules subscribe with
+`status_busd.py stream <topic>` and get a line per change. The legacy status
+files (in /tmp/mqtt and /tmp/waybar) are kept in sync as a compatibility
+sink, and writes to them by scripts that haven't moved to the bus are
+ingested via inotify.
+
+Usage:
+    status_busd.py serve
+    status_busd.py stream in_office_idle
+    status_busd.py stream idle_status --field text --default ⚫
+    status_busd.py get in_office
+    status_busd.py pub in_office on
+"""
+
+import argparse
+import json
+import logging
+import os
+import selectors
+import socket
+import sys
+import time
+
+# Add the custom script path to PYTHONPATH
+sys.path.append("/home/rash/.config/scripts")
+from _utils import logging_utils  # noqa: E402
+from _utils import status_bus  # noqa: E402
+from _utils.inotify import Inotify  # noqa: E402
+
+# Drop subscribers that stop reading rather than buffering for them forever
+MAX_CLIENT_BUFFER = 256 * 1024
+STREAM_RETRY_INTERVAL = 1
+UNKNOWN_OUTPUT = {"text": "?", "class": "unknown", "tooltip": "Status unknown"}
+
+
+def build_in_office_idle(state):
+    """Waybar output for the in-office module (formerly in_office_status.py)."""
+    if not state:
+        return {"text": "", "tooltip": "Error fetching state"}
+    return {
+        "text": "󰀈" if state == "on" else "󰀒",
+        "tooltip": f"Presence idle_inhibit is {state}",
+        "class": "icon-blue" if state == "on" else "icon-red",
+    }
+
+
+# Derived topics: output topic -> (input topic, function of the input value)
+DERIVED = {
+    "in_office_idle": ("in_office", build_in_office_idle),
+}
+
+
+class StatusBus:
+    """In-process pub/sub holding the latest value of every topic."""
+
+    def __init__(self):
+        self.values = {}
+        self._subscribers = []
+
+    def subscribe(self, callback):
+        """Call callback(topic, value, source) on every change."""
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def publish(self, topic, value, source):
+        """Validate and store a value; returns True if it changed anything."""
+        status_bus.validate(topic, value)
+        if self.values.get(topic) == value:
+            return False
+        self.values[topic] = value
+        logging.debug(f"{topic} = {value!r} (from {source})")
+        for callback in list(self._subscribers):
+            try:
+                callback(topic, value, source)
+            except Exception as e:
+                logging.error(f"Subscriber failed on {topic}: {e}", exc_info=True)
+        return True
+
+
+def file_sink(topic, value, source):
+    """Keep the legacy status file in sync, unless that's where the value came from."""
+    if source == "file":
+        return
+    try:
+        status_bus.write_file(topic, value)
+    except OSError as e:
+        logging.warning(f"Failed to write {status_bus.TOPICS[topic]['file']}: {e}")
+
+
+def make_deriver(bus):
+    def derive(topic, value, source):
+        for output, (input_topic, build) in DERIVED.items():
+            if topic == input_topic:
+                bus.publish(output, build(value), "derived")
+
+    return derive
+
+
+class Client:
+    """One socket connection: request/reply, or a subscription stream."""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.inbuf = b""
+        self.outbuf = b""
+        self.topics = None
+
+    def queue(self, message):
+        self.outbuf += json.dumps(message, ensure_ascii=False).encode() + b"\n"
+
+
+class StatusBusServer:
+    def __init__(self, bus, path):
+        self.bus = bus
+        self.path = path
+        self.selector = selectors.DefaultSelector()
+        self.clients = {}
+        self.file_topics = {
+            spec["file"]: topic
+            for topic, spec in status_bus.TOPICS.items()
+            if not spec.get("derived")
+        }
+        self.inotify = Inotify()
+        self.bus.subscribe(self.broadcast)
+
+    def start(self):
+        for directory in sorted({os.path.dirname(path) for path in self.file_topics}):
+            os.makedirs(directory, exist_ok=True)
+            self.inotify.add_watch(directory)
+        self.selector.register(self.inotify, selectors.EVENT_READ, self.on_inotify)
+
+        # Seed from whatever the legacy files currently hold
+        for topic in self.file_topics.values():
+            value = status_bus.read_file(topic)
+            if value is not None:
+                self.bus.publish(topic, value, "file")
+        for output, (input_topic, build) in DERIVED.items():
+            self.bus.publish(output, build(self.bus.values.get(input_topic)), "derived")
+
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.listener.bind(self.path)
+        os.chmod(self.path, 0o600)
+        self.listener.listen(32)
+        self.listener.setblocking(False)
+        self.selector.register(self.listener, selectors.EVENT_READ, self.on_accept)
+        logging.info(f"Status bus listening on {self.path}")
+
+    def serve_forever(self):
+        while True:
+            for key, mask in self.selector.select():
+                key.data(key.fileobj, mask)
+
+    def close(self):
+        for client in list(self.clients.values()):
+            self.drop(client)
+        self.listener.close()
+        self.inotify.close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    def on_inotify(self, _fileobj, _mask):
+        for path, _event in self.inotify.read():
+            topic = self.file_topics.get(path)
+            if topic is None:
+                continue
+            try:
+                with open(path) as f:
+                    value = status_bus.decode_file(topic, f.read())
+            except FileNotFoundError:
+                continue
+            except (OSError, ValueError) as e:
+                # Half-written or garbage file; the next write will fix it
+                logging.debug(f"Ignoring {path}: {e}")
+                continue
+            self.bus.publish(topic, value, "file")
+
+    def on_accept(self, listener, _mask):
+        try:
+            sock, _ = listener.accept()
+        except BlockingIOError:
+            return
+        sock.setblocking(False)
+        client = Client(sock)
+        self.clients[sock] = client
+        self.selector.register(sock, selectors.EVENT_READ, self.on_client)
+
+    def on_client(self, sock, mask):
+        client = self.clients.get(sock)
+        if client is None:
+            return
+        if mask & selectors.EVENT_READ:
+            try:
+                data = sock.recv(65536)
+            except BlockingIOError:
+                data = None
+            except OSError:
+                data = b""
+            if data == b"":
+                self.drop(client)
+                return
+            if data:
+                client.inbuf += data
+                while b"\n" in client.inbuf:
+                    line, client.inbuf = client.inbuf.split(b"\n", 1)
+                    if line.strip():
+                        self.handle(client, line)
+        self.flush(client)
+
+    def handle(self, client, line):
+        try:
+            message = json.loads(line)
+            op = message.get("op")
+            if op == "pub":
+                topic = message.get("topic")
+                if status_bus.TOPICS.get(topic, {}).get("derived"):
+                    raise ValueError(f"{topic} is derived and can't be published")
+                changed = self.bus.publish(topic, message.get("value"), "socket")
+                client.queue({"ok": True, "changed": changed})
+            elif op == "get":
+                topic = message.get("topic")
+                if topic not in status_bus.TOPICS:
+                    raise ValueError(f"Unknown topic: {topic}")
+                client.queue({"ok": True, "value": self.bus.values.get(topic)})
+            elif op == "sub":
+                topics = message.get("topics") or list(status_bus.TOPICS)
+                unknown = [t for t in topics if t not in status_bus.TOPICS]
+                if unknown:
+                    raise ValueError(f"Unknown topics: {', '.join(unknown)}")
+                client.topics = set(topics)
+                for topic in topics:
+                    if topic in self.bus.values:
+                        client.queue({"topic": topic, "value": self.bus.values[topic]})
+            else:
+                raise ValueError(f"Unknown op: {op}")
+        except (ValueError, AttributeError) as e:
+            client.queue({"ok": False, "error": str(e)})
+
+    def broadcast(self, topic, value, _source):
+        for client in list(self.clients.values()):
+            if client.topics and topic in client.topics:
+                client.queue({"topic": topic, "value": value})
+                self.flush(client)
+
+    def flush(self, client):
+        if client.outbuf:
+            try:
+                sent = client.sock.send(client.outbuf)
+                client.outbuf = client.outbuf[sent:]
+            except BlockingIOError:
+                pass
+            except OSError:
+                self.drop(client)
+                return
+        if len(client.outbuf) > MAX_CLIENT_BUFFER:
+            logging.warning("Dropping subscriber that stopped reading")
+            self.drop(client)
+            return
+        events = selectors.EVENT_READ | (selectors.EVENT_WRITE if client.outbuf else 0)
+        self.selector.modify(client.sock, events, self.on_client)
+
+    def drop(self, client):
+        self.clients.pop(client.sock, None)
+        try:
+            self.selector.unregister(client.sock)
+        except (KeyError, ValueError):
+            pass
+        client.sock.close()
+
+
+def format_value(value, field, default):
+    """Render a value as one waybar line."""
+    if value is None:
+        return default
+    if isinstance(value, dict):
+        if field:
+            return str(value.get(field, default))
+        return json.dumps(value, ensure_ascii=False)
+    return str(value)
+
+
+def stream(topic, field, default):
+    """
+    Print the topic's value and one line per change, for waybar `exec`.
+
+    While the daemon is down the status file is shown instead (polled), and
+    the connection is retried so the module recovers on its own.
+    """
+    last_line = None
+
+    def emit(value):
+        nonlocal last_line
+        line = format_value(value, field, default)
+        if line != last_line:
+            print(line, flush=True)
+            last_line = line
+
+    while True:
+        try:
+            for _topic, value in status_bus.subscribe([topic]):
+                emit(value)
+        except (OSError, ValueError) as e:
+            logging.debug(f"Status bus unavailable: {e}")
+        emit(status_bus.read_file(topic))
+        time.sleep(STREAM_RETRY_INTERVAL)
+
+
+def serve():
+    bus = StatusBus()
+    bus.subscribe(file_sink)
+    bus.subscribe(make_deriver(bus))
+    server = StatusBusServer(bus, status_bus.socket_path())
+    server.start()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logging.info("Status bus interrupted by user")
+    finally:
+        server.close()
+
+
+def main():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--debug", action="store_true", help="Enable debug logging")
+    parser = argparse.ArgumentParser(description="Status bus daemon and client")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("serve", parents=[common], help="Run the daemon")
+    stream_parser = sub.add_parser(
+        "stream", parents=[common], help="Print a topic on every change (waybar exec)"
+    )
+    stream_parser.add_argument("topic", choices=sorted(status_bus.TOPICS))
+    stream_parser.add_argument("--field", help="Print only this key of a JSON topic")
+    stream_parser.add_argument("--default", help="Output when the topic has no value")
+    get_parser = sub.add_parser("get", parents=[common], help="Print a topic's current value")
+    get_parser.add_argument("topic", choices=sorted(status_bus.TOPICS))
+    pub_parser = sub.add_parser("pub", parents=[common], help="Publish a value (JSON for dict topics)")
+    pub_parser.add_argument("topic", choices=sorted(status_bus.TOPICS))
+    pub_parser.add_argument("value")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        logging_utils.configure_logging()
+        logging.getLogger().setLevel(logging.DEBUG if args.debug else logging.WARNING)
+        serve()
+    else:
+        # Clients run under waybar; stdout is the module output, so log to stderr only
+        logging.basicConfig(
+            level=logging.DEBUG if args.debug else logging.WARNING, stream=sys.stderr
+        )
+
+    if args.command == "stream":
+        default = args.default
+        if default is None:
+            default = UNKNOWN_OUTPUT["text"] if args.field else json.dumps(UNKNOWN_OUTPUT)
+        try:
+            stream(args.topic, args.field, default)
+        except (KeyboardInterrupt, BrokenPipeError):
+            pass
+    elif args.command == "get":
+        print(format_value(status_bus.get(args.topic), None, ""))
+    elif args.command == "pub":
+        value = args.value
+        if status_bus.TOPICS[args.topic]["type"] is dict:
+            value = json.loads(value)
+        try:
+            status_bus.publish(args.topic, value)
+        except ValueError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,9 +4,9 @@ import argparse
 import json
 import logging
 import os
-import subprocess
 import sys
 import time
+import urllib.request
 from datetime import datetime, timedelta
 
 import pytz
@@ -14,12 +14,37 @@ import pytz
 # Add the custom script path to PYTHONPATH
 sys.path.append("/home/rash/.config/scripts")
 from _utils import logging_utils
+from _utils import status_bus
+
+"""
+Tibber price for waybar.
+
+Prices for today and tomorrow are fetched once, when Tibber publishes them
+(tomorrow's arrive around 13:00), and every slot's price class, icon class
+and 3 hour look-ahead is precomputed. The tick at each slot boundary is then
+a lookup with no network. The price table is cached on disk so a restart
+doesn't refetch, and failed fetches back off instead of retrying every tick.
+
+Both hourly and 15 minute price resolution are handled; the slot length is
+taken from the data.
+
+Usage:
+    tibber_price.py [--resolution quarter_hourly] [--debug]
+    tibber_price.py --dump      # print the precomputed table and exit
+"""
 
 # Parse command-line arguments
 parser = argparse.ArgumentParser(
     description="Fetch and display Tibber price information."
 )
 parser.add_argument("--debug", action="store_true", help="Enable debug logging")
+parser.add_argument(
+    "--resolution",
+    choices=["hourly", "quarter_hourly"],
+    default="hourly",
+    help="Price resolution to request from Tibber (default: %(default)s)",
+)
+parser.add_argument("--dump", action="store_true", help="Print the price table and exit")
 args = parser.parse_args()
 
 # Configure logging
@@ -39,172 +64,255 @@ if not TIBBER_TOKEN:
     else:
         raise EnvironmentError("TIBBER_TOKEN not found in environment or secrets file")
 
+API_URL = "https://api.tibber.com/v1-beta/gql"
+HOME_ID = "c6a410ee-85a7-4a25-90a7-e328cdcf5aea"
+TIMEZONE = pytz.timezone("Europe/Stockholm")
+CACHE_FILE = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "tibber_prices.json"
+)
 
-def fetch_prices():
-
-    price_leeway = 0.12  # Percentage of the price range to consider for margin
-
-    command = [
-        "curl",
-        "-s",
-        "-H",
-        f"Authorization: Bearer {TIBBER_TOKEN}",
-        "-H",
-        "Content-Type: application/json",
-        "-X",
-        "POST",
-        "-d",
-        '{ "query": "{viewer {home(id: \\"c6a410ee-85a7-4a25-90a7-e328cdcf5aea\\") '
-        "{currentSubscription {priceInfo {current {total startsAt} today {total startsAt} "
-        'tomorrow {total startsAt}}}}}}" }',
-        "https://api.tibber.com/v1-beta/gql",
-    ]
-
-    # Execute the command
-    result = subprocess.run(command, capture_output=True, text=True)
-    output = result.stdout
-
-    # Parse the JSON output
-    data = json.loads(output)
-
-    # Extract the current price and all today's prices
-    current_price_info = data["data"]["viewer"]["home"]["currentSubscription"][
-        "priceInfo"
-    ]["current"]
-    today_prices = data["data"]["viewer"]["home"]["currentSubscription"]["priceInfo"][
-        "today"
-    ]
-    tomorrow_prices = data["data"]["viewer"]["home"]["currentSubscription"][
-        "priceInfo"
-    ].get("tomorrow", [])
-
-    # Find the current hour index
-    current_time = datetime.now(pytz.timezone("Europe/Stockholm"))
-    # Get timezone offset dynamically to handle DST
-    tz_offset = current_time.strftime("%z")  # Format: +0200 or +0100
-    tz_offset = f"{tz_offset[:3]}:{tz_offset[3:]}"  # Convert to +02:00 or +01:00 format
-    current_hour = current_time.strftime(f"%Y-%m-%dT%H:00:00.000{tz_offset}")
-
-    # Append tomorrow's prices to today's prices if available
-    combined_prices = today_prices + tomorrow_prices
-
-    # Filter prices between 7am and 10pm for percentile calculation
-    awake_hours = [
-        hour for hour in today_prices if 7 <= int(hour["startsAt"][11:13]) <= 22
-    ]
-    awake_prices = [hour["total"] for hour in awake_hours]
-
-    # Calculate the 25th and 75th percentiles
-    def calculate_percentile(prices, percentile):
-        prices.sort()
-        index = (len(prices) - 1) * percentile / 100
-        lower = int(index)
-        upper = lower + 1
-        if upper >= len(prices):
-            return prices[lower]
-        else:
-            return prices[lower] * (upper - index) + prices[upper] * (index - lower)
-
-    percentile_25 = calculate_percentile(awake_prices, 25)
-    percentile_75 = calculate_percentile(awake_prices, 75)
-
-    # Calculate dynamic margin as a percentage of the price range
-    price_range = max(awake_prices) - min(awake_prices)
-    margin = price_leeway * price_range  # Adjust this percentage as needed
-
-    # Ensure the index is found and valid; otherwise, set to a default
-    current_hour_index = next(
-        (i for i, hour in enumerate(today_prices) if hour["startsAt"] == current_hour),
-        None,
+PRICE_LEEWAY = 0.12  # Percentage of the price range to consider for margin
+AWAKE_HOURS = (7, 22)  # Hours (inclusive) used for the percentiles
+LOOKAHEAD = timedelta(hours=3)
+TOMORROW_PUBLISHED_HOUR = 13  # Tibber publishes tomorrow's prices around 13:00
+REQUEST_TIMEOUT = 20
+RETRY_MIN = 60  # Backoff after a failed fetch, doubling up to RETRY_MAX
+RETRY_MAX = 3600
+TOMORROW_RETRY = 900  # How often to ask again when tomorrow is late
+
+
+def fetch_prices(resolution):
+    """Today's and tomorrow's prices as a list of {"total", "startsAt"}."""
+    price_info = "priceInfo" if resolution == "hourly" else "priceInfo(resolution: QUARTER_HOURLY)"
+    query = (
+        f'{{viewer {{home(id: "{HOME_ID}") {{currentSubscription {{{price_info} '
+        "{today {total startsAt} tomorrow {total startsAt}}}}}}}"
     )
-
-    if current_hour_index is None or current_hour_index + 3 >= len(combined_prices):
-        return (
-            None,
-            None,
-            None,
-            None,
-            None,
-            "Error: Current hour's index is out of bounds or not found.",
+    request = urllib.request.Request(
+        API_URL,
+        data=json.dumps({"query": query}).encode(),
+        headers={
+            "Authorization": f"Bearer {TIBBER_TOKEN}",
+            "Content-Type": "application/json",
+        },
+    )
+    with urllib.request.urlopen(request, timeout=REQUEST_TIMEOUT) as response:
+        data = json.load(response)
+    if data.get("errors"):
+        raise ValueError(data["errors"][0].get("message", "GraphQL error"))
+
+    price_info = data["data"]["viewer"]["home"]["currentSubscription"]["priceInfo"]
+    return price_info["today"] + (price_info.get("tomorrow") or [])
+
+
+def calculate_percentile(sorted_prices, percentile):
+    index = (len(sorted_prices) - 1) * percentile / 100
+    lower = int(index)
+    upper = lower + 1
+    if upper >= len(sorted_prices):
+        return sorted_prices[lower]
+    return sorted_prices[lower] * (upper - index) + sorted_prices[upper] * (index - lower)
+
+
+def day_thresholds(slots):
+    """(cheap below, expensive above) for one day's slots, from its awake hours."""
+    awake = sorted(
+        slot["total"] for slot in slots if AWAKE_HOURS[0] <= slot["start"].hour <= AWAKE_HOURS[1]
+    ) or sorted(slot["total"] for slot in slots)
+    margin = PRICE_LEEWAY * (awake[-1] - awake[0])
+    return calculate_percentile(awake, 25) + margin, calculate_percentile(awake, 75)
+
+
+class PriceTable:
+    """Precomputed waybar state for every price slot that has been fetched."""
+
+    def __init__(self, prices):
+        slots = sorted(
+            (
+                {"start": datetime.fromisoformat(p["startsAt"]), "total": p["total"]}
+                for p in prices
+            ),
+            key=lambda slot: slot["start"],
         )
+        if not slots:
+            raise ValueError("No prices in response")
 
-    # Calculate the average of the next three hours
-    next_hours = combined_prices[current_hour_index + 1 : current_hour_index + 4]
-    next_3_hr_avg = sum(hour["total"] for hour in next_hours) / len(next_hours)
-
-    # Determine if the price will increase or decrease
-    price_increases = next_3_hr_avg > current_price_info["total"]
-
-    # Formatting the output
-    current_price = current_price_info["total"]
-    if current_price < (percentile_25 + margin):
-        price_class = "price-good"  # Cheap
-    elif current_price > percentile_75:
-        price_class = "price-bad"  # Expensive
-    else:
-        price_class = "price-mid"  # Mid-range
-
-    icon_class = "icon-good" if not price_increases else "icon-bad"
-    arrow_icon = "" if price_increases else ""
-
-    return current_price, arrow_icon, price_class, icon_class, next_3_hr_avg, None
+        # Slot length from the data, so hourly and 15 minute prices both work
+        if len(slots) > 1:
+            self.slot_length = min(b["start"] - a["start"] for a, b in zip(slots, slots[1:]))
+        else:
+            self.slot_length = timedelta(hours=1)
+        for slot in slots:
+            slot["end"] = slot["start"] + self.slot_length
+
+        days = {}
+        for slot in slots:
+            days.setdefault(slot["start"].astimezone(TIMEZONE).date(), []).append(slot)
+        thresholds = {day: day_thresholds(day_slots) for day, day_slots in days.items()}
+
+        for i, slot in enumerate(slots):
+            # Look-ahead uses whatever is published; near midnight before
+            # tomorrow's prices are out that is less than the full 3 hours
+            horizon = slot["end"] + LOOKAHEAD
+            ahead = [s["total"] for s in slots[i + 1:] if s["start"] < horizon]
+            slot["next_avg"] = sum(ahead) / len(ahead) if ahead else slot["total"]
+            cheap, expensive = thresholds[slot["start"].astimezone(TIMEZONE).date()]
+            if slot["total"] < cheap:
+                slot["price_class"] = "price-good"  # Cheap
+            elif slot["total"] > expensive:
+                slot["price_class"] = "price-bad"  # Expensive
+            else:
+                slot["price_class"] = "price-mid"  # Mid-range
+            increases = slot["next_avg"] > slot["total"]
+            slot["icon_class"] = "icon-bad" if increases else "icon-good"
+            slot["arrow"] = "" if increases else ""
+        self.slots = slots
+        self.days = sorted(days)
+
+    def lookup(self, now):
+        """The slot containing now, or None if it isn't covered."""
+        for slot in self.slots:
+            if slot["start"] <= now < slot["end"]:
+                return slot
+        return None
+
+    def has_day(self, day):
+        return day in self.days
+
+    def outputs(self, slot):
+        tooltip = f"next 3 hour average: {slot['next_avg']:.2f}"
+        text_output = {
+            "text": f"{slot['total']:.2f}kr",
+            "tooltip": tooltip,
+            "class": slot["price_class"],
+        }
+        icon_output = {"text": slot["arrow"], "tooltip": tooltip, "class": slot["icon_class"]}
+        return text_output, icon_output
+
+
+def load_cache(resolution):
+    try:
+        with open(CACHE_FILE) as f:
+            cached = json.load(f)
+        if cached.get("resolution") != resolution:
+            return None
+        return PriceTable(cached["prices"])
+    except (OSError, ValueError, KeyError) as e:
+        logging.debug(f"No usable price cache: {e}")
+        return None
+
+
+def save_cache(resolution, prices):
+    tmp = CACHE_FILE + ".tmp"
+    try:
+        os.makedirs(os.path.dirname(CACHE_FILE), exist_ok=True)
+        with open(tmp, "w") as f:
+            json.dump({"resolution": resolution, "prices": prices}, f)
+        os.replace(tmp, CACHE_FILE)
+    except OSError as e:
+        logging.warning(f"Failed to write price cache: {e}")
+
+
+def next_fetch_time(table, now):
+    """When the table next needs refreshing (tomorrow's prices or a new day)."""
+    local = now.astimezone(TIMEZONE)
+    today = local.date()
+    tomorrow = today + timedelta(days=1)
+    published = TIMEZONE.localize(
+        datetime.combine(today, datetime.min.time()).replace(hour=TOMORROW_PUBLISHED_HOUR)
+    )
+    if table is None or not table.has_day(today):
+        return now
+    if table.has_day(tomorrow):
+        # Nothing new until tomorrow's publication of the day after
+        return published + timedelta(days=1)
+    if local < published:
+        return published
+    return now
+
+
+def next_slot_boundary(table, now):
+    """Start of the next price slot (one second late, to be safely inside it)."""
+    length = table.slot_length if table else timedelta(hours=1)
+    local = now.astimezone(TIMEZONE)
+    midnight = TIMEZONE.localize(datetime.combine(local.date(), datetime.min.time()))
+    elapsed = (local - midnight) // length
+    return TIMEZONE.normalize(midnight + (elapsed + 1) * length) + timedelta(seconds=1)
+
+
+def dump(table):
+    for slot in table.slots:
+        print(
+            f"{slot['start'].astimezone(TIMEZONE):%Y-%m-%d %H:%M} {slot['total']:7.4f} "
+            f"{slot['price_class']:<10} {slot['icon_class']:<9} {slot['arrow']} "
+            f"next {slot['next_avg']:.4f}"
+        )
 
 
 def main():
-    text_output_file = "/tmp/tibber_price_text_output.json"
-    icon_output_file = "/tmp/tibber_price_icon_output.json"
     last_text_output = None
     last_icon_output = None
-    error_cooldown = 120  # 2 minutes cooldown after error
+    retry_delay = RETRY_MIN
+    fetch_at = None
 
     logging.debug("Script started.")
+    table = load_cache(args.resolution)
 
     while True:
-        current_time = datetime.now(pytz.timezone("Europe/Stockholm"))
-        next_hour = (current_time + timedelta(hours=1)).replace(
-            minute=1, second=0, microsecond=0
-        )
-        sleep_duration = (next_hour - current_time).total_seconds()
-
-        current_price, arrow_icon, price_class, icon_class, next_3_hr_avg, error = (
-            fetch_prices()
-        )
-
-        if error:
-            logging.error(error)
-            logging.info(
-                f"Cooling down for {error_cooldown} seconds before retrying..."
-            )
-            time.sleep(error_cooldown)
-            # Skip rest of loop and try again from start
-            continue
-
-        text_output = {
-            "text": f"{current_price:.2f}kr",
-            "tooltip": f"next 3 hour average: {next_3_hr_avg:.2f}",
-            "class": price_class,
-        }
-        icon_output = {
-            "text": f"{arrow_icon}",
-            "tooltip": f"next 3 hour average: {next_3_hr_avg:.2f}",
-            "class": icon_class,
-        }
+        now = datetime.now(TIMEZONE)
+        if fetch_at is None:
+            fetch_at = next_fetch_time(table, now)
+
+        if now >= fetch_at:
+            try:
+                prices = fetch_prices(args.resolution)
+                fetched = PriceTable(prices)
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                logging.error(f"Fetching prices failed: {e}")
+                logging.info(f"Retrying in {retry_delay} seconds")
+                fetch_at = now + timedelta(seconds=retry_delay)
+                retry_delay = min(retry_delay * 2, RETRY_MAX)
+            else:
+                table = fetched
+                save_cache(args.resolution, prices)
+                retry_delay = RETRY_MIN
+                fetch_at = next_fetch_time(table, now)
+                if fetch_at <= now:
+                    # Tomorrow's prices are late; ask again later
+                    fetch_at = now + timedelta(seconds=TOMORROW_RETRY)
+                logging.debug(
+                    f"Fetched {len(table.slots)} slots of {table.slot_length}, "
+                    f"next fetch at {fetch_at:%Y-%m-%d %H:%M}"
+                )
+
+        if args.dump:
+            if table is None:
+                print("No prices available", file=sys.stderr)
+                return 1
+            dump(table)
+            return 0
+
+        slot = table.lookup(now) if table else None
+        if slot is None:
+            logging.error("No price for the current time")
+            fetch_at = min(fetch_at, now + timedelta(seconds=retry_delay))
+        else:
+            text_output, icon_output = table.outputs(slot)
 
-        if text_output != last_text_output:
-            with open(text_output_file, "w") as f:
-                json.dump(text_output, f)
-            logging.debug(f"Output: {text_output}")
-            last_text_output = text_output
+            if text_output != last_text_output:
+                status_bus.publish("tibber_price", text_output)
+                logging.debug(f"Output: {text_output}")
+                last_text_output = text_output
 
-        if icon_output != last_icon_output:
-            with open(icon_output_file, "w") as f:
-                json.dump(icon_output, f)
-            logging.debug(f"Output: {icon_output}")
-            last_icon_output = icon_output
+            if icon_output != last_icon_output:
+                status_bus.publish("tibber_icon", icon_output)
+                logging.debug(f"Output: {icon_output}")
+                last_icon_output = icon_output
 
-        # Sleep until the start of the next hour
-        time.sleep(sleep_duration)
+        # Sleep until the next slot starts or the next fetch is due
+        wake = min(next_slot_boundary(table, now), fetch_at)
+        time.sleep(max(1, (wake - datetime.now(TIMEZONE)).total_seconds()))
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
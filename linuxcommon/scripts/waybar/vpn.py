@@ -2,16 +2,23 @@
 import argparse
 import json
 import logging
-import os
 import subprocess
 import sys
-import threading
 import time
 
-import requests
-
 sys.path.append("/home/rash/.config/scripts")
 from _utils import logging_utils  # noqa: E402
+from _utils import status_bus  # noqa: E402
+
+"""
+VPN status for waybar, from the Mullvad daemon's own state events.
+
+`mullvad status --json listen` prints the current tunnel state and then one
+JSON object per transition, including the exit IP and location the daemon
+resolved, so no journald reader or third-party IP lookup is needed. Older
+CLIs without --json are followed through the plain `mullvad status listen`
+output instead. The waybar output is published only when it changes.
+"""
 
 # CLI args
 parser = argparse.ArgumentParser(
@@ -24,8 +31,13 @@ args = parser.parse_args()
 logging_utils.configure_logging()
 logging.getLogger().setLevel(logging.DEBUG if args.debug else logging.WARNING)
 
-output_file = "/tmp/waybar/vpn_status_output.json"
-IP_TIMEOUT = 5
+LISTEN_COMMANDS = [
+    ["mullvad", "status", "--json", "listen"],
+    ["mullvad", "status", "listen"],  # CLIs from before --json: state only
+]
+RETRY_MIN = 1  # Backoff when the daemon isn't answering, doubling up to RETRY_MAX
+RETRY_MAX = 30
+USAGE_ERROR = 2  # Exit code of the CLI when it doesn't know an argument
 
 STATE_MAP = {
     "Connected": {
@@ -41,149 +53,149 @@ STATE_MAP = {
         "class": "vpn-disconnected",
     },
     "Disconnected": {
-        "text": "",
+        "text": "",
         "class": "vpn-disconnected",
     },
 }
 
 
 def write_to_file(data):
-    logging.debug(f"Attempting to write data to {output_file}")
+    """Publish to the status bus, which keeps /tmp/waybar/vpn_status_output.json in sync."""
+    logging.debug(f"Publishing VPN status: {data}")
     try:
-        os.makedirs(os.path.dirname(output_file), exist_ok=True)
-        logging.debug("Directory created/verified")
-        with open(output_file, "w") as f:
-            json.dump(data, f)
-            logging.info(f"Successfully wrote data: {data}")
+        status_bus.publish("vpn", data)
+        logging.info(f"Successfully published data: {data}")
     except Exception as e:
-        logging.error(f"Error writing to file: {e}")
+        logging.error(f"Error publishing VPN status: {e}")
         raise
 
 
-def get_external_ip():
+def parse_json_event(line):
+    """(state, location) from a `mullvad status --json` line, or None."""
     try:
-        return requests.get(
-            "http://api.ipify.org/?format=text", timeout=IP_TIMEOUT
-        ).text.strip()
-    except Exception as e:
-        logging.warning(f"Could not fetch external IP: {e}")
-        return "unknown"
-
-
-def parse_state_from_log(line):
-    if "New tunnel state:" in line:
-        for state in STATE_MAP:
-            if f"New tunnel state: {state}" in line:
-                return state
+        event = json.loads(line)
+    except ValueError:
+        return None
+    if not isinstance(event, dict) or "state" not in event:
+        return None
+    details = event.get("details") or {}
+    location = details.get("location") if isinstance(details, dict) else None
+    return event["state"].capitalize(), location or None
+
+
+def parse_text_event(line):
+    """State from a plain `mullvad status listen` line ("Connected to ..."), or None."""
+    word = line.split(" ", 1)[0].rstrip(":.")
+    if word in STATE_MAP or word == "Error":
+        return word, None
     return None
 
 
-def build_output_immediate(state):
-    """Build output without IP lookup for immediate display"""
-    base = STATE_MAP.get(state, {"text": "?", "class": "vpn-error"})
+def build_output(state, location):
+    """Waybar output for a tunnel state, with the daemon's exit IP in the tooltip."""
+    base = STATE_MAP.get(state, {"text": "!", "class": "vpn-error"})
     tooltip = state
     if state in ("Connecting", "Disconnecting"):
         tooltip += "..."
-
-    output_data = {
+    elif location:
+        where = ", ".join(part for part in (location.get("city"), location.get("country")) if part)
+        if location.get("hostname") and state == "Connected":
+            where = f"{location['hostname']} ({where})" if where else location["hostname"]
+        if where:
+            tooltip += f" via {where}" if state == "Connected" else f" in {where}"
+        ip = location.get("ipv4") or location.get("ipv6")
+        if ip:
+            tooltip += f". IP is {ip}"
+
+    return {
         "text": base["text"],
         "tooltip": tooltip,
         "class": base["class"],
     }
-    logging.debug(f"Built immediate output data: {output_data}")
-    print(json.dumps(output_data))
-    return output_data
 
 
-def build_output_with_ip(state):
-    """Build output with IP lookup for complete information"""
-    base = STATE_MAP.get(state, {"text": "?", "class": "vpn-error"})
-    tooltip = state
-    if state in ("Connected", "Disconnected"):
-        ip = get_external_ip()
-        tooltip += f". IP is {ip}"
-    else:
-        tooltip += "..."
-
-    output_data = {
-        "text": base["text"],
-        "tooltip": tooltip,
-        "class": base["class"],
-    }
-    logging.debug(f"Built complete output data: {output_data}")
-    print(json.dumps(output_data))
-    return output_data
-
-
-def build_output(state):
-    """Build output with immediate update, then IP lookup in background"""
-    # First, update immediately without IP lookup
-    immediate_output = build_output_immediate(state)
-    write_to_file(immediate_output)
-
-    # For connected/disconnected states, fetch IP in background
-    if state in ("Connected", "Disconnected"):
-
-        def update_with_ip():
-            complete_output = build_output_with_ip(state)
-            write_to_file(complete_output)
-
-        # Run IP lookup in background thread
-        threading.Thread(target=update_with_ip, daemon=True).start()
-
-    return immediate_output
-
-
-def monitor_logs():
-    logging.debug("Starting journalctl -f for mullvad-daemon...")
-    cmd = ["journalctl", "-f", "-u", "mullvad-daemon.service", "-o", "cat"]
-    proc = subprocess.Popen(
-        cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
-    )
-
-    last_state = None
-
-    for line in iter(proc.stdout.readline, ""):
-        line = line.strip()
-        logging.debug(f"Log: {line}")
-        new_state = parse_state_from_log(line)
-        if new_state and new_state != last_state:
-            logging.debug(f"Detected VPN state change → {new_state}")
-            build_output(new_state)
-            last_state = new_state
-
-    proc.stdout.close()
-    proc.wait()
+class VpnWatcher:
+    def __init__(self):
+        self.last_output = None
+        self.locations = {}  # state -> last location the daemon reported for it
+        self.command_index = 0
+
+    def publish(self, output):
+        if output != self.last_output:
+            write_to_file(output)
+            self.last_output = output
+
+    def handle(self, state, location):
+        if location:
+            self.locations[state] = location
+        elif state in ("Connected", "Disconnected"):
+            # Events without location details reuse what we saw last time
+            location = self.locations.get(state)
+        logging.debug(f"VPN state → {state}")
+        self.publish(build_output(state, location))
+
+    def listen(self):
+        """Follow one `mullvad status listen` process; returns True if it sent any event.
+
+        Returns None when the CLI rejected the arguments and the next listen
+        command should be tried straight away.
+        """
+        command = LISTEN_COMMANDS[self.command_index]
+        logging.debug(f"Starting {' '.join(command)}")
+        proc = subprocess.Popen(
+            command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+        )
+        seen_event = False
+        for line in proc.stdout:
+            line = line.strip()
+            logging.debug(f"Event: {line}")
+            if line.startswith("{"):
+                event = parse_json_event(line)
+            else:
+                event = parse_text_event(line)
+            if event:
+                seen_event = True
+                self.handle(*event)
+        proc.wait()
+
+        if not seen_event and proc.returncode == USAGE_ERROR:
+            if self.command_index + 1 < len(LISTEN_COMMANDS):
+                self.command_index += 1
+                logging.info("mullvad CLI has no --json, using text status")
+                return None
+        return seen_event
+
+    def run(self):
+        retry_delay = RETRY_MIN
+        while True:
+            try:
+                seen_event = self.listen()
+                if seen_event is None:
+                    continue
+            except FileNotFoundError:
+                logging.error("mullvad CLI not found")
+                seen_event = False
+            if seen_event:
+                retry_delay = RETRY_MIN
+            else:
+                # Daemon not up yet (boot) or restarting
+                self.publish({"text": "!", "tooltip": "Failed to get VPN state", "class": "vpn-error"})
+                retry_delay = min(retry_delay * 2, RETRY_MAX)
+            logging.warning(f"mullvad status listener exited, restarting in {retry_delay}s")
+            time.sleep(retry_delay)
 
 
 def main():
     try:
         # Write loading state immediately so the status file always exists
-        # before mullvad status is queried (important at boot where the
+        # before the daemon answers (important at boot where the
         # mullvad-daemon may not be ready yet).
         write_to_file({"text": "󰇘", "tooltip": "Loading...", "class": "vpn-disconnected"})
-
-        # Retry mullvad status — daemon may take a moment to start after boot
-        state = None
-        for attempt in range(6):
-            result = subprocess.run(
-                ["mullvad", "status"], capture_output=True, text=True, timeout=5
-            )
-            if result.returncode == 0:
-                state = "Connected" if "Connected" in result.stdout else "Disconnected"
-                logging.info(f"Initial VPN state: {state}")
-                build_output(state)
-                break
-            logging.warning(f"mullvad status attempt {attempt + 1} failed: {result.stderr.strip()}")
-            time.sleep(3)
-
-        if state is None:
-            logging.error("Could not get initial VPN state after retries")
-            write_to_file({"text": "!", "tooltip": "Failed to get VPN state", "class": "vpn-error"})
-
-        monitor_logs()
+        VpnWatcher().run()
+    except KeyboardInterrupt:
+        pass
     except Exception as e:
-        logging.exception("Error in log monitoring")
+        logging.exception("Error in VPN status watcher")
         write_to_file(
             {
                 "text": "!",
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for hypr_window_ops against the fake compositor.
+
+Runs every CLI subcommand, `launch_profile_apps` and the sneaky window
+monitor against a replayed recording (see fake_hyprland.py) and reports wall
+time and IPC round-trips, so changes can be measured on a headless box.
+
+Usage:
+    python -m hypr_window_ops.benchmark
+    python -m hypr_window_ops.benchmark --only cli --repeat 10 --json results.json
+"""
+
+import argparse
+import json
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from .fake_hyprland import DEFAULT_RECORDING, FakeHyprland
+
+# Subcommands that run against the recording without user interaction.
+# watch-window-open, setup-pip and window-wait block on external processes and are left out.
+CLI_SCENARIOS = [
+    ["move-windows", "2"],
+    ["switch-ws", "next"],
+    ["switch-ws", "2"],
+    ["focus_location", "right", "master"],
+    ["pin-nodim"],
+    ["toggle-nofocus"],
+    ["toggle-floating"],
+    ["toggle-fullscreen-nodim"],
+    ["toggle-double-size", "--relative-floating"],
+    ["snap-to-corner", "--corner", "upper-left", "--relative-floating"],
+    ["move-to-monitor", "--direction", "right", "--relative-floating"],
+    ["toggle-stash"],
+    ["move-to-stash"],
+    ["toggle-secure"],
+    ["move-to-secure"],
+    ["toggle-full"],
+    ["full-video"],
+    ["toggle-sneaky"],
+    ["toggle-monitor"],
+    ["cycle-windows"],
+    ["snap-class-to-corner", "--class", "mpv", "--corner", "upper-left", "--delay", "0"],
+]
+
+# Profile used for the launch_profile_apps benchmark; apps are "launched"
+# through the fake compositor's exec dispatcher
+BENCH_PROFILE = {
+    "bench": {
+        "1": [
+            {"name": "editor", "command": "hyprctl dispatch exec bench-editor", "is_master": True},
+            {"name": "terminal", "command": "hyprctl dispatch exec bench-terminal", "is_master": False},
+        ],
+        "11": [
+            {"name": "mail", "command": "hyprctl dispatch exec bench-mail", "is_master": True},
+        ],
+        "special:stash-left": [
+            {"name": "notes", "command": "hyprctl dispatch exec bench-notes", "is_master": False, "no_focus": True},
+        ],
+    }
+}
+
+SNEAKY_SCRIPT = Path(__file__).resolve().parents[3] / "scripts" / "sneaky_window_monitor.py"
+
+
+def make_home(tmpdir):
+    """Create a throwaway HOME with the launch_apps.json the package loads at import."""
+    config_dir = Path(tmpdir) / ".config" / "hypr" / "script_configs"
+    config_dir.mkdir(parents=True, exist_ok=True)
+    with open(config_dir / "launch_apps.json", "w") as f:
+        json.dump(BENCH_PROFILE, f)
+    return str(tmpdir)
+
+
+def summarize(name, durations, fake_runs):
+    """Collapse repeated runs into one result row."""
+    return {
+        "name": name,
+        "runs": len(durations),
+        "wall_ms_median": round(statistics.median(durations) * 1000, 1),
+        "wall_ms_min": round(min(durations) * 1000, 1),
+        "round_trips": round(statistics.median(run["round_trips"] for run in fake_runs), 1),
+        "dispatches": round(statistics.median(run["dispatches"] for run in fake_runs), 1),
+        "returncodes": sorted({run["returncode"] for run in fake_runs}),
+    }
+
+
+def run_command(fake, argv, env, timeout=60):
+    """Run argv against a freshly reset fake compositor and collect its counters."""
+    fake.reset()
+    start = time.perf_counter()
+    result = subprocess.run(argv, env=env, capture_output=True, text=True, timeout=timeout)
+    duration = time.perf_counter() - start
+    return duration, {
+        "round_trips": fake.round_trips,
+        "dispatches": sum(v for k, v in fake.dispatch_counts.items() if not k.startswith("__")),
+        "returncode": result.returncode,
+    }
+
+
+def bench_cli(fake, env, repeat):
+    """Benchmark each CLI subcommand as a cold process, the way keybinds invoke it."""
+    results = []
+    for argv in CLI_SCENARIOS:
+        durations, runs = [], []
+        for _ in range(repeat):
+            duration, run = run_command(fake, [sys.executable, "-m", "hypr_window_ops.cli", *argv], env)
+            durations.append(duration)
+            runs.append(run)
+        results.append(summarize(" ".join(argv), durations, runs))
+    return results
+
+
+def bench_launch_profile_apps(fake, env, repeat):
+    """Benchmark launch_profile_apps on a small synthetic profile."""
+    durations, runs = [], []
+    for _ in range(repeat):
+        duration, run = run_command(
+            fake, [sys.executable, "-m", "hypr_window_ops.launch_apps", "--profile", "bench"], env
+        )
+        durations.append(duration)
+        runs.append(run)
+    return [summarize("launch_profile_apps bench", durations, runs)]
+
+
+def bench_sneaky_monitor(fake, env, duration, script=SNEAKY_SCRIPT, flip_interval=3.0):
+    """
+    Run the sneaky window monitor for a fixed time while focus flips between
+    a window that overlaps the sneaky window and one that doesn't.
+
+    flip_interval has to outlast the monitor's 1s focus cooldown plus a poll
+    cycle, otherwise the flips never trigger a move.
+    """
+    if not Path(script).exists():
+        print(f"⚠️  Sneaky window monitor not found at {script}, skipping", file=sys.stderr)
+        return []
+
+    fake.reset()
+    overlapping = "0x55d0c0a00002"
+    clear = "0x55d0c0a00001"
+    process = subprocess.Popen(
+        [sys.executable, "-u", str(script)], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    start = time.perf_counter()
+    flips = 0
+    try:
+        while time.perf_counter() - start < duration:
+            with fake.lock:
+                fake.dispatch(f"focuswindow address:{overlapping if flips % 2 == 0 else clear}")
+            flips += 1
+            time.sleep(flip_interval)
+    finally:
+        process.send_signal(signal.SIGINT)
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+    elapsed = time.perf_counter() - start
+
+    moves = sum(fake.dispatch_counts[name] for name in ("movewindow", "movewindowpixel"))
+    return [{
+        "name": "sneaky_window_monitor",
+        "runs": 1,
+        "wall_ms_median": round(elapsed * 1000, 1),
+        "wall_ms_min": round(elapsed * 1000, 1),
+        "round_trips": fake.round_trips,
+        "round_trips_per_s": round(fake.round_trips / elapsed, 1),
+        "dispatches": moves,
+        "focus_flips": flips,
+        "returncodes": [process.returncode],
+    }]
+
+
+def print_results(results):
+    """Print a plain-text results table."""
+    print(f"{'scenario':<62} {'runs':>4} {'median ms':>10} {'min ms':>9} {'rtts':>6} {'dispatch':>8}")
+    for row in results:
+        print(
+            f"{row['name']:<62} {row['runs']:>4} {row['wall_ms_median']:>10} {row['wall_ms_min']:>9} "
+            f"{row['round_trips']:>6} {row['dispatches']:>8}"
+        )
+        if "round_trips_per_s" in row:
+            print(f"{'':<62} {row['round_trips_per_s']} rtt/s over {row['focus_flips']} focus flips")
+
+
+def main():
+    """CLI entry point for the benchmark suite."""
+    parser = argparse.ArgumentParser(description="Benchmark hypr_window_ops against a fake Hyprland")
+    parser.add_argument("--recording", default=str(DEFAULT_RECORDING), help="Recording directory to replay")
+    parser.add_argument("--only", choices=["cli", "launch", "sneaky"], action="append", help="Run only these suites")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per CLI scenario (default: %(default)s)")
+    parser.add_argument("--sneaky-duration", type=float, default=10.0, help="Seconds to run the sneaky monitor (default: %(default)s)")
+    parser.add_argument("--sneaky-script", default=str(SNEAKY_SCRIPT), help="Path to sneaky_window_monitor.py")
+    parser.add_argument("--json", metavar="FILE", help="Also write results as JSON")
+    args = parser.parse_args()
+
+    suites = args.only or ["cli", "launch", "sneaky"]
+    results = []
+    with tempfile.TemporaryDirectory(prefix="hypr-bench-home-") as home, FakeHyprland(args.recording) as fake:
+        env = fake.env()
+        env["HOME"] = make_home(home)
+        if "cli" in suites:
+            results += bench_cli(fake, env, args.repeat)
+        if "launch" in suites:
+            results += bench_launch_profile_apps(fake, env, max(1, args.repeat // 3))
+        if "sneaky" in suites:
+            results += bench_sneaky_monitor(fake, env, args.sneaky_duration, args.sneaky_script)
+
+    print_results(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,791 @@
+#!/usr/bin/env python3
+"""
+Fake Hyprland compositor for exercising hypr_window_ops without a live session.
+
+Serves recorded `clients`/`monitors`/`workspaces` JSON over the same unix
+sockets Hyprland uses (`.socket.sock` for requests, `.socket2.sock` for
+events), applies dispatches to an in-memory model and emits the matching
+socket2 events. Every request is counted so callers can measure IPC
+round-trips per operation.
+
+Since hypr_window_ops shells out to `hyprctl`, a small `hyprctl` shim that
+speaks the socket protocol is provided as well, so the whole stack runs on a
+box without Hyprland installed.
+
+Usage:
+    python -m hypr_window_ops.fake_hyprland serve [RECORDING_DIR]
+    python -m hypr_window_ops.fake_hyprland record OUTPUT_DIR
+    python -m hypr_window_ops.fake_hyprland hyprctl [-j] COMMAND [ARGS...]
+"""
+
+import argparse
+import copy
+import json
+import os
+import queue
+import select
+import shlex
+import shutil
+import socket
+import socketserver
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+RECORDINGS_DIR = Path(__file__).parent / "recordings"
+DEFAULT_RECORDING = RECORDINGS_DIR / "dual_monitor"
+DEFAULT_SIGNATURE = "fake_hyprland"
+RECORDED_FILES = ("clients", "monitors", "workspaces", "activewindow")
+
+DEFAULT_OPTIONS = {
+    "general:gaps_out": {"option": "general:gaps_out", "custom": "10 10 10 10", "set": True},
+    "general:gaps_in": {"option": "general:gaps_in", "custom": "5 5 5 5", "set": True},
+    "general:border_size": {"option": "general:border_size", "int": 2, "set": True},
+}
+
+DIRECTIONS = {"l", "r", "u", "d"}
+
+
+def socket_dir(runtime_dir=None, signature=None):
+    """Return the Hyprland IPC directory for a runtime dir and instance signature."""
+    runtime_dir = runtime_dir or os.environ.get("XDG_RUNTIME_DIR", f"/run/user/{os.getuid()}")
+    signature = signature or os.environ.get("HYPRLAND_INSTANCE_SIGNATURE", "")
+    return Path(runtime_dir) / "hypr" / signature
+
+
+def load_recording(recording_dir):
+    """Load a recorded Hyprland state from a directory of `hyprctl -j` dumps."""
+    recording_dir = Path(recording_dir)
+    state = {}
+    for name in RECORDED_FILES + ("options",):
+        path = recording_dir / f"{name}.json"
+        if path.exists():
+            with open(path, "r") as f:
+                state[name] = json.load(f)
+    for name in ("clients", "monitors", "workspaces"):
+        if name not in state:
+            raise FileNotFoundError(f"Recording is missing {name}.json: {recording_dir}")
+    return state
+
+
+def record_live_state(output_dir):
+    """Capture the current Hyprland state with the real hyprctl into output_dir."""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    for name in RECORDED_FILES:
+        result = subprocess.run(["hyprctl", name, "-j"], capture_output=True, text=True)
+        if result.returncode != 0:
+            print(f"Error running hyprctl {name}: {result.stderr}", file=sys.stderr)
+            return 1
+        with open(output_dir / f"{name}.json", "w") as f:
+            f.write(result.stdout)
+
+    options = {}
+    for option in DEFAULT_OPTIONS:
+        result = subprocess.run(["hyprctl", "getoption", option, "-j"], capture_output=True, text=True)
+        if result.returncode == 0:
+            options[option] = json.loads(result.stdout)
+    with open(output_dir / "options.json", "w") as f:
+        json.dump(options, f, indent=2)
+
+    print(f"✅ Recorded Hyprland state to {output_dir}")
+    return 0
+
+
+def _split_selector(args):
+    """Split 'ARGS,address:0x1' into ('ARGS', 'address:0x1')."""
+    if "," in args:
+        head, _, selector = args.rpartition(",")
+        if ":" in selector and not selector.startswith("special:"):
+            return head.strip(), selector.strip()
+    return args.strip(), ""
+
+
+class FakeHyprland:
+    """In-memory Hyprland model that answers hyprctl requests and emits socket2 events."""
+
+    def __init__(self, recording_dir=DEFAULT_RECORDING):
+        self.recording_dir = Path(recording_dir)
+        self.lock = threading.RLock()
+        self.request_counts = Counter()
+        self.dispatch_counts = Counter()
+        self.events = []
+        self._subscribers = []
+        self._servers = []
+        self._threads = []
+        self._tmpdir = None
+        self.runtime_dir = None
+        self.signature = None
+        self.reset()
+
+    # ------------------------------------------------------------------
+    # State
+    # ------------------------------------------------------------------
+
+    def reset(self):
+        """Reload the recording and clear counters."""
+        state = load_recording(self.recording_dir)
+        with self.lock:
+            self.clients = state["clients"]
+            self.monitors = state["monitors"]
+            self.workspaces = {ws["id"]: ws for ws in state["workspaces"]}
+            self.options = copy.deepcopy(DEFAULT_OPTIONS)
+            self.options.update(state.get("options", {}))
+            self.props = {}
+            self.cursor = {"x": 0, "y": 0}
+            self._next_address = 0x5a5a0000
+
+            active = state.get("activewindow") or {}
+            self.active_address = active.get("address")
+            if not self.active_address:
+                focused = [c for c in self.clients if c.get("focusHistoryID") == 0]
+                self.active_address = focused[0]["address"] if focused else None
+
+            for monitor in self.monitors:
+                monitor.setdefault("specialWorkspace", {"id": 0, "name": ""})
+            if not any(m.get("focused") for m in self.monitors) and self.monitors:
+                self.monitors[0]["focused"] = True
+            self.reset_stats()
+
+    def reset_stats(self):
+        """Clear request, dispatch and event counters."""
+        with self.lock:
+            self.request_counts.clear()
+            self.dispatch_counts.clear()
+            self.events.clear()
+
+    @property
+    def round_trips(self):
+        """Total socket requests served since the last reset."""
+        return self.request_counts["__requests__"]
+
+    def _client(self, address):
+        return next((c for c in self.clients if c["address"] == address), None)
+
+    def _monitor(self, key):
+        for monitor in self.monitors:
+            if key in (monitor["id"], monitor["name"]):
+                return monitor
+        return None
+
+    def _focused_monitor(self):
+        return next((m for m in self.monitors if m.get("focused")), self.monitors[0])
+
+    def _logical_size(self, monitor):
+        if monitor.get("transform", 0) in (1, 3):
+            return monitor["height"], monitor["width"]
+        return monitor["width"], monitor["height"]
+
+    def _gap(self):
+        return int(self.options["general:gaps_out"].get("custom", "0").split()[0])
+
+    def _select_window(self, selector):
+        if not selector:
+            return self._client(self.active_address)
+        kind, _, value = selector.partition(":")
+        if kind == "address":
+            return self._client(value)
+        if kind == "class":
+            return next((c for c in self.clients if c.get("class") == value), None)
+        if kind == "title":
+            return next((c for c in self.clients if c.get("title") == value), None)
+        if kind == "pid":
+            return next((c for c in self.clients if str(c.get("pid")) == value), None)
+        return None
+
+    def _resolve_workspace(self, spec, create=True):
+        spec = spec.strip()
+        if spec.lstrip("-").isdigit():
+            ws_id = int(spec)
+            name = spec
+        else:
+            name = spec if spec.startswith("special:") else spec.replace("name:", "")
+            existing = next((ws for ws in self.workspaces.values() if ws["name"] == name), None)
+            if existing:
+                return existing
+            if spec.startswith("special:"):
+                ws_id = min([-98] + list(self.workspaces)) - 1
+            else:
+                ws_id = max([0] + list(self.workspaces)) + 1
+        if ws_id in self.workspaces or not create:
+            return self.workspaces.get(ws_id)
+        monitor = self._focused_monitor()
+        workspace = {
+            "id": ws_id,
+            "name": name,
+            "monitor": monitor["name"],
+            "monitorID": monitor["id"],
+            "windows": 0,
+            "hasfullscreen": False,
+            "lastwindow": "0x0",
+            "lastwindowtitle": "",
+        }
+        self.workspaces[ws_id] = workspace
+        self._emit("createworkspace", name)
+        self._emit("createworkspacev2", f"{ws_id},{name}")
+        return workspace
+
+    def _set_active(self, client):
+        self.active_address = client["address"] if client else None
+        if not client:
+            self._emit("activewindow", ",")
+            self._emit("activewindowv2", "")
+            return
+        for other in self.clients:
+            if other is not client and other.get("focusHistoryID", 0) <= client.get("focusHistoryID", 0):
+                other["focusHistoryID"] = other.get("focusHistoryID", 0) + 1
+        client["focusHistoryID"] = 0
+        monitor = self._monitor(client["monitor"])
+        if monitor:
+            self._focus_monitor(monitor)
+            if client["workspace"]["id"] > 0:
+                monitor["activeWorkspace"] = dict(client["workspace"])
+        self._emit("activewindow", f"{client.get('class', '')},{client.get('title', '')}")
+        self._emit("activewindowv2", client["address"][2:])
+
+    def _focus_monitor(self, monitor):
+        if monitor.get("focused"):
+            return
+        for other in self.monitors:
+            other["focused"] = other is monitor
+        self._emit("focusedmon", f"{monitor['name']},{monitor['activeWorkspace']['name']}")
+
+    def _place_in_corner(self, client, monitor, directions):
+        width, height = self._logical_size(monitor)
+        gap = self._gap()
+        x, y = client["at"]
+        if "l" in directions:
+            x = monitor["x"] + gap
+        if "r" in directions:
+            x = monitor["x"] + width - client["size"][0] - gap
+        if "u" in directions:
+            y = monitor["y"] + gap
+        if "d" in directions:
+            y = monitor["y"] + height - client["size"][1] - gap
+        client["at"] = [x, y]
+
+    def _move_to_workspace(self, client, workspace):
+        client["workspace"] = {"id": workspace["id"], "name": workspace["name"]}
+        monitor = self._monitor(workspace["monitor"])
+        if monitor and monitor["id"] != client["monitor"]:
+            old = self._monitor(client["monitor"])
+            if old:
+                client["at"] = [
+                    client["at"][0] - old["x"] + monitor["x"],
+                    client["at"][1] - old["y"] + monitor["y"],
+                ]
+            client["monitor"] = monitor["id"]
+        self._emit("movewindow", f"{client['address'][2:]},{workspace['name']}")
+        self._emit("movewindowv2", f"{client['address'][2:]},{workspace['id']},{workspace['name']}")
+
+    def _emit(self, event, data):
+        line = f"{event}>>{data}"
+        self.events.append(line)
+        for subscriber in list(self._subscribers):
+            subscriber.put(line)
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def query(self, command):
+        """Answer a JSON query such as `clients` or `getoption general:gaps_out`."""
+        name, _, args = command.partition(" ")
+        if name == "clients":
+            return self.clients
+        if name == "activewindow":
+            return self._client(self.active_address) or {}
+        if name == "monitors":
+            return self.monitors
+        if name == "workspaces":
+            return [self._workspace_info(ws) for ws in self.workspaces.values() if ws["id"] < 0 or self._has_windows_or_visible(ws)]
+        if name == "activeworkspace":
+            ws_id = self._focused_monitor()["activeWorkspace"]["id"]
+            return self._workspace_info(self.workspaces[ws_id]) if ws_id in self.workspaces else {}
+        if name == "getoption":
+            return self.options.get(args.strip(), {"option": args.strip(), "int": 0, "set": False})
+        if name == "cursorpos":
+            return self.cursor
+        if name == "version":
+            return {"branch": "fake", "commit": "fake", "tag": "fake-hyprland"}
+        return None
+
+    def _has_windows_or_visible(self, workspace):
+        if any(c["workspace"]["id"] == workspace["id"] for c in self.clients):
+            return True
+        return any(m["activeWorkspace"]["id"] == workspace["id"] for m in self.monitors)
+
+    def _workspace_info(self, workspace):
+        windows = [c for c in self.clients if c["workspace"]["id"] == workspace["id"]]
+        info = dict(workspace)
+        info["windows"] = len(windows)
+        info["hasfullscreen"] = any(c.get("fullscreen") for c in windows)
+        if windows:
+            last = min(windows, key=lambda c: c.get("focusHistoryID", 0))
+            info["lastwindow"] = last["address"]
+            info["lastwindowtitle"] = last.get("title", "")
+        return info
+
+    # ------------------------------------------------------------------
+    # Dispatchers
+    # ------------------------------------------------------------------
+
+    def dispatch(self, command):
+        """Apply a dispatcher such as `movewindow l` to the model. Returns the reply text."""
+        name, _, args = command.partition(" ")
+        args = " ".join(part for part in args.split(" ") if part != "--")
+        self.dispatch_counts[name] += 1
+        handler = getattr(self, f"_dispatch_{name}", None)
+        if handler is None:
+            self.dispatch_counts["__unhandled__"] += 1
+            return "ok"
+        return handler(args.strip()) or "ok"
+
+    def _dispatch_workspace(self, args):
+        workspace = self._resolve_workspace(args)
+        monitor = self._monitor(workspace["monitor"]) or self._focused_monitor()
+        self._focus_monitor(monitor)
+        monitor["activeWorkspace"] = {"id": workspace["id"], "name": workspace["name"]}
+        self._emit("workspace", workspace["name"])
+        self._emit("workspacev2", f"{workspace['id']},{workspace['name']}")
+
+    def _dispatch_togglespecialworkspace(self, args):
+        workspace = self._resolve_workspace(f"special:{args or 'special'}")
+        monitor = self._focused_monitor()
+        if monitor["specialWorkspace"]["id"] == workspace["id"]:
+            monitor["specialWorkspace"] = {"id": 0, "name": ""}
+            self._emit("activespecial", f",{monitor['name']}")
+        else:
+            workspace["monitor"], workspace["monitorID"] = monitor["name"], monitor["id"]
+            monitor["specialWorkspace"] = {"id": workspace["id"], "name": workspace["name"]}
+            for client in self.clients:
+                if client["workspace"]["id"] == workspace["id"]:
+                    client["monitor"] = monitor["id"]
+            self._emit("activespecial", f"{workspace['name']},{monitor['name']}")
+
+    def _dispatch_focuswindow(self, args):
+        client = self._select_window(args)
+        if not client:
+            return "No such window found"
+        self._set_active(client)
+
+    def _dispatch_focusmonitor(self, args):
+        monitor = self._monitor(args)
+        if monitor is None and args in DIRECTIONS:
+            ordered = sorted(self.monitors, key=lambda m: m["x"])
+            index = ordered.index(self._focused_monitor())
+            index = index - 1 if args == "l" else index + 1 if args == "r" else index
+            monitor = ordered[index % len(ordered)]
+        if monitor:
+            self._focus_monitor(monitor)
+
+    def _dispatch_movetoworkspace(self, args, silent=False):
+        spec, selector = _split_selector(args)
+        client = self._select_window(selector)
+        if not client:
+            return "No such window found"
+        workspace = self._resolve_workspace(spec)
+        self._move_to_workspace(client, workspace)
+        if not silent:
+            self._dispatch_workspace(str(workspace["id"]) if workspace["id"] > 0 else workspace["name"])
+            self._set_active(client)
+
+    def _dispatch_movetoworkspacesilent(self, args):
+        return self._dispatch_movetoworkspace(args, silent=True)
+
+    def _dispatch_movewindow(self, args):
+        target, selector = _split_selector(args)
+        client = self._select_window(selector)
+        if not client:
+            return "No such window found"
+        if target.startswith("mon:"):
+            monitor = self._monitor(target[4:])
+            if monitor:
+                ws = monitor["activeWorkspace"]
+                self._move_to_workspace(client, self.workspaces.get(ws["id"]) or self._resolve_workspace(ws["name"]))
+        elif target in DIRECTIONS:
+            self._place_in_corner(client, self._monitor(client["monitor"]), {target})
+            self._emit("movewindow", f"{client['address'][2:]},{client['workspace']['name']}")
+
+    def _dispatch_movewindowpixel(self, args):
+        coords, selector = _split_selector(args)
+        client = self._select_window(selector)
+        if not client:
+            return "No such window found"
+        parts = coords.split()
+        if parts and parts[0] == "exact":
+            client["at"] = [int(float(parts[1])), int(float(parts[2]))]
+        else:
+            client["at"] = [client["at"][0] + int(float(parts[0])), client["at"][1] + int(float(parts[1]))]
+
+    def _dispatch_moveactive(self, args):
+        return self._dispatch_movewindowpixel(args)
+
+    def _resize(self, client, parts):
+        if parts and parts[0] == "exact":
+            width, height = int(float(parts[1])), int(float(parts[2]))
+        else:
+            width, height = client["size"][0] + int(float(parts[0])), client["size"][1] + int(float(parts[1]))
+        # Hyprland keeps the window center fixed when resizing
+        center_x = client["at"][0] + client["size"][0] // 2
+        center_y = client["at"][1] + client["size"][1] // 2
+        client["size"] = [width, height]
+        client["at"] = [center_x - width // 2, center_y - height // 2]
+
+    def _dispatch_resizewindowpixel(self, args):
+        size, selector = _split_selector(args)
+        client = self._select_window(selector)
+        if not client:
+            return "No such window found"
+        self._resize(client, size.split())
+
+    def _dispatch_resizeactive(self, args):
+        client = self._select_window("")
+        if client:
+            self._resize(client, args.split())
+
+    def _set_floating(self, args, floating):
+        client = self._select_window(args)
+        if not client:
+            return "No such window found"
+        client["floating"] = (not client.get("floating", False)) if floating is None else floating
+        self._emit("changefloatingmode", f"{client['address'][2:]},{int(client['floating'])}")
+
+    def _dispatch_setfloating(self, args):
+        return self._set_floating(args, True)
+
+    def _dispatch_settiled(self, args):
+        return self._set_floating(args, False)
+
+    def _dispatch_togglefloating(self, args):
+        return self._set_floating(args, None)
+
+    def _dispatch_pin(self, args):
+        client = self._select_window(args)
+        if not client:
+            return "No such window found"
+        client["pinned"] = not client.get("pinned", False)
+        self._emit("pin", f"{client['address'][2:]},{int(client['pinned'])}")
+
+    def _dispatch_fullscreen(self, args):
+        client = self._select_window("")
+        if client:
+            client["fullscreen"] = 0 if client.get("fullscreen") else 2
+            self._emit("fullscreen", "1" if client["fullscreen"] else "0")
+
+    def _dispatch_tagwindow(self, args):
+        tag, _, selector = args.partition(" ")
+        client = self._select_window(selector.strip())
+        if not client:
+            return "No such window found"
+        tags = client.setdefault("tags", [])
+        name = tag.lstrip("+-")
+        if tag.startswith("+") or (not tag.startswith("-") and name not in tags):
+            if name not in tags:
+                tags.append(name)
+        elif name in tags:
+            tags.remove(name)
+
+    def _dispatch_setprop(self, args):
+        selector, _, rest = args.partition(" ")
+        client = self._select_window(selector)
+        if not client:
+            return "No such window found"
+        prop, _, value = rest.partition(" ")
+        self.props.setdefault(client["address"], {})[prop] = value
+
+    def _dispatch_layoutmsg(self, args):
+        client = self._select_window("")
+        if not client:
+            return
+        tiled = sorted(
+            (c for c in self.clients if c["workspace"]["id"] == client["workspace"]["id"] and not c.get("floating")),
+            key=lambda c: (c["at"][0], c["at"][1]),
+        )
+        if client not in tiled:
+            return
+        index = tiled.index(client)
+        if args == "swapwithmaster" and index > 0:
+            other = tiled[0]
+        elif args == "swapprev" and index > 0:
+            other = tiled[index - 1]
+        else:
+            return
+        client["at"], other["at"] = other["at"], client["at"]
+        client["size"], other["size"] = other["size"], client["size"]
+
+    def _dispatch_exec(self, args):
+        words = [w for w in shlex.split(args) if "=" not in w]
+        app_class = Path(words[0]).name if words else "app"
+        monitor = self._focused_monitor()
+        special = monitor["specialWorkspace"]
+        ws = special if special["id"] else monitor["activeWorkspace"]
+        width, height = self._logical_size(monitor)
+        gap = self._gap()
+        self._next_address += 0x10
+        client = {
+            "address": f"0x{self._next_address:x}",
+            "mapped": True,
+            "hidden": False,
+            "at": [monitor["x"] + gap, monitor["y"] + gap],
+            "size": [width // 2 - 2 * gap, height - 2 * gap],
+            "workspace": {"id": ws["id"], "name": ws["name"]},
+            "floating": False,
+            "pseudo": False,
+            "monitor": monitor["id"],
+            "class": app_class,
+            "title": app_class,
+            "initialClass": app_class,
+            "initialTitle": app_class,
+            "pid": 0,
+            "xwayland": False,
+            "pinned": False,
+            "fullscreen": 0,
+            "fullscreenClient": 0,
+            "grouped": [],
+            "tags": [],
+            "swallowing": "0x0",
+            "focusHistoryID": len(self.clients),
+            "inhibitingIdle": False,
+        }
+        self.clients.append(client)
+        self._emit("openwindow", f"{client['address'][2:]},{ws['name']},{app_class},{app_class}")
+        self._set_active(client)
+
+    def _dispatch_killactive(self, args):
+        return self._dispatch_closewindow("")
+
+    def _dispatch_closewindow(self, args):
+        client = self._select_window(args)
+        if not client:
+            return "No such window found"
+        self.clients.remove(client)
+        self._emit("closewindow", client["address"][2:])
+        if client["address"] == self.active_address:
+            remaining = sorted(self.clients, key=lambda c: c.get("focusHistoryID", 0))
+            self._set_active(remaining[0] if remaining else None)
+
+    # ------------------------------------------------------------------
+    # IPC
+    # ------------------------------------------------------------------
+
+    def handle_request(self, request):
+        """Answer one raw `.socket.sock` request the way Hyprland does."""
+        with self.lock:
+            self.request_counts["__requests__"] += 1
+            flags = ""
+            prefix, sep, rest = request.partition("/")
+            if sep and (prefix == "" or prefix.isalpha()) and len(prefix) <= 3:
+                flags, request = prefix, rest
+            if request.startswith("[[BATCH]]"):
+                commands = [c.strip() for c in request[len("[[BATCH]]"):].split(";") if c.strip()]
+            else:
+                commands = [request.strip()]
+            return "\n\n\n".join(self._run_command(command, "j" in flags) for command in commands)
+
+    def _run_command(self, command, as_json):
+        name, _, args = command.partition(" ")
+        self.request_counts[name] += 1
+        if name == "dispatch":
+            return self.dispatch(args)
+        if name == "setprop":
+            return self._dispatch_setprop(args) or "ok"
+        if name in ("keyword", "reload", "notify", "dismissnotify"):
+            return "ok"
+        result = self.query(command)
+        if result is None:
+            return "unknown request"
+        return json.dumps(result, indent=2) if as_json else json.dumps(result)
+
+    def subscribe(self):
+        """Return a queue receiving every subsequently emitted socket2 event line."""
+        events = queue.Queue()
+        with self.lock:
+            self._subscribers.append(events)
+        return events
+
+    def unsubscribe(self, events):
+        with self.lock:
+            if events in self._subscribers:
+                self._subscribers.remove(events)
+
+    def start(self, runtime_dir=None, signature=DEFAULT_SIGNATURE):
+        """Start serving `.socket.sock` and `.socket2.sock` under runtime_dir/hypr/signature."""
+        if runtime_dir is None:
+            self._tmpdir = tempfile.mkdtemp(prefix="fake-hyprland-")
+            runtime_dir = self._tmpdir
+        self.runtime_dir, self.signature = str(runtime_dir), signature
+        ipc_dir = socket_dir(self.runtime_dir, signature)
+        ipc_dir.mkdir(parents=True, exist_ok=True)
+
+        fake = self
+
+        class RequestHandler(socketserver.BaseRequestHandler):
+            def handle(self):
+                chunks = [self.request.recv(65536)]
+                # hyprctl doesn't half-close, so drain whatever is already buffered
+                while select.select([self.request], [], [], 0.005)[0]:
+                    chunk = self.request.recv(65536)
+                    if not chunk:
+                        break
+                    chunks.append(chunk)
+                reply = fake.handle_request(b"".join(chunks).decode("utf-8", errors="ignore"))
+                self.request.sendall(reply.encode("utf-8"))
+
+        class EventHandler(socketserver.BaseRequestHandler):
+            def handle(self):
+                events = fake.subscribe()
+                try:
+                    while True:
+                        line = events.get()
+                        if line is None:
+                            break
+                        self.request.sendall(f"{line}\n".encode("utf-8"))
+                except OSError:
+                    pass
+                finally:
+                    fake.unsubscribe(events)
+
+        for name, handler in ((".socket.sock", RequestHandler), (".socket2.sock", EventHandler)):
+            path = ipc_dir / name
+            if path.exists():
+                path.unlink()
+            server = socketserver.ThreadingUnixStreamServer(str(path), handler)
+            server.daemon_threads = True
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            self._servers.append(server)
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        """Stop the IPC servers and remove any temporary runtime dir."""
+        with self.lock:
+            for subscriber in self._subscribers:
+                subscriber.put(None)
+        for server in self._servers:
+            server.shutdown()
+            server.server_close()
+        self._servers, self._threads = [], []
+        if self._tmpdir:
+            shutil.rmtree(self._tmpdir, ignore_errors=True)
+            self._tmpdir = None
+
+    def __enter__(self):
+        return self.start() if not self._servers else self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def env(self, base=None):
+        """Return an environment pointing hyprctl and socket2 listeners at this instance."""
+        env = dict(os.environ if base is None else base)
+        env["XDG_RUNTIME_DIR"] = self.runtime_dir
+        env["HYPRLAND_INSTANCE_SIGNATURE"] = self.signature
+        bin_dir = install_hyprctl_shim(Path(self.runtime_dir) / "bin")
+        env["PATH"] = f"{bin_dir}:{env.get('PATH', '')}"
+        package_root = str(Path(__file__).resolve().parent.parent)
+        env["PYTHONPATH"] = f"{package_root}:{env['PYTHONPATH']}" if env.get("PYTHONPATH") else package_root
+        return env
+
+
+def install_hyprctl_shim(bin_dir):
+    """Write a `hyprctl` executable into bin_dir that talks to the fake sockets."""
+    bin_dir = Path(bin_dir)
+    bin_dir.mkdir(parents=True, exist_ok=True)
+    shim = bin_dir / "hyprctl"
+    package_root = Path(__file__).resolve().parent.parent
+    shim.write_text(
+        "#!/bin/sh\n"
+        f'PYTHONPATH="{package_root}${{PYTHONPATH:+:$PYTHONPATH}}" '
+        f'exec "{sys.executable}" -m hypr_window_ops.fake_hyprland hyprctl "$@"\n'
+    )
+    shim.chmod(0o755)
+    return bin_dir
+
+
+def hyprctl_main(argv):
+    """Minimal hyprctl replacement: build the request, send it, print the reply."""
+    flags = ""
+    batch = None
+    words = []
+    literal = False
+    args = iter(argv)
+    for arg in args:
+        if literal:
+            words.append(arg)
+        elif arg == "--":
+            literal = True
+        elif arg == "-j":
+            flags += "j"
+        elif arg == "--batch":
+            batch = next(args, "")
+        else:
+            words.append(arg)
+
+    request = f"{flags}/[[BATCH]]{batch}" if batch is not None else f"{flags}/{' '.join(words)}"
+    path = socket_dir() / ".socket.sock"
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(str(path))
+            sock.sendall(request.encode("utf-8"))
+            chunks = []
+            while True:
+                chunk = sock.recv(65536)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+    except OSError as e:
+        print(f"Couldn't connect to {path}: {e}", file=sys.stderr)
+        return 1
+    print(b"".join(chunks).decode("utf-8"))
+    return 0
+
+
+def main():
+    """CLI entry point for the fake compositor."""
+    if len(sys.argv) > 1 and sys.argv[1] == "hyprctl":
+        return hyprctl_main(sys.argv[2:])
+
+    parser = argparse.ArgumentParser(description="Fake Hyprland compositor for headless testing")
+    subparsers = parser.add_subparsers(dest="command")
+
+    serve_parser = subparsers.add_parser("serve", help="Serve a recording until interrupted")
+    serve_parser.add_argument("recording", nargs="?", default=str(DEFAULT_RECORDING), help="Recording directory")
+    serve_parser.add_argument("--runtime-dir", help="Runtime dir for the sockets (default: temporary)")
+    serve_parser.add_argument("--signature", default=DEFAULT_SIGNATURE, help="Instance signature (default: %(default)s)")
+
+    record_parser = subparsers.add_parser("record", help="Record the live Hyprland state")
+    record_parser.add_argument("output", help="Directory to write the recording to")
+
+    args = parser.parse_args()
+
+    if args.command == "record":
+        return record_live_state(args.output)
+    if args.command == "serve":
+        fake = FakeHyprland(args.recording).start(args.runtime_dir, args.signature)
+        env = fake.env()
+        print(f"export XDG_RUNTIME_DIR={env['XDG_RUNTIME_DIR']}")
+        print(f"export HYPRLAND_INSTANCE_SIGNATURE={env['HYPRLAND_INSTANCE_SIGNATURE']}")
+        print(f"export PATH={Path(env['XDG_RUNTIME_DIR']) / 'bin'}:$PATH")
+        sys.stdout.flush()
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            print(f"\nServed {fake.round_trips} requests: {dict(fake.request_counts)}")
+            fake.stop()
+        return 0
+
+    parser.print_help()
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
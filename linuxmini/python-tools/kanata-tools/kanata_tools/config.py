@@ -1,19 +1,30 @@
 """Configuration for Kanata Tools."""
 
+import os
 from pathlib import Path
 
 # Network configuration
 KANATA_HOST = "127.0.0.1"
 KANATA_PORT = 5829
 
+# Control socket of the status listener daemon, which brokers layer switches
+# over its long-lived kanata connection
+CONTROL_SOCKET = Path(os.environ.get("XDG_RUNTIME_DIR", f"/run/user/{os.getuid()}")) / "kanata_tools.sock"
+CONTROL_TIMEOUT = 1.0
+
 # File paths
-STATUS_FILE = Path("/tmp/kanata_status.json")
+STATUS_FILE = Path("/tmp/waybar/kanata_status.json")  # Watched by the status bus with the other waybar files
 STATE_FILE = Path("/tmp/kanata_layer_state.json")
 PERSISTENT_STATE_FILE = Path("/home/rash/.config/kanata/last_state.json")
 BOOT_TIME_FILE = Path("/tmp/kanata_last_boot_time")
 ACTIVE_LAYOUT_FILE = Path("/tmp/active_keyboard_layout")
 ESPANSO_CONFIG_FILE = Path("/home/rash/.config/espanso/config/default.yml")
 
+# Status listener timing
+STATUS_COALESCE_WINDOW = 0.05  # Layer flips within this window produce one write set
+PERSIST_INTERVAL = 30.0  # Seconds between lazy writes of the persistent state
+ESPANSO_DEBOUNCE = 1.0  # Seconds of layer quiet before espanso is updated
+
 # Layer mappings - simplified for new config (no home row mods in base layers)
 LAYER_NAMES = {
     ("cmk", "base"): "colemak",  # Colemak (default)
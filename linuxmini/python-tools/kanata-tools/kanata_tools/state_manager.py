@@ -2,6 +2,7 @@
 
 import json
 import logging
+import os
 import time
 from pathlib import Path
 from typing import Optional
@@ -14,6 +15,15 @@ from .config import (
 )
 
 
+def atomic_write_text(path: Path, text: str):
+    """Write text via a temp file and rename, so readers never see a partial file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.tmp")
+    with open(tmp, "w") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
 class StateManager:
     """Manages Kanata state persistence and reboot detection."""
     
@@ -74,8 +84,7 @@ class StateManager:
         try:
             state = {"layout": layout, "mod_state": mod_state}
             PERSISTENT_STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
-            with open(PERSISTENT_STATE_FILE, "w") as f:
-                json.dump(state, f)
+            atomic_write_text(PERSISTENT_STATE_FILE, json.dumps(state))
             self.logger.debug(f"Saved persistent state: {state}")
         except Exception as e:
             self.logger.error(f"Failed to save persistent state: {e}")
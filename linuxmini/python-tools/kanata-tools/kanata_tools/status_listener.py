@@ -2,21 +2,72 @@
 
 import json
 import logging
+import os
+import select
+import signal
 import socket
 import sys
 import time
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Iterator, Optional, Tuple
 
 from .config import (
     ACTIVE_LAYOUT_FILE,
+    CONTROL_SOCKET,
     KANATA_HOST,
     KANATA_PORT,
     LAYER_TO_STATE,
+    PERSIST_INTERVAL,
+    STATUS_COALESCE_WINDOW,
     STATUS_CONFIG,
     STATUS_FILE,
 )
-from .state_manager import StateManager
+from .espanso import EspansoUpdater
+from .state_manager import StateManager, atomic_write_text
+
+
+class LineReader:
+    """
+    Splits a socket stream into lines without re-copying the unread tail.
+
+    Data is received into a fixed buffer and appended to a bytearray; each
+    pass scans only the bytes that arrived since the last newline search and
+    drops the consumed prefix once, so a large burst costs linear time.
+    """
+
+    def __init__(self, sock: socket.socket, chunk_size: int = 65536):
+        self.sock = sock
+        self.buffer = bytearray()
+        self._chunk = bytearray(chunk_size)
+        self._view = memoryview(self._chunk)
+        self._scanned = 0  # Bytes of buffer already known to hold no newline
+
+    def read_lines(self) -> Optional[Iterator[bytes]]:
+        """Receive once and return the complete lines; None when the peer closed."""
+        count = self.sock.recv_into(self._chunk)
+        if count == 0:
+            return None
+        self.buffer += self._view[:count]
+        return self._split()
+
+    def _split(self) -> Iterator[bytes]:
+        lines = []
+        start = 0
+        search_from = self._scanned
+        while True:
+            end = self.buffer.find(b"\n", search_from)
+            if end < 0:
+                break
+            lines.append(bytes(self.buffer[start:end]))
+            start = search_from = end + 1
+        if start:
+            del self.buffer[:start]
+        self._scanned = len(self.buffer)
+        return iter(lines)
+
+
+def _raise_keyboard_interrupt(signum, frame):
+    raise KeyboardInterrupt
 
 
 class KanataStatusListener:
@@ -27,6 +78,14 @@ class KanataStatusListener:
         self.current_layout = "qwe"
         self.current_mod_state = "base"
         self.state_manager = StateManager(self.logger)
+        self.written_state = None  # (layout, mod_state) last written to the status files
+        self.write_at = None  # When pending layer flips get written
+        self.persist_dirty = False
+        self.persist_at = time.monotonic() + PERSIST_INTERVAL
+        self.espanso = EspansoUpdater(self.logger)
+        self.kanata_sock: Optional[socket.socket] = None
+        self.control: Optional[socket.socket] = None
+        self.control_clients: dict = {}  # socket -> bytearray of unread input
     
     def setup_logging(self):
         logging.basicConfig(
@@ -55,24 +114,81 @@ class KanataStatusListener:
             return None
     
     def update_status_files(self, layout: str, mod_state: str):
-        """Update both status files based on current state."""
+        """Write the status and active layout files, and mark the persistent state dirty."""
         try:
-            # Update waybar status file
+            # Update waybar status file (renamed into place, so watchers see one change)
             key = (layout, mod_state)
-            status = STATUS_CONFIG[key]
-            with open(STATUS_FILE, "w") as f:
-                json.dump(status, f)
-            
+            atomic_write_text(STATUS_FILE, json.dumps(STATUS_CONFIG[key]))
+
             # Update active keyboard layout file
-            with open(ACTIVE_LAYOUT_FILE, "w") as f:
-                f.write(layout)
-            
-            # Save persistent state
-            self.state_manager.save_persistent_state(layout, mod_state)
-            
+            atomic_write_text(ACTIVE_LAYOUT_FILE, layout)
+            self.written_state = key
+
+            # Espanso follows in the background, and only restarts if its config changes
+            self.espanso.schedule(layout)
+
+            # Persistent state is only needed across reconnects; save it lazily
+            self.persist_dirty = True
+
         except Exception as e:
             self.logger.error(f"Failed to update status files: {e}")
-    
+
+    def flush_persistent_state(self):
+        """Save the persistent state if it changed since the last save."""
+        if self.persist_dirty:
+            self.state_manager.save_persistent_state(self.current_layout, self.current_mod_state)
+            self.persist_dirty = False
+        self.persist_at = time.monotonic() + PERSIST_INTERVAL
+
+    def handle_line(self, line: bytes):
+        """Track the latest layer; files are written once the flips settle."""
+        line = line.strip()
+        if not line:
+            return
+        try:
+            message = json.loads(line)
+        except json.JSONDecodeError as e:
+            self.logger.warning(f"Invalid JSON received: {line!r} - {e}")
+            return
+
+        state = self.parse_layer_change(message)
+        if state:
+            self.set_state(state)
+
+    def set_state(self, state: Tuple[str, str]):
+        if state != (self.current_layout, self.current_mod_state):
+            layout, mod_state = state
+            self.logger.info(
+                f"Layer changed: {self.current_layout}-{self.current_mod_state} "
+                f"→ {layout}-{mod_state}"
+            )
+            self.current_layout = layout
+            self.current_mod_state = mod_state
+            if self.write_at is None:
+                self.write_at = time.monotonic() + STATUS_COALESCE_WINDOW
+
+    def flush_status(self):
+        """Write the coalesced state, unless the flips ended where they started."""
+        self.write_at = None
+        state = (self.current_layout, self.current_mod_state)
+        if state != self.written_state:
+            self.update_status_files(*state)
+        else:
+            self.logger.debug("Layer flips cancelled out, nothing to write")
+
+    def next_timeout(self) -> float:
+        deadline = self.persist_at
+        if self.write_at is not None:
+            deadline = min(deadline, self.write_at)
+        return max(0.0, deadline - time.monotonic())
+
+    def run_due(self):
+        now = time.monotonic()
+        if self.write_at is not None and self.write_at <= now:
+            self.flush_status()
+        if self.persist_at <= now:
+            self.flush_persistent_state()
+
     def connect_to_kanata(self) -> Optional[socket.socket]:
         """Connect to Kanata TCP server."""
         try:
@@ -84,6 +200,84 @@ class KanataStatusListener:
             self.logger.error(f"Failed to connect to Kanata TCP server: {e}")
             return None
     
+    def open_control_socket(self):
+        """Listen for layer switch requests from `kanata-tools switch/set`."""
+        try:
+            if CONTROL_SOCKET.exists():
+                CONTROL_SOCKET.unlink()
+            self.control = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.control.bind(str(CONTROL_SOCKET))
+            os.chmod(CONTROL_SOCKET, 0o600)
+            self.control.listen(8)
+            self.logger.info(f"Accepting layer switch requests on {CONTROL_SOCKET}")
+        except OSError as e:
+            self.logger.warning(f"Control socket unavailable, switches will connect directly: {e}")
+            self.control = None
+
+    def close_control_socket(self):
+        for client in list(self.control_clients):
+            client.close()
+        self.control_clients.clear()
+        if self.control:
+            self.control.close()
+            self.control = None
+            try:
+                CONTROL_SOCKET.unlink()
+            except OSError:
+                pass
+
+    def on_control_readable(self, sock: socket.socket):
+        if sock is self.control:
+            client, _ = self.control.accept()
+            self.control_clients[client] = bytearray()
+            return
+        try:
+            data = sock.recv(4096)
+        except OSError:
+            data = b""
+        if not data:
+            self.control_clients.pop(sock, None)
+            sock.close()
+            return
+        buffer = self.control_clients[sock]
+        buffer += data
+        while (end := buffer.find(b"\n")) >= 0:
+            line = bytes(buffer[:end])
+            del buffer[:end + 1]
+            reply = self.handle_control(line)
+            try:
+                sock.sendall(json.dumps(reply).encode() + b"\n")
+            except OSError:
+                self.control_clients.pop(sock, None)
+                sock.close()
+                return
+
+    def handle_control(self, line: bytes) -> dict:
+        """Serve one request: {"op": "set", "layer": ...} or {"op": "status"}."""
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError:
+            return {"ok": False, "error": "invalid JSON"}
+        op = request.get("op")
+        if op == "status":
+            return {"ok": True, "layout": self.current_layout, "mod_state": self.current_mod_state}
+        if op != "set":
+            return {"ok": False, "error": f"unknown op: {op}"}
+        layer_name = request.get("layer")
+        if layer_name not in LAYER_TO_STATE:
+            return {"ok": False, "error": f"unknown layer: {layer_name}"}
+        if self.kanata_sock is None:
+            return {"ok": False, "error": "not connected to kanata"}
+        try:
+            message = {"ChangeLayer": {"new": layer_name}}
+            self.kanata_sock.sendall(json.dumps(message).encode("utf-8") + b"\n")
+        except OSError as e:
+            return {"ok": False, "error": str(e)}
+        self.logger.info(f"Sent layer change to: {layer_name}")
+        # Kanata may or may not echo a LayerChange for requested switches
+        self.set_state(LAYER_TO_STATE[layer_name])
+        return {"ok": True}
+
     def listen_for_messages(self):
         """Main listening loop."""
         while True:
@@ -92,66 +286,63 @@ class KanataStatusListener:
                 self.logger.error("Could not connect to Kanata, retrying in 5 seconds...")
                 time.sleep(5)
                 continue
-            
+
             # Write initial state immediately upon successful connection
             self.update_status_files(self.current_layout, self.current_mod_state)
             self.logger.info(f"Initialized with default state: {self.current_layout}-{self.current_mod_state}")
-            
+
             try:
-                buffer = ""
-                
-                while True:
-                    data = sock.recv(1024).decode('utf-8')
-                    if not data:
-                        self.logger.warning("Connection closed by Kanata")
-                        break
-                    
-                    buffer += data
-                    
-                    # Process complete JSON messages (one per line)
-                    while '\n' in buffer:
-                        line, buffer = buffer.split('\n', 1)
-                        line = line.strip()
-                        
-                        if line:
-                            try:
-                                message = json.loads(line)
-                                
-                                # Parse layer change
-                                state = self.parse_layer_change(message)
-                                if state:
-                                    layout, mod_state = state
-                                    if layout != self.current_layout or mod_state != self.current_mod_state:
-                                        self.logger.info(
-                                            f"Layer changed: {self.current_layout}-{self.current_mod_state} "
-                                            f"→ {layout}-{mod_state}"
-                                        )
-                                        self.current_layout = layout
-                                        self.current_mod_state = mod_state
-                                        self.update_status_files(layout, mod_state)
-                                        
-                            except json.JSONDecodeError as e:
-                                self.logger.warning(f"Invalid JSON received: {line} - {e}")
-                                
+                reader = LineReader(sock)
+                self.kanata_sock = sock
+                closed = False
+
+                while not closed:
+                    watched = [sock, *self.control_clients]
+                    if self.control:
+                        watched.append(self.control)
+                    readable, _, _ = select.select(watched, [], [], self.next_timeout())
+                    for ready in readable:
+                        if ready is not sock:
+                            self.on_control_readable(ready)
+                            continue
+                        lines = reader.read_lines()
+                        if lines is None:
+                            self.logger.warning("Connection closed by Kanata")
+                            closed = True
+                            break
+                        for line in lines:
+                            self.handle_line(line)
+                    self.run_due()
+
             except Exception as e:
                 self.logger.error(f"Error in message loop: {e}")
-                
+
             finally:
+                self.kanata_sock = None
                 if sock:
                     sock.close()
-                    
+                if self.write_at is not None:
+                    self.flush_status()
+
             # Reconnect after a delay
             self.logger.info("Reconnecting in 5 seconds...")
             time.sleep(5)
-    
+
     def run(self):
         """Run the status listener daemon."""
+        # systemd stops the service with SIGTERM; shut down like Ctrl-C so state is saved
+        signal.signal(signal.SIGTERM, _raise_keyboard_interrupt)
         try:
             self.logger.info("Starting Kanata status listener daemon...")
+            self.open_control_socket()
             self.listen_for_messages()
         except KeyboardInterrupt:
             self.logger.info("Shutting down...")
+            self.flush_persistent_state()
             sys.exit(0)
         except Exception as e:
             self.logger.error(f"Fatal error: {e}")
-            sys.exit(1)
\ No newline at end of file
+            self.flush_persistent_state()
+            sys.exit(1)
+        finally:
+            self.close_control_socket()
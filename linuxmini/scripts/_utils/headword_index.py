@@ -0,0 +1,376 @@
+# Description: Persistent prefix and typo-tolerant headword index over StarDict dictionaries.
+
+"""
+One file holding every headword (and synonym) of a set of StarDict
+dictionaries, built once and memory-mapped afterwards:
+
+    header        magic, then JSON: booknames, source signature, array sizes
+    word_offsets  uint32[n + 1]  start of each word in the blob
+    masks         uint32[n]      which dictionaries (bit per bookname) have it
+    lengths       uint8[n]       casefolded length of each word (capped at 255)
+    by_length     uint32[n]      word numbers ordered by length
+    length_ends   uint32[256]    end of each length's run in by_length
+    trigram_keys  uint64[t]      sorted trigram keys
+    posting_ends  uint32[t]      end of each trigram's run in postings
+    postings      uint32[p]      word numbers, ascending per trigram
+    blob          UTF-8 words, sorted by casefolded form
+
+Words that differ only in case share an entry, spelled in lowercase if
+any dictionary has it that way. Prefix completion is a binary search in
+the sorted words.
+
+Typo-tolerant matching pads the query and cuts it into trigrams. Each
+edit (a swap of neighbours counts as one) changes at most four of them,
+so a word within k edits shares at least (trigrams - 4k) of them. When
+that number is positive, such a word appears in at least one of any
+4k + 1 of the posting lists, so the union of the 4k + 1 shortest lists
+(the rarest trigrams), less the words sharing too few trigrams, is a
+complete candidate set. When it isn't (k edits can destroy every trigram
+of a short query), the candidates are every word whose length is within
+k instead, taken from the by-length buckets. Either way, candidates
+whose length is off by more than k are skipped before a real,
+bit-parallel edit distance is computed for the rest.
+
+default_max_distance() keeps the trigram filter effective: two edits are
+only allowed for words long enough to keep a few trigrams intact.
+
+The index records the size and mtime of every source index file and is
+rebuilt by load_or_build() when any of them change.
+
+Usage:
+    index = load_or_build(path, [StarDict(ifo) for ifo in ifo_paths])
+    index.prefix("defin")     # ["define", "definite", ...]
+    index.fuzzy("defnie")     # ["define", ...]
+"""
+
+import array
+import bisect
+import collections
+import json
+import mmap
+import os
+import struct
+from pathlib import Path
+
+MAGIC = b"HWIDX\x00\x02\x00"
+
+PAD = "\x00"
+TRIGRAMS_PER_EDIT = 4
+MAX_LENGTH = 255
+
+_HEADER_LENGTH = struct.Struct("<I")
+
+
+def trigram_keys(folded):
+    """Keys of the trigrams of a casefolded word, padded so ends count double."""
+    padded = PAD * 2 + folded + PAD * 2
+    return {
+        (ord(padded[i]) << 42) | (ord(padded[i + 1]) << 21) | ord(padded[i + 2])
+        for i in range(len(padded) - 2)
+    }
+
+
+def distance_from(pattern):
+    """
+    A function giving the optimal string alignment distance (a swap of
+    neighbours counts as one edit) from pattern to any word. Hyyro's
+    bit-parallel algorithm: one pass over the word with a few integer
+    operations per character, pattern positions being the bits.
+    """
+    char_masks = {}
+    for i, c in enumerate(pattern):
+        char_masks[c] = char_masks.get(c, 0) | (1 << i)
+    full = (1 << len(pattern)) - 1
+    last = 1 << (len(pattern) - 1) if pattern else 0
+
+    def distance(word):
+        if not pattern:
+            return len(word)
+        vp, vn, d0, pm_previous, score = full, 0, 0, 0, len(pattern)
+        for c in word:
+            pm = char_masks.get(c, 0)
+            transposed = ((~d0 & pm) << 1) & pm_previous
+            d0 = ((((pm & vp) + vp) ^ vp) | pm | vn | transposed) & full
+            hp = (vn | ~(d0 | vp)) & full
+            hn = d0 & vp
+            if hp & last:
+                score += 1
+            elif hn & last:
+                score -= 1
+            hp = ((hp << 1) | 1) & full
+            hn = (hn << 1) & full
+            vp = (hn | ~(d0 | hp)) & full
+            vn = d0 & hp
+            pm_previous = pm
+        return score
+
+    return distance
+
+
+def default_max_distance(word):
+    """Edits tolerated in word by default: two only once it has trigrams to spare."""
+    return 1 if len(word) < 9 else 2
+
+
+def signature(dictionaries):
+    """What the index was built from: each dictionary's index files and their versions."""
+    sources = []
+    for dictionary in dictionaries:
+        for suffix in (".idx", ".idx.gz", ".syn"):
+            path = dictionary.ifo_path.with_suffix(suffix)
+            if path.exists():
+                st = path.stat()
+                sources.append([str(path), st.st_size, st.st_mtime_ns])
+    return sources
+
+
+def _aligned(length):
+    return (length + 7) & ~7
+
+
+class HeadwordIndex:
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.map[: len(MAGIC)] != MAGIC:
+            self.map.close()
+            raise ValueError(f"{self.path}: not a headword index")
+        (length,) = _HEADER_LENGTH.unpack_from(self.map, len(MAGIC))
+        start = len(MAGIC) + _HEADER_LENGTH.size
+        self.header = json.loads(self.map[start : start + length])
+        self.booknames = self.header["booknames"]
+        self.signature = self.header["signature"]
+
+        view = memoryview(self.map)
+        pos = _aligned(start + length)
+        self._views = []
+        sections = {}
+        for name, typecode, count in self.header["arrays"]:
+            size = count * struct.calcsize(typecode)
+            sections[name] = view[pos : pos + size].cast(typecode)
+            self._views.append(sections[name])
+            pos = _aligned(pos + size)
+        self.word_offsets = sections["word_offsets"]
+        self.masks = sections["masks"]
+        self.lengths = sections["lengths"]
+        self.by_length = sections["by_length"]
+        self.length_ends = sections["length_ends"]
+        self.trigram_keys = sections["trigram_keys"]
+        self.posting_ends = sections["posting_ends"]
+        self.postings = sections["postings"]
+        self.blob = view[pos:]
+        self._views.extend([self.blob, view])
+
+    @classmethod
+    def build(cls, path, dictionaries):
+        """Index the headwords of the given StarDict dictionaries into path."""
+        booknames = [dictionary.bookname for dictionary in dictionaries]
+        if len(booknames) > 32:
+            raise ValueError("at most 32 dictionaries per index")
+
+        entries = {}
+        for bit, dictionary in enumerate(dictionaries):
+            for word in dictionary.headwords():
+                folded = word.casefold()
+                entry = entries.get(folded)
+                if entry is None:
+                    entries[folded] = [word, 1 << bit]
+                else:
+                    entry[1] |= 1 << bit
+                    if word == folded:
+                        entry[0] = word  # Show "word" rather than "Word"
+
+        folded_words = sorted(entries)
+        word_offsets = array.array("I", [0])
+        masks = array.array("I")
+        lengths = array.array("B")
+        blob = bytearray()
+        postings_by_key = collections.defaultdict(lambda: array.array("I"))
+        for number, folded in enumerate(folded_words):
+            word, mask = entries[folded]
+            blob += word.encode("utf-8")
+            word_offsets.append(len(blob))
+            masks.append(mask)
+            lengths.append(min(len(folded), MAX_LENGTH))
+            for key in trigram_keys(folded):
+                postings_by_key[key].append(number)
+
+        keys = array.array("Q", sorted(postings_by_key))
+        posting_ends = array.array("I")
+        postings = array.array("I")
+        for key in keys:
+            postings.extend(postings_by_key[key])
+            posting_ends.append(len(postings))
+
+        by_length = array.array("I", sorted(range(len(lengths)), key=lengths.__getitem__))
+        length_ends = array.array("I", [0] * (MAX_LENGTH + 1))
+        for length in lengths:
+            length_ends[length] += 1
+        for length in range(1, MAX_LENGTH + 1):
+            length_ends[length] += length_ends[length - 1]
+
+        arrays = [
+            ("word_offsets", word_offsets),
+            ("masks", masks),
+            ("lengths", lengths),
+            ("by_length", by_length),
+            ("length_ends", length_ends),
+            ("trigram_keys", keys),
+            ("posting_ends", posting_ends),
+            ("postings", postings),
+        ]
+        header = json.dumps(
+            {
+                "booknames": booknames,
+                "signature": signature(dictionaries),
+                "arrays": [(name, data.typecode, len(data)) for name, data in arrays],
+            }
+        ).encode()
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(MAGIC + _HEADER_LENGTH.pack(len(header)) + header)
+            for _, data in arrays:
+                f.write(b"\0" * (_aligned(f.tell()) - f.tell()))
+                data.tofile(f)
+            f.write(b"\0" * (_aligned(f.tell()) - f.tell()))
+            f.write(blob)
+        os.replace(tmp, path)
+        return cls(path)
+
+    def __len__(self):
+        return len(self.masks)
+
+    def word(self, number):
+        start = self.word_offsets[number]
+        return bytes(self.blob[start : self.word_offsets[number + 1]]).decode("utf-8")
+
+    def mask_for(self, booknames=None):
+        """Bit mask selecting the given booknames (None: all of them)."""
+        if booknames is None:
+            return (1 << len(self.booknames)) - 1
+        return sum(1 << bit for bit, name in enumerate(self.booknames) if name in booknames)
+
+    def bisect(self, folded):
+        """First word number whose casefolded form is >= folded."""
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.word(mid).casefold() < folded:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def find(self, word, booknames=None):
+        """The indexed spelling of word, ignoring case, or None."""
+        folded = word.casefold()
+        number = self.bisect(folded)
+        if number < len(self) and self.word(number).casefold() == folded:
+            if self.masks[number] & self.mask_for(booknames):
+                return self.word(number)
+        return None
+
+    def prefix(self, prefix, limit=50, booknames=None):
+        """Words starting with prefix (ignoring case), in sorted order."""
+        folded = prefix.casefold()
+        mask = self.mask_for(booknames)
+        results = []
+        for number in range(self.bisect(folded), len(self)):
+            word = self.word(number)
+            if not word.casefold().startswith(folded):
+                break
+            if self.masks[number] & mask:
+                results.append(word)
+                if len(results) >= limit:
+                    break
+        return results
+
+    def _postings(self, key):
+        position = bisect.bisect_left(self.trigram_keys, key)
+        if position == len(self.trigram_keys) or self.trigram_keys[position] != key:
+            return self.postings[0:0]
+        start = self.posting_ends[position - 1] if position else 0
+        return self.postings[start : self.posting_ends[position]]
+
+    def _of_length(self, shortest, longest):
+        """Numbers of the words whose length is in [shortest, longest]."""
+        shortest = max(shortest, 0)
+        longest = min(longest, MAX_LENGTH)
+        if shortest > longest:
+            return self.by_length[0:0]
+        start = self.length_ends[shortest - 1] if shortest else 0
+        return self.by_length[start : self.length_ends[longest]]
+
+    def fuzzy(self, word, limit=10, booknames=None, max_distance=None, max_checked=None):
+        """
+        Words within max_distance edits of word, closest first. Nearer
+        distances are searched first and the search stops once limit words
+        that close are found. max_checked caps the number of edit distances
+        computed, for interactive use; the result may then be incomplete.
+        """
+        folded = word.casefold()
+        length = len(folded)
+        if max_distance is None:
+            max_distance = default_max_distance(folded)
+        lists = sorted((self._postings(key) for key in trigram_keys(folded)), key=len)
+        shared = None
+        mask = self.mask_for(booknames)
+        distance_to = distance_from(folded)
+        checked = set()
+        found = []
+        for distance in range(max_distance + 1):
+            needed = len(lists) - TRIGRAMS_PER_EDIT * distance
+            if needed > 0:
+                if shared is None:
+                    shared = collections.Counter()
+                    for postings in lists:
+                        shared.update(postings)
+                # A word within this distance is in at least one of these lists
+                candidates = set().union(*lists[: TRIGRAMS_PER_EDIT * distance + 1])
+            else:
+                candidates = self._of_length(length - distance, length + distance)
+            for number in candidates:
+                if (
+                    number in checked
+                    or abs(self.lengths[number] - length) > distance
+                    or not self.masks[number] & mask
+                    or (needed > 0 and shared[number] < needed)
+                ):
+                    continue
+                if max_checked is not None and len(checked) >= max_checked:
+                    return [candidate for *_, candidate in sorted(found)[:limit]]
+                checked.add(number)
+                candidate = self.word(number)
+                found_distance = distance_to(candidate.casefold())
+                if found_distance <= max_distance:
+                    found.append((found_distance, candidate.casefold(), candidate))
+            if sum(1 for entry in found if entry[0] <= distance) >= limit:
+                break
+        return [candidate for *_, candidate in sorted(found)[:limit]]
+
+    def close(self):
+        for view in self._views:
+            view.release()
+        self.map.close()
+
+
+def load_or_build(path, dictionaries, on_build=None):
+    """
+    The index at path, rebuilt first if it is missing or out of date;
+    on_build() is called before a (re)build, which can take a while.
+    """
+    booknames = [dictionary.bookname for dictionary in dictionaries]
+    try:
+        index = HeadwordIndex(path)
+        if index.booknames == booknames and index.signature == signature(dictionaries):
+            return index
+        index.close()
+    except (OSError, ValueError, KeyError):
+        pass
+    if on_build is not None:
+        on_build()
+    return HeadwordIndex.build(path, dictionaries)
@@ -0,0 +1,108 @@
+# Description: Minimal inotify wrapper (ctypes, no third-party dependencies).
+
+import ctypes
+import ctypes.util
+import os
+import struct
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_CLOSE_NOWRITE = 0x00000010
+IN_OPEN = 0x00000020
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+
+IN_CLOSE = IN_CLOSE_WRITE | IN_CLOSE_NOWRITE
+
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+
+# Events that mean "the file now has new contents", including atomic
+# replace-by-rename which plain IN_MODIFY misses
+FILE_WRITTEN = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+_EVENT_HEADER = struct.Struct("iIII")
+
+_libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+_libc.inotify_init1.argtypes = [ctypes.c_int]
+_libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+_libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+
+
+def _check(result):
+    if result < 0:
+        errno = ctypes.get_errno()
+        raise OSError(errno, os.strerror(errno))
+    return result
+
+
+class Inotify:
+    """
+    An inotify instance watching directories for file events.
+
+    Watching directories rather than files survives files being deleted and
+    recreated, which is how most status files in /tmp are rewritten.
+    """
+
+    def __init__(self, nonblocking=True):
+        flags = IN_CLOEXEC | (IN_NONBLOCK if nonblocking else 0)
+        self.fd = _check(_libc.inotify_init1(flags))
+        self._paths = {}
+
+    def fileno(self):
+        return self.fd
+
+    def add_watch(self, path, mask=FILE_WRITTEN):
+        """Watch path; returns the watch descriptor."""
+        wd = _check(_libc.inotify_add_watch(self.fd, os.fsencode(path), mask))
+        self._paths[wd] = str(path)
+        return wd
+
+    def rm_watch(self, wd):
+        _libc.inotify_rm_watch(self.fd, wd)
+        self._paths.pop(wd, None)
+
+    def read(self):
+        """
+        Read pending events as (path, mask) tuples, where path is the watched
+        directory joined with the event's file name.
+
+        Returns an empty list if nothing is pending on a non-blocking instance.
+        """
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        events = []
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0").decode(errors="replace")
+            offset += length
+            base = self._paths.get(wd)
+            if base is None:
+                continue
+            if mask & IN_IGNORED:
+                self._paths.pop(wd, None)
+            events.append((os.path.join(base, name) if name else base, mask))
+        return events
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,434 @@
+# Description: StarDict dictionary reader (mmap'd index, dictzip random access, stdlib only).
+
+"""
+Reads StarDict dictionaries in-process, the format sdcv and GoldenDict use:
+
+    name.ifo          text header: bookname, wordcount, sametypesequence, ...
+    name.idx[.gz]     sorted "headword\\0" + offset + size records
+    name.syn          optional "synonym\\0" + idx entry number records
+    name.dict[.dz]    definitions, plain or dictzip compressed
+
+Opening a dictionary costs almost nothing: the .idx and .syn files are
+memory-mapped and searched in place, so only the pages a lookup touches are
+read. Records are variable length, so binary search needs the offset of
+every record; that table is built by one scan the first time a dictionary
+is used and cached in ~/.cache/stardict, keyed by the index file's size and
+mtime, and mapped from there afterwards.
+
+Headwords are ordered the way StarDict sorts them, ASCII case-insensitively
+with a byte comparison as tie break, so a lookup is two binary searches
+for the first and last record equal to the folded query.
+
+A .dict.dz file is a gzip stream with an "RA" extra field listing the
+compressed size of each fixed-size chunk, each compressed with a full flush
+so it can be inflated on its own. Reading a definition inflates only the
+chunks it spans, with the last few kept for neighbouring entries.
+
+Usage:
+    library = StarDictLibrary()
+    for entry in library.lookup("word", booknames=["WordNet"]):
+        print(entry.bookname, entry.headword, entry.text)
+"""
+
+import array
+import gzip
+import hashlib
+import html
+import itertools
+import mmap
+import os
+import re
+import struct
+import zlib
+from pathlib import Path
+from typing import NamedTuple
+
+# Same search order as sdcv
+DEFAULT_DIRS = [
+    Path(os.environ["STARDICT_DATA_DIR"]) / "dic" if os.environ.get("STARDICT_DATA_DIR") else None,
+    Path.home() / ".stardict" / "dic",
+    Path(os.environ.get("XDG_DATA_HOME", Path.home() / ".local" / "share")) / "stardict" / "dic",
+    Path("/usr/share/stardict/dic"),
+]
+DEFAULT_DIRS = [d for d in DEFAULT_DIRS if d is not None]
+
+CACHE_DIR = Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")) / "stardict"
+
+# Section types whose payload is text (lowercase) vs. sized binary (uppercase)
+TEXT_TYPES = set("mlghxtykw")
+PHONETIC_TYPES = set("tyk")
+MARKUP_TYPES = set("gx")
+
+DICTZIP_CACHED_CHUNKS = 8
+
+_UINT32 = struct.Struct(">I")
+_UINT64 = struct.Struct(">Q")
+_TAG = re.compile(r"<[^>]*>")
+
+
+class Entry(NamedTuple):
+    bookname: str
+    headword: str
+    sections: list  # [(type char, str or bytes)]
+
+    @property
+    def text(self):
+        """The definition as sdcv prints it: each text section on its own line(s)."""
+        parts = []
+        for kind, data in self.sections:
+            if kind not in TEXT_TYPES or not data:
+                continue
+            if kind in MARKUP_TYPES:
+                data = html.unescape(_TAG.sub("", data))
+            elif kind in PHONETIC_TYPES:
+                data = f"[{data}]"
+            parts.append("\n" + data)
+        return "".join(parts)
+
+
+def parse_ifo(path):
+    """The key=value pairs of an .ifo file."""
+    info = {}
+    with open(path, encoding="utf-8", errors="replace") as f:
+        if not f.readline().startswith("StarDict's dict ifo file"):
+            raise ValueError(f"{path}: not a StarDict .ifo file")
+        for line in f:
+            key, sep, value = line.rstrip("\n").partition("=")
+            if sep:
+                info[key.strip()] = value.strip()
+    return info
+
+
+def fold(word):
+    """StarDict's primary sort key: ASCII-only lowercase (bytes.lower leaves UTF-8 alone)."""
+    return word.lower()
+
+
+def _map_file(path):
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class DictData:
+    """Random access to a .dict, .dict.dz (dictzip) or plain gzip'd .dict.gz file."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.data = _map_file(self.path)
+        self.chunk_length = None
+        self.chunk_offsets = None
+        self.cache = {}
+        if self.data[:2] == b"\x1f\x8b":
+            if not self._parse_dictzip_header():
+                # gzip without a chunk table: no random access, inflate it once
+                self.data = gzip.decompress(self.data)
+
+    def _parse_dictzip_header(self):
+        data = self.data
+        flags = data[3]
+        pos = 10
+        chunk_sizes = None
+        if flags & 0x04:  # FEXTRA
+            (xlen,) = struct.unpack_from("<H", data, pos)
+            extra, pos = data[pos + 2 : pos + 2 + xlen], pos + 2 + xlen
+            while len(extra) >= 4:
+                (length,) = struct.unpack_from("<H", extra, 2)
+                if extra[:2] == b"RA":
+                    _, self.chunk_length, count = struct.unpack_from("<HHH", extra, 4)
+                    chunk_sizes = struct.unpack_from(f"<{count}H", extra, 10)
+                extra = extra[4 + length :]
+        for flag in (0x08, 0x10):  # FNAME, FCOMMENT: zero-terminated
+            if flags & flag:
+                pos = data.find(b"\0", pos) + 1
+        if flags & 0x02:  # FHCRC
+            pos += 2
+        if chunk_sizes is None:
+            return False
+        self.chunk_offsets = list(itertools.accumulate(chunk_sizes, initial=pos))
+        return True
+
+    def _chunk(self, index):
+        chunk = self.cache.get(index)
+        if chunk is None:
+            start, end = self.chunk_offsets[index], self.chunk_offsets[index + 1]
+            chunk = zlib.decompressobj(-zlib.MAX_WBITS).decompress(self.data[start:end])
+            if len(self.cache) >= DICTZIP_CACHED_CHUNKS:
+                self.cache.pop(next(iter(self.cache)))
+            self.cache[index] = chunk
+        return chunk
+
+    def read(self, offset, size):
+        if self.chunk_offsets is None:
+            return bytes(self.data[offset : offset + size])
+        first = offset // self.chunk_length
+        last = (offset + size - 1) // self.chunk_length
+        data = b"".join(self._chunk(i) for i in range(first, last + 1))
+        start = offset - first * self.chunk_length
+        return data[start : start + size]
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+
+
+class SortedIndex:
+    """
+    An .idx or .syn file: NUL-terminated headwords, each followed by a fixed
+    size tail, searched in place through a cached table of record offsets.
+    """
+
+    def __init__(self, path, tail, cache_dir=CACHE_DIR):
+        self.path = Path(path)
+        self.tail = tail
+        if self.path.suffix == ".gz":
+            self.data = gzip.decompress(self.path.read_bytes())
+        else:
+            self.data = _map_file(self.path)
+        self.offsets_map = None
+        self.offsets = self._load_offsets(Path(cache_dir))
+
+    def _cache_path(self, cache_dir):
+        st = self.path.stat()
+        key = hashlib.sha1(str(self.path.resolve()).encode()).hexdigest()[:16]
+        return cache_dir / f"{key}-{st.st_size}-{st.st_mtime_ns}.offsets"
+
+    def _load_offsets(self, cache_dir):
+        cache_path = self._cache_path(cache_dir)
+        typecode = "I" if len(self.data) < 2**32 else "Q"
+        try:
+            with open(cache_path, "rb") as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return array.array(typecode)
+                self.offsets_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            return memoryview(self.offsets_map).cast(typecode)
+        except FileNotFoundError:
+            pass
+
+        offsets = self._scan(typecode)
+        try:
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            # Drop tables cached for older versions of this file
+            for stale in cache_dir.glob(cache_path.name.split("-", 1)[0] + "-*"):
+                stale.unlink(missing_ok=True)
+            tmp = cache_path.with_suffix(".tmp")
+            with open(tmp, "wb") as f:
+                offsets.tofile(f)
+            os.replace(tmp, cache_path)
+        except OSError:
+            pass  # Read-only cache: rescan next time
+        return offsets
+
+    def _scan(self, typecode):
+        offsets = array.array(typecode)
+        find, step, end = self.data.find, 1 + self.tail, len(self.data)
+        pos = 0
+        while pos < end:
+            offsets.append(pos)
+            nul = find(b"\0", pos)
+            if nul < 0:
+                break
+            pos = nul + step
+        return offsets
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def word(self, index):
+        start = self.offsets[index]
+        return bytes(self.data[start : self.data.find(b"\0", start)])
+
+    def words(self):
+        for index in range(len(self.offsets)):
+            yield self.word(index)
+
+    def tail_of(self, index):
+        start = self.data.find(b"\0", self.offsets[index]) + 1
+        return self.data[start : start + self.tail]
+
+    def bisect(self, folded, upper=False):
+        """First index whose folded headword is >= folded (> with upper)."""
+        lo, hi = 0, len(self.offsets)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            key = fold(self.word(mid))
+            if key < folded or (upper and key == folded):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def matching(self, word):
+        """Indices of headwords equal to word, ignoring ASCII case."""
+        folded = fold(word)
+        return range(self.bisect(folded), self.bisect(folded, upper=True))
+
+    def close(self):
+        if isinstance(self.offsets, memoryview):
+            self.offsets.release()
+            self.offsets_map.close()
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+
+
+class StarDict:
+    """One dictionary, opened from its .ifo path."""
+
+    def __init__(self, ifo_path, cache_dir=CACHE_DIR):
+        self.ifo_path = Path(ifo_path)
+        self.info = parse_ifo(self.ifo_path)
+        self.bookname = self.info.get("bookname", self.ifo_path.stem)
+        self.sametypesequence = self.info.get("sametypesequence", "")
+        self.cache_dir = cache_dir
+        self._idx = self._syn = self._dict = None
+
+    def _sibling(self, *suffixes):
+        base = self.ifo_path.with_suffix("")
+        for suffix in suffixes:
+            path = base.with_name(base.name + suffix)
+            if path.exists():
+                return path
+        return None
+
+    def open(self):
+        if self._idx is not None:
+            return self
+        idx_path = self._sibling(".idx", ".idx.gz")
+        dict_path = self._sibling(".dict.dz", ".dict", ".dict.gz")
+        if idx_path is None or dict_path is None:
+            raise FileNotFoundError(f"{self.ifo_path}: missing .idx or .dict file")
+        self.offset_struct = _UINT64 if self.info.get("idxoffsetbits") == "64" else _UINT32
+        self._idx = SortedIndex(idx_path, self.offset_struct.size + 4, self.cache_dir)
+        syn_path = self._sibling(".syn")
+        self._syn = SortedIndex(syn_path, 4, self.cache_dir) if syn_path else None
+        self._dict = DictData(dict_path)
+        return self
+
+    def close(self):
+        for part in (self._idx, self._syn, self._dict):
+            if part is not None:
+                part.close()
+        self._idx = self._syn = self._dict = None
+
+    def headword(self, index):
+        return self._idx.word(index).decode("utf-8", errors="replace")
+
+    def headwords(self):
+        """Every headword and synonym, in file order."""
+        self.open()
+        for index in (self._idx, self._syn):
+            if index is not None:
+                for word in index.words():
+                    yield word.decode("utf-8", errors="replace")
+
+    def _matches(self, word):
+        """Indices of headwords equal to word ignoring case, and of entries with it as a synonym."""
+        # Folding only covers ASCII, so also try Unicode case variants
+        variants = {word, word.lower(), word.capitalize()}
+        wanted = word.casefold()
+        headwords, synonyms = set(), set()
+        for variant in variants:
+            encoded = variant.encode("utf-8")
+            for i in self._idx.matching(encoded):
+                if self.headword(i).casefold() == wanted:
+                    headwords.add(i)
+            if self._syn is not None:
+                for i in self._syn.matching(encoded):
+                    if self._syn.word(i).decode("utf-8", errors="replace").casefold() == wanted:
+                        synonyms.add(_UINT32.unpack(self._syn.tail_of(i))[0])
+        return headwords, synonyms - headwords
+
+    def lookup(self, word):
+        """
+        Entries for word. Like sdcv, other cases are only tried when there is
+        no exact headword, and synonyms only when no headword matches at all.
+        """
+        self.open()
+        headwords, synonyms = self._matches(word)
+        exact = [i for i in headwords if self.headword(i) == word]
+        return [self.entry(i) for i in sorted(exact or headwords or synonyms)]
+
+    def entry(self, index):
+        tail = self._idx.tail_of(index)
+        offset = self.offset_struct.unpack_from(tail)[0]
+        (size,) = _UINT32.unpack_from(tail, self.offset_struct.size)
+        data = self._dict.read(offset, size)
+        return Entry(
+            self.bookname,
+            self.headword(index),
+            self.parse_sections(data),
+        )
+
+    def parse_sections(self, data):
+        """Split a definition into (type, payload) pairs, per sametypesequence."""
+        sections = []
+        pos = 0
+        types = iter(self.sametypesequence)
+        count = len(self.sametypesequence)
+        while pos < len(data):
+            if count:
+                kind = next(types, None)
+                if kind is None:
+                    break
+                last = len(sections) == count - 1
+            else:
+                kind, pos, last = chr(data[pos]), pos + 1, False
+            if kind.islower():
+                end = len(data) if last else data.find(b"\0", pos)
+                end = len(data) if end < 0 else end
+                sections.append((kind, data[pos:end].decode("utf-8", errors="replace")))
+                pos = end + 1
+            else:
+                if last:
+                    size = len(data) - pos
+                else:
+                    (size,) = _UINT32.unpack_from(data, pos)
+                    pos += 4
+                sections.append((kind, data[pos : pos + size]))
+                pos += size
+        return sections
+
+
+def find_dictionaries(dirs=None):
+    """All .ifo files under the given (default: sdcv's) directories."""
+    found = []
+    for directory in dirs or DEFAULT_DIRS:
+        if Path(directory).is_dir():
+            found.extend(sorted(Path(directory).rglob("*.ifo")))
+    return found
+
+
+class StarDictLibrary:
+    """
+    All dictionaries in the search directories, by bookname. Only .ifo
+    headers are read up front; a dictionary's files are mapped the first
+    time it is searched.
+    """
+
+    def __init__(self, dirs=None, cache_dir=CACHE_DIR):
+        self.dictionaries = {}
+        for ifo_path in find_dictionaries(dirs):
+            try:
+                dictionary = StarDict(ifo_path, cache_dir)
+            except (OSError, ValueError):
+                continue
+            self.dictionaries.setdefault(dictionary.bookname, dictionary)
+
+    def __contains__(self, bookname):
+        return bookname in self.dictionaries
+
+    def lookup(self, word, booknames=None):
+        entries = []
+        for bookname, dictionary in self.dictionaries.items():
+            if booknames is not None and bookname not in booknames:
+                continue
+            try:
+                entries.extend(dictionary.lookup(word))
+            except OSError:
+                continue
+        return entries
+
+    def close(self):
+        for dictionary in self.dictionaries.values():
+            dictionary.close()
@@ -0,0 +1,189 @@
+# Description: Topic registry and client for the status bus daemon (status_busd.py).
+
+import json
+import logging
+import os
+import socket
+
+# Every topic the bus accepts. "file" is the legacy status file the daemon
+# keeps in sync (and ingests writes from), so scripts that still read or
+# write those files keep working. The daemon watches their directories, so
+# they live in /tmp/mqtt or /tmp/waybar, never directly in /tmp. Topics
+# marked "derived" are computed by the daemon itself and can't be published
+# by clients.
+TOPICS = {
+    "in_office": {
+        "type": str,
+        "choices": ("on", "off", "unavailable", "unknown"),
+        "file": "/tmp/mqtt/in_office_status",
+    },
+    "linux_mini": {
+        "type": str,
+        "choices": ("active", "inactive"),
+        "file": "/tmp/mqtt/linux_mini_status",
+    },
+    "idle_detection": {
+        "type": str,
+        "choices": ("active", "inactive", "in_progress"),
+        "file": "/tmp/mqtt/idle_detection_status",
+    },
+    "webcam": {
+        "type": str,
+        "choices": ("active", "inactive"),
+        "file": "/tmp/mqtt/linux_webcam_status",
+    },
+    "manual_override": {
+        "type": str,
+        "choices": ("active", "inactive"),
+        "file": "/tmp/mqtt/manual_override_status",
+    },
+    "vpn": {"type": dict, "file": "/tmp/waybar/vpn_status_output.json"},
+    "kanata_layer": {"type": dict, "file": "/tmp/waybar/kanata_status.json"},
+    "tibber_price": {"type": dict, "file": "/tmp/waybar/tibber_price_text_output.json"},
+    "tibber_icon": {"type": dict, "file": "/tmp/waybar/tibber_price_icon_output.json"},
+    "idle_status": {"type": dict, "file": "/tmp/waybar/idle_status.json"},
+    "speedtest": {"type": dict, "file": "/tmp/waybar/speedtest_output.json"},
+    "special_workspaces_left": {
+        "type": dict,
+        "file": "/tmp/waybar/special_workspaces_left.json",
+    },
+    "special_workspaces_right": {
+        "type": dict,
+        "file": "/tmp/waybar/special_workspaces_right.json",
+    },
+    "in_office_idle": {
+        "type": dict,
+        "file": "/tmp/waybar/in_office_idle_output.json",
+        "derived": True,
+    },
+}
+
+CONNECT_TIMEOUT = 1.0
+
+
+def socket_path():
+    """Path of the daemon's Unix socket."""
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR") or f"/run/user/{os.getuid()}"
+    return os.path.join(runtime_dir, "status_bus.sock")
+
+
+def validate(topic, value):
+    """Return value if it is valid for topic, otherwise raise ValueError."""
+    spec = TOPICS.get(topic)
+    if spec is None:
+        raise ValueError(f"Unknown topic: {topic}")
+    if not isinstance(value, spec["type"]):
+        raise ValueError(
+            f"{topic} expects {spec['type'].__name__}, got {type(value).__name__}"
+        )
+    if "choices" in spec and value not in spec["choices"]:
+        raise ValueError(f"{topic} must be one of {spec['choices']}, got {value!r}")
+    return value
+
+
+def encode_file(topic, value):
+    """Render a value the way the legacy status file stores it."""
+    if TOPICS[topic]["type"] is dict:
+        return json.dumps(value)
+    return value
+
+
+def decode_file(topic, text):
+    """Parse legacy status file contents; raises ValueError if they're not valid."""
+    if TOPICS[topic]["type"] is dict:
+        try:
+            return validate(topic, json.loads(text))
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON in {TOPICS[topic]['file']}: {e}") from e
+    return validate(topic, text.strip())
+
+
+def read_file(topic):
+    """Read a topic's value from its status file, or None if missing or invalid."""
+    try:
+        with open(TOPICS[topic]["file"]) as f:
+            return decode_file(topic, f.read())
+    except (OSError, ValueError):
+        return None
+
+
+def write_file(topic, value):
+    """Atomically write a topic's status file."""
+    path = TOPICS[topic]["file"]
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(encode_file(topic, value))
+    os.replace(tmp_path, path)
+
+
+def connect(timeout=CONNECT_TIMEOUT):
+    """Open a connection to the daemon; raises OSError if it isn't running."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(socket_path())
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def request(message, timeout=CONNECT_TIMEOUT):
+    """Send one request to the daemon and return its decoded reply."""
+    with connect(timeout) as sock:
+        sock.sendall(json.dumps(message).encode() + b"\n")
+        with sock.makefile("r") as reader:
+            line = reader.readline()
+    if not line:
+        raise ConnectionError("Status bus closed the connection")
+    return json.loads(line)
+
+
+def publish(topic, value):
+    """
+    Publish a value on the bus.
+
+    Falls back to writing the status file directly when the daemon is not
+    running; it picks the file up once it starts. Returns True if the daemon
+    took the value.
+    """
+    validate(topic, value)
+    try:
+        reply = request({"op": "pub", "topic": topic, "value": value})
+    except (OSError, ValueError) as e:
+        logging.debug(f"Status bus unavailable ({e}), writing {topic} file directly")
+        write_file(topic, value)
+        return False
+    if not reply.get("ok"):
+        raise ValueError(reply.get("error", f"Status bus rejected {topic}"))
+    return True
+
+
+def get(topic):
+    """Current value of a topic, from the daemon or its status file."""
+    try:
+        reply = request({"op": "get", "topic": topic})
+    except (OSError, ValueError):
+        return read_file(topic)
+    return reply.get("value")
+
+
+def subscribe(topics):
+    """
+    Yield (topic, value) for the current value of each topic and every change
+    after that. Raises OSError if the daemon isn't running or goes away.
+    """
+    sock = connect()
+    sock.settimeout(None)
+    try:
+        sock.sendall(json.dumps({"op": "sub", "topics": list(topics)}).encode() + b"\n")
+        with sock.makefile("r") as reader:
+            for line in reader:
+                message = json.loads(line)
+                if "error" in message:
+                    raise ValueError(message["error"])
+                yield message["topic"], message["value"]
+    finally:
+        sock.close()
+    raise ConnectionError("Status bus closed the connection")
@@ -0,0 +1,102 @@
+# Description: Minimal timerfd wrapper (ctypes, no third-party dependencies).
+
+import ctypes
+import ctypes.util
+import errno
+import math
+import os
+import struct
+
+CLOCK_REALTIME = 0
+CLOCK_MONOTONIC = 1
+CLOCK_BOOTTIME = 7
+
+TFD_TIMER_ABSTIME = 1 << 0
+TFD_TIMER_CANCEL_ON_SET = 1 << 1
+
+TFD_NONBLOCK = os.O_NONBLOCK
+TFD_CLOEXEC = os.O_CLOEXEC
+
+
+class _Timespec(ctypes.Structure):
+    _fields_ = [("tv_sec", ctypes.c_long), ("tv_nsec", ctypes.c_long)]
+
+
+class _Itimerspec(ctypes.Structure):
+    _fields_ = [("it_interval", _Timespec), ("it_value", _Timespec)]
+
+
+_EXPIRATIONS = struct.Struct("Q")
+
+_libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+_libc.timerfd_create.argtypes = [ctypes.c_int, ctypes.c_int]
+_libc.timerfd_settime.argtypes = [
+    ctypes.c_int,
+    ctypes.c_int,
+    ctypes.POINTER(_Itimerspec),
+    ctypes.POINTER(_Itimerspec),
+]
+
+
+def _check(result):
+    if result < 0:
+        err = ctypes.get_errno()
+        raise OSError(err, os.strerror(err))
+    return result
+
+
+class WallClockTimer:
+    """
+    A one-shot timer that fires at an absolute wall clock (CLOCK_REALTIME) time.
+
+    Unlike a select() timeout, which counts CLOCK_MONOTONIC and stops while
+    the machine is suspended, the deadline is a time of day: after a resume
+    the timer fires as soon as the kernel notices the deadline has passed.
+    The timer is armed with TFD_TIMER_CANCEL_ON_SET, so a clock step
+    (settimeofday, NTP stepping, and on current kernels resume) wakes the
+    reader too, and read() reports it as a jump.
+    """
+
+    def __init__(self, nonblocking=True):
+        flags = TFD_CLOEXEC | (TFD_NONBLOCK if nonblocking else 0)
+        self.fd = _check(_libc.timerfd_create(CLOCK_REALTIME, flags))
+
+    def fileno(self):
+        return self.fd
+
+    def set_deadline(self, timestamp):
+        """Fire at the given Unix time; None disarms the timer."""
+        spec = _Itimerspec()
+        if timestamp is not None:
+            # A zero it_value disarms; any past deadline fires immediately anyway
+            fraction, seconds = math.modf(max(timestamp, 1.0))
+            spec.it_value.tv_sec = int(seconds)
+            spec.it_value.tv_nsec = int(fraction * 1e9)
+        flags = TFD_TIMER_ABSTIME | TFD_TIMER_CANCEL_ON_SET
+        _check(_libc.timerfd_settime(self.fd, flags, ctypes.byref(spec), None))
+
+    def read(self):
+        """
+        Consume a wakeup: the number of expirations, 0 if nothing is pending
+        on a non-blocking timer, or None if the clock was stepped.
+        """
+        try:
+            data = os.read(self.fd, _EXPIRATIONS.size)
+        except BlockingIOError:
+            return 0
+        except OSError as e:
+            if e.errno == errno.ECANCELED:
+                return None
+            raise
+        return _EXPIRATIONS.unpack(data)[0]
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+"""
+Local fake of the Google Calendar API for testing gcal_sync.py and the
+school calendar --sync
+
+Implements just what those use: the OAuth token endpoint, calendarList.list,
+events.list with paging, timeMin/timeMax and syncToken semantics, and
+events.import/patch/delete. Every change gets a sequence number; a sync token is the
+sequence number it was issued at, and an incremental listing returns the
+events (including cancelled ones) changed after it. Tokens issued before
+expire_tokens() get HTTP 410 Gone, as the real API does eventually.
+
+Serve it and point the notifier at it:
+    fake_calendar_api.py --port 8765
+    GCAL_API_BASE=http://127.0.0.1:8765/calendar/v3 gcal_notify.py --refresh -v
+(with a credentials.json whose token_uri is http://127.0.0.1:8765/token)
+
+Or run the built-in scenarios against a throwaway config directory: the
+notifier's sync (full sync, deltas, expired token, export to
+events_cache.json) and the school calendar sync (create, no-op rerun,
+holiday table change):
+    fake_calendar_api.py --check
+"""
+
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import sys
+import tempfile
+import threading
+import urllib.parse
+from collections import Counter
+from datetime import date, datetime, time, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Add parent directory to path to import gcal_notify
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+CLIENT_ID = "fake-client"
+ACCESS_TOKEN_PREFIX = "fake-access-"
+
+
+class FakeCalendarData:
+    """Calendars and events with a change log, shared with the request handler"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calendars = {}  # id -> summary
+        self.events = {}  # (calendar id, event id) -> (seq, resource)
+        self.seq = 0
+        self.min_valid_token = 0
+        self.token_counter = itertools.count(1)
+        self.requests = []  # (method, path) of every request
+
+    def add_calendar(self, calendar_id, summary):
+        self.calendars[calendar_id] = summary
+
+    def put_event(self, calendar_id, event_id, summary, start, **fields):
+        with self.lock:
+            self.seq += 1
+            resource = {
+                "id": event_id,
+                "status": "confirmed",
+                "summary": summary,
+                "start": {"dateTime": start.astimezone().isoformat()},
+                "htmlLink": f"https://calendar.example/event?eid={event_id}",
+                **fields,
+            }
+            self.events[(calendar_id, event_id)] = (self.seq, resource)
+
+    def cancel_event(self, calendar_id, event_id):
+        """Cancel (delete) an event; False if there is no such live event"""
+        with self.lock:
+            found = self.events.get((calendar_id, event_id))
+            if found is not None and found[1]["status"] == "cancelled":
+                return False
+            self._write(calendar_id, {"id": event_id, "status": "cancelled"})
+            return found is not None
+
+    def _write(self, calendar_id, resource):
+        """Store a changed resource (lock held)"""
+        self.seq += 1
+        self.events[(calendar_id, resource["id"])] = (self.seq, resource)
+
+    def import_event(self, calendar_id, body):
+        """events.import: create, or update the event with the same iCalUID"""
+        with self.lock:
+            for (cal, _), (_, resource) in self.events.items():
+                if cal == calendar_id and resource.get("iCalUID") == body["iCalUID"]:
+                    resource = {**resource, **body, "status": "confirmed"}
+                    break
+            else:
+                event_id = f"imported{next(self.token_counter)}"
+                resource = {"id": event_id, "status": "confirmed", **body}
+            self._write(calendar_id, resource)
+            return resource
+
+    def patch_event(self, calendar_id, event_id, body):
+        with self.lock:
+            found = self.events.get((calendar_id, event_id))
+            if found is None or found[1]["status"] == "cancelled":
+                return None
+            resource = {**found[1], **body}
+            self._write(calendar_id, resource)
+            return resource
+
+    def expire_tokens(self):
+        with self.lock:
+            self.min_valid_token = self.seq + 1
+
+    def list_events(self, calendar_id, params):
+        """(status, body) of an events.list request"""
+        with self.lock:
+            if "syncToken" in params:
+                since = int(params["syncToken"])
+                if since < self.min_valid_token:
+                    return 410, {"error": {"code": 410, "message": "Sync token is no longer valid"}}
+                selected = [
+                    resource
+                    for (cal, _), (seq, resource) in sorted(self.events.items())
+                    if cal == calendar_id and seq > since
+                ]
+            else:
+                # Like the API: timeMin bounds the event's end, timeMax its start
+                time_min = params.get("timeMin")
+                time_max = params.get("timeMax")
+                selected = [
+                    resource
+                    for (cal, _), (_, resource) in sorted(self.events.items())
+                    if cal == calendar_id
+                    and resource["status"] != "cancelled"
+                    and (time_min is None or event_time(resource, "end") > parse_time(time_min))
+                    and (time_max is None or event_time(resource, "start") < parse_time(time_max))
+                ]
+            offset = int(params.get("pageToken", 0))
+            size = int(params.get("maxResults", 250))
+            body = {"items": selected[offset:offset + size]}
+            if offset + size < len(selected):
+                body["nextPageToken"] = str(offset + size)
+            else:
+                body["nextSyncToken"] = str(self.seq)
+            return 200, body
+
+
+def parse_time(text):
+    return datetime.fromisoformat(text.replace("Z", "+00:00"))
+
+
+def event_time(resource, key):
+    """Aware start or end of an event; all-day dates are local midnight"""
+    value = resource.get(key) or resource["start"]
+    if "dateTime" in value:
+        return parse_time(value["dateTime"])
+    return datetime.combine(date.fromisoformat(value["date"]), time()).astimezone()
+
+
+class Handler(BaseHTTPRequestHandler):
+    data = None  # FakeCalendarData, set by serve()
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def read_body(self):
+        return self.rfile.read(int(self.headers.get("Content-Length", 0))).decode()
+
+    def authorized(self):
+        if self.headers.get("Authorization", "").startswith(f"Bearer {ACCESS_TOKEN_PREFIX}"):
+            return True
+        self.send_json(401, {"error": {"code": 401, "message": "Invalid Credentials"}})
+        return False
+
+    def event_route(self):
+        """(calendar id, event id or "import" or None) of an events URL, or None"""
+        url = urllib.parse.urlsplit(self.path)
+        self.data.requests.append((self.command, urllib.parse.unquote(url.path)))
+        parts = [urllib.parse.unquote(p) for p in url.path.split("/") if p]
+        if parts[:3] != ["calendar", "v3", "calendars"] or len(parts) not in (5, 6):
+            return None
+        if parts[4] != "events" or parts[3] not in self.data.calendars:
+            return None
+        return parts[3], parts[5] if len(parts) == 6 else None
+
+    def do_POST(self):
+        if self.path != "/token":
+            route = self.event_route()
+            if not self.authorized():
+                return
+            if route is None or route[1] != "import":
+                self.send_json(404, {"error": {"code": 404}})
+                return
+            self.send_json(200, self.data.import_event(route[0], json.loads(self.read_body())))
+            return
+
+        self.data.requests.append(("POST", self.path))
+        form = urllib.parse.parse_qs(self.read_body())
+        if form.get("client_id") != [CLIENT_ID]:
+            self.send_json(400, {"error": "invalid_client"})
+            return
+        token = f"{ACCESS_TOKEN_PREFIX}{next(self.data.token_counter)}"
+        self.send_json(200, {"access_token": token, "expires_in": 3600})
+
+    def do_PATCH(self):
+        route = self.event_route()
+        if not self.authorized():
+            return
+        resource = None
+        if route is not None and route[1] not in (None, "import"):
+            resource = self.data.patch_event(*route, json.loads(self.read_body()))
+        if resource is None:
+            self.send_json(404, {"error": {"code": 404}})
+        else:
+            self.send_json(200, resource)
+
+    def do_DELETE(self):
+        route = self.event_route()
+        if not self.authorized():
+            return
+        if route is None or not self.data.cancel_event(*route):
+            self.send_json(404, {"error": {"code": 404}})
+            return
+        self.send_response(204)
+        self.end_headers()
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        self.data.requests.append(("GET", urllib.parse.unquote(url.path)))
+        params = dict(urllib.parse.parse_qsl(url.query))
+        if not self.authorized():
+            return
+
+        parts = [urllib.parse.unquote(p) for p in url.path.split("/") if p]
+        if parts[:2] != ["calendar", "v3"]:
+            self.send_json(404, {"error": {"code": 404}})
+        elif parts[2:] == ["users", "me", "calendarList"]:
+            items = [
+                {"id": calendar_id, "summary": summary}
+                for calendar_id, summary in self.data.calendars.items()
+            ]
+            self.send_json(200, {"items": items})
+        elif len(parts) == 5 and parts[2] == "calendars" and parts[4] == "events":
+            if parts[3] not in self.data.calendars:
+                self.send_json(404, {"error": {"code": 404}})
+            else:
+                self.send_json(*self.data.list_events(parts[3], params))
+        else:
+            self.send_json(404, {"error": {"code": 404}})
+
+
+def serve(data, port=0):
+    """Start the server on a thread; returns (server, base URL)"""
+    Handler.data = data
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def sample_data(calendar_names):
+    data = FakeCalendarData()
+    now = datetime.now().replace(second=0, microsecond=0)
+    for index, name in enumerate(calendar_names + ["Not monitored"]):
+        data.add_calendar(f"cal{index}@example.com", name)
+    data.put_event("cal0@example.com", "standup", "Standup", now + timedelta(hours=1),
+                   hangoutLink="https://meet.google.com/abc-defg-hij")
+    data.put_event("cal0@example.com", "lunch", "Lunch", now + timedelta(hours=3),
+                   location="Stora torget 1, Uppsala")
+    data.put_event("cal0@example.com", "old", "Yesterday's retro", now - timedelta(days=2))
+    data.put_event("cal1@example.com", "dentist", "Dentist", now + timedelta(hours=5))
+    data.put_event("cal2@example.com", "other", "Not monitored", now + timedelta(hours=2))
+    return data
+
+
+def check():
+    """Run the sync scenarios against a fresh fake server; returns an exit code"""
+    import gcal_notify
+    import gcal_sync
+
+    names = list(gcal_notify.CALENDARS_TO_MONITOR)
+    data = sample_data(names)
+    server, base = serve(data)
+    gcal_sync.API_BASE = f"{base}/calendar/v3"
+    failures = []
+
+    def expect(label, actual, expected):
+        status = "ok" if actual == expected else "FAIL"
+        if actual != expected:
+            failures.append(label)
+        print(f"{status:4} {label}: {actual!r}" + ("" if actual == expected else f" != {expected!r}"))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config_dir = Path(tmp)
+        (config_dir / "credentials.json").write_text(json.dumps({
+            "type": "authorized_user",
+            "client_id": CLIENT_ID,
+            "client_secret": "secret",
+            "refresh_token": "refresh",
+            "token_uri": f"{base}/token",
+        }))
+        notifier = gcal_notify.CalendarNotifier(config_dir)
+
+        def refresh():
+            data.requests.clear()
+            notifier.fetch_and_cache_events()
+            cached = json.loads(notifier.cache_file.read_text())["events"]
+            return [event["title"] for event in cached], list(data.requests)
+
+        titles, requests = refresh()
+        expect("full sync: cached events", titles, ["Standup", "Lunch", "Dentist"])
+        expect("full sync: requests", len(requests), 4)  # token, calendarList, 2 x events
+        cached = json.loads(notifier.cache_file.read_text())["events"]
+        expect("export: conference_url", cached[0]["conference_url"],
+               "https://meet.google.com/abc-defg-hij")
+
+        titles, requests = refresh()
+        expect("no changes: cached events", titles, ["Standup", "Lunch", "Dentist"])
+        expect("no changes: requests", requests, [
+            ("GET", "/calendar/v3/calendars/cal0@example.com/events"),
+            ("GET", "/calendar/v3/calendars/cal1@example.com/events"),
+        ])
+
+        now = datetime.now().replace(second=0, microsecond=0)
+        data.put_event("cal1@example.com", "gym", "Gym", now + timedelta(hours=2))
+        data.put_event("cal0@example.com", "lunch", "Lunch with Anna", now + timedelta(hours=4),
+                       location="Stora torget 1, Uppsala")
+        data.cancel_event("cal0@example.com", "standup")
+        data.cancel_event("cal0@example.com", "never-synced")
+        titles, requests = refresh()
+        expect("deltas: cached events", titles, ["Gym", "Lunch with Anna", "Dentist"])
+        expect("deltas: requests", len(requests), 2)
+
+        cached = json.loads(notifier.cache_file.read_text())["events"]
+        expect("export: maps_url", cached[1]["maps_url"],
+               "https://maps.google.com/maps?q=Stora%20torget%201%2C%20Uppsala")
+
+        data.expire_tokens()
+        data.put_event("cal1@example.com", "dentist", "Dentist (moved)", now + timedelta(hours=6))
+        titles, requests = refresh()
+        expect("expired token: cached events", titles, ["Gym", "Lunch with Anna", "Dentist (moved)"])
+        expect("expired token: requests", len(requests), 4)  # 410 + full list per calendar
+
+        store = gcal_sync.EventStore(notifier.sync_db_file)
+        stored = store.db.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+        store.close()
+        expect("store: old events pruned", stored, 3)
+
+        check_school_sync(data, gcal_sync.CalendarApi(config_dir / "credentials.json"), expect)
+
+    server.shutdown()
+    print("All checks passed" if not failures else f"{len(failures)} checks failed")
+    return 1 if failures else 0
+
+
+def check_school_sync(data, api, expect):
+    """School calendar: .ics export, first sync, no-op rerun, holiday table change"""
+    from school_calendar import UID_DOMAIN, SchoolCalendar
+    from uppsala_skola_calendar_generator import CALENDAR as school
+
+    calendar_id = "school@example.com"
+    data.add_calendar(calendar_id, school.calendar_name)
+    data.put_event(calendar_id, "manual", "Föräldramöte", datetime(2026, 9, 8, 18))
+    start, end = school.default_start, school.default_end
+    blocks = school.generate_blocks(start, end)
+
+    ics = school.render_ics(blocks)
+    lines = ics.split("\r\n")
+    expect("school ics: events", ics.count("BEGIN:VEVENT"), len(blocks))
+    expect("school ics: lines over 75 octets", [ln for ln in lines if len(ln.encode()) > 75], [])
+
+    def sync(calendar):
+        data.requests.clear()
+        with contextlib.redirect_stdout(io.StringIO()):
+            status = calendar.sync(api, start, end, dry_run=False)
+        writes = Counter(
+            method for method, path in data.requests if method != "GET" and path != "/token"
+        )
+        tagged = sorted(
+            (resource["summary"], resource["start"]["date"], resource["end"]["date"])
+            for (cal, _), (_, resource) in data.events.items()
+            if cal == calendar_id
+            and resource["status"] != "cancelled"
+            and resource.get("iCalUID", "").endswith(UID_DOMAIN)
+        )
+        return status, dict(writes), tagged
+
+    def expected(blocks):
+        return sorted((block.title, block.start, block.end_exclusive) for block in blocks)
+
+    status, writes, tagged = sync(school)
+    expect("school sync: creates", (status, writes), (0, {"POST": len(blocks)}))
+    expect("school sync: calendar matches blocks", tagged == expected(blocks), True)
+
+    status, writes, tagged = sync(school)
+    expect("school rerun: writes", (status, writes), (0, {}))
+
+    # A week longer autumn break and a new Friday off
+    holidays = dict(school.holidays)
+    holidays["2026-10-26"] = {"end": "2026-11-06", "title": "Uppsala - Höstlov"}
+    holidays["2026-09-18"] = {"end": "2026-09-18", "title": "Uppsala - Lovdag"}
+    changed = SchoolCalendar(school.name, school.calendar_name, holidays, start, end)
+    status, writes, tagged = sync(changed)
+    expect("school change: writes", (status, writes), (0, {"POST": 2, "PATCH": 1, "DELETE": 1}))
+    expect("school change: calendar matches blocks",
+           tagged == expected(changed.generate_blocks(start, end)), True)
+    expect("school change: untagged event kept",
+           data.events[(calendar_id, "manual")][1]["status"], "confirmed")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Google Calendar API for gcal_sync.py")
+    parser.add_argument("--port", type=int, default=8765, help="Port to serve on (default: 8765)")
+    parser.add_argument("--check", action="store_true", help="Run the sync scenarios and exit")
+    args = parser.parse_args()
+
+    if args.check:
+        return check()
+
+    from gcal_notify import CALENDARS_TO_MONITOR
+
+    server, base = serve(sample_data(list(CALENDARS_TO_MONITOR)), args.port)
+    print(f"Serving fake Calendar API at {base}/calendar/v3 (token_uri {base}/token)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,19 +2,39 @@
 """
 Google Calendar Persistent Notifications using gcalcli and dunstify
 Based on implementations from the gcalcli community
+
+--daemon keeps one process running: it loads the event cache into a heap of
+(fire time, event, interval) reminders and sleeps on a wall clock timer until
+the next one is due, so reminders go out on the second rather than at the
+next per-minute cron run. The cache is reloaded whenever --refresh rewrites
+it (inotify), and a clock step or resume from suspend wakes it to send what
+is due and drop reminders missed by more than MISSED_REMINDER_GRACE_SECONDS.
 """
 
 import argparse
+import heapq
+import itertools
 import json
 import logging
 import os
 import re
+import selectors
+import signal
 import subprocess
+import sys
+import threading
+import time
 from datetime import datetime, timedelta
 from hashlib import md5
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
+# Add the custom script path to PYTHONPATH
+sys.path.append("/home/rash/.config/scripts")
+from _utils.inotify import Inotify  # noqa: E402
+from _utils.timerfd import WallClockTimer  # noqa: E402
+from gcal_sync import ApiError, CalendarApi, CalendarSync, EventStore  # noqa: E402
+
 # ============================================================================
 # CONFIGURATION - Edit these settings to customize behavior
 # ============================================================================
@@ -58,8 +78,23 @@ SNOOZE_MINUTES = 1  # How many minutes to snooze notifications
 CONFIG_DIR = Path.home() / ".config" / "gcal-notifications"
 CACHE_FILE = CONFIG_DIR / "events_cache.json"
 
+CREDENTIALS_FILE = CONFIG_DIR / "credentials.json"  # OAuth authorized_user JSON
+SYNC_DB_FILE = CONFIG_DIR / "events.sqlite"
+
 # Cache Configuration
 CACHE_DURATION_HOURS = 1  # How long cache is considered fresh
+CACHE_WINDOW_HOURS = 24  # How far ahead the cache holds events
+
+# Refresh Backend
+# "api": incremental Calendar API sync (gcal_sync.py), needs CREDENTIALS_FILE
+# "gcalcli": full gcalcli agenda export on every refresh
+# "auto": "api" when CREDENTIALS_FILE exists, otherwise "gcalcli"
+SYNC_BACKEND = "auto"
+
+# Daemon Configuration
+# Reminders found overdue by more than this (after a suspend, or added to the
+# calendar too late) are dropped instead of being sent late
+MISSED_REMINDER_GRACE_SECONDS = 120
 
 # ============================================================================
 # END CONFIGURATION
@@ -77,6 +112,81 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+class ReminderSchedule:
+    """
+    Min-heap of pending reminders ordered by fire time.
+
+    Entries are (fire_time, seq, event_key, event, minutes) with fire_time a
+    Unix timestamp, so local time and DST are resolved once when the cache is
+    loaded. Reminders that have been handed out are remembered, so reloading
+    a refreshed cache never sends one twice.
+    """
+
+    def __init__(self, reminder_intervals: List[int], clock=time.time):
+        self.reminder_intervals = reminder_intervals
+        self.clock = clock
+        self._heap = []
+        self._counter = itertools.count()
+        self.sent = {}  # (event_key, minutes) -> event start timestamp
+
+    @staticmethod
+    def event_key(event: Dict) -> Tuple[str, str]:
+        return event["title"], event["start_time"]
+
+    def load(self, events: List[Dict]) -> int:
+        """Rebuild the heap from cached events; returns the number of pending reminders"""
+        now = self.clock()
+        self._heap = []
+        for event in events:
+            try:
+                start = datetime.fromisoformat(event["start_time"]).timestamp()
+                key = self.event_key(event)
+            except (KeyError, TypeError, ValueError) as e:
+                logger.error(f"Skipping cached event without a valid start time: {e}")
+                continue
+            for minutes in self.reminder_intervals:
+                fire_time = start - minutes * 60
+                if (key, minutes) in self.sent:
+                    continue
+                if fire_time < now - MISSED_REMINDER_GRACE_SECONDS:
+                    continue
+                self._heap.append((fire_time, next(self._counter), key, event, minutes))
+        heapq.heapify(self._heap)
+
+        # Events that ended a day ago are out of the cache window for good
+        self.sent = {
+            sent: start for sent, start in self.sent.items() if start > now - 86400
+        }
+        return len(self._heap)
+
+    def next_fire_time(self) -> Optional[float]:
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self) -> List[Tuple[Dict, int]]:
+        """
+        Remove and return the (event, minutes) reminders that are due.
+
+        If several reminders of one event are due at once (after a suspend),
+        only the latest interval is returned; reminders more than
+        MISSED_REMINDER_GRACE_SECONDS late are dropped.
+        """
+        now = self.clock()
+        due = {}
+        while self._heap and self._heap[0][0] <= now:
+            fire_time, _, key, event, minutes = heapq.heappop(self._heap)
+            self.sent[(key, minutes)] = fire_time + minutes * 60
+            late = now - fire_time
+            if late > MISSED_REMINDER_GRACE_SECONDS:
+                logger.info(
+                    f"Dropping {minutes}-minute reminder for {event['title']}: "
+                    f"{late:.0f}s late"
+                )
+                continue
+            # Popped in fire order, so a later interval replaces an earlier one
+            due[key] = (event, minutes)
+        return list(due.values())
+
+
 class CalendarNotifier:
     """Main class for handling Google Calendar notifications with dunstify"""
 
@@ -86,6 +196,8 @@ class CalendarNotifier:
         ]
         self.config_dir = config_dir or CONFIG_DIR
         self.cache_file = self.config_dir / "events_cache.json"
+        self.credentials_file = self.config_dir / CREDENTIALS_FILE.name
+        self.sync_db_file = self.config_dir / SYNC_DB_FILE.name
 
         # Create config directory
         self.config_dir.mkdir(parents=True, exist_ok=True)
@@ -254,19 +366,86 @@ class CalendarNotifier:
         """Save events to cache file"""
         try:
             cache_data = {"last_updated": datetime.now().isoformat(), "events": events}
-            with open(self.cache_file, "w") as f:
+            # Write then rename, so the daemon never reads a half-written cache
+            tmp_file = self.cache_file.with_suffix(".tmp")
+            with open(tmp_file, "w") as f:
                 json.dump(cache_data, f, indent=2)
+            os.replace(tmp_file, self.cache_file)
             logger.debug(f"Cached {len(events)} events")
         except Exception as e:
             logger.error(f"Error saving cache: {e}")
 
+    def use_api_sync(self) -> bool:
+        """Whether refreshes go through the incremental Calendar API sync"""
+        if SYNC_BACKEND == "auto":
+            return self.credentials_file.exists()
+        return SYNC_BACKEND == "api"
+
+    def sync_event_store(self) -> Tuple[EventStore, List[str]]:
+        """Bring the local event store up to date; returns it and the synced calendar ids"""
+        store = EventStore(self.sync_db_file)
+        try:
+            api = CalendarApi(self.credentials_file, store)
+            results = CalendarSync(store, api, CALENDARS_TO_MONITOR).sync()
+        except Exception:
+            store.close()
+            raise
+        changes = sum(stored + removed for stored, removed in results.values())
+        logger.debug(
+            f"Synced {len(results)} calendars: {changes} changes, "
+            f"{api.requests} requests, {api.bytes_received} bytes"
+        )
+        return store, list(results)
+
+    def event_from_row(self, row) -> Dict:
+        """Cache/notification event from a stored Calendar API event"""
+        location = row["location"]
+        return {
+            "title": row["title"] or "(No title)",
+            "start_time": datetime.fromtimestamp(row["start_ts"]).isoformat(),
+            "event_url": row["html_link"],
+            "conference_url": self.extract_conference_url(
+                row["hangout_link"], row["description"]
+            ),
+            "maps_url": self.format_location_for_maps(location) if location else None,
+        }
+
     def fetch_and_cache_events(self) -> None:
+        """Refresh the event cache with the configured backend"""
+        if self.use_api_sync():
+            self.fetch_and_cache_events_api()
+        else:
+            self.fetch_and_cache_events_gcalcli()
+
+    def fetch_and_cache_events_api(self) -> None:
+        """Apply calendar changes to the event store and export the cache window"""
+        logger.debug("Refreshing event cache with incremental Calendar API sync")
+        try:
+            store, calendar_ids = self.sync_event_store()
+        except (ApiError, OSError, KeyError, ValueError) as e:
+            # Keep the previous cache; the next refresh retries
+            logger.error(f"Calendar API sync failed: {e}")
+            return
+
+        try:
+            # Include events that just started, for a late 0-minute reminder
+            start = time.time() - MISSED_REMINDER_GRACE_SECONDS
+            rows = store.events_between(
+                start, start + CACHE_WINDOW_HOURS * 3600, calendar_ids
+            )
+        finally:
+            store.close()
+        events = [self.event_from_row(row) for row in rows]
+        self.save_events_to_cache(events)
+        logger.debug(f"Successfully cached {len(events)} events")
+
+    def fetch_and_cache_events_gcalcli(self) -> None:
         """Fetch events from gcalcli and cache them for future queries"""
         logger.debug("Refreshing event cache from Google Calendar API")
 
         # Get events for the next 24 hours to ensure we catch all needed events
         start_time = datetime.now()
-        end_time = start_time + timedelta(hours=24)
+        end_time = start_time + timedelta(hours=CACHE_WINDOW_HOURS)
 
         start_str = start_time.strftime("%Y-%m-%d")
         end_str = end_time.strftime("%Y-%m-%d")
@@ -663,6 +842,23 @@ class CalendarNotifier:
             f"(target: {target_time.strftime('%Y-%m-%d %H:%M')})"
         )
 
+        if self.use_api_sync():
+            try:
+                store, calendar_ids = self.sync_event_store()
+            except (ApiError, OSError, KeyError, ValueError) as e:
+                logger.error(f"Calendar API sync failed: {e}")
+                return
+            try:
+                rows = store.events_between(
+                    start_time.timestamp(), end_time.timestamp(), calendar_ids
+                )
+            finally:
+                store.close()
+            for row in rows:
+                logger.debug(f"Found event starting at target time: {row['title']}")
+                self.send_notification_simple(self.event_from_row(row), minutes)
+            return
+
         # Get events that START in this narrow window
         cmd = [
             "gcalcli",
@@ -816,6 +1012,76 @@ class CalendarNotifier:
         self.check_cached_notifications()
         logger.debug("Cron check completed")
 
+    def send_notification_async(self, event: Dict, remind_minutes: int):
+        """Send a notification without blocking the daemon (dunstify waits for an action)"""
+        threading.Thread(
+            target=self.send_notification_simple,
+            args=(event, remind_minutes),
+            name=f"notify-{remind_minutes}m",
+            daemon=True,
+        ).start()
+
+    def reload_schedule(self, schedule: ReminderSchedule):
+        """Rebuild the reminder heap from the event cache"""
+        events = self.load_cached_events().get("events", [])
+        pending = schedule.load(events)
+        next_fire = schedule.next_fire_time()
+        next_str = (
+            datetime.fromtimestamp(next_fire).strftime("%Y-%m-%d %H:%M:%S")
+            if next_fire is not None
+            else "none"
+        )
+        logger.info(
+            f"Loaded {len(events)} cached events, {pending} reminders pending, "
+            f"next at {next_str}"
+        )
+
+    def run_daemon(self):
+        """Stay resident and send each reminder at its exact time"""
+        calendars_str = (
+            ", ".join(CALENDARS_TO_MONITOR) if CALENDARS_TO_MONITOR else "all calendars"
+        )
+        logger.info(f"Notification daemon started for: {calendars_str}")
+
+        if not self.is_cache_fresh():
+            logger.info("Cache is stale or missing, refreshing...")
+            self.fetch_and_cache_events()
+
+        schedule = ReminderSchedule(self.reminder_intervals)
+        selector = selectors.DefaultSelector()
+        with Inotify() as inotify, WallClockTimer() as timer:
+            # Watch the directory: --refresh replaces the cache file by rename
+            inotify.add_watch(self.config_dir)
+            selector.register(inotify, selectors.EVENT_READ, "inotify")
+            selector.register(timer, selectors.EVENT_READ, "timer")
+            self.reload_schedule(schedule)
+
+            # Wall minus monotonic time only moves when the clock is stepped
+            # or the machine was suspended (monotonic time stops in suspend)
+            clock_offset = time.time() - time.monotonic()
+
+            while True:
+                timer.set_deadline(schedule.next_fire_time())
+                for key, _ in selector.select():
+                    if key.data == "inotify":
+                        if any(path == str(self.cache_file) for path, _ in inotify.read()):
+                            logger.debug("Event cache rewritten, re-arming")
+                            self.reload_schedule(schedule)
+                    else:
+                        timer.read()
+
+                offset = time.time() - time.monotonic()
+                if abs(offset - clock_offset) > 1:
+                    logger.info(
+                        f"Wall clock jumped {offset - clock_offset:+.0f}s "
+                        "(resume from suspend or clock change)"
+                    )
+                    clock_offset = offset
+
+                for event, minutes in schedule.pop_due():
+                    logger.info(f"Sending {minutes}-minute notification for: {event['title']}")
+                    self.send_notification_async(event, minutes)
+
     def run_advanced_notifications(self, minutes: int = 10):
         """Advanced mode with detailed event information"""
         calendars_str = (
@@ -835,10 +1101,14 @@ def main():
         formatter_class=argparse.RawDescriptionHelpFormatter,
         epilog="""
 Examples:
+  # Resident scheduler (systemd user service gcal-notify.service), with the
+  # cache refreshed by cron every 30 minutes:
+  python3 %(prog)s --daemon
+
   # Refresh cache (add to crontab every 30 minutes):
   */30 * * * * DISPLAY=:0 python3 %(prog)s --refresh
 
-  # Query cache for notifications (add to crontab every minute):
+  # Query cache for notifications (cron every minute, instead of --daemon):
   */1 * * * * DISPLAY=:0 python3 %(prog)s --query
 
   # Old cron job (still works but less efficient):
@@ -861,6 +1131,11 @@ Examples:
         action="store_true",
         help="Query cached events for notifications (run every minute)",
     )
+    group.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Stay resident and send reminders at their exact time",
+    )
     group.add_argument(
         "--cron",
         action="store_true",
@@ -886,6 +1161,9 @@ Examples:
     # Set logging level
     if args.verbose:
         logging.getLogger().setLevel(logging.DEBUG)
+    elif args.daemon:
+        # The daemon logs to the journal; keep its schedule visible there
+        logging.getLogger().setLevel(logging.INFO)
     else:
         # Ensure we're at WARNING level for normal operations (quiet mode)
         logging.getLogger().setLevel(logging.WARNING)
@@ -898,6 +1176,13 @@ Examples:
         notifier.fetch_and_cache_events()
     elif args.query:
         notifier.check_cached_notifications()
+    elif args.daemon:
+        # SIGTERM (systemctl stop) exits like Ctrl+C
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+        try:
+            notifier.run_daemon()
+        except KeyboardInterrupt:
+            logger.info("Notification daemon stopped")
     elif args.cron:
         notifier.run_cron_check()
     elif args.advanced:
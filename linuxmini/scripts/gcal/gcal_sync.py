@@ -0,0 +1,429 @@
+#!/usr/bin/env python3
+"""
+Incremental Google Calendar sync for gcal_notify.py
+
+The first sync of a calendar lists its events from a day ago onward and
+keeps the nextSyncToken the API returns. Every later sync sends that token
+and gets back only the events created, changed or cancelled since, which is
+usually an empty page. Changes are applied to an SQLite store keyed by
+(calendar id, event id) with an index on start time, and gcal_notify.py
+exports the upcoming events from it into events_cache.json.
+
+If the server has expired a sync token (HTTP 410 Gone), that calendar is
+cleared and fully synced again.
+
+Credentials are an OAuth "authorized_user" JSON file (client_id,
+client_secret, refresh_token and optionally token_uri) at
+~/.config/gcal-notifications/credentials.json. GCAL_API_BASE points the
+client at another server, e.g. debug/fake_calendar_api.py.
+
+Usage:
+    gcal_sync.py [--full] [--verbose]   # sync and list the stored events
+"""
+
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+API_BASE = os.environ.get("GCAL_API_BASE", "https://www.googleapis.com/calendar/v3")
+DEFAULT_TOKEN_URI = "https://oauth2.googleapis.com/token"
+REQUEST_TIMEOUT = 30  # seconds
+PAGE_SIZE = 2500  # Largest page events.list allows
+
+# How far back a full sync starts; stored events older than this are pruned
+FULL_SYNC_LOOKBACK = timedelta(days=1)
+
+# Only the fields the store keeps, to keep incremental responses small
+EVENT_FIELDS = (
+    "nextPageToken,nextSyncToken,items(id,status,summary,start,htmlLink,"
+    "hangoutLink,location,description)"
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS calendars (
+    calendar_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    sync_token TEXT
+);
+CREATE TABLE IF NOT EXISTS events (
+    calendar_id TEXT NOT NULL,
+    event_id TEXT NOT NULL,
+    start_ts REAL NOT NULL,
+    all_day INTEGER NOT NULL,
+    title TEXT,
+    html_link TEXT,
+    hangout_link TEXT,
+    location TEXT,
+    description TEXT,
+    PRIMARY KEY (calendar_id, event_id)
+);
+CREATE INDEX IF NOT EXISTS events_by_start ON events (start_ts);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+logger = logging.getLogger(__name__)
+
+
+class ApiError(Exception):
+    """A Calendar API or token endpoint request that did not succeed"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(f"HTTP {status}: {message}")
+        self.status = status
+
+
+def parse_event_start(start: Dict) -> Tuple[float, bool]:
+    """(Unix timestamp, all_day) of an event resource's start"""
+    if "dateTime" in start:
+        # fromisoformat() before Python 3.11 does not accept a trailing Z
+        value = start["dateTime"].replace("Z", "+00:00")
+        return datetime.fromisoformat(value).timestamp(), False
+    # All-day events start at local midnight
+    return datetime.fromisoformat(start["date"]).timestamp(), True
+
+
+class EventStore:
+    """SQLite store of calendars (with their sync tokens) and their events"""
+
+    def __init__(self, path: Path):
+        self.db = sqlite3.connect(str(path))
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def get_meta(self, key: str) -> Optional[str]:
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else None
+
+    def set_meta(self, key: str, value: str):
+        with self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value)
+            )
+
+    def calendar_ids(self) -> Dict[str, str]:
+        """{name: calendar_id} of the calendars seen so far"""
+        rows = self.db.execute("SELECT calendar_id, name FROM calendars")
+        return {row["name"]: row["calendar_id"] for row in rows}
+
+    def add_calendar(self, calendar_id: str, name: str):
+        with self.db:
+            self.db.execute(
+                "INSERT INTO calendars (calendar_id, name) VALUES (?, ?) "
+                "ON CONFLICT (calendar_id) DO UPDATE SET name = excluded.name",
+                (calendar_id, name),
+            )
+
+    def sync_token(self, calendar_id: str) -> Optional[str]:
+        row = self.db.execute(
+            "SELECT sync_token FROM calendars WHERE calendar_id = ?", (calendar_id,)
+        ).fetchone()
+        return row["sync_token"] if row else None
+
+    def apply(
+        self, calendar_id: str, items: List[Dict], sync_token: str, full: bool
+    ) -> Tuple[int, int]:
+        """
+        Apply a page set of event resources and store the new sync token,
+        atomically. A full sync replaces all events of the calendar.
+        Returns (events stored, events removed).
+        """
+        stored = removed = 0
+        with self.db:
+            if full:
+                removed += self.db.execute(
+                    "DELETE FROM events WHERE calendar_id = ?", (calendar_id,)
+                ).rowcount
+            for item in items:
+                if item.get("status") == "cancelled" or "start" not in item:
+                    removed += self.db.execute(
+                        "DELETE FROM events WHERE calendar_id = ? AND event_id = ?",
+                        (calendar_id, item["id"]),
+                    ).rowcount
+                    continue
+                start_ts, all_day = parse_event_start(item["start"])
+                self.db.execute(
+                    "INSERT OR REPLACE INTO events (calendar_id, event_id, start_ts, "
+                    "all_day, title, html_link, hangout_link, location, description) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        calendar_id,
+                        item["id"],
+                        start_ts,
+                        all_day,
+                        item.get("summary"),
+                        item.get("htmlLink"),
+                        item.get("hangoutLink"),
+                        item.get("location"),
+                        item.get("description"),
+                    ),
+                )
+                stored += 1
+            self.db.execute(
+                "UPDATE calendars SET sync_token = ? WHERE calendar_id = ?",
+                (sync_token, calendar_id),
+            )
+        return stored, removed
+
+    def events_between(
+        self, start_ts: float, end_ts: float, calendar_ids: Optional[List[str]] = None
+    ) -> List[sqlite3.Row]:
+        """Timed (not all-day) events starting in [start_ts, end_ts), by start time"""
+        query = "SELECT * FROM events WHERE start_ts >= ? AND start_ts < ? AND NOT all_day"
+        params = [start_ts, end_ts]
+        if calendar_ids is not None:
+            query += f" AND calendar_id IN ({', '.join('?' * len(calendar_ids))})"
+            params.extend(calendar_ids)
+        return self.db.execute(query + " ORDER BY start_ts", params).fetchall()
+
+    def prune(self, before_ts: float) -> int:
+        with self.db:
+            return self.db.execute(
+                "DELETE FROM events WHERE start_ts < ?", (before_ts,)
+            ).rowcount
+
+
+class CalendarApi:
+    """
+    Minimal Calendar API v3 client (urllib, OAuth refresh token flow)
+
+    Safe to share between threads; the access token is refreshed under a lock.
+    """
+
+    def __init__(
+        self,
+        credentials_file: Path,
+        store: Optional[EventStore] = None,
+        api_base: Optional[str] = None,
+    ):
+        with open(credentials_file) as f:
+            self.credentials = json.load(f)
+        self.store = store  # Keeps the access token between runs, if given
+        self.api_base = (api_base or API_BASE).rstrip("/")
+        self.requests = 0
+        self.bytes_received = 0
+        self._lock = threading.Lock()
+        self._token = store.get_meta("access_token") if store else None
+        self._expiry = float(store.get_meta("access_token_expiry") or 0) if store else 0.0
+
+    def _refresh_access_token(self, rejected: Optional[str] = None) -> str:
+        """A new access token, unless another thread already replaced rejected"""
+        with self._lock:
+            if rejected is not None and self._token != rejected:
+                return self._token
+            form = urllib.parse.urlencode(
+                {
+                    "client_id": self.credentials["client_id"],
+                    "client_secret": self.credentials["client_secret"],
+                    "refresh_token": self.credentials["refresh_token"],
+                    "grant_type": "refresh_token",
+                }
+            ).encode()
+            token_uri = self.credentials.get("token_uri", DEFAULT_TOKEN_URI)
+            data = self._fetch(urllib.request.Request(token_uri, data=form))
+            self._token = data["access_token"]
+            self._expiry = time.time() + data.get("expires_in", 3600)
+            if self.store is not None:
+                self.store.set_meta("access_token", self._token)
+                self.store.set_meta("access_token_expiry", str(self._expiry))
+            logger.debug("Refreshed access token")
+            return self._token
+
+    def _access_token(self) -> str:
+        token = self._token
+        if token and self._expiry > time.time() + 60:
+            return token
+        return self._refresh_access_token(rejected=token)
+
+    def _fetch(self, request: urllib.request.Request) -> Dict:
+        self.requests += 1
+        try:
+            with urllib.request.urlopen(request, timeout=REQUEST_TIMEOUT) as response:
+                body = response.read()
+        except urllib.error.HTTPError as e:
+            raise ApiError(e.code, e.read().decode(errors="replace")[:200]) from e
+        self.bytes_received += len(body)
+        # events.delete answers 204 No Content
+        return json.loads(body) if body else {}
+
+    def request(
+        self, method: str, path: str, params: Optional[Dict] = None, body: Optional[Dict] = None
+    ) -> Dict:
+        url = f"{self.api_base}{path}"
+        if params:
+            url += f"?{urllib.parse.urlencode(params)}"
+        data = json.dumps(body).encode() if body is not None else None
+        token = self._access_token()
+        try:
+            return self._fetch(self._authorized(method, url, data, token))
+        except ApiError as e:
+            if e.status != 401:
+                raise
+        # The access token was revoked or expired early; retry once
+        token = self._refresh_access_token(rejected=token)
+        return self._fetch(self._authorized(method, url, data, token))
+
+    def get(self, path: str, params: Dict) -> Dict:
+        return self.request("GET", path, params)
+
+    @staticmethod
+    def _authorized(
+        method: str, url: str, data: Optional[bytes], token: str
+    ) -> urllib.request.Request:
+        headers = {"Authorization": f"Bearer {token}"}
+        if data is not None:
+            headers["Content-Type"] = "application/json"
+        return urllib.request.Request(url, data=data, headers=headers, method=method)
+
+    @staticmethod
+    def events_path(calendar_id: str, event_id: Optional[str] = None) -> str:
+        path = f"/calendars/{urllib.parse.quote(calendar_id, safe='')}/events"
+        if event_id is not None:
+            path += f"/{urllib.parse.quote(event_id, safe='')}"
+        return path
+
+    def get_all(self, path: str, params: Dict) -> List[Dict]:
+        """Items of every page of a list request"""
+        params = dict(params)
+        items = []
+        while True:
+            data = self.get(path, params)
+            items.extend(data.get("items", []))
+            if "nextPageToken" not in data:
+                return items
+            params["pageToken"] = data["nextPageToken"]
+
+    def calendar_list(self) -> List[Dict]:
+        return self.get_all(
+            "/users/me/calendarList",
+            {"fields": "nextPageToken,items(id,summary,summaryOverride)"},
+        )
+
+    def find_calendar(self, name: str) -> Optional[str]:
+        """Id of the calendar shown as name, or None"""
+        for calendar in self.calendar_list():
+            if name in (calendar.get("summaryOverride"), calendar.get("summary")):
+                return calendar["id"]
+        return None
+
+    def list_events(
+        self, calendar_id: str, sync_token: Optional[str], time_min: Optional[datetime]
+    ) -> Tuple[List[Dict], str]:
+        """All pages of events.list: (event resources, nextSyncToken)"""
+        path = self.events_path(calendar_id)
+        params = {"singleEvents": "true", "maxResults": PAGE_SIZE, "fields": EVENT_FIELDS}
+        if sync_token:
+            params["syncToken"] = sync_token
+        elif time_min:
+            params["timeMin"] = time_min.astimezone().isoformat()
+        items = []
+        while True:
+            data = self.get(path, params)
+            items.extend(data.get("items", []))
+            if "nextPageToken" not in data:
+                return items, data["nextSyncToken"]
+            params["pageToken"] = data["nextPageToken"]
+
+
+class CalendarSync:
+    """Keeps an EventStore in step with the monitored calendars"""
+
+    def __init__(self, store: EventStore, api: CalendarApi, calendar_names: List[str]):
+        self.store = store
+        self.api = api
+        self.calendar_names = calendar_names  # Empty means every calendar in the list
+
+    def resolve_calendars(self) -> List[str]:
+        """Calendar ids of the monitored calendars, from the store or calendarList"""
+        known = self.store.calendar_ids()
+        if self.calendar_names and all(name in known for name in self.calendar_names):
+            return [known[name] for name in self.calendar_names]
+
+        by_name = {}
+        for calendar in self.api.calendar_list():
+            name = calendar.get("summaryOverride") or calendar.get("summary") or calendar["id"]
+            by_name[name] = calendar["id"]
+        names = self.calendar_names or list(by_name)
+        ids = []
+        for name in names:
+            if name not in by_name:
+                logger.warning(f"Calendar not found: {name}")
+                continue
+            self.store.add_calendar(by_name[name], name)
+            ids.append(by_name[name])
+        return ids
+
+    def sync(self, full: bool = False) -> Dict[str, Tuple[int, int]]:
+        """Sync every monitored calendar; returns {calendar_id: (stored, removed)}"""
+        time_min = datetime.now() - FULL_SYNC_LOOKBACK
+        results = {}
+        for calendar_id in self.resolve_calendars():
+            sync_token = None if full else self.store.sync_token(calendar_id)
+            try:
+                items, next_token = self.api.list_events(calendar_id, sync_token, time_min)
+            except ApiError as e:
+                if e.status != 410 or not sync_token:
+                    raise
+                logger.info(f"Sync token expired for {calendar_id}, doing a full sync")
+                sync_token = None
+                items, next_token = self.api.list_events(calendar_id, None, time_min)
+
+            results[calendar_id] = self.store.apply(
+                calendar_id, items, next_token, full=sync_token is None
+            )
+            logger.debug(
+                f"{'Incremental' if sync_token else 'Full'} sync of {calendar_id}: "
+                f"{results[calendar_id][0]} stored, {results[calendar_id][1]} removed"
+            )
+        # Incremental results also carry changes to past events; drop them again
+        self.store.prune(time_min.timestamp())
+        return results
+
+
+def main():
+    """Sync the monitored calendars and list the stored events"""
+    # gcal_notify holds the calendar list and file locations
+    from gcal_notify import CALENDARS_TO_MONITOR, CREDENTIALS_FILE, SYNC_DB_FILE
+
+    parser = argparse.ArgumentParser(description="Incremental Google Calendar sync")
+    parser.add_argument("--full", action="store_true", help="Discard sync tokens and resync")
+    parser.add_argument("--verbose", "-v", action="store_true", help="Enable verbose logging")
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.DEBUG if args.verbose else logging.INFO)
+
+    store = EventStore(SYNC_DB_FILE)
+    try:
+        api = CalendarApi(CREDENTIALS_FILE, store)
+        results = CalendarSync(store, api, CALENDARS_TO_MONITOR).sync(full=args.full)
+    except (ApiError, OSError, KeyError, ValueError) as e:
+        logger.error(f"Sync failed: {e}")
+        return 1
+
+    for calendar_id, (stored, removed) in results.items():
+        print(f"{calendar_id}: {stored} stored, {removed} removed")
+    print(f"{api.requests} requests, {api.bytes_received} bytes received")
+    now = time.time()
+    for row in store.events_between(now, now + 7 * 86400):
+        print(f"{datetime.fromtimestamp(row['start_ts']):%Y-%m-%d %H:%M}  {row['title']}")
+    store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
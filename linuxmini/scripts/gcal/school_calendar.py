@@ -0,0 +1,535 @@
+#!/usr/bin/env python3
+"""
+School schedule engine shared by the school calendar generators
+
+A SchoolCalendar is configured by a holiday table: every weekday in the
+school period that is not a holiday is a school day. Days are grouped into
+Mon-Fri blocks and written out as all-day events in one of three ways:
+
+- gcalcli commands (dry run by default, --execute runs them one by one)
+- a single .ics file for a one-shot import (--ics FILE)
+- a diff-based sync through the Calendar API (--sync, applied with --execute)
+
+Every block has a stable UID derived from the calendar, title and start
+date; the .ics file and the API sync both use it as the event's iCalUID,
+so an .ics import can later be kept up to date with --sync.
+--sync lists the calendar's events in the range once, matches them by UID
+and only creates missing blocks, updates blocks whose end date changed and
+deletes blocks the holiday table no longer produces, with a bounded pool of
+concurrent requests. Running it again changes nothing.
+
+--sync uses the OAuth credentials of gcal_notify.py
+(~/.config/gcal-notifications/credentials.json), which need the
+https://www.googleapis.com/auth/calendar scope to write events.
+"""
+
+import argparse
+import random
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from hashlib import sha1
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Tuple
+
+UID_DOMAIN = "school-calendar.rash"
+SYNC_WORKERS = 4  # Concurrent API requests; Calendar API quotas are per user
+SYNC_RETRIES = 4  # Attempts per request on rate limiting and server errors
+
+
+class Block(NamedTuple):
+    """One all-day event: a Mon-Fri run of school or holiday days (end inclusive)"""
+
+    title: str
+    start: str
+    end: str
+    holiday: bool
+    uid: str
+
+    @property
+    def duration(self) -> int:
+        return calculate_duration(self.start, self.end)
+
+    @property
+    def end_exclusive(self) -> str:
+        """The day after the block, as all-day event ends are written"""
+        end = datetime.strptime(self.end, "%Y-%m-%d") + timedelta(days=1)
+        return end.strftime("%Y-%m-%d")
+
+
+def calculate_duration(start_date, end_date):
+    """Calculate duration in days between two dates (inclusive)"""
+    start = datetime.strptime(start_date, "%Y-%m-%d")
+    end = datetime.strptime(end_date, "%Y-%m-%d")
+    return (end - start).days + 1
+
+
+def create_weekly_blocks(dates):
+    """Group consecutive weekdays into weekly Mon-Fri blocks"""
+    if not dates:
+        return []
+
+    blocks = []
+    current_block_start = dates[0]
+    current_block_end = dates[0]
+
+    for i in range(1, len(dates)):
+        current_date = datetime.strptime(dates[i], "%Y-%m-%d")
+        prev_date = datetime.strptime(dates[i - 1], "%Y-%m-%d")
+
+        # Check if this is the next consecutive weekday
+        expected_next_day = prev_date + timedelta(days=1)
+
+        # Special case: if previous day was Friday, next weekday should be Monday (3 days later)
+        if prev_date.weekday() == 4:  # Friday
+            expected_next_day = prev_date + timedelta(days=3)  # Monday
+
+        if current_date == expected_next_day:
+            # Continuous weekday, but check if we're crossing into a new week
+            if prev_date.weekday() == 4:  # Previous was Friday, this is Monday
+                # End the current block on Friday and start a new block on Monday
+                blocks.append((current_block_start, dates[i - 1]))
+                current_block_start = dates[i]
+                current_block_end = dates[i]
+            else:
+                # Same week, extend the current block
+                current_block_end = dates[i]
+        else:
+            # Gap found, save current block and start new one
+            blocks.append((current_block_start, current_block_end))
+            current_block_start = dates[i]
+            current_block_end = dates[i]
+
+    # Add the last block
+    blocks.append((current_block_start, current_block_end))
+
+    return blocks
+
+
+def weekdays_between(start_date, end_date):
+    """All Mon-Fri dates from start_date to end_date (inclusive)"""
+    weekdays = []
+    current = datetime.strptime(start_date, "%Y-%m-%d")
+    end = datetime.strptime(end_date, "%Y-%m-%d")
+    while current <= end:
+        if current.weekday() < 5:  # Monday-Friday only
+            weekdays.append(current.strftime("%Y-%m-%d"))
+        current += timedelta(days=1)
+    return weekdays
+
+
+def ics_escape(text: str) -> str:
+    return (
+        text.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\n", "\\n")
+    )
+
+
+def ics_fold(line: str) -> str:
+    """Fold a content line at 75 octets (RFC 5545 3.1)"""
+    encoded = line.encode()
+    if len(encoded) <= 75:
+        return line
+    parts = []
+    while encoded:
+        limit = 75 if not parts else 74  # Continuation lines start with a space
+        cut = min(limit, len(encoded))
+        # Don't split a UTF-8 sequence
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode())
+        encoded = encoded[cut:]
+    return "\r\n ".join(parts)
+
+
+class SchoolCalendar:
+    """A school's schedule: holiday table, school period and target calendar"""
+
+    def __init__(self, name, calendar_name, holidays, default_start, default_end):
+        self.name = name  # "Uppsala"
+        self.calendar_name = calendar_name  # Google Calendar to write to
+        self.holidays = holidays  # {start: {"end": end, "title": title}}
+        self.default_start = default_start
+        self.default_end = default_end
+        self.school_title = f"{name} - Skola"
+
+    def block_uid(self, title: str, start: str) -> str:
+        digest = sha1(f"{self.calendar_name}\0{title}\0{start}".encode()).hexdigest()
+        return f"{digest[:20]}@{UID_DOMAIN}"
+
+    def get_holiday_dates(self):
+        """Get set of all holiday dates"""
+        holiday_dates = set()
+
+        for start_date, holiday_info in self.holidays.items():
+            end_date = holiday_info["end"]
+            current = datetime.strptime(start_date, "%Y-%m-%d")
+            end = datetime.strptime(end_date, "%Y-%m-%d")
+
+            while current <= end:
+                holiday_dates.add(current.strftime("%Y-%m-%d"))
+                current += timedelta(days=1)
+
+        return holiday_dates
+
+    def get_school_weekdays(self, start_date, end_date):
+        """Get all weekdays that are not holidays within the specified date range"""
+        holiday_dates = self.get_holiday_dates()
+        return [day for day in weekdays_between(start_date, end_date) if day not in holiday_dates]
+
+    def get_holidays_in_range(self, start_date, end_date):
+        """Get holidays that fall within the specified date range"""
+        holidays_in_range = {}
+
+        range_start = datetime.strptime(start_date, "%Y-%m-%d")
+        range_end = datetime.strptime(end_date, "%Y-%m-%d")
+
+        for holiday_start, holiday_info in self.holidays.items():
+            holiday_end = holiday_info["end"]
+
+            holiday_start_dt = datetime.strptime(holiday_start, "%Y-%m-%d")
+            holiday_end_dt = datetime.strptime(holiday_end, "%Y-%m-%d")
+
+            # Check if holiday overlaps with our date range
+            if holiday_start_dt <= range_end and holiday_end_dt >= range_start:
+                # Clip holiday to our range
+                clipped_start = max(holiday_start_dt, range_start).strftime("%Y-%m-%d")
+                clipped_end = min(holiday_end_dt, range_end).strftime("%Y-%m-%d")
+
+                holidays_in_range[clipped_start] = {
+                    "end": clipped_end,
+                    "title": holiday_info["title"],
+                }
+
+        return holidays_in_range
+
+    def generate_blocks(self, start_date, end_date) -> List[Block]:
+        """Holiday blocks, then school blocks, within the date range"""
+        blocks = []
+
+        # 1. Holiday events (weekday blocks Mon-Fri, same as school events)
+        holidays_in_range = self.get_holidays_in_range(start_date, end_date)
+        for holiday_start, holiday_info in holidays_in_range.items():
+            title = holiday_info["title"]
+            holiday_weekdays = weekdays_between(holiday_start, holiday_info["end"])
+            for block_start, block_end in create_weekly_blocks(holiday_weekdays):
+                uid = self.block_uid(title, block_start)
+                blocks.append(Block(title, block_start, block_end, True, uid))
+
+        # 2. School events (weekday blocks Mon-Fri) within our range
+        school_dates = self.get_school_weekdays(start_date, end_date)
+        for block_start, block_end in create_weekly_blocks(school_dates):
+            uid = self.block_uid(self.school_title, block_start)
+            blocks.append(Block(self.school_title, block_start, block_end, False, uid))
+
+        return blocks
+
+    def generate_commands(self, start_date, end_date):
+        """Generate gcalcli commands for the schedule within the specified date range"""
+        return [
+            f'gcalcli --calendar "{self.calendar_name}" add --title "{block.title}" '
+            f'--when "{block.start}" --allday --duration {block.duration} --noprompt'
+            for block in self.generate_blocks(start_date, end_date)
+        ]
+
+    def print_schedule_summary(self, start_date, end_date):
+        """Print a summary of the generated schedule"""
+        # Get holidays in range (weekdays only)
+        holidays_in_range = self.get_holidays_in_range(start_date, end_date)
+        holiday_weekdays = set()
+        for holiday_start, holiday_info in holidays_in_range.items():
+            holiday_weekdays.update(weekdays_between(holiday_start, holiday_info["end"]))
+
+        school_dates = self.get_school_weekdays(start_date, end_date)
+
+        print(f"{self.name} Schedule Summary ({start_date} to {end_date}):")
+        print(f"  Holiday weekdays: {len(holiday_weekdays)}")
+        print(f"  School days: {len(school_dates)}")
+        print(f"  Holiday periods: {len(holidays_in_range)}")
+
+        school_blocks = create_weekly_blocks(school_dates)
+        print(f"  School blocks: {len(school_blocks)}")
+        print()
+
+        if holidays_in_range:
+            print("Holiday periods in range (weekdays only):")
+            for holiday_start, holiday_info in sorted(holidays_in_range.items()):
+                print(
+                    f"  {holiday_start} to {holiday_info['end']}: {holiday_info['title']}"
+                )
+            print()
+
+    def execute_commands(self, commands, dry_run=True):
+        """Execute the gcalcli commands"""
+        school_marker = f'--title "{self.school_title}"'
+        if dry_run:
+            print("DRY RUN - Commands that would be executed:")
+            print("=" * 50)
+
+            # Count holiday vs school commands
+            holiday_commands = [cmd for cmd in commands if school_marker not in cmd]
+            school_commands = [cmd for cmd in commands if school_marker in cmd]
+
+            if holiday_commands:
+                print("HOLIDAY EVENTS:")
+                for i, cmd in enumerate(holiday_commands, 1):
+                    print(f"{i:2d}. {cmd}")
+
+            if school_commands:
+                print("\nSCHOOL EVENTS:")
+                for i, cmd in enumerate(school_commands, 1):
+                    print(f"{i:2d}. {cmd}")
+
+            print(
+                f"\nTotal commands: {len(commands)} ({len(holiday_commands)} holidays, {len(school_commands)} school blocks)"
+            )
+            print("\nTo execute for real, run with --execute flag")
+        else:
+            print(f"Executing {len(commands)} commands...")
+            for i, cmd in enumerate(commands, 1):
+                print(f"Executing {i}/{len(commands)}: {cmd}")
+                try:
+                    # Just run the command as-is, let gcalcli handle authentication
+                    result = subprocess.run(
+                        cmd, shell=True, capture_output=True, text=True, timeout=60
+                    )
+                    if result.returncode != 0:
+                        print(f"ERROR: {result.stderr.strip()}")
+                        print(f"STDOUT: {result.stdout.strip()}")
+                    else:
+                        print("SUCCESS")
+                        if result.stdout.strip():
+                            print(f"OUTPUT: {result.stdout.strip()}")
+                except subprocess.TimeoutExpired:
+                    print("ERROR: Command timed out after 60 seconds")
+                except Exception as e:
+                    print(f"ERROR executing command: {e}")
+
+    def render_ics(self, blocks: List[Block]) -> str:
+        """All blocks as one iCalendar file, for a single import"""
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        lines = [
+            "BEGIN:VCALENDAR",
+            "VERSION:2.0",
+            f"PRODID:-//rash//{self.name} school calendar//SV",
+            "CALSCALE:GREGORIAN",
+            f"X-WR-CALNAME:{ics_escape(self.calendar_name)}",
+        ]
+        for block in blocks:
+            lines += [
+                "BEGIN:VEVENT",
+                f"UID:{block.uid}",
+                f"DTSTAMP:{stamp}",
+                f"DTSTART;VALUE=DATE:{block.start.replace('-', '')}",
+                f"DTEND;VALUE=DATE:{block.end_exclusive.replace('-', '')}",
+                f"SUMMARY:{ics_escape(block.title)}",
+                "END:VEVENT",
+            ]
+        lines.append("END:VCALENDAR")
+        return "".join(ics_fold(line) + "\r\n" for line in lines)
+
+    def event_body(self, block: Block) -> Dict:
+        return {
+            "summary": block.title,
+            "start": {"date": block.start},
+            "end": {"date": block.end_exclusive},
+            "iCalUID": block.uid,
+        }
+
+    def plan_sync(
+        self, blocks: List[Block], existing: List[Dict], start_date, end_date
+    ) -> Tuple[List[Block], List[Tuple[Dict, Block]], List[Dict]]:
+        """
+        (creates, updates, deletes) that bring the calendar's UID-tagged events
+        starting within the range in line with blocks. Events without one of
+        our UIDs, and tagged events outside the range, are left alone.
+        """
+        wanted = {block.uid: block for block in blocks}
+        updates, deletes = [], []
+        seen = set()
+        for event in existing:
+            uid = event.get("iCalUID", "")
+            start = event.get("start", {}).get("date")
+            if not uid.endswith(f"@{UID_DOMAIN}") or not start:
+                continue
+            if not start_date <= start <= end_date:
+                continue
+            block = wanted.get(uid)
+            if block is None or uid in seen:
+                deletes.append(event)
+                continue
+            seen.add(uid)
+            if (
+                event.get("summary") != block.title
+                or event.get("end", {}).get("date") != block.end_exclusive
+            ):
+                updates.append((event, block))
+        creates = [block for uid, block in wanted.items() if uid not in seen]
+        return creates, updates, deletes
+
+    def sync(self, api, start_date, end_date, dry_run=True, workers=SYNC_WORKERS):
+        """Diff the calendar against the generated blocks and apply the changes"""
+        from gcal_sync import ApiError
+
+        calendar_id = api.find_calendar(self.calendar_name)
+        if calendar_id is None:
+            print(f"Error: calendar not found: {self.calendar_name}")
+            return 1
+
+        time_max = datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)
+        existing = api.get_all(
+            api.events_path(calendar_id),
+            {
+                "timeMin": f"{start_date}T00:00:00Z",
+                "timeMax": f"{time_max:%Y-%m-%d}T00:00:00Z",
+                "maxResults": 2500,
+                "fields": "nextPageToken,items(id,iCalUID,summary,start,end)",
+            },
+        )
+        blocks = self.generate_blocks(start_date, end_date)
+        creates, updates, deletes = self.plan_sync(blocks, existing, start_date, end_date)
+
+        print(
+            f"{self.calendar_name}: {len(blocks)} blocks, {len(existing)} existing events "
+            f"-> {len(creates)} to create, {len(updates)} to update, {len(deletes)} to delete"
+        )
+        for block in creates:
+            print(f"  + {block.start} to {block.end}: {block.title}")
+        for event, block in updates:
+            print(f"  ~ {block.start} to {block.end}: {block.title}")
+        for event in deletes:
+            print(f"  - {event['start']['date']}: {event.get('summary')}")
+        if dry_run:
+            if creates or updates or deletes:
+                print("\nTo apply these changes, run with --sync --execute")
+            return 0
+
+        # import (rather than insert) is keyed by iCalUID, so a create that
+        # raced another run, or an earlier .ics import, updates instead of duplicating
+        import_path = f"{api.events_path(calendar_id)}/import"
+        tasks = [
+            ("create", block.title, "POST", import_path, self.event_body(block))
+            for block in creates
+        ]
+        tasks += [
+            ("update", block.title, "PATCH", api.events_path(calendar_id, event["id"]),
+             {"summary": block.title, "end": {"date": block.end_exclusive}})
+            for event, block in updates
+        ]
+        tasks += [
+            ("delete", event.get("summary"), "DELETE", api.events_path(calendar_id, event["id"]), None)
+            for event in deletes
+        ]
+
+        failures = 0
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(request_with_retries, api, method, task_path, body): (action, title)
+                for action, title, method, task_path, body in tasks
+            }
+            for future in as_completed(futures):
+                action, title = futures[future]
+                try:
+                    future.result()
+                except (ApiError, OSError) as e:
+                    failures += 1
+                    print(f"ERROR: {action} {title}: {e}")
+        print(f"Applied {len(tasks) - failures} of {len(tasks)} changes in {api.requests} requests")
+        return 1 if failures else 0
+
+
+def request_with_retries(api, method, path, body):
+    """api.request, backing off on rate limiting (403/429) and server errors"""
+    from gcal_sync import ApiError
+
+    for attempt in range(SYNC_RETRIES):
+        try:
+            return api.request(method, path, body=body)
+        except ApiError as e:
+            # 403 is also a permission error; only rate limiting is worth retrying
+            retryable = (
+                e.status == 429
+                or e.status >= 500
+                or (e.status == 403 and "rateLimitExceeded" in str(e))
+            )
+            if not retryable or attempt == SYNC_RETRIES - 1:
+                raise
+            time.sleep((2 ** attempt) + random.random())
+
+
+def main(calendar: SchoolCalendar):
+    """Command line of a school calendar generator"""
+    parser = argparse.ArgumentParser(
+        description=f"Generate {calendar.name} school schedule events"
+    )
+    parser.add_argument(
+        "--execute",
+        action="store_true",
+        help="Actually execute commands, or apply the --sync changes (default: dry run)",
+    )
+    parser.add_argument(
+        "--summary", action="store_true", help="Show schedule summary only"
+    )
+    parser.add_argument(
+        "--ics", metavar="FILE", help="Write all events to an .ics file for a single import"
+    )
+    parser.add_argument(
+        "--sync",
+        action="store_true",
+        help="Create, update and delete only what differs in the calendar (Calendar API)",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=SYNC_WORKERS,
+        help=f"Concurrent requests for --sync (default: {SYNC_WORKERS})",
+    )
+    parser.add_argument(
+        "--from", dest="from_date",
+        help=f"Start date (YYYY-MM-DD, default: {calendar.default_start})",
+    )
+    parser.add_argument(
+        "--to", dest="to_date",
+        help=f"End date (YYYY-MM-DD, default: {calendar.default_end})",
+    )
+
+    args = parser.parse_args()
+
+    # Use provided dates or defaults
+    start_date = args.from_date or calendar.default_start
+    end_date = args.to_date or calendar.default_end
+
+    # Validate date format
+    try:
+        datetime.strptime(start_date, "%Y-%m-%d")
+        datetime.strptime(end_date, "%Y-%m-%d")
+    except ValueError:
+        print("Error: Dates must be in YYYY-MM-DD format")
+        return 1
+
+    if args.summary:
+        calendar.print_schedule_summary(start_date, end_date)
+        return 0
+
+    if args.ics:
+        blocks = calendar.generate_blocks(start_date, end_date)
+        Path(args.ics).write_text(calendar.render_ics(blocks), newline="")
+        print(f"Wrote {len(blocks)} events to {args.ics}")
+        return 0
+
+    if args.sync:
+        from gcal_notify import CREDENTIALS_FILE
+        from gcal_sync import ApiError, CalendarApi
+
+        try:
+            api = CalendarApi(CREDENTIALS_FILE)
+            return calendar.sync(api, start_date, end_date, not args.execute, args.workers)
+        except (ApiError, OSError, KeyError, ValueError) as e:
+            print(f"Error: sync failed: {e}")
+            return 1
+
+    calendar.print_schedule_summary(start_date, end_date)
+    commands = calendar.generate_commands(start_date, end_date)
+    calendar.execute_commands(commands, not args.execute)
+    return 0
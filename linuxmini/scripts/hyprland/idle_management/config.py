@@ -7,6 +7,7 @@ This file contains all configuration options used across the idle management scr
 Modify values here to customize the behavior of the entire system.
 """
 
+import os
 from pathlib import Path
 
 # =============================================================================
@@ -34,6 +35,7 @@ LOG_FILES = {
     "in_office_monitor": TMP_DIR / "in_office_monitor.log",
     "activity_status_reporter": TMP_DIR / "mini_status_debug.log",
     "webcam_status": None,  # Uses logging_utils, no separate log file
+    "debug_face_detector": TMP_DIR / "debug_face_detector.log",  # Stage timings
 }
 
 # =============================================================================
@@ -58,14 +60,15 @@ STATUS_FILE_DEFAULTS = {
 }
 
 # =============================================================================
-# CONTROL FILES (FLAGS)
+# CONTROL SOCKET
 # =============================================================================
 
-CONTROL_FILES = {
-    "idle_simple_lock_exit": TMP_DIR / "idle_simple_lock_exit",
-    "in_office_monitor_exit": TMP_DIR / "in_office_monitor_exit",
-    "in_office_monitor_pid": TMP_DIR / "in_office_monitor.pid",
-}
+# in_office_monitor.py listens here; idle_simple_lock/dpms/resume send it
+# commands instead of creating exit-flag files. SIGTERM stops the monitor.
+CONTROL_SOCKET = (
+    Path(os.environ.get("XDG_RUNTIME_DIR") or f"/run/user/{os.getuid()}")
+    / "idle_presence.sock"
+)
 
 # =============================================================================
 # DEVICE FILES
@@ -89,16 +92,14 @@ EXTERNAL_SCRIPTS = {
 
 # Check intervals (in seconds)
 CHECK_INTERVALS = {
-    "lock_monitoring": 1,  # How often to check for office status changes during lock monitoring
-    "dpms_monitoring": 1,  # How often to check for office status changes during DPMS monitoring
-    "office_monitoring": 1,  # How often to check for office status changes in continuous monitoring
-    "webcam_polling": 2,  # How often to poll webcam status when active
     "debug_monitoring": 0.5,  # How often to check for file changes in debug mode
 }
 
-# Resume delays (in seconds)
-RESUME_DELAYS = {
-    "exit_flag_cleanup": 2,  # How long to wait before cleaning up exit flags
+# Presence state machine timers (in seconds)
+PRESENCE_TIMINGS = {
+    "hyprlock_startup": 3,  # Time hyprlock gets to initialize and start rendering
+    "dpms_off_delay": 30,  # Lock screen stays visible this long before DPMS off
+    "control_timeout": 2,  # How long clients wait for the monitor to answer
 }
 
 # DPMS auto-on schedule configuration
@@ -115,12 +116,53 @@ DPMS_SCHEDULE = {
 # DETECTION PARAMETERS
 # =============================================================================
 
+# The detectors form a cascade (presence_cascade.py): the cheap gate runs on
+# every frame, MediaPipe face detection only after motion or while presence
+# is being confirmed, and face_recognition only on newly appeared faces.
 DETECTION_PARAMS = {
+    "threshold": 0.5,  # Fraction of processed frames with a detection to count as present
+    "gate": {
+        "width": 160,  # Frames are downscaled to this width for the motion/brightness check
+        "min_brightness": 12,  # Mean gray level below which the scene is dark (lights off)
+        "diff_threshold": 12,  # Change of a downscaled, blurred pixel that counts as motion
+    },
     "motion": {
         "enabled": True,
         "priority": 1,
-        "min_area": 200,
+        "min_area": 200,  # Changed area in full-resolution pixels
+    },
+    "mediapipe_face": {
+        "enabled": True,
+        "priority": 2,
+        "model_selection": 0,  # 0: short range (within 2 m), 1: full range
+        "min_detection_confidence": 0.5,
+        "motion_interval": 0.2,  # Min seconds between detections while there is motion
+        "presence_interval": 1.0,  # Seconds between detections confirming a still person
+        "presence_hold": 10,  # Seconds after the last face or motion to keep confirming
     },
+    "face_tracking": {
+        "iou_threshold": 0.3,  # Box overlap for a detection to continue a track
+        "track_timeout": 3.0,  # Seconds a track survives without a matching detection
+    },
+}
+
+# Recency weighting of frame detections (debug visualizer)
+DETECTION_TIMING = {
+    "recent_window_duration": 3,  # Seconds counted as "recent"
+    "recent_window_threshold": 0.7,  # Recent detection rate that alone means present
+}
+
+# Person-specific recognition (requires the face_recognition library)
+FACIAL_RECOGNITION = {
+    "enabled": True,
+    "reference_dir": IDLE_MANAGEMENT_DIR / "reference_faces",  # One face per image
+    # Encodings of the reference images, rebuilt when the images change
+    "encodings_cache": Path.home() / ".cache" / "idle_management" / "reference_encodings.npz",
+    "tolerance": 0.6,  # Max face distance for a match (face_recognition default)
+    "min_recognition_confidence": 0.4,  # 1 - distance needed to count as recognized
+    "face_locations_model": "hog",  # "hog" (CPU) or "cnn"
+    "face_detection_model": "small",  # Landmark model for encodings: "small" or "large"
+    "num_jitters": 1,
 }
 
 # =============================================================================
@@ -132,8 +174,7 @@ SYSTEM_COMMANDS = {
     "hyprctl_dpms_on": ["hyprctl", "dispatch", "dpms", "on"],
     "hyprctl_dpms_off": ["hyprctl", "dispatch", "dpms", "off"],
     "pidof_hyprlock": ["pidof", "hyprlock"],
-    "lsof_webcam": ["lsof"],  # Will append device path
-    "inotifywait_webcam": ["inotifywait", "-e", "open"],  # Will append device path
+    "lsof_webcam": ["lsof"],  # Will append device paths (only used for benchmarking)
 }
 
 # =============================================================================
@@ -154,6 +195,7 @@ LOGGING_CONFIG = {
 
 WEBCAM_CONFIG = {
     "excluded_processes": [],  # Processes to exclude from webcam usage detection
+    "device_glob": "/dev/video*",  # Every matching device is watched, including hotplugged ones
 }
 
 # =============================================================================
@@ -176,9 +218,9 @@ def get_status_default(status_name):
     return STATUS_FILE_DEFAULTS.get(status_name)
 
 
-def get_control_file(control_name):
-    """Get the control file path for a given control."""
-    return CONTROL_FILES.get(control_name)
+def get_control_socket():
+    """Get the path of the presence monitor's control socket."""
+    return CONTROL_SOCKET
 
 
 def get_check_interval(interval_name):
@@ -200,7 +242,7 @@ def get_detection_method_param(method_name, param_name):
 def get_detection_method_order():
     """Get the configured detection method order based on priorities."""
     methods = []
-    for method_name in ["motion"]:
+    for method_name in ["motion", "mediapipe_face"]:
         method_config = DETECTION_PARAMS.get(method_name, {})
         if method_config.get("enabled", False):
             priority = method_config.get("priority", 999)
@@ -211,6 +253,19 @@ def get_detection_method_order():
     return [method_name for priority, method_name in methods]
 
 
+def get_detection_timing_param(param_name):
+    """Get a recency weighting parameter."""
+    return DETECTION_TIMING.get(param_name)
+
+
+def get_facial_recognition_param(param_name):
+    """Get a facial recognition parameter."""
+    return FACIAL_RECOGNITION.get(param_name)
+
+
+def is_facial_recognition_enabled():
+    """Check if person-specific facial recognition is enabled."""
+    return FACIAL_RECOGNITION.get("enabled", False)
 
 
 def is_detection_method_enabled(method_name):
@@ -263,11 +318,6 @@ def get_all_status_files():
     return list(STATUS_FILES.values())
 
 
-def get_all_control_files():
-    """Get all control file paths as a list."""
-    return list(CONTROL_FILES.values())
-
-
 def get_all_log_files():
     """Get all log file paths as a list (excluding None values)."""
     return [path for path in LOG_FILES.values() if path is not None]
@@ -275,9 +325,11 @@ def get_all_log_files():
 
 def get_enabled_detection_methods():
     """Get a string describing detection methods that will actually be used."""
-    if is_detection_method_enabled("motion"):
-        return "Motion"
-    return "None"
+    names = {"motion": "Motion", "mediapipe_face": "MediaPipe face"}
+    methods = [names[method] for method in get_detection_method_order()]
+    if methods and is_facial_recognition_enabled():
+        methods.append("face recognition")
+    return " → ".join(methods) or "None"
 
 
 # =============================================================================
@@ -318,7 +370,7 @@ if __name__ == "__main__":
 
     print("\nConfiguration summary:")
     print(f"  Status files: {len(STATUS_FILES)}")
-    print(f"  Control files: {len(CONTROL_FILES)}")
+    print(f"  Control socket: {CONTROL_SOCKET}")
     print(f"  Log files: {len([f for f in LOG_FILES.values() if f])}")
     print(f"  Detection methods: {get_enabled_detection_methods()}")
     print(f"  Check intervals: {len(CHECK_INTERVALS)}")
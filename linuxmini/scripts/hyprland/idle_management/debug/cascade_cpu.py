@@ -0,0 +1,174 @@
+#!/home/rash/.config/scripts/hyprland/idle_management/.venv/bin/python
+
+"""
+CPU cost per hour of the detection cascade, on synthetic scenes.
+
+Drives presence_cascade.DetectionCascade with generated 640x480 frames on a
+virtual clock and measures the process CPU time spent inside it, then
+scales that to one hour of webcam frames. The same frames are run through
+the previous pipeline (full resolution motion plus MediaPipe FaceMesh with
+refined landmarks on every second frame) for comparison.
+
+Scenarios:
+    idle     lights off; the frames are near black sensor noise
+    away     lit, empty room with sensor noise
+    present  lit room with a person-sized shape that sways and shifts
+
+The generated frames contain no real face, so MediaPipe finds nothing and
+face_recognition is never called; with a real person it runs once per new
+face track (a few times an hour), which the "recognitions/h" column counts.
+
+Usage:
+    cascade_cpu.py [--seconds 120] [--fps 15] [--scenario present]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# Add parent directory to path to import config
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from presence_cascade import (  # noqa: E402
+    MEDIAPIPE_AVAILABLE,
+    DetectionCascade,
+    MediaPipeFaceDetector,
+)
+
+WIDTH, HEIGHT = 640, 480
+
+
+class VirtualClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_room(rng):
+    """A smooth lit background, like a wall and furniture out of focus."""
+    base = rng.integers(60, 200, (HEIGHT // 40, WIDTH // 40, 3), dtype=np.uint8)
+    return cv2.resize(base, (WIDTH, HEIGHT), interpolation=cv2.INTER_CUBIC)
+
+
+def scene_frames(scenario, count, fps, seed=0):
+    """Yield count BGR frames of a scenario."""
+    rng = np.random.default_rng(seed)
+    room = make_room(rng)
+    dark = np.full((HEIGHT, WIDTH, 3), 4, np.uint8)
+    noise = np.empty((HEIGHT, WIDTH, 3), np.int16)
+    for i in range(count):
+        t = i / fps
+        if scenario == "idle":
+            frame = dark.astype(np.int16)
+        else:
+            frame = room.astype(np.int16)
+        if scenario == "present":
+            # Fidget side to side, with a larger shift every 20 seconds
+            x = WIDTH // 2 + int(12 * np.sin(t * 3)) + (40 if (t // 20) % 2 else 0)
+            y = HEIGHT // 2 + int(3 * np.sin(t * 0.7))
+            cv2.ellipse(frame, (x, y - 60), (55, 70), 0, 0, 360, (150, 170, 200), -1)
+            cv2.ellipse(frame, (x, y + 160), (130, 120), 0, 0, 360, (70, 60, 60), -1)
+        noise[:] = rng.normal(0, 2, noise.shape)
+        frame += noise
+        yield np.clip(frame, 0, 255).astype(np.uint8)
+
+
+class LegacyPipeline:
+    """The previous per-frame work: full size motion and FaceMesh every 2nd frame."""
+
+    def __init__(self):
+        self.previous = None
+        self.count = 0
+        self.kernel = np.ones((5, 5), np.uint8)
+        self.face_mesh = None
+        if MEDIAPIPE_AVAILABLE:
+            import mediapipe as mp
+
+            self.face_mesh = mp.solutions.face_mesh.FaceMesh(
+                static_image_mode=False, max_num_faces=1, refine_landmarks=True
+            )
+
+    def process(self, frame):
+        self.count += 1
+        if (self.count - 1) % 2:
+            return
+        if self.face_mesh is not None:
+            self.face_mesh.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        if self.previous is not None:
+            gray1 = cv2.cvtColor(self.previous, cv2.COLOR_BGR2GRAY)
+            gray2 = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            _, thresh = cv2.threshold(cv2.absdiff(gray1, gray2), 25, 255, cv2.THRESH_BINARY)
+            thresh = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, self.kernel)
+            thresh = cv2.morphologyEx(thresh, cv2.MORPH_OPEN, self.kernel)
+            cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        self.previous = frame
+
+
+def run(scenario, seconds, fps):
+    clock = VirtualClock()
+    detector = MediaPipeFaceDetector() if MEDIAPIPE_AVAILABLE else None
+    cascade = DetectionCascade(detector, recognizer=None, clock=clock)
+    legacy = LegacyPipeline()
+    cascade_cpu = legacy_cpu = 0.0
+    present_frames = 0
+
+    count = int(seconds * fps)
+    for i, frame in enumerate(scene_frames(scenario, count, fps)):
+        clock.now = i / fps
+        start = time.process_time()
+        results = cascade.process(frame)
+        cascade_cpu += time.process_time() - start
+        present_frames += results["motion"] or results["mediapipe_face"]
+
+        start = time.process_time()
+        legacy.process(frame)
+        legacy_cpu += time.process_time() - start
+
+    per_hour = 3600 / seconds
+    return {
+        "scenario": scenario,
+        "present": present_frames / count,
+        "detections": cascade.stage_calls["detect"] * per_hour,
+        "recognitions": cascade.stage_calls["recognize"] * per_hour,
+        "cascade": cascade_cpu * per_hour,
+        "legacy": legacy_cpu * per_hour,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Detection cascade CPU per hour")
+    parser.add_argument("--seconds", type=float, default=120, help="Simulated seconds per scenario")
+    parser.add_argument("--fps", type=float, default=15, help="Frames per second fed in")
+    parser.add_argument(
+        "--scenario", choices=["idle", "away", "present"], action="append",
+        help="Scenario to run (default: all)",
+    )
+    args = parser.parse_args()
+
+    if not MEDIAPIPE_AVAILABLE:
+        print("⚠ MediaPipe not available: face detection costs are not included")
+
+    print(f"{args.fps:g} fps, {args.seconds:g}s simulated per scenario; CPU seconds per hour")
+    print(
+        f"{'scenario':<9} {'signal':>7} {'detections/h':>13} {'recognitions/h':>15} "
+        f"{'cascade':>9} {'previous':>9} {'saving':>7}"
+    )
+    for scenario in args.scenario or ["idle", "away", "present"]:
+        row = run(scenario, args.seconds, args.fps)
+        saving = 1 - row["cascade"] / row["legacy"] if row["legacy"] else 0
+        print(
+            f"{row['scenario']:<9} {row['present']:>7.0%} {row['detections']:>13.0f} "
+            f"{row['recognitions']:>15.0f} {row['cascade']:>8.0f}s "
+            f"{row['legacy']:>8.0f}s {saving:>7.0%}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
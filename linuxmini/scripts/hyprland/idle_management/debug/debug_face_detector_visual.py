@@ -1,6 +1,7 @@
 #!/home/rash/.config/scripts/hyprland/idle_management/.venv/bin/python
 
 import argparse
+import logging
 import os
 import sys
 import time
@@ -12,43 +13,57 @@ import numpy as np
 # Fix Qt platform for Wayland/Hyprland compatibility - must be before OpenCV GUI
 os.environ['QT_QPA_PLATFORM'] = 'xcb'
 
-# Try to import MediaPipe for enhanced detection
-try:
-    import mediapipe as mp
-
-    MEDIAPIPE_AVAILABLE = True
-except ImportError:
-    MEDIAPIPE_AVAILABLE = False
-
-# Try to import face_recognition for person-specific recognition
-try:
-    import face_recognition
-
-    FACE_RECOGNITION_AVAILABLE = True
-except ImportError:
-    FACE_RECOGNITION_AVAILABLE = False
-
 # Add parent directory to path to import config
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 # Import centralized configuration
 from config import (  # noqa: E402
+    LOGGING_CONFIG,
     get_detection_method_param,
     get_detection_param,
-    get_detection_timing_param,
+    get_enabled_detection_methods,
+    get_log_file,
     get_facial_recognition_param,
     is_detection_method_enabled,
     is_facial_recognition_enabled,
 )
+from face_references import ReferenceEncodings  # noqa: E402
+from frame_capture import (  # noqa: E402
+    CaptureThread,
+    LatestFrameBuffer,
+    StageTimings,
+    format_summary,
+    open_source,
+)
+from presence_cascade import (  # noqa: E402
+    FACE_RECOGNITION_AVAILABLE,
+    MEDIAPIPE_AVAILABLE,
+    DetectionCascade,
+    FaceRecognizer,
+    MediaPipeFaceDetector,
+)
+from rolling_stats import RecencyWeightedPresence, RollingMean, RollingRate  # noqa: E402
+
+TIMING_LOG_INTERVAL = 5  # Seconds between stage timing log lines
+
+# Overlay abbreviations, in pipeline order
+STAGE_LABELS = {
+    "capture": "cap",
+    "gate": "gate",
+    "convert": "cvt",
+    "detect": "det",
+    "recognize": "rec",
+    "draw": "draw",
+}
 
 
 class VisualFaceDetector:
     """Visual debugging tool for optimized face detection system."""
 
     def __init__(self):
-        self.face_mesh = None
-        self.previous_frame = None
-        self.known_encodings = []
+        self.face_detector = None  # MediaPipeFaceDetector when available
+        self.cascade = None
+        self.references = None  # ReferenceEncodings once loaded
 
         # Detection statistics
         self.frame_count = 0
@@ -59,24 +74,24 @@ class VisualFaceDetector:
             "total_detections": 0,
         }
 
-        # Facial recognition confidence tracking
-        self.recognition_confidences = []  # List of confidence scores
-        self.max_confidence_history = 20  # Keep last 20 confidence scores
+        # Facial recognition confidence tracking (last 20 scores)
+        self.recognition_confidences = RollingMean(20)
 
         # Rolling window for last 5 seconds detection rate
-        self.detection_events = []  # List of (timestamp, detected_bool) tuples
-        self.rolling_window_seconds = 5
+        self.rolling_rate = RollingRate(5)
 
-        # Frame-level detection tracking for recency weighting
-        self.frame_detections = (
-            []
-        )  # List of (timestamp, detected_bool) tuples for frame-level analysis
+        # Frame-level detections over the last 10 seconds for recency weighting
+        self.presence = RecencyWeightedPresence(window_seconds=10)
 
         # Performance optimization settings
-        self.frame_skip = 2  # Process every Nth frame for better performance
+        self.frame_skip = 1  # Process every Nth captured frame (the cascade gates the rest)
         self.processed_frame_count = 0  # Count of actually processed frames
         self.last_detection_method = None  # Track what method worked last
 
+        # Per-stage durations for the overlay and the timing log
+        self.timings = StageTimings()
+        self.logger = logging.getLogger("debug_face_detector")
+
         # Colors for different detection types
         self.colors = {
             "facial_recognition": (0, 255, 0),  # Green - target person recognized!
@@ -95,41 +110,20 @@ class VisualFaceDetector:
         if is_facial_recognition_enabled():
             if FACE_RECOGNITION_AVAILABLE:
                 try:
-                    # Import from face_detector module
-                    from face_detector import load_reference_encodings
-
-                    all_encodings = load_reference_encodings()
-                    if all_encodings:
-                        # PERFORMANCE OPTIMIZATION: Limit encodings for debug tool
-                        max_encodings_for_debug = 10
-                        if len(all_encodings) > max_encodings_for_debug:
-                            print(
-                                f"⚠️ Performance optimization: Using first "
-                                f"{max_encodings_for_debug} of {len(all_encodings)} "
-                                f"reference encodings for debug"
-                            )
-                            print(
-                                f"   (Production face_detector.py will use all "
-                                f"{len(all_encodings)} encodings)"
-                            )
-                            self.known_encodings = all_encodings[
-                                :max_encodings_for_debug
-                            ]
-                        else:
-                            self.known_encodings = all_encodings
-
+                    references = ReferenceEncodings.load()
+                    if references:
+                        self.references = references
                         print(
                             f"✓ Facial recognition enabled with "
-                            f"{len(self.known_encodings)} reference encodings (debug mode)"
+                            f"{len(references)} reference encodings"
                         )
-
                     else:
                         print(
                             "⚠ Facial recognition enabled but no reference encodings loaded"
                         )
                 except Exception as e:
                     print(f"⚠ Failed to load facial recognition: {e}")
-                    self.known_encodings = []
+                    self.references = None
             else:
                 print(
                     "⚠ Facial recognition enabled but face_recognition library not available"
@@ -138,26 +132,14 @@ class VisualFaceDetector:
         else:
             print("⚠ Facial recognition disabled in configuration")
 
-        # Initialize MediaPipe face mesh
+        # Initialize MediaPipe face detection (boxes only, no landmark mesh)
         if MEDIAPIPE_AVAILABLE and is_detection_method_enabled("mediapipe_face"):
             try:
-                self.face_mesh = mp.solutions.face_mesh.FaceMesh(
-                    static_image_mode=False,
-                    max_num_faces=1,
-                    refine_landmarks=True,
-                    min_detection_confidence=get_detection_method_param(
-                        "mediapipe_face", "min_detection_confidence"
-                    )
-                    or 0.5,
-                    min_tracking_confidence=get_detection_method_param(
-                        "mediapipe_face", "min_tracking_confidence"
-                    )
-                    or 0.5,
-                )
+                self.face_detector = MediaPipeFaceDetector()
                 print("✓ MediaPipe face detection enabled (excellent for all angles)")
             except Exception as e:
                 print(f"⚠ Failed to initialize MediaPipe: {e}")
-                self.face_mesh = None
+                self.face_detector = None
         else:
             if not MEDIAPIPE_AVAILABLE:
                 print("⚠ MediaPipe not available (install with: pip install mediapipe)")
@@ -167,395 +149,84 @@ class VisualFaceDetector:
         print("✓ Motion detection: enabled")
 
         print(
-            f"✓ Facial recognition: {'enabled' if self.known_encodings else 'disabled'}"
+            f"✓ Facial recognition: {'enabled' if self.references else 'disabled'}"
         )
         print(
-            f"✓ MediaPipe face detection: {'enabled' if self.face_mesh else 'disabled'}"
+            f"✓ MediaPipe face detection: {'enabled' if self.face_detector else 'disabled'}"
         )
 
-        # Performance warning
-        if len(self.known_encodings) > 15:
-            print(
-                f"⚠️ Performance Warning: {len(self.known_encodings)} reference encodings detected"
-            )
-            print(
-                "   Consider using setup_facial_recognition.py --regenerate to clean up bad images"
-            )
-            print("   Optimal range: 5-10 high-quality reference images")
+        recognizer = FaceRecognizer(self.references) if self.references else None
+        self.cascade = DetectionCascade(self.face_detector, recognizer)
+        print(f"✓ Cascade: {get_enabled_detection_methods()}")
 
         return True
 
-    def detect_motion(self, frame1, frame2, debug_display=None):
-        """Detect motion between two frames with optional debug display."""
-        min_area = get_detection_method_param("motion", "min_area") or 200
-
-        # Convert frames to grayscale
-        gray1 = cv2.cvtColor(frame1, cv2.COLOR_BGR2GRAY)
-        gray2 = cv2.cvtColor(frame2, cv2.COLOR_BGR2GRAY)
-
-        # Calculate absolute difference
-        diff = cv2.absdiff(gray1, gray2)
-
-        # Apply threshold
-        _, thresh = cv2.threshold(diff, 25, 255, cv2.THRESH_BINARY)
-
-        # Apply morphological operations to reduce noise
-        kernel = np.ones((5, 5), np.uint8)
-        thresh = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, kernel)
-        thresh = cv2.morphologyEx(thresh, cv2.MORPH_OPEN, kernel)
-
-        # Find contours
-        contours, _ = cv2.findContours(
-            thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
-        )
-
-        # Check if any contour is large enough and draw them if debug display provided
-        motion_detected = False
-        if debug_display is not None:
-            # Show motion threshold image in corner
-            small_thresh = cv2.resize(thresh, (160, 120))
-            debug_display[10:130, 10:170] = cv2.cvtColor(
+    def detect_all_methods(self, frame):
+        """Run the detection cascade and return results with visual annotations."""
+        annotated_frame = frame.copy()
+        results = self.cascade.process(frame)
+        self.timings.update(results["_timings"])
+        self.processed_frame_count += 1
+
+        gate = results["_gate"]
+        if gate.mask is not None:
+            # Show the downscaled motion mask in the corner
+            small_thresh = cv2.resize(gate.mask, (160, 120))
+            annotated_frame[10:130, 10:170] = cv2.cvtColor(
                 small_thresh, cv2.COLOR_GRAY2BGR
             )
-            cv2.rectangle(debug_display, (8, 8), (172, 132), self.colors["motion"], 2)
+            cv2.rectangle(annotated_frame, (8, 8), (172, 132), self.colors["motion"], 2)
             cv2.putText(
-                debug_display,
-                "Motion Thresh",
+                annotated_frame,
+                f"Motion (brightness {gate.brightness:.0f})",
                 (12, 145),
                 cv2.FONT_HERSHEY_SIMPLEX,
                 0.4,
                 self.colors["motion"],
                 1,
             )
-
-        for contour in contours:
-            area = cv2.contourArea(contour)
-            if area > min_area:
-                motion_detected = True
-                if debug_display is not None:
-                    # Draw motion contours
-                    cv2.drawContours(
-                        debug_display, [contour], -1, self.colors["motion"], 2
-                    )
-                    # Draw bounding box
-                    x, y, w, h = cv2.boundingRect(contour)
-                    cv2.rectangle(
-                        debug_display, (x, y), (x + w, y + h), self.colors["motion"], 2
-                    )
-                    cv2.putText(
-                        debug_display,
-                        f"Motion {int(area)}",
-                        (x, y - 10),
-                        cv2.FONT_HERSHEY_SIMPLEX,
-                        0.5,
-                        self.colors["motion"],
-                        2,
-                    )
-
-        return motion_detected
-
-    def recognize_person_visual(self, frame):
-        """Recognize if detected face belongs to the target person with visual feedback."""
-        if not self.known_encodings or not FACE_RECOGNITION_AVAILABLE:
-            return False, 0.0, None
-
-        tolerance = get_facial_recognition_param("tolerance")
-        min_confidence = get_facial_recognition_param("min_recognition_confidence")
-
-        try:
-            # Find face locations
-            face_locations = face_recognition.face_locations(
-                frame, model=get_facial_recognition_param("face_locations_model")
-            )
-
-            if not face_locations:
-                return False, 0.0, None
-
-            # Get face encodings
-            face_encodings = face_recognition.face_encodings(
-                frame,
-                face_locations,
-                model=get_facial_recognition_param("face_detection_model"),
-                num_jitters=get_facial_recognition_param("num_jitters"),
+        for x, y, w, h in gate.motion_boxes:
+            cv2.rectangle(
+                annotated_frame, (x, y), (x + w, y + h), self.colors["motion"], 2
             )
 
-            if not face_encodings:
-                return False, 0.0, face_locations
-
-            # Compare each detected face against known encodings
-            best_confidence = 0.0
-            recognized = False
-
-            for (top, right, bottom, left), face_encoding in zip(
-                face_locations, face_encodings
-            ):
-                # Get face distances (lower = better match)
-                face_distances = face_recognition.face_distance(
-                    self.known_encodings, face_encoding
-                )
-
-                if len(face_distances) > 0:
-                    best_match_distance = np.min(face_distances)
-                    confidence = 1.0 - best_match_distance
-
-                    # Update best confidence
-                    if confidence > best_confidence:
-                        best_confidence = confidence
-
-                    # Check if any face matches within tolerance
-                    matches = face_recognition.compare_faces(
-                        self.known_encodings, face_encoding, tolerance=tolerance
-                    )
-
-                    if any(matches) and confidence >= min_confidence:
-                        recognized = True
-
-            return recognized, best_confidence, face_locations
-
-        except Exception as e:
-            print(f"Error during facial recognition: {e}")
-            return False, 0.0, None
-
-    def update_rolling_detection_rate(self, current_time, any_detected):
-        """Update rolling detection rate for the last 5 seconds."""
-        # Add current detection event
-        self.detection_events.append((current_time, any_detected))
-
-        # Remove events older than rolling window
-        cutoff_time = current_time - self.rolling_window_seconds
-        self.detection_events = [
-            (timestamp, detected)
-            for timestamp, detected in self.detection_events
-            if timestamp >= cutoff_time
-        ]
-
-    def get_rolling_detection_rate(self):
-        """Calculate detection rate for the rolling window."""
-        if not self.detection_events:
-            return 0.0
-
-        detected_count = sum(1 for _, detected in self.detection_events if detected)
-        return detected_count / len(self.detection_events)
-
-    def update_frame_detections(self, current_time, detected):
-        """Track frame-level detection events for recency weighting."""
-        self.frame_detections.append((current_time, detected))
-
-    def evaluate_recency_weighting(self, current_time):
-        """
-        Evaluate detection using recency weighting logic.
-
-        Returns:
-            tuple: (overall_rate, recent_rate, detection_decision, decision_reason)
-        """
-        # Get recency weighting configuration
-        recent_window_duration = (
-            get_detection_timing_param("recent_window_duration") or 3
-        )
-        recent_window_threshold = (
-            get_detection_timing_param("recent_window_threshold") or 0.7
-        )
-        overall_threshold = get_detection_param("threshold") or 0.5
-
-        if not self.frame_detections:
-            return 0.0, 0.0, False, "No frame data"
-
-        # Calculate overall detection rate
-        overall_detected = sum(1 for _, detected in self.frame_detections if detected)
-        overall_rate = overall_detected / len(self.frame_detections)
-
-        # Calculate recent window detection rate
-        recent_cutoff = current_time - recent_window_duration
-        recent_frames = [
-            (timestamp, detected)
-            for timestamp, detected in self.frame_detections
-            if timestamp >= recent_cutoff
-        ]
-
-        if recent_frames:
-            recent_detected = sum(1 for _, detected in recent_frames if detected)
-            recent_rate = recent_detected / len(recent_frames)
-        else:
-            recent_rate = 0.0
-
-        # Apply recency weighting decision logic
-        if recent_rate >= recent_window_threshold:
-            return (
-                overall_rate,
-                recent_rate,
-                True,
-                f"recent window {recent_rate:.1%} >= {recent_window_threshold:.1%}",
-            )
-        elif overall_rate >= overall_threshold:
-            return (
-                overall_rate,
-                recent_rate,
-                True,
-                f"overall window {overall_rate:.1%} >= {overall_threshold:.1%}",
+        for track in results["_tracks"]:
+            top, right, bottom, left = track.box
+            if track.recognized:
+                # Green box for recognized person
+                color = self.colors["facial_recognition"]
+                label = f"RECOGNIZED ({track.confidence:.2f})"
+                thickness = 4
+            elif track.recognized is False:
+                # Red box for unknown person
+                color = self.colors["unknown_person"]
+                label = f"UNKNOWN ({track.confidence:.2f})"
+                thickness = 3
+            else:
+                color = self.colors["mediapipe_face"]
+                label = "MediaPipe Face"
+                thickness = 2
+            cv2.rectangle(annotated_frame, (left, top), (right, bottom), color, thickness)
+            cv2.putText(
+                annotated_frame,
+                f"#{track.id} {label}",
+                (left, top - 10),
+                cv2.FONT_HERSHEY_SIMPLEX,
+                0.6,
+                color,
+                2,
             )
-        else:
-            return overall_rate, recent_rate, False, "both rates below thresholds"
 
-    def clear_old_frame_detections(self, current_time, max_window_duration=10):
-        """Remove old frame detection data beyond the maximum window."""
-        cutoff_time = current_time - max_window_duration
-        self.frame_detections = [
-            (timestamp, detected)
-            for timestamp, detected in self.frame_detections
-            if timestamp >= cutoff_time
-        ]
-
-    def detect_all_methods(self, frame):
-        """Detect using facial recognition, MediaPipe and motion
-        and return results with visual annotations."""
-        results = {}
-        annotated_frame = frame.copy()
-        recognition_confidence = 0.0
+        for method in ("facial_recognition", "mediapipe_face", "motion"):
+            if results[method]:
+                self.last_detection_method = method
+                break
 
-        # PERFORMANCE OPTIMIZATION: Frame skipping for real-time display
-        self.frame_count += 1
-        # ✅ FIX: Always process first frame, then skip according to frame_skip
-        should_process = (self.frame_count == 1) or (
-            (self.frame_count - 1) % self.frame_skip == 0
-        )
+        # Track confidence history
+        if results["_new_tracks"] and results["_recognition_confidence"] > 0:
+            self.recognition_confidences.add(results["_recognition_confidence"])
 
-        if should_process:
-            self.processed_frame_count += 1
-
-        # Facial recognition (person-specific detection)
-        results["facial_recognition"] = False
-        face_locations_from_recognition = None
-
-        if (
-            should_process
-            and self.known_encodings
-            and FACE_RECOGNITION_AVAILABLE
-            and is_facial_recognition_enabled()
-        ):
-            recognized, confidence, face_locations = self.recognize_person_visual(frame)
-            results["facial_recognition"] = recognized
-            recognition_confidence = confidence
-            face_locations_from_recognition = face_locations
-
-            # Track confidence history
-            if confidence > 0:
-                self.recognition_confidences.append(confidence)
-                if len(self.recognition_confidences) > self.max_confidence_history:
-                    self.recognition_confidences.pop(0)
-
-            # Draw facial recognition results
-            if face_locations:
-                for top, right, bottom, left in face_locations:
-                    if recognized:
-                        # Green box for recognized person
-                        color = self.colors["facial_recognition"]
-                        label = f"RECOGNIZED ({confidence:.2f})"
-                        thickness = 4
-                        self.last_detection_method = "facial_recognition"
-                    else:
-                        # Red box for unknown person
-                        color = self.colors["unknown_person"]
-                        label = f"UNKNOWN ({confidence:.2f})"
-                        thickness = 3
-
-                    cv2.rectangle(
-                        annotated_frame,
-                        (left, top),
-                        (right, bottom),
-                        color,
-                        thickness,
-                    )
-                    cv2.putText(
-                        annotated_frame,
-                        label,
-                        (left, top - 10),
-                        cv2.FONT_HERSHEY_SIMPLEX,
-                        0.7,
-                        color,
-                        2,
-                    )
-
-        # Fallback detection methods (if facial recognition disabled or fallback enabled)
-        # ✅ PERFORMANCE FIX: Skip fallback methods if facial recognition already succeeded
-        skip_fallback = (
-            results["facial_recognition"] and is_facial_recognition_enabled()
-        )
-
-        # MediaPipe face detection (best for all angles and edge cases)
-        results["mediapipe_face"] = False
-        if should_process and self.face_mesh is not None and not skip_fallback:
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            mp_results = self.face_mesh.process(frame_rgb)
-            if mp_results.multi_face_landmarks:
-                results["mediapipe_face"] = True
-                self.last_detection_method = "mediapipe_face"
-                # Only draw MediaPipe landmarks if facial recognition didn't find faces
-                if not face_locations_from_recognition:
-                    # Draw face mesh landmarks for first detected face
-                    landmarks = mp_results.multi_face_landmarks[0]
-                    # Draw key landmarks for visual feedback
-                    h, w = frame.shape[:2]
-                    key_points = [
-                        10,
-                        151,
-                        9,
-                        175,
-                        197,
-                        196,
-                    ]  # Forehead, nose, chin, cheeks
-                    for point_idx in key_points:
-                        if point_idx < len(landmarks.landmark):
-                            landmark = landmarks.landmark[point_idx]
-                            x = int(landmark.x * w)
-                            y = int(landmark.y * h)
-                            cv2.circle(
-                                annotated_frame,
-                                (x, y),
-                                3,
-                                self.colors["mediapipe_face"],
-                                -1,
-                            )
-
-                    # Draw bounding box around face
-                    xs = [int(landmark.x * w) for landmark in landmarks.landmark]
-                    ys = [int(landmark.y * h) for landmark in landmarks.landmark]
-                    x_min, x_max = min(xs), max(xs)
-                    y_min, y_max = min(ys), max(ys)
-                    cv2.rectangle(
-                        annotated_frame,
-                        (x_min - 10, y_min - 10),
-                        (x_max + 10, y_max + 10),
-                        self.colors["mediapipe_face"],
-                        2,
-                    )
-                    cv2.putText(
-                        annotated_frame,
-                        "MediaPipe Face",
-                        (x_min - 10, y_min - 25),
-                        cv2.FONT_HERSHEY_SIMPLEX,
-                        0.6,
-                        self.colors["mediapipe_face"],
-                        2,
-                    )
-
-        # Motion detection (only if no face detection succeeded)
-        results["motion"] = False
-        if (
-            should_process
-            and self.previous_frame is not None
-            and not (results["facial_recognition"] or results["mediapipe_face"])
-        ):
-            results["motion"] = self.detect_motion(
-                self.previous_frame, frame, annotated_frame
-            )
-            if results["motion"]:
-                self.last_detection_method = "motion"
-
-        # Store additional info for status display
-        results["_recognition_confidence"] = recognition_confidence
-        results["_should_process"] = should_process
         results["_processed_frame_count"] = self.processed_frame_count
-
         return results, annotated_frame
 
     def draw_status_overlay(
@@ -585,7 +256,7 @@ class VisualFaceDetector:
 
         # Title
         title = "Enhanced Presence Detection"
-        if is_facial_recognition_enabled() and self.known_encodings:
+        if is_facial_recognition_enabled() and self.references:
             title = "Facial Recognition + Detection"
 
         cv2.putText(
@@ -603,7 +274,7 @@ class VisualFaceDetector:
         methods = []
 
         # Add facial recognition if enabled
-        if is_facial_recognition_enabled() and self.known_encodings:
+        if is_facial_recognition_enabled() and self.references:
             methods.append(("Facial Recognition", "facial_recognition"))
 
         methods.extend(
@@ -614,10 +285,10 @@ class VisualFaceDetector:
         )
 
         for method_name, method_key in methods:
-            if method_key == "mediapipe_face" and self.face_mesh is None:
+            if method_key == "mediapipe_face" and self.face_detector is None:
                 status = "DISABLED"
                 color = (128, 128, 128)  # Gray
-            elif method_key == "facial_recognition" and not self.known_encodings:
+            elif method_key == "facial_recognition" and not self.references:
                 status = "DISABLED"
                 color = (128, 128, 128)  # Gray
             else:
@@ -665,11 +336,11 @@ class VisualFaceDetector:
             y_offset += line_height
 
         # Facial recognition confidence info
-        if is_facial_recognition_enabled() and self.known_encodings:
+        if is_facial_recognition_enabled() and self.references:
             y_offset += 5
             current_confidence = results.get("_recognition_confidence", 0.0)
             avg_confidence = (
-                sum(self.recognition_confidences) / len(self.recognition_confidences)
+                self.recognition_confidences.mean()
                 if self.recognition_confidences
                 else 0.0
             )
@@ -855,7 +526,8 @@ class VisualFaceDetector:
         y_offset += line_height
         cv2.putText(
             frame,
-            f"Skip: 1:{self.frame_skip} ({processing_rate:.1%} processed)",
+            f"Skip: 1:{self.frame_skip} ({processing_rate:.1%} processed, "
+            f"lag {results.get('_frame_age', 0.0) * 1000:.0f}ms)",
             (width - 340, y_offset),
             cv2.FONT_HERSHEY_SIMPLEX,
             0.45,
@@ -872,6 +544,24 @@ class VisualFaceDetector:
             self.colors["text"],
             1,
         )
+        y_offset += line_height
+
+        # Per-stage timings of the latest frame (ms)
+        last = self.timings.last
+        stage_text = " ".join(
+            f"{label} {last[stage] * 1000:.1f}"
+            for stage, label in STAGE_LABELS.items()
+            if stage in last
+        )
+        cv2.putText(
+            frame,
+            f"ms: {stage_text}",
+            (width - 340, y_offset),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            0.4,
+            self.colors["text"],
+            1,
+        )
 
         # Detection method legend
         y_offset = height - 90
@@ -889,7 +579,7 @@ class VisualFaceDetector:
         legend_items = []
 
         # Add facial recognition to legend if enabled
-        if is_facial_recognition_enabled() and self.known_encodings:
+        if is_facial_recognition_enabled() and self.references:
             legend_items.append(("Target Person", "facial_recognition"))
             legend_items.append(("Unknown Person", "unknown_person"))
 
@@ -901,9 +591,9 @@ class VisualFaceDetector:
         )
 
         for method_name, method_key in legend_items:
-            if method_key == "mediapipe_face" and self.face_mesh is None:
+            if method_key == "mediapipe_face" and self.face_detector is None:
                 continue
-            if method_key == "facial_recognition" and not self.known_encodings:
+            if method_key == "facial_recognition" and not self.references:
                 continue
             cv2.rectangle(
                 frame,
@@ -937,25 +627,30 @@ class VisualFaceDetector:
             # Fallback to common resolution if tkinter fails
             return 1920, 1080
 
-    def run_visual_detection(self, duration=None):
-        """Run visual detection with live camera feed."""
-        cap = cv2.VideoCapture(0)
+    def run_visual_detection(self, duration=None, source="0"):
+        """Run visual detection with live camera feed (or a recorded clip)."""
+        cap = open_source(source)
         if not cap.isOpened():
-            print("❌ Cannot open camera")
+            print(f"❌ Cannot open {'camera' if source.isdigit() else source}")
             return
 
-        # ✅ PERFORMANCE FIX: Optimize camera capture
-        print("⚙️ Optimizing camera for real-time performance...")
+        pace_fps = None
+        if source.isdigit():
+            # ✅ PERFORMANCE FIX: Optimize camera capture
+            print("⚙️ Optimizing camera for real-time performance...")
 
-        # Set camera buffer to minimum to avoid frame accumulation
-        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+            # Set camera buffer to minimum to avoid frame accumulation
+            cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
 
-        # Set optimal resolution for performance (can adjust as needed)
-        cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+            # Set optimal resolution for performance (can adjust as needed)
+            cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
+            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
 
-        # Set FPS (will use what camera supports)
-        cap.set(cv2.CAP_PROP_FPS, 30)
+            # Set FPS (will use what camera supports)
+            cap.set(cv2.CAP_PROP_FPS, 30)
+        else:
+            # Play recordings in real time (debug/replay_detection.py runs them flat out)
+            pace_fps = cap.get(cv2.CAP_PROP_FPS) or 15
 
         # Check actual camera properties
         actual_fps = cap.get(cv2.CAP_PROP_FPS)
@@ -969,7 +664,7 @@ class VisualFaceDetector:
 
         print("\n🎥 Starting optimized visual detection...")
         print("📖 Legend:")
-        if self.known_encodings:
+        if self.references:
             print("   🟢 Green box = Target person recognized!")
             print("   🔴 Red box = Unknown person detected")
         print("   🟠 Orange box = MediaPipe face detected (excellent for all angles!)")
@@ -983,118 +678,96 @@ class VisualFaceDetector:
         print(
             f"\n⚡ Performance: Processing every {self.frame_skip} frames for optimal speed"
         )
+        print(f"📝 Stage timings are logged to {get_log_file('debug_face_detector')}")
+
+        # Capture runs on its own thread; this loop always works on the newest frame
+        frame_buffer = LatestFrameBuffer()
+        capture = CaptureThread(cap, frame_buffer, self.timings, pace_fps)
+        capture.start()
 
         start_time = time.time()
         frames_with_detection = 0
         processed_frames = 0  # ✅ Track processed frames separately
         fullscreen = False
         screen_width, screen_height = self.get_screen_resolution()
-
-        # ✅ PERFORMANCE FIX: Frame dropping variables
-        last_process_time = time.time()
-        target_process_interval = (
-            1.0 / 15
-        )  # Process at most 15 FPS for face recognition
-        frames_dropped = 0
+        next_timing_log = time.monotonic() + TIMING_LOG_INTERVAL
 
         # Initialize variables to prevent UnboundLocalError
         detection_rate = 0.0
         elapsed_time = 0.0
+        frame = None
+        seq = 0
 
         try:
             while True:
-                # ✅ PERFORMANCE FIX: Read frame and check timing
-                ret, frame = cap.read()
-                if not ret:
-                    print("❌ Can't receive frame from camera")
+                # Hand back the last frame and wait for one at least frame_skip newer
+                taken = frame_buffer.take(done_with=frame, min_seq=seq + self.frame_skip)
+                if taken is None:
+                    if source.isdigit():
+                        print("❌ Can't receive frame from camera")
+                    else:
+                        print("\n🎞️ End of recording")
                     break
-
-                self.frame_count += 1
+                frame, new_seq, captured_at = taken
+                self.frame_count += new_seq - seq
+                seq = new_seq
                 current_time = time.time()
+                processed_frames += 1  # ✅ Count processed frames correctly
 
-                # ✅ PERFORMANCE FIX: Drop frames to maintain real-time performance
-                time_since_last_process = current_time - last_process_time
-                should_process_frame = (
-                    time_since_last_process >= target_process_interval
-                    or self.frame_count % self.frame_skip == 0
-                )
-
-                if not should_process_frame:
-                    frames_dropped += 1
-                    # Still show the frame but don't do heavy processing
-                    display_frame = frame.copy()
+                # Detect using the cascade
+                results, display_frame = self.detect_all_methods(frame)
+                results["_frame_age"] = time.perf_counter() - captured_at
 
-                    # Add simple "dropping frames" indicator
-                    cv2.putText(
-                        display_frame,
-                        f"Live view (dropped {frames_dropped} frames for performance)",
-                        (10, 30),
-                        cv2.FONT_HERSHEY_SIMPLEX,
-                        0.6,
-                        (255, 255, 0),  # Yellow
-                        2,
-                    )
-                else:
-                    # ✅ PERFORMANCE FIX: Process this frame
-                    last_process_time = current_time
-                    frames_dropped = 0
-                    processed_frames += 1  # ✅ Count processed frames correctly
-
-                    # Detect using all methods
-                    results, annotated_frame = self.detect_all_methods(frame)
-                    display_frame = annotated_frame
-
-                    # Update statistics
-                    any_detected = any(
-                        v
-                        for k, v in results.items()
-                        if not k.startswith("_") and isinstance(v, bool)
-                    )
-                    if any_detected:
-                        frames_with_detection += 1
-                        self.detection_stats["total_detections"] += 1
-
-                    for method, detected in results.items():
-                        if (
-                            not method.startswith("_")
-                            and detected
-                            and isinstance(detected, bool)
-                        ):
-                            self.detection_stats[method] += 1
-
-                    # ✅ FIX: Calculate detection rates based on PROCESSED frames only
-                    detection_rate = (
-                        frames_with_detection / processed_frames
-                        if processed_frames > 0
-                        else 0
-                    )
-                    elapsed_time = time.time() - start_time
-
-                    # Update rolling detection rate (5-second window for display)
-                    self.update_rolling_detection_rate(current_time, any_detected)
-                    rolling_detection_rate = self.get_rolling_detection_rate()
+                # Update statistics
+                any_detected = any(
+                    v
+                    for k, v in results.items()
+                    if not k.startswith("_") and isinstance(v, bool)
+                )
+                if any_detected:
+                    frames_with_detection += 1
+                    self.detection_stats["total_detections"] += 1
+
+                for method, detected in results.items():
+                    if (
+                        not method.startswith("_")
+                        and detected
+                        and isinstance(detected, bool)
+                    ):
+                        self.detection_stats[method] += 1
+
+                # ✅ FIX: Calculate detection rates based on PROCESSED frames only
+                detection_rate = (
+                    frames_with_detection / processed_frames
+                    if processed_frames > 0
+                    else 0
+                )
+                elapsed_time = time.time() - start_time
 
-                    # Update frame-level detections for recency weighting
-                    self.update_frame_detections(current_time, any_detected)
-                    self.clear_old_frame_detections(current_time)
+                # Update rolling detection rate (5-second window for display)
+                self.rolling_rate.add(current_time, any_detected)
+                rolling_detection_rate = self.rolling_rate.rate()
 
-                    # Evaluate recency weighting for detection decision
-                    overall_rate, recent_rate, recency_decision, decision_reason = (
-                        self.evaluate_recency_weighting(current_time)
-                    )
+                # Recency weighting for the detection decision
+                self.presence.add(current_time, any_detected)
+                overall_rate, recent_rate, recency_decision, decision_reason = (
+                    self.presence.evaluate()
+                )
 
-                    # Draw status overlay on the annotated frame before scaling
-                    self.draw_status_overlay(
-                        display_frame,
-                        results,
-                        detection_rate,
-                        elapsed_time,
-                        rolling_detection_rate,
-                        overall_rate,
-                        recent_rate,
-                        recency_decision,
-                        decision_reason,
-                    )
+                draw_start = time.perf_counter()
+
+                # Draw status overlay on the annotated frame before scaling
+                self.draw_status_overlay(
+                    display_frame,
+                    results,
+                    detection_rate,
+                    elapsed_time,
+                    rolling_detection_rate,
+                    overall_rate,
+                    recent_rate,
+                    recency_decision,
+                    decision_reason,
+                )
 
                 # Scale frame if in fullscreen mode
                 if fullscreen:
@@ -1126,12 +799,19 @@ class VisualFaceDetector:
                     ] = display_frame
                     display_frame = full_frame
 
-                # Store frame for motion detection (use original size)
-                self.previous_frame = frame.copy()
-
                 # Display the frame
                 window_name = "Optimized Human Presence Detection - Debug View"
                 cv2.imshow(window_name, display_frame)
+                self.timings.add("draw", time.perf_counter() - draw_start)
+
+                if time.monotonic() >= next_timing_log:
+                    next_timing_log += TIMING_LOG_INTERVAL
+                    self.logger.info(
+                        f"{format_summary(self.timings.summary())}; "
+                        f"lag {results['_frame_age'] * 1000:.0f}ms, "
+                        f"{frame_buffer.overwritten} of {frame_buffer.published} "
+                        f"frames superseded before detection"
+                    )
 
                 # ✅ PERFORMANCE FIX: Minimal wait time for responsiveness
                 key = cv2.waitKey(1) & 0xFF
@@ -1176,15 +856,18 @@ class VisualFaceDetector:
                     break
 
         finally:
+            # Let the capture thread finish its read before releasing the camera
+            capture.stop()
+            capture.join(timeout=2)
             cap.release()
             cv2.destroyAllWindows()
 
             # Clean up MediaPipe resources
-            if self.face_mesh is not None:
+            if self.face_detector is not None:
                 try:
-                    self.face_mesh.close()
+                    self.face_detector.close()
                 except Exception as e:
-                    print(f"Warning: Error closing MediaPipe face mesh: {e}")
+                    print(f"Warning: Error closing MediaPipe face detection: {e}")
 
             # Print final statistics
             self.print_final_stats(detection_rate, elapsed_time, processed_frames)
@@ -1200,9 +883,9 @@ class VisualFaceDetector:
             "total_detections": 0,
         }
         # Reset rolling window and confidence tracking
-        self.detection_events = []
-        self.recognition_confidences = []
-        self.frame_detections = []
+        self.rolling_rate.clear()
+        self.recognition_confidences.clear()
+        self.presence.clear()
 
     def print_final_stats(self, detection_rate, elapsed_time, processed_frames=None):
         """Print final detection statistics."""
@@ -1234,7 +917,7 @@ class VisualFaceDetector:
         for method, count in self.detection_stats.items():
             if method == "total_detections":
                 continue
-            if method == "mediapipe_face" and self.face_mesh is None:
+            if method == "mediapipe_face" and self.face_detector is None:
                 print(f"  🔸 {method.replace('_', ' ').title()}: DISABLED")
                 continue
             percentage = (count / self.frame_count * 100) if self.frame_count > 0 else 0
@@ -1281,6 +964,12 @@ def main():
         default=None,
         help="Duration to run detection (seconds). Default: unlimited",
     )
+    parser.add_argument(
+        "--source",
+        "-s",
+        default="0",
+        help="Camera index, video file or image directory. Default: camera 0",
+    )
     parser.add_argument(
         "--test-config",
         action="store_true",
@@ -1288,6 +977,14 @@ def main():
     )
     args = parser.parse_args()
 
+    # Stage timings go to the log file; the console keeps the human-readable output
+    logging.basicConfig(
+        level=logging.INFO,
+        format=LOGGING_CONFIG["format"],
+        datefmt=LOGGING_CONFIG["date_format"],
+        handlers=[logging.FileHandler(get_log_file("debug_face_detector"))],
+    )
+
     print("🔍 Optimized Human Presence Detection - Visual Debug Tool")
     print("=" * 60)
 
@@ -1310,7 +1007,7 @@ def main():
 
     # Run visual detection
     try:
-        detector.run_visual_detection(args.duration)
+        detector.run_visual_detection(args.duration, args.source)
     except KeyboardInterrupt:
         print("\n\n⛔ Interrupted by user")
     except Exception as e:
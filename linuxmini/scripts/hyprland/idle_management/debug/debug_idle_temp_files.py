@@ -11,7 +11,7 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Import centralized configuration
 from config import (  # noqa: E402
-    CONTROL_FILES,
+    CONTROL_SOCKET,
     STATUS_FILES,
     get_all_log_files,
     get_check_interval,
@@ -28,8 +28,7 @@ files_to_monitor = {
 
 # Additional control files to monitor (non-log files)
 control_files = {
-    str(CONTROL_FILES["idle_simple_lock_exit"]): "Lock Exit Flag",
-    str(CONTROL_FILES["in_office_monitor_exit"]): "Office Monitor Exit Flag",
+    str(CONTROL_SOCKET): "Presence Monitor Socket",
 }
 
 # Log files to monitor separately
@@ -0,0 +1,283 @@
+#!/home/rash/.config/scripts/hyprland/idle_management/.venv/bin/python
+
+"""
+Offline replay benchmark for the presence detection cascade.
+
+Runs recorded clips (video files or directories of images) through
+presence_cascade.DetectionCascade headless, as fast as the CPU allows, on
+a virtual clock that follows the clip's own frame times. Reports the
+detection FPS, CPU time per frame, and precision/recall of each method
+and of the recency-weighted decision against ground truth labels, for
+every combination of the configurations given.
+
+Labels are the intervals (in clip seconds) where someone is present, one
+"<start> <end>" per line, in <clip>.labels next to a video file or
+labels.txt inside an image directory:
+    # arrives, leaves for coffee, comes back
+    2.0 41.5
+    63 120
+
+Configurations are the cartesian product of the --set and --frame-skip
+values; --set takes a DETECTION_PARAMS section ("facial_recognition" for
+FACIAL_RECOGNITION) and a comma-separated list of values:
+
+    replay_detection.py desk.mp4 empty_room.mp4 \\
+        --frame-skip 1,2,3 --set motion.min_area=100,200,400 \\
+        --set facial_recognition.tolerance=0.5,0.6
+"""
+
+import argparse
+import itertools
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import cv2
+
+# Add parent directory to path to import config
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import config  # noqa: E402
+from face_references import ReferenceEncodings  # noqa: E402
+from frame_capture import open_source  # noqa: E402
+from presence_cascade import (  # noqa: E402
+    FACE_RECOGNITION_AVAILABLE,
+    MEDIAPIPE_AVAILABLE,
+    DetectionCascade,
+    FaceRecognizer,
+    MediaPipeFaceDetector,
+)
+from rolling_stats import RecencyWeightedPresence  # noqa: E402
+
+METHODS = ("facial_recognition", "mediapipe_face", "motion", "present", "decision")
+METHOD_LABELS = {
+    "facial_recognition": "recognized",
+    "mediapipe_face": "face",
+    "motion": "motion",
+    "present": "any",
+    "decision": "decision",  # Recency-weighted, as the detector reports it
+}
+
+
+class VirtualClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def labels_path(clip):
+    clip = Path(clip)
+    if clip.is_dir():
+        return clip / "labels.txt"
+    return clip.with_name(clip.name + ".labels")
+
+
+def parse_labels(path):
+    """Sorted (start, end) present intervals in seconds."""
+    intervals = []
+    with open(path) as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            start, end = (float(v) for v in line.split()[:2])
+            intervals.append((start, end))
+    return sorted(intervals)
+
+
+def is_present(intervals, t):
+    return any(start <= t < end for start, end in intervals)
+
+
+def parse_setting(text):
+    """"section.key=v1,v2" -> (section, key, [values])."""
+    name, _, values = text.partition("=")
+    section, _, key = name.partition(".")
+    if not values or not key:
+        raise argparse.ArgumentTypeError(f"expected section.key=v1,v2: {text}")
+    return section, key, [parse_value(v) for v in values.split(",")]
+
+
+def parse_value(text):
+    for convert in (int, float):
+        try:
+            return convert(text)
+        except ValueError:
+            pass
+    return text
+
+
+def settings_table(section):
+    if section == "facial_recognition":
+        return config.FACIAL_RECOGNITION
+    return config.DETECTION_PARAMS[section]
+
+
+@contextmanager
+def overrides(values):
+    """Temporarily apply {(section, key): value} to the config dicts."""
+    saved = {}
+    try:
+        for (section, key), value in values.items():
+            table = settings_table(section)
+            saved[(section, key)] = table.get(key)
+            table[key] = value
+        yield
+    finally:
+        for (section, key), value in saved.items():
+            settings_table(section)[key] = value
+
+
+class Score:
+    """Confusion counts for one method."""
+
+    def __init__(self):
+        self.tp = self.fp = self.fn = self.tn = 0
+
+    def add(self, predicted, actual):
+        if predicted and actual:
+            self.tp += 1
+        elif predicted:
+            self.fp += 1
+        elif actual:
+            self.fn += 1
+        else:
+            self.tn += 1
+
+    def precision(self):
+        return self.tp / (self.tp + self.fp) if self.tp + self.fp else None
+
+    def recall(self):
+        return self.tp / (self.tp + self.fn) if self.tp + self.fn else None
+
+
+def build_cascade(clock, references):
+    detector = None
+    if MEDIAPIPE_AVAILABLE and config.is_detection_method_enabled("mediapipe_face"):
+        detector = MediaPipeFaceDetector()
+    recognizer = FaceRecognizer(references) if references else None
+    return DetectionCascade(detector, recognizer, clock)
+
+
+def replay_clip(clip, intervals, frame_skip, references, scores):
+    """Run one clip; returns (processed frames, detection wall s, CPU s, decode s)."""
+    cap = open_source(clip)
+    if not cap.isOpened():
+        raise OSError(f"Cannot open {clip}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 15
+    clock = VirtualClock()
+    cascade = build_cascade(clock, references)
+    presence = RecencyWeightedPresence()
+    processed = 0
+    wall = cpu = decode = 0.0
+    frame = None
+    index = 0
+    try:
+        while True:
+            start = time.perf_counter()
+            ok, frame = cap.read(frame) if frame is not None else cap.read()
+            decode += time.perf_counter() - start
+            if not ok:
+                break
+            index += 1
+            if (index - 1) % frame_skip:
+                continue
+
+            clock.now = (index - 1) / fps
+            start, start_cpu = time.perf_counter(), time.process_time()
+            results = cascade.process(frame)
+            cpu += time.process_time() - start_cpu
+            wall += time.perf_counter() - start
+            processed += 1
+
+            actual = is_present(intervals, clock.now)
+            results["present"] = any(results[method] for method in METHODS[:3])
+            presence.add(clock.now, results["present"])
+            results["decision"] = presence.evaluate()[2]
+            for method in METHODS:
+                scores[method].add(results[method], actual)
+    finally:
+        cap.release()
+        if cascade.face_detector is not None:
+            cascade.face_detector.close()
+    return processed, wall, cpu, decode
+
+
+def format_ratio(value):
+    return "  —  " if value is None else f"{value:5.1%}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded clips through the detection cascade")
+    parser.add_argument("clips", nargs="+", help="Video files or image directories")
+    parser.add_argument("--labels", help="Labels file (only with a single clip)")
+    parser.add_argument(
+        "--frame-skip", default="1",
+        help="Comma-separated frame skip values to compare (default: 1)",
+    )
+    parser.add_argument(
+        "--set", dest="settings", action="append", default=[], type=parse_setting,
+        metavar="SECTION.KEY=V1,V2", help="Config values to compare",
+    )
+    args = parser.parse_args()
+
+    if args.labels and len(args.clips) > 1:
+        parser.error("--labels can only be used with a single clip")
+    clips = []
+    for clip in args.clips:
+        path = Path(args.labels) if args.labels else labels_path(clip)
+        try:
+            clips.append((clip, parse_labels(path)))
+        except OSError as e:
+            parser.error(f"No labels for {clip}: {e}")
+
+    references = None
+    if FACE_RECOGNITION_AVAILABLE and config.is_facial_recognition_enabled():
+        references = ReferenceEncodings.load() or None
+    if not MEDIAPIPE_AVAILABLE:
+        print("⚠ MediaPipe not available: face detection not included")
+    if references is None:
+        print("⚠ No face recognition (library missing or no references)")
+
+    frame_skips = [int(v) for v in args.frame_skip.split(",")]
+    names = [(section, key) for section, key, _ in args.settings]
+    combos = list(itertools.product(frame_skips, *(values for _, _, values in args.settings)))
+
+    header = f"{'config':<40} {'frames':>7} {'fps':>7} {'cpu ms':>7}"
+    for method in METHODS:
+        header += f" {METHOD_LABELS[method] + ' P/R':>11}"
+    print(header)
+
+    for combo in combos:
+        frame_skip, values = combo[0], dict(zip(names, combo[1:]))
+        label = " ".join(
+            [f"skip={frame_skip}"] + [f"{key}={value}" for (_, key), value in values.items()]
+        )
+        scores = {method: Score() for method in METHODS}
+        processed = 0
+        wall = cpu = decode = 0.0
+        with overrides(values):
+            for clip, intervals in clips:
+                counts = replay_clip(clip, intervals, frame_skip, references, scores)
+                processed += counts[0]
+                wall += counts[1]
+                cpu += counts[2]
+                decode += counts[3]
+
+        row = (
+            f"{label:<40} {processed:>7} {processed / wall if wall else 0:>7.0f} "
+            f"{cpu / processed * 1000 if processed else 0:>7.2f}"
+        )
+        for method in METHODS:
+            row += f" {format_ratio(scores[method].precision())}/{format_ratio(scores[method].recall())}"
+        print(row)
+
+    print(f"\n(decoding the clips takes {decode:.1f}s per configuration, not counted above)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
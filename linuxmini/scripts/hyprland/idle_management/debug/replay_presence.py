@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+
+"""
+Deterministic replay harness for the presence state machine (presence.py).
+
+Feeds a timeline of status changes through PresenceMachine on a virtual
+clock and records the actions it takes, so transitions can be checked
+without hyprlock, hyprctl, Home Assistant or real waiting.
+
+Timeline lines are "<seconds> <event> [arg]":
+    0 in_office on
+    60 idle lock
+    90 in_office off
+    95 unlock          # hyprlock exited (fake lock state only)
+    100 resume
+
+Usage:
+    replay_presence.py                  # run the built-in scenarios
+    replay_presence.py timeline.txt     # print the actions for a timeline
+"""
+
+import argparse
+import logging
+import os
+import sys
+
+# Add parent directory to path to import config
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from presence import PresenceMachine, Scheduler  # noqa: E402
+
+# Built-in scenarios: timeline and the actions expected, as "<t> <action>"
+SCENARIOS = {
+    "leave": (
+        ["0 in_office on", "10 in_office off"],
+        ["10 lock", "43 dpms_off", "43 office_devices_off"],
+    ),
+    "return_during_lock_wait": (
+        ["0 in_office on", "10 in_office off", "20 in_office on"],
+        ["10 lock", "20 dpms_on"],
+    ),
+    "unlocked_before_dpms_off": (
+        ["0 in_office on", "10 in_office off", "20 unlock"],
+        ["10 lock"],
+    ),
+    "return_after_dpms_off": (
+        ["0 in_office on", "10 in_office off", "100 in_office on"],
+        ["10 lock", "43 dpms_off", "43 office_devices_off", "100 dpms_on"],
+    ),
+    "started_away": (
+        ["0 in_office off"],
+        [],
+    ),
+    "idle_lock_waits_for_off": (
+        ["0 in_office on", "60 idle lock", "90 in_office off"],
+        ["90 lock", "123 dpms_off", "123 office_devices_off"],
+    ),
+    "idle_dpms_while_away": (
+        ["0 in_office off", "120 idle dpms"],
+        ["120 dpms_off"],
+    ),
+    "idle_dpms_cancelled_by_resume": (
+        ["0 in_office on", "120 idle dpms", "130 resume", "200 in_office off"],
+        ["200 lock", "233 dpms_off", "233 office_devices_off"],
+    ),
+    "idle_dpms_then_leave": (
+        ["0 in_office on", "120 idle dpms", "200 in_office off"],
+        ["200 lock", "200 dpms_off", "233 office_devices_off"],
+    ),
+    "unavailable_is_ignored": (
+        ["0 in_office on", "10 in_office unavailable", "20 in_office on"],
+        [],
+    ),
+}
+
+
+class VirtualClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeActions:
+    """Records actions with their virtual time and tracks a fake lock state."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.locked = False
+        self.log = []
+
+    def _record(self, name):
+        self.log.append(f"{self.clock():g} {name}")
+
+    def lock(self):
+        # Mirrors lock_computer: nothing happens if hyprlock is already running
+        if not self.locked:
+            self.locked = True
+            self._record("lock")
+
+    def is_locked(self):
+        return self.locked
+
+    def dpms_on(self):
+        self._record("dpms_on")
+
+    def dpms_off(self):
+        self._record("dpms_off")
+
+    def office_devices_off(self):
+        self._record("office_devices_off")
+
+
+def parse_timeline(lines):
+    """Parse timeline lines into sorted (time, event, arg) tuples."""
+    events = []
+    for line in lines:
+        line = line.split("#", 1)[0].strip()
+        if not line:
+            continue
+        parts = line.split()
+        events.append((float(parts[0]), parts[1], parts[2] if len(parts) > 2 else None))
+    return sorted(events, key=lambda event: event[0])
+
+
+def replay(lines, timings=None):
+    """Replay a timeline and return the recorded actions."""
+    clock = VirtualClock()
+    scheduler = Scheduler(clock)
+    actions = FakeActions(clock)
+    machine = PresenceMachine(actions, scheduler, timings)
+
+    def advance(to):
+        while (deadline := scheduler.next_deadline()) is not None and deadline <= to:
+            clock.now = deadline
+            scheduler.run_due()
+        clock.now = to
+
+    for at, event, arg in parse_timeline(lines):
+        advance(at)
+        if event == "in_office":
+            machine.on_in_office(arg)
+        elif event == "idle":
+            machine.on_idle(arg)
+        elif event == "resume":
+            machine.on_resume()
+        elif event == "unlock":
+            actions.locked = False
+        else:
+            raise ValueError(f"Unknown timeline event: {event}")
+
+    # Let any pending timers fire
+    deadline = scheduler.next_deadline()
+    if deadline is not None:
+        advance(deadline + 3600)
+    return actions.log
+
+
+def run_scenarios():
+    """Run the built-in scenarios; returns the number of failures."""
+    timings = {"hyprlock_startup": 3, "dpms_off_delay": 30}
+    failures = 0
+    for name, (timeline, expected) in SCENARIOS.items():
+        actual = replay(timeline, timings)
+        if actual == expected:
+            print(f"✓ {name}")
+        else:
+            failures += 1
+            print(f"✗ {name}")
+            print(f"    expected: {expected}")
+            print(f"    actual:   {actual}")
+    print(f"\n{len(SCENARIOS) - failures}/{len(SCENARIOS)} scenarios passed")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay presence timelines")
+    parser.add_argument("timeline", nargs="?", help="Timeline file (default: built-in scenarios)")
+    parser.add_argument("--debug", action="store_true", help="Show state machine logging")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.DEBUG if args.debug else logging.WARNING,
+        format="%(levelname)s - %(message)s",
+    )
+
+    if args.timeline is None:
+        return 1 if run_scenarios() else 0
+
+    with open(args.timeline) as f:
+        for action in replay(f.readlines()):
+            print(action)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+
+"""
+Reference face encodings for person-specific presence detection.
+
+The encodings of every image in the reference directory are kept as one
+contiguous float32 matrix (one 128-d row per image). Computing them with
+face_recognition takes seconds, so the matrix is cached in an .npz keyed
+by a hash of the image files and only rebuilt when the images change.
+
+Matching compares all faces in a frame against all references with one
+matrix product, instead of a face_distance call plus a compare_faces call
+(which recomputes the same distances) per face. The cost is a few
+microseconds even for hundreds of references, so the whole reference set
+is used.
+
+Run directly to rebuild the cache or benchmark matching:
+    face_references.py --rebuild
+    face_references.py --benchmark [--faces 2] [--iterations 200]
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from config import get_facial_recognition_param
+
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png")
+ENCODING_SIZE = 128
+CACHE_VERSION = 1  # Bump when the encoding parameters or layout change
+
+
+def list_reference_images(reference_dir):
+    """Reference image paths, in a stable order."""
+    try:
+        entries = sorted(Path(reference_dir).iterdir())
+    except OSError:
+        return []
+    return [p for p in entries if p.suffix.lower() in IMAGE_SUFFIXES and p.is_file()]
+
+
+def hash_images(paths):
+    """Hash of the images' names and contents, plus the encoding settings."""
+    digest = hashlib.sha256()
+    digest.update(
+        f"{CACHE_VERSION}:{get_facial_recognition_param('face_detection_model')}:"
+        f"{get_facial_recognition_param('num_jitters')}".encode()
+    )
+    for path in paths:
+        digest.update(path.name.encode() + b"\0")
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def encode_images(paths, log=print):
+    """Encode the first face of each image; images without a face are skipped."""
+    import face_recognition
+
+    rows = []
+    sources = []
+    for path in paths:
+        image = face_recognition.load_image_file(str(path))
+        encodings = face_recognition.face_encodings(
+            image,
+            model=get_facial_recognition_param("face_detection_model"),
+            num_jitters=get_facial_recognition_param("num_jitters"),
+        )
+        if not encodings:
+            log(f"⚠ No face found in reference image {path.name}, skipping")
+            continue
+        if len(encodings) > 1:
+            log(f"⚠ {len(encodings)} faces in {path.name}, using the first")
+        rows.append(encodings[0])
+        sources.append(path.name)
+    return np.asarray(rows, dtype=np.float32).reshape(-1, ENCODING_SIZE), sources
+
+
+class ReferenceEncodings:
+    """Reference encodings as one float32 matrix, matched in a single batch."""
+
+    def __init__(self, matrix, sources=()):
+        self.matrix = np.ascontiguousarray(matrix, dtype=np.float32).reshape(
+            -1, ENCODING_SIZE
+        )
+        self.sources = list(sources)
+        # |r|^2 per reference, so distances need only one matrix product per frame
+        self.sq_norms = np.einsum("ij,ij->i", self.matrix, self.matrix)
+
+    def __len__(self):
+        return len(self.matrix)
+
+    @classmethod
+    def load(cls, reference_dir=None, cache_file=None, rebuild=False, log=print):
+        """Load from the cache, re-encoding the images if they changed."""
+        reference_dir = Path(reference_dir or get_facial_recognition_param("reference_dir"))
+        cache_file = Path(cache_file or get_facial_recognition_param("encodings_cache"))
+        paths = list_reference_images(reference_dir)
+        if not paths:
+            log(f"⚠ No reference images in {reference_dir}")
+            return cls(np.empty((0, ENCODING_SIZE), np.float32))
+        source_hash = hash_images(paths)
+
+        if not rebuild:
+            try:
+                with np.load(cache_file) as cached:
+                    if str(cached["source_hash"]) == source_hash:
+                        return cls(cached["encodings"], cached["sources"].tolist())
+                log("Reference images changed, re-encoding...")
+            except (OSError, KeyError, ValueError):
+                log("No reference encoding cache, encoding images...")
+
+        start = time.perf_counter()
+        matrix, sources = encode_images(paths, log)
+        log(
+            f"Encoded {len(sources)} of {len(paths)} reference images "
+            f"in {time.perf_counter() - start:.1f}s"
+        )
+        references = cls(matrix, sources)
+        references.save(cache_file, source_hash)
+        return references
+
+    def save(self, cache_file, source_hash):
+        cache_file = Path(cache_file)
+        tmp = cache_file.with_name(cache_file.name + ".tmp.npz")
+        try:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            np.savez(
+                tmp,
+                encodings=self.matrix,
+                sources=np.array(self.sources, dtype=str),
+                source_hash=np.array(source_hash),
+            )
+            os.replace(tmp, cache_file)
+        except OSError as e:
+            print(f"⚠ Failed to write reference encoding cache: {e}")
+
+    def distances(self, face_encodings):
+        """Euclidean distance of every face to every reference, shape (faces, refs)."""
+        faces = np.asarray(face_encodings, dtype=np.float32).reshape(-1, ENCODING_SIZE)
+        # |f - r|^2 = |f|^2 + |r|^2 - 2 f.r
+        sq = np.einsum("ij,ij->i", faces, faces)[:, None] + self.sq_norms[None, :]
+        sq -= 2.0 * (faces @ self.matrix.T)
+        np.maximum(sq, 0.0, out=sq)  # Rounding can dip just below zero
+        return np.sqrt(sq, out=sq)
+
+    def best_distances(self, face_encodings):
+        """Distance of each face to its closest reference (inf without references)."""
+        if not len(self) or not len(face_encodings):
+            return np.full(len(face_encodings), np.inf, dtype=np.float32)
+        return self.distances(face_encodings).min(axis=1)
+
+
+def per_face_match(known_encodings, face_encodings, tolerance):
+    """The old matching loop: face_distance, then compare_faces, for each face."""
+    best = []
+    for face_encoding in face_encodings:
+        # face_recognition.face_distance and compare_faces are both this norm
+        distances = np.linalg.norm(known_encodings - face_encoding, axis=1)
+        matches = list(np.linalg.norm(known_encodings - face_encoding, axis=1) <= tolerance)
+        best.append((np.min(distances), any(matches)))
+    return best
+
+
+def benchmark(faces, iterations, counts=(5, 10, 25, 50, 100, 250, 500, 1000)):
+    """Per-frame matching time against the reference count, old loop vs batched."""
+    rng = np.random.default_rng(0)
+    tolerance = get_facial_recognition_param("tolerance")
+    frame = rng.normal(0, 0.1, (faces, ENCODING_SIZE))
+    print(f"Matching {faces} face(s) per frame, {iterations} frames per row")
+    print(f"{'refs':>6} {'per-face loop':>15} {'batched':>10} {'speedup':>8}")
+    for count in counts:
+        known = rng.normal(0, 0.1, (count, ENCODING_SIZE))
+        references = ReferenceEncodings(known)
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            per_face_match(known, frame, tolerance)
+        loop = (time.perf_counter() - start) / iterations
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            references.best_distances(frame) <= tolerance
+        batched = (time.perf_counter() - start) / iterations
+
+        print(
+            f"{count:>6} {loop * 1e6:>12.1f} µs {batched * 1e6:>7.1f} µs "
+            f"{loop / batched:>7.1f}x"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reference face encoding cache")
+    parser.add_argument("--rebuild", action="store_true", help="Re-encode the reference images")
+    parser.add_argument("--benchmark", action="store_true", help="Time matching vs reference count")
+    parser.add_argument("--faces", type=int, default=1, help="Faces per frame (benchmark)")
+    parser.add_argument("--iterations", type=int, default=200, help="Frames per row (benchmark)")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.faces, args.iterations)
+        return 0
+
+    references = ReferenceEncodings.load(rebuild=args.rebuild)
+    print(f"{len(references)} reference encodings: {', '.join(references.sources)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
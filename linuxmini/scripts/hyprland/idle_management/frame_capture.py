@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+
+"""
+Threaded webcam capture with a single-slot latest-frame buffer.
+
+CaptureThread reads frames as fast as the camera delivers them and hands
+each one to LatestFrameBuffer, which keeps only the newest. The detection
+loop takes the newest frame whenever it is ready for one, so slow
+inference drops stale frames instead of falling behind the camera and
+adding lag.
+
+Three frame arrays circulate between the capture thread, the buffer slot
+and the reader. cv2.VideoCapture.read() decodes into whichever array was
+handed back, so frames are not copied or reallocated per read.
+
+StageTimings keeps per-stage durations (capture, gate, convert, detect,
+recognize, draw) for the overlay and a periodic log line.
+
+open_source() opens a camera, a video file or a directory of images, so
+recorded clips can go through the same pipeline as the webcam.
+"""
+
+import threading
+import time
+from pathlib import Path
+
+import cv2
+
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png", ".bmp")
+DEFAULT_SEQUENCE_FPS = 15
+
+
+class ImageSequence:
+    """A directory of images, in name order, read like a cv2.VideoCapture."""
+
+    def __init__(self, directory, fps=DEFAULT_SEQUENCE_FPS):
+        self.paths = sorted(
+            p for p in Path(directory).iterdir() if p.suffix.lower() in IMAGE_SUFFIXES
+        )
+        self.fps = fps
+        self.index = 0
+
+    def isOpened(self):
+        return bool(self.paths)
+
+    def read(self, image=None):
+        # cv2.imread has no destination argument; image is accepted for compatibility
+        if self.index >= len(self.paths):
+            return False, None
+        frame = cv2.imread(str(self.paths[self.index]))
+        self.index += 1
+        return frame is not None, frame
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FPS:
+            return float(self.fps)
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return float(len(self.paths))
+        return 0.0
+
+    def set(self, prop, value):
+        return False
+
+    def release(self):
+        self.index = len(self.paths)
+
+
+def open_source(source, fps=None):
+    """
+    Open a camera index ("0"), a video file or an image directory.
+
+    fps overrides the frame rate of image directories (and is ignored for
+    cameras and video files, whose rate comes from the device or container).
+    """
+    source = str(source)
+    if source.isdigit():
+        return cv2.VideoCapture(int(source))
+    if Path(source).is_dir():
+        return ImageSequence(source, fps or DEFAULT_SEQUENCE_FPS)
+    return cv2.VideoCapture(source)
+
+
+class LatestFrameBuffer:
+    """Single frame slot: publishing replaces an unread frame, take() waits for a new one."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._ready = None  # (frame, seq, timestamp) not yet taken
+        self._spare = None  # Array the reader has finished with
+        self._seq = 0
+        self.closed = False
+        self.published = 0
+        self.overwritten = 0  # Frames replaced before anyone took them
+
+    def publish(self, frame, timestamp):
+        """Make frame the newest; returns an array the writer may decode into next."""
+        with self._cond:
+            self._seq += 1
+            self.published += 1
+            if self._ready is not None:
+                self.overwritten += 1
+                recycled = self._ready[0]
+            else:
+                recycled, self._spare = self._spare, None
+            self._ready = (frame, self._seq, timestamp)
+            self._cond.notify_all()
+            return recycled
+
+    def take(self, done_with=None, min_seq=0, timeout=None):
+        """
+        Wait for and return the newest (frame, seq, timestamp).
+
+        done_with is the frame the caller got last time and no longer needs;
+        it goes back to the writer. Frames numbered below min_seq are skipped.
+        Returns None once the buffer is closed or the timeout passes.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            if done_with is not None:
+                self._spare = done_with
+            while self._ready is None or self._ready[1] < min_seq:
+                if self.closed:
+                    return None
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+            ready, self._ready = self._ready, None
+            return ready
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+
+class CaptureThread(threading.Thread):
+    """Reads a cv2.VideoCapture into a LatestFrameBuffer until stopped or out of frames."""
+
+    def __init__(self, cap, buffer, timings=None, pace_fps=None):
+        super().__init__(daemon=True, name="frame-capture")
+        self.cap = cap
+        self.buffer = buffer
+        self.timings = timings
+        # Recorded clips are read at their own frame rate, as a camera would deliver them
+        self.interval = 1.0 / pace_fps if pace_fps else 0.0
+        self.running = True
+
+    def run(self):
+        target = None
+        next_read = time.perf_counter()
+        try:
+            while self.running:
+                if self.interval:
+                    next_read += self.interval
+                    time.sleep(max(0.0, next_read - time.perf_counter()))
+                start = time.perf_counter()
+                ok, frame = self.cap.read(target) if target is not None else self.cap.read()
+                if not ok:
+                    break
+                now = time.perf_counter()
+                if self.timings is not None:
+                    self.timings.add("capture", now - start)
+                target = self.buffer.publish(frame, now)
+        finally:
+            self.buffer.close()
+
+    def stop(self):
+        self.running = False
+
+
+class StageTimings:
+    """Latest and per-interval mean/max duration of each pipeline stage."""
+
+    def __init__(self):
+        self._lock = threading.Lock()  # The capture thread adds concurrently
+        self.last = {}
+        self._sums = {}
+        self._maxes = {}
+        self._counts = {}
+
+    def add(self, stage, seconds):
+        with self._lock:
+            self.last[stage] = seconds
+            self._sums[stage] = self._sums.get(stage, 0.0) + seconds
+            self._counts[stage] = self._counts.get(stage, 0) + 1
+            if seconds > self._maxes.get(stage, 0.0):
+                self._maxes[stage] = seconds
+
+    def update(self, durations):
+        for stage, seconds in durations.items():
+            self.add(stage, seconds)
+
+    def summary(self):
+        """{stage: (calls, mean, max)} since the last summary, then start over."""
+        with self._lock:
+            result = {
+                stage: (count, self._sums[stage] / count, self._maxes[stage])
+                for stage, count in self._counts.items()
+            }
+            self._sums.clear()
+            self._maxes.clear()
+            self._counts.clear()
+        return result
+
+
+def format_summary(summary, order=("capture", "gate", "convert", "detect", "recognize", "draw")):
+    """One log line: "stage n× mean/max ms" for each stage that ran."""
+    stages = [s for s in order if s in summary] + sorted(set(summary) - set(order))
+    return ", ".join(
+        f"{stage} {summary[stage][0]}× {summary[stage][1] * 1000:.1f}/{summary[stage][2] * 1000:.1f}ms"
+        for stage in stages
+    )
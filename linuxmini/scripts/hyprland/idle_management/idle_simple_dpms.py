@@ -2,17 +2,15 @@
 
 import logging
 import subprocess
-import time
 
 # Import centralized configuration
 from config import (
     LOGGING_CONFIG,
-    get_check_interval,
-    get_control_file,
     get_log_file,
     get_status_file,
     get_system_command,
 )
+from presence import send_command
 
 
 def setup_logging():
@@ -52,49 +50,21 @@ def turn_dpms_off():
 
 
 def main():
-    """Check in_office status and turn dpms off if off, or wait for it to turn off."""
+    """Hand the idle timeout to in_office_monitor; check once if it isn't running."""
     setup_logging()
 
-    # Get control file and check interval from config
-    exit_flag = get_control_file(
-        "idle_simple_lock_exit"
-    )  # Reuse the same exit flag as lock script
-    check_interval = get_check_interval("dpms_monitoring")
+    try:
+        reply = send_command("idle dpms")
+        logging.info(f"Idle dpms handed to in_office_monitor: {reply}")
+        return
+    except (OSError, ValueError) as e:
+        logging.warning(f"in_office_monitor not reachable ({e}), checking once")
 
     office_status = get_in_office_status()
     logging.info(f"120-second timeout reached, in_office status: {office_status}")
-
     if office_status == "off":
         logging.info("in_office is OFF - turning displays off immediately")
         turn_dpms_off()
-        return
-
-    # Office is "on" - wait and monitor for status change to "off"
-    logging.info("in_office is ON - monitoring for status change to OFF")
-
-    try:
-        while True:
-            # Check for exit signal (user resumed activity)
-            if exit_flag.exists():
-                logging.info(
-                    "Exit signal received - user resumed activity, stopping DPMS monitoring"
-                )
-                return
-
-            # Check office status
-            current_status = get_in_office_status()
-
-            if current_status == "off":
-                logging.info("in_office changed to OFF - turning displays off")
-                turn_dpms_off()
-                return
-
-            time.sleep(check_interval)
-
-    except KeyboardInterrupt:
-        logging.info("Received interrupt signal")
-    except Exception as e:
-        logging.error(f"Unexpected error: {e}")
 
 
 if __name__ == "__main__":
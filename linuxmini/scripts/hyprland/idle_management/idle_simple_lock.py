@@ -2,17 +2,15 @@
 
 import logging
 import subprocess
-import time
 
 # Import centralized configuration
 from config import (
     LOGGING_CONFIG,
-    get_check_interval,
-    get_control_file,
     get_log_file,
     get_status_file,
     get_system_command,
 )
+from presence import send_command
 
 
 def setup_logging():
@@ -104,53 +102,21 @@ def lock_session():
 
 
 def main():
-    """Check in_office status and lock if off, or wait for it to turn off."""
+    """Hand the idle timeout to in_office_monitor; check once if it isn't running."""
     setup_logging()
 
-    # Get control file and check interval from config
-    exit_flag = get_control_file("idle_simple_lock_exit")
-    check_interval = get_check_interval("lock_monitoring")
-
-    # Clean up our own exit flag if it exists (from previous run)
-    exit_flag.unlink(missing_ok=True)
+    try:
+        reply = send_command("idle lock")
+        logging.info(f"Idle lock handed to in_office_monitor: {reply}")
+        return
+    except (OSError, ValueError) as e:
+        logging.warning(f"in_office_monitor not reachable ({e}), checking once")
 
     office_status = get_in_office_status()
     logging.info(f"60-second timeout reached, in_office status: {office_status}")
-
     if office_status == "off":
         logging.info("in_office is OFF - locking session immediately")
         lock_session()
-        return
-
-    # Office is "on" - wait and monitor for status change to "off"
-    logging.info("in_office is ON - monitoring for status change to OFF")
-
-    try:
-        while True:
-            # Check for exit signal (user resumed activity)
-            if exit_flag.exists():
-                logging.info(
-                    "Exit signal received - user resumed activity, stopping lock monitoring"
-                )
-                return
-
-            # Check office status
-            current_status = get_in_office_status()
-
-            if current_status == "off":
-                logging.info("in_office changed to OFF - locking session")
-                lock_session()
-                return
-
-            time.sleep(check_interval)
-
-    except KeyboardInterrupt:
-        logging.info("Received interrupt signal")
-    except Exception as e:
-        logging.error(f"Unexpected error: {e}")
-    finally:
-        # Clean up exit flag
-        exit_flag.unlink(missing_ok=True)
 
 
 if __name__ == "__main__":
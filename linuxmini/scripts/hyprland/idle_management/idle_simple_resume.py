@@ -2,17 +2,15 @@
 
 import logging
 import subprocess
-import time
 
 # Import centralized configuration
 from config import (
     EXTERNAL_SCRIPTS,
     LOGGING_CONFIG,
-    RESUME_DELAYS,
-    get_control_file,
     get_log_file,
     get_system_command,
 )
+from presence import send_command
 
 
 def setup_logging():
@@ -90,16 +88,12 @@ def main():
     setup_logging()
     logging.info("Simple resume cleanup started")
 
-    # Get control file and delay from config
-    lock_exit_flag = get_control_file("idle_simple_lock_exit")
-    cleanup_delay = RESUME_DELAYS["exit_flag_cleanup"]
-
-    # Signal any running lock monitoring to stop
+    # Cancel any idle lock/DPMS the monitor is still waiting on
     try:
-        lock_exit_flag.write_text("resume")
-        logging.info("Created exit flag for idle_simple_lock")
-    except Exception as e:
-        logging.warning(f"Could not create lock exit flag: {e}")
+        send_command("resume")
+        logging.info("Cancelled pending idle actions in in_office_monitor")
+    except (OSError, ValueError) as e:
+        logging.warning(f"Could not reach in_office_monitor: {e}")
 
     # Restore Kanata layout after unlock
     restore_layout()
@@ -110,14 +104,6 @@ def main():
     # Report active status to HA
     report_active_status()
 
-    # Clean up the exit flag after a moment
-    try:
-        time.sleep(cleanup_delay)
-        lock_exit_flag.unlink(missing_ok=True)
-        logging.info("Cleaned up lock exit flag")
-    except Exception as e:
-        logging.warning(f"Could not clean up lock exit flag: {e}")
-
     logging.info("Simple resume cleanup completed")
     # Note: in_office_monitor runs continuously, no need to manage it here
 
@@ -1,20 +1,29 @@
 #!/usr/bin/env python3
 
+import json
 import logging
 import os
+import selectors
+import signal
+import socket
 import subprocess
-import time
+import sys
+
+# Add the custom script path to PYTHONPATH
+sys.path.append("/home/rash/.config/scripts")
+from _utils.inotify import Inotify  # noqa: E402
 
 # Import centralized configuration
-from config import (
+from config import (  # noqa: E402
     LOGGING_CONFIG,
-    get_check_interval,
-    get_control_file,
+    get_control_socket,
     get_log_file,
     get_status_file,
     get_system_command,
     is_within_work_hours,
 )
+from idle_simple_lock import save_and_switch_layout  # noqa: E402
+from presence import PresenceMachine, Scheduler  # noqa: E402
 
 
 def setup_logging():
@@ -51,8 +60,7 @@ def turn_dpms_on():
 
     try:
         logging.info("in_office turned ON - turning displays on (DPMS on)")
-        env = os.environ.copy()
-        subprocess.run(get_system_command("hyprctl_dpms_on"), check=True, env=env)
+        subprocess.run(get_system_command("hyprctl_dpms_on"), check=True)
         return True
     except subprocess.CalledProcessError as e:
         logging.error(f"Failed to turn DPMS on: {e}")
@@ -60,32 +68,26 @@ def turn_dpms_on():
 
 
 def turn_dpms_off():
-    """Turn DPMS off using hyprctl and turn off Home Assistant devices."""
+    """Turn DPMS off using hyprctl."""
     try:
         logging.info("Turning displays off (DPMS off)")
-        env = os.environ.copy()
-        subprocess.run(get_system_command("hyprctl_dpms_off"), check=True, env=env)
+        subprocess.run(get_system_command("hyprctl_dpms_off"), check=True)
+        return True
+    except subprocess.CalledProcessError as e:
+        logging.error(f"Failed to turn DPMS off: {e}")
+        return False
 
-        # Turn off Home Assistant devices
-        logging.info("Turning off Home Assistant devices")
-        subprocess.run(
-            ["hass-cli", "service", "call", "switch.turn_off",
-             "--arguments", "entity_id=switch.robs_office_big_lamp"],
-            check=False,
-            env=env
-        )
+
+def turn_office_devices_off():
+    """Turn off Home Assistant devices in the office."""
+    logging.info("Turning off Home Assistant devices")
+    for entity_id in ("switch.robs_office_big_lamp", "switch.box"):
         subprocess.run(
             ["hass-cli", "service", "call", "switch.turn_off",
-             "--arguments", "entity_id=switch.box"],
+             "--arguments", f"entity_id={entity_id}"],
             check=False,
-            env=env
         )
 
-        return True
-    except subprocess.CalledProcessError as e:
-        logging.error(f"Failed to turn DPMS off: {e}")
-        return False
-
 
 def lock_computer():
     """Lock the computer using hyprlock."""
@@ -98,9 +100,11 @@ def lock_computer():
             logging.info("hyprlock already running")
             return True
 
+        # Save and switch Kanata layout before locking
+        save_and_switch_layout()
+
         logging.info("Locking computer with hyprlock")
-        env = os.environ.copy()
-        subprocess.Popen(get_system_command("hyprlock"), env=env)
+        subprocess.Popen(get_system_command("hyprlock"))
         return True
     except Exception as e:
         logging.error(f"Failed to lock computer: {e}")
@@ -119,88 +123,115 @@ def is_locked():
         return False
 
 
-def cleanup():
-    """Clean up files on exit."""
-    try:
-        pid_file = get_control_file("in_office_monitor_pid")
-        exit_flag = get_control_file("in_office_monitor_exit")
+class SystemActions:
+    """The real side effects PresenceMachine drives."""
+
+    lock = staticmethod(lock_computer)
+    is_locked = staticmethod(is_locked)
+    dpms_on = staticmethod(turn_dpms_on)
+    dpms_off = staticmethod(turn_dpms_off)
+    office_devices_off = staticmethod(turn_office_devices_off)
+
+
+def handle_command(machine, line):
+    """Run one control socket command and return the reply."""
+    parts = line.split()
+    if parts[:1] == ["idle"] and len(parts) == 2:
+        machine.on_idle(parts[1])
+    elif parts == ["resume"]:
+        machine.on_resume()
+    elif parts != ["status"]:
+        return {"ok": False, "error": f"Unknown command: {line.strip()}"}
+    return {"ok": True, **machine.status()}
+
+
+def open_control_socket(path):
+    """Bind the control socket, refusing to start if another monitor owns it."""
+    if path.exists():
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(str(path))
+            raise RuntimeError(f"in_office_monitor already running ({path})")
+        except (ConnectionRefusedError, FileNotFoundError):
+            path.unlink(missing_ok=True)
+        finally:
+            probe.close()
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(str(path))
+    os.chmod(path, 0o600)
+    server.listen(8)
+    return server
+
+
+def serve_client(machine, server):
+    conn, _ = server.accept()
+    with conn:
+        conn.settimeout(1)
+        try:
+            line = conn.makefile("r").readline()
+            reply = handle_command(machine, line) if line else None
+        except (OSError, ValueError) as e:
+            reply = {"ok": False, "error": str(e)}
+        if reply is not None:
+            try:
+                conn.sendall(json.dumps(reply).encode() + b"\n")
+            except OSError:
+                pass
+
+
+def run(machine, scheduler, server, status_file):
+    """Event loop: in_office file changes, control commands and timers."""
+    selector = selectors.DefaultSelector()
+    with Inotify() as inotify:
+        status_file.parent.mkdir(parents=True, exist_ok=True)
+        inotify.add_watch(status_file.parent)
+        selector.register(inotify, selectors.EVENT_READ, "inotify")
+        selector.register(server, selectors.EVENT_READ, "control")
+
+        machine.on_in_office(get_in_office_status())
+        logging.info(f"Initial in_office status: {machine.in_office}")
 
-        pid_file.unlink(missing_ok=True)
-        exit_flag.unlink(missing_ok=True)
-        logging.info("In-office monitor exiting")
-    except Exception as e:
-        logging.error(f"Error during cleanup: {e}")
+        while True:
+            deadline = scheduler.next_deadline()
+            timeout = None if deadline is None else max(0, deadline - scheduler.clock())
+            for key, _ in selector.select(timeout):
+                if key.data == "inotify":
+                    if any(path == str(status_file) for path, _ in inotify.read()):
+                        machine.on_in_office(get_in_office_status())
+                else:
+                    serve_client(machine, server)
+            scheduler.run_due()
 
 
 def main():
-    """Monitor in_office status and control DPMS based on status changes."""
+    """Monitor in_office status and control locking and DPMS on status changes."""
     setup_logging()
 
-    # Get control files and check interval from config
-    exit_flag = get_control_file("in_office_monitor_exit")
-    pid_file = get_control_file("in_office_monitor_pid")
-    check_interval = get_check_interval("office_monitoring")
-
-    # Clean up our own exit flag if it exists (from previous run)
-    exit_flag.unlink(missing_ok=True)
-    logging.debug("Cleaned up any existing exit flag")
+    # SIGTERM (systemctl stop, pkill) unwinds through the finally below
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
 
-    # Create PID file
+    socket_path = get_control_socket()
     try:
-        pid_file.write_text(str(os.getpid()))
-        logging.info("In-office monitor started")
-    except Exception as e:
-        logging.error(f"Failed to create PID file: {e}")
+        server = open_control_socket(socket_path)
+    except (RuntimeError, OSError) as e:
+        logging.error(f"Failed to open control socket: {e}")
         return
 
-    last_status = get_in_office_status()
-    logging.info(f"Initial in_office status: {last_status}")
+    scheduler = Scheduler()
+    machine = PresenceMachine(SystemActions(), scheduler)
+    logging.info("In-office monitor started")
 
     try:
-        while True:
-            # Check for exit signal
-            if exit_flag.exists():
-                logging.info("Exit signal received - stopping monitoring")
-                break
-
-            current_status = get_in_office_status()
-
-            # Handle status transitions in both directions
-            if last_status == "off" and current_status == "on":
-                logging.info("in_office status changed from OFF to ON")
-                turn_dpms_on()
-            elif last_status == "on" and current_status == "off":
-                logging.info("in_office status changed from ON to OFF")
-                # Lock the computer immediately
-                lock_computer()
-
-                # Give hyprlock a few seconds to initialize and start rendering
-                logging.info("Giving hyprlock 3 seconds to initialize...")
-                time.sleep(3)
-
-                # Wait 30 seconds with lock screen visible before turning off DPMS
-                logging.info("Waiting 30 seconds before turning off DPMS...")
-                time.sleep(30)
-
-                # Check if still OFF and locked before turning off DPMS
-                current_status_after_wait = get_in_office_status()
-                if current_status_after_wait == "off" and is_locked():
-                    logging.info("Still OFF and locked - turning off DPMS")
-                    turn_dpms_off()
-                elif current_status_after_wait == "on":
-                    logging.info("Status changed to ON during wait - skipping DPMS off")
-                elif not is_locked():
-                    logging.info("Computer is not locked - skipping DPMS off")
-
-            last_status = current_status
-            time.sleep(check_interval)
-
+        run(machine, scheduler, server, get_status_file("in_office_status"))
     except KeyboardInterrupt:
         logging.info("Received interrupt signal")
     except Exception as e:
-        logging.error(f"Unexpected error: {e}")
+        logging.error(f"Unexpected error: {e}", exc_info=True)
     finally:
-        cleanup()
+        server.close()
+        socket_path.unlink(missing_ok=True)
+        logging.info("In-office monitor exiting")
 
 
 if __name__ == "__main__":
@@ -1,23 +1,20 @@
 #!/usr/bin/env python3
 
 import argparse
+import fnmatch
 import logging
-import subprocess
+import os
 import sys
-import time
 
 # Add the custom script path to PYTHONPATH
 sys.path.append("/home/rash/.config/scripts")
 from _utils import logging_utils  # noqa: E402
+from _utils import status_bus  # noqa: E402
+from _utils.inotify import IN_ATTRIB, IN_CLOSE, IN_CREATE, IN_DELETE, IN_OPEN, Inotify  # noqa: E402
 
 # Import centralized configuration
-from config import (  # noqa: E402
-    DEVICE_FILES,
-    WEBCAM_CONFIG,
-    get_check_interval,
-    get_status_file,
-    get_system_command,
-)
+from config import WEBCAM_CONFIG  # noqa: E402
+from webcam_usage import WebcamUsage, list_devices  # noqa: E402
 
 """
 This script is launched by a systemd service.
@@ -40,86 +37,94 @@ if args.debug:
 else:
     logging.getLogger().setLevel(logging.ERROR)
 
-# Get configuration from centralized config
-device_file_path = str(DEVICE_FILES["webcam"])
-last_state = "inactive"  # Track the last state to avoid duplicate writes
-status_file_path = str(get_status_file("linux_webcam_status"))
-excluded_processes = WEBCAM_CONFIG["excluded_processes"]
-webcam_polling_interval = get_check_interval("webcam_polling")
+device_glob = WEBCAM_CONFIG["device_glob"]
+device_dir = os.path.dirname(device_glob)
+last_state = None  # Track the last state to avoid duplicate writes
 
 
-def is_webcam_in_use():
-    """Check if webcam is in use by non-automated processes (excludes configured processes)."""
-    try:
-        # Get list of processes using the camera
-        lsof_command = get_system_command("lsof_webcam") + [device_file_path]
-        lsof_output = subprocess.check_output(
-            lsof_command, stderr=subprocess.DEVNULL, text=True
-        )
-
-        for line in lsof_output.strip().split("\n"):
-            if line and not line.startswith("COMMAND"):  # Skip header
-                # Check if this line contains any excluded process
-                line_lower = line.lower()
-                excluded = False
-                for process in excluded_processes:
-                    if process.lower() in line_lower:
-                        logging.debug(f"Ignoring {process} process: {line}")
-                        excluded = True
-                        break
-
-                if not excluded:
-                    # If it's not an excluded process, webcam is in use by something else
-                    logging.debug(f"Non-automated webcam usage detected: {line}")
-                    return True
-
-        # All processes using camera are excluded - consider inactive
-        logging.debug("Only excluded processes using camera - considering inactive")
-        return False
-
-    except subprocess.CalledProcessError:
-        # No processes using camera
-        return False
-
+def update_status(state):
+    """Publish the webcam state (the status bus keeps /tmp/mqtt/linux_webcam_status in sync)."""
+    global last_state
+    if state == last_state:
+        return
+    status_bus.publish("webcam", state)
+    last_state = state
+    logging.debug(f"Success: webcam status updated - Webcam is {state}")
 
-def update_status_file(state):
-    import os
 
-    os.makedirs(os.path.dirname(status_file_path), exist_ok=True)
-    with open(status_file_path, "w") as f:
-        f.write(state)
-    logging.debug(f"Success: {status_file_path} updated - Webcam is {state}")
+def watch_device(inotify, path, watched):
+    """Watch a device node for opens and closes; returns True if newly watched."""
+    if path in watched:
+        return False
+    try:
+        inotify.add_watch(path, IN_OPEN | IN_CLOSE)
+    except OSError as e:
+        # A hotplugged node is root-only until udev fixes its permissions
+        # (IN_ATTRIB retries then), or it may already be gone again
+        logging.debug(f"Can't watch {path} yet: {e}")
+        return False
+    watched.add(path)
+    return True
 
 
 def main():
-    global last_state
-
-    while True:
-        try:
-            # Wait for webcam to become active
-            inotify_command = get_system_command("inotifywait_webcam") + [
-                device_file_path
-            ]
-            subprocess.run(inotify_command, check=True)
-
-            # When inotifywait detects an open event, check if the webcam is actually in use
-            if is_webcam_in_use() and last_state == "inactive":
-                logging.debug("Webcam is active")
-                update_status_file("active")
-                last_state = "active"
-
-            # Start polling to detect when the webcam becomes inactive
-            while is_webcam_in_use():
-                time.sleep(webcam_polling_interval)
-
-            # Once polling detects the webcam is inactive
-            if last_state == "active":
-                logging.debug("Webcam is inactive")
-                update_status_file("inactive")
-                last_state = "inactive"
-        except subprocess.CalledProcessError as e:
-            logging.error(f"Error: {e}")
+    usage = WebcamUsage(list_devices())
+    logging.debug(f"Watching {sorted(usage.devices) or 'no devices yet'}")
+    watched = set()
+
+    with Inotify(nonblocking=False) as inotify:
+        # Device nodes come and go with USB hotplug; the directory watch catches
+        # that, and IN_ATTRIB tells when udev has made a new node readable
+        inotify.add_watch(device_dir, IN_CREATE | IN_DELETE | IN_ATTRIB)
+        for device in usage.devices:
+            watch_device(inotify, device, watched)
+
+        usage.rescan()
+        update_status("active" if usage.in_use() else "inactive")
+
+        while True:
+            opened = closed = False
+            for path, mask in inotify.read():
+                if mask & (IN_CREATE | IN_DELETE | IN_ATTRIB):
+                    if not fnmatch.fnmatch(path, device_glob):
+                        continue
+                    if mask & IN_CREATE:
+                        logging.debug(f"Device added: {path}")
+                        usage.devices.add(path)
+                        watch_device(inotify, path, watched)
+                        closed = True
+                    elif mask & IN_DELETE:
+                        logging.debug(f"Device removed: {path}")
+                        usage.devices.discard(path)
+                        watched.discard(path)
+                        closed = True
+                    elif path in usage.devices and watch_device(inotify, path, watched):
+                        # Opens before the watch went unseen, so scan for them
+                        logging.debug(f"Device now watchable: {path}")
+                        opened = True
+                elif mask & IN_OPEN:
+                    opened = True
+                elif mask & IN_CLOSE:
+                    closed = True
+
+            # An open needs a full scan (the opener is unknown); a close only
+            # needs the processes already known to hold a device
+            if opened:
+                usage.rescan()
+            elif closed:
+                usage.recheck_users()
+            else:
+                continue
+
+            if usage.in_use():
+                logging.debug(f"Webcam in use by {usage.active_users()}")
+                update_status("active")
+            else:
+                update_status("inactive")
 
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    except KeyboardInterrupt:
+        pass
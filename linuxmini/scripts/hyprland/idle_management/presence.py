@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+
+"""
+Event-driven presence state machine for the idle management system.
+
+PresenceMachine holds no I/O of its own: it is fed events (in_office changes,
+hypridle idle requests, resume) and drives an `actions` object and a
+Scheduler for its timers. in_office_monitor.py wires it to inotify, the
+control socket and the real system commands; debug/replay_presence.py feeds
+it recorded timelines with a virtual clock.
+"""
+
+import heapq
+import itertools
+import json
+import logging
+import socket
+import time
+from enum import Enum
+
+from config import PRESENCE_TIMINGS, get_control_socket
+
+
+class State(Enum):
+    """Where the user is, as far as the machine knows."""
+
+    UNKNOWN = "unknown"  # No in_office value seen yet
+    PRESENT = "present"  # in_office is on
+    AWAY_LOCKING = "away_locking"  # in_office went off; locked, waiting to turn DPMS off
+    AWAY = "away"  # in_office is off and the away sequence has finished
+
+
+class Timer:
+    """Handle for a scheduled callback; cancel() is safe to call at any time."""
+
+    def __init__(self, deadline, callback, name):
+        self.deadline = deadline
+        self.callback = callback
+        self.name = name
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class Scheduler:
+    """
+    Timer heap driven by an injectable clock.
+
+    The real event loop sleeps until next_deadline() and then calls
+    run_due(); the replay harness advances a virtual clock instead.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._heap = []
+        self._counter = itertools.count()
+
+    def call_later(self, delay, callback, name=""):
+        timer = Timer(self.clock() + delay, callback, name)
+        heapq.heappush(self._heap, (timer.deadline, next(self._counter), timer))
+        return timer
+
+    def next_deadline(self):
+        """Deadline of the earliest live timer, or None."""
+        while self._heap and self._heap[0][2].cancelled:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def run_due(self):
+        """Run every timer whose deadline has passed."""
+        while True:
+            deadline = self.next_deadline()
+            if deadline is None or deadline > self.clock():
+                return
+            _, _, timer = heapq.heappop(self._heap)
+            timer.callback()
+
+
+class PresenceMachine:
+    """
+    Presence transitions:
+
+      PRESENT --off--> AWAY_LOCKING   lock, start the DPMS-off timer
+      AWAY_LOCKING --timer--> AWAY    DPMS off + office devices off if still locked
+      AWAY_LOCKING/AWAY --on--> PRESENT   cancel the timer, DPMS on
+
+    Idle requests from hypridle ("lock"/"dpms") act immediately when the user
+    is away and otherwise wait for in_office to go off; resume drops them.
+    """
+
+    def __init__(self, actions, scheduler, timings=None):
+        self.actions = actions
+        self.scheduler = scheduler
+        self.timings = {**PRESENCE_TIMINGS, **(timings or {})}
+        self.state = State.UNKNOWN
+        self.in_office = None
+        self.pending_idle = set()
+        self.displays_off = False
+        self._away_timer = None
+
+    def _set_state(self, state):
+        if state != self.state:
+            logging.info(f"Presence state {self.state.value} -> {state.value}")
+            self.state = state
+
+    def _cancel_away_timer(self):
+        if self._away_timer is not None:
+            self._away_timer.cancel()
+            self._away_timer = None
+
+    def on_in_office(self, status):
+        """Handle a new in_office value ("on"/"off"; anything else is ignored)."""
+        previous, self.in_office = self.in_office, status
+        if status == previous:
+            return
+
+        if status == "on":
+            if self.state in (State.AWAY_LOCKING, State.AWAY):
+                logging.info("in_office status changed from OFF to ON")
+                self._cancel_away_timer()
+                self.actions.dpms_on()
+                self.displays_off = False
+            self._set_state(State.PRESENT)
+        elif status == "off":
+            if self.state == State.UNKNOWN:
+                # Started while away: don't re-run the away sequence
+                self._set_state(State.AWAY)
+            elif self.state == State.PRESENT:
+                logging.info("in_office status changed from ON to OFF")
+                self._leave()
+            self._run_pending_idle()
+        else:
+            logging.info(f"Ignoring in_office status {status!r}")
+
+    def _leave(self):
+        self.actions.lock()
+        delay = self.timings["hyprlock_startup"] + self.timings["dpms_off_delay"]
+        logging.info(f"Waiting {delay} seconds before turning off DPMS...")
+        self._away_timer = self.scheduler.call_later(delay, self._away_timeout, "dpms_off")
+        self._set_state(State.AWAY_LOCKING)
+
+    def _away_timeout(self):
+        self._away_timer = None
+        if self.actions.is_locked():
+            logging.info("Still OFF and locked - turning off DPMS")
+            self._dpms_off()
+            self.actions.office_devices_off()
+        else:
+            logging.info("Computer is not locked - skipping DPMS off")
+        self._set_state(State.AWAY)
+
+    def on_idle(self, kind):
+        """hypridle timeout: kind is "lock" or "dpms"."""
+        if kind not in ("lock", "dpms"):
+            raise ValueError(f"Unknown idle request: {kind}")
+        logging.info(f"Idle {kind} requested, in_office status: {self.in_office}")
+        self.pending_idle.add(kind)
+        if self.in_office == "off":
+            self._run_pending_idle()
+        else:
+            logging.info(f"in_office is ON - waiting for OFF before idle {kind}")
+
+    def _run_pending_idle(self):
+        if "lock" in self.pending_idle:
+            logging.info("in_office is OFF - locking session")
+            self.actions.lock()
+        if "dpms" in self.pending_idle:
+            logging.info("in_office is OFF - turning displays off")
+            self._dpms_off()
+        self.pending_idle.clear()
+
+    def _dpms_off(self):
+        if not self.displays_off:
+            self.actions.dpms_off()
+            self.displays_off = True
+
+    def on_resume(self):
+        """User activity: drop pending idle requests (idle_simple_resume turns DPMS on)."""
+        if self.pending_idle:
+            logging.info(f"Resume - cancelling pending idle {sorted(self.pending_idle)}")
+        self.pending_idle.clear()
+        self.displays_off = False
+
+    def status(self):
+        return {
+            "state": self.state.value,
+            "in_office": self.in_office,
+            "pending_idle": sorted(self.pending_idle),
+            "away_timer": self._away_timer is not None,
+        }
+
+
+def send_command(command, timeout=None):
+    """
+    Send one command line to in_office_monitor and return its JSON reply.
+
+    Raises OSError if the monitor isn't running.
+    """
+    timeout = PRESENCE_TIMINGS["control_timeout"] if timeout is None else timeout
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(str(get_control_socket()))
+        sock.sendall(command.encode() + b"\n")
+        with sock.makefile("r") as reader:
+            line = reader.readline()
+    if not line:
+        raise ConnectionError("in_office_monitor closed the connection")
+    return json.loads(line)
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+
+"""
+Cascaded webcam presence detection.
+
+Each stage only runs when the cheaper one before it asks for it:
+
+1. FrameGate, on every frame: a downscaled grayscale brightness and motion
+   check. Dark frames (lights off, lens covered) stop the cascade here.
+2. MediaPipe face detection (the short range detector, not the landmark
+   mesh), only while there is motion, or at a slower rate for a while after
+   the last motion or face to confirm a person sitting still.
+3. face_recognition, only for face tracks that just appeared. FaceTracker
+   follows faces across detections by box overlap, so a recognized person
+   stays recognized without encoding their face again.
+
+The policies are in config.py DETECTION_PARAMS. The detector and
+recognizer are injected, so debug/cascade_cpu.py can drive the cascade on
+synthetic scenes and a virtual clock.
+"""
+
+import itertools
+import time
+
+import cv2
+import numpy as np
+
+from config import (
+    get_detection_method_param,
+    get_detection_param,
+    get_facial_recognition_param,
+)
+
+try:
+    import mediapipe as mp
+
+    MEDIAPIPE_AVAILABLE = True
+except ImportError:
+    MEDIAPIPE_AVAILABLE = False
+
+try:
+    import face_recognition
+
+    FACE_RECOGNITION_AVAILABLE = True
+except ImportError:
+    FACE_RECOGNITION_AVAILABLE = False
+
+STAGES = ("gate", "convert", "detect", "recognize")
+
+
+class GateResult:
+    """What the cheap per-frame check saw."""
+
+    def __init__(self, brightness, dark, motion_boxes, mask, scale):
+        self.brightness = brightness
+        self.dark = dark
+        self.motion_boxes = motion_boxes  # (x, y, w, h) in full-resolution pixels
+        self.mask = mask  # Downscaled motion mask, None on the first frame
+        self.scale = scale  # Downscaled size / full size
+
+
+class FrameGate:
+    """Motion and brightness on a small blurred grayscale copy of each frame."""
+
+    def __init__(self):
+        params = get_detection_param("gate")
+        self.width = params["width"]
+        self.min_brightness = params["min_brightness"]
+        self.diff_threshold = params["diff_threshold"]
+        self.min_area = get_detection_method_param("motion", "min_area") or 200
+        self.kernel = np.ones((3, 3), np.uint8)
+        self.previous = None
+
+    def check(self, frame):
+        height, width = frame.shape[:2]
+        scale = min(1.0, self.width / width)
+        size = (round(width * scale), round(height * scale))
+        # OpenCV's area resize has a fast path for exact halving and is several
+        # times slower for other factors, so halve first
+        small = frame
+        while small.shape[1] >= 2 * size[0]:
+            half = (small.shape[1] // 2, small.shape[0] // 2)
+            small = cv2.resize(small, half, interpolation=cv2.INTER_AREA)
+        if small.shape[1] != size[0]:
+            small = cv2.resize(small, size, interpolation=cv2.INTER_AREA)
+        scale = small.shape[1] / width
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        gray = cv2.GaussianBlur(gray, (5, 5), 0)
+        brightness = cv2.mean(gray)[0]
+
+        previous, self.previous = self.previous, gray
+        motion_boxes = []
+        mask = None
+        if previous is not None and previous.shape == gray.shape:
+            diff = cv2.absdiff(previous, gray)
+            _, mask = cv2.threshold(diff, self.diff_threshold, 255, cv2.THRESH_BINARY)
+            mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, self.kernel)
+            contours, _ = cv2.findContours(
+                mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
+            )
+            # min_area is in full-resolution pixels, as before the downscale
+            min_area = self.min_area * scale * scale
+            for contour in contours:
+                if cv2.contourArea(contour) > min_area:
+                    x, y, w, h = cv2.boundingRect(contour)
+                    motion_boxes.append(
+                        tuple(round(v / scale) for v in (x, y, w, h))
+                    )
+        return GateResult(
+            brightness, brightness < self.min_brightness, motion_boxes, mask, scale
+        )
+
+
+class Track:
+    """A face followed across detections."""
+
+    def __init__(self, track_id, box, now):
+        self.id = track_id
+        self.box = box  # (top, right, bottom, left)
+        self.first_seen = now
+        self.last_seen = now
+        self.recognized = None  # None until face_recognition has looked at it
+        self.confidence = 0.0
+
+
+def box_iou(a, b):
+    """Intersection over union of two (top, right, bottom, left) boxes."""
+    top, bottom = max(a[0], b[0]), min(a[2], b[2])
+    left, right = max(a[3], b[3]), min(a[1], b[1])
+    if bottom <= top or right <= left:
+        return 0.0
+    inter = (bottom - top) * (right - left)
+    area_a = (a[2] - a[0]) * (a[1] - a[3])
+    area_b = (b[2] - b[0]) * (b[1] - b[3])
+    return inter / (area_a + area_b - inter)
+
+
+class FaceTracker:
+    """Greedy box-overlap tracking; tracks expire after track_timeout unseen."""
+
+    def __init__(self):
+        self.iou_threshold = get_detection_method_param("face_tracking", "iou_threshold")
+        self.timeout = get_detection_method_param("face_tracking", "track_timeout")
+        self.tracks = []
+        self._ids = itertools.count(1)
+
+    def update(self, boxes, now):
+        """Match detections to tracks; returns the tracks started by this call."""
+        pairs = sorted(
+            (
+                (box_iou(track.box, box), t, b)
+                for t, track in enumerate(self.tracks)
+                for b, box in enumerate(boxes)
+            ),
+            reverse=True,
+        )
+        used_tracks, used_boxes = set(), set()
+        for iou, t, b in pairs:
+            if iou < self.iou_threshold:
+                break
+            if t in used_tracks or b in used_boxes:
+                continue
+            used_tracks.add(t)
+            used_boxes.add(b)
+            self.tracks[t].box = boxes[b]
+            self.tracks[t].last_seen = now
+
+        new = [
+            Track(next(self._ids), box, now)
+            for b, box in enumerate(boxes)
+            if b not in used_boxes
+        ]
+        self.tracks.extend(new)
+        return new
+
+    def expire(self, now):
+        self.tracks = [t for t in self.tracks if now - t.last_seen <= self.timeout]
+
+
+class MediaPipeFaceDetector:
+    """MediaPipe's face detector; returns (top, right, bottom, left) boxes."""
+
+    def __init__(self):
+        self.detector = mp.solutions.face_detection.FaceDetection(
+            model_selection=get_detection_method_param("mediapipe_face", "model_selection"),
+            min_detection_confidence=get_detection_method_param(
+                "mediapipe_face", "min_detection_confidence"
+            ),
+        )
+
+    def __call__(self, frame_rgb):
+        height, width = frame_rgb.shape[:2]
+        results = self.detector.process(frame_rgb)
+        boxes = []
+        for detection in results.detections or ():
+            rel = detection.location_data.relative_bounding_box
+            left = max(0, int(rel.xmin * width))
+            top = max(0, int(rel.ymin * height))
+            right = min(width, int((rel.xmin + rel.width) * width))
+            bottom = min(height, int((rel.ymin + rel.height) * height))
+            if right > left and bottom > top:
+                boxes.append((top, right, bottom, left))
+        return boxes
+
+    def close(self):
+        self.detector.close()
+
+
+class FaceRecognizer:
+    """Encodes the given face boxes and matches them against the references."""
+
+    def __init__(self, references):
+        self.references = references
+        self.tolerance = get_facial_recognition_param("tolerance")
+        self.min_confidence = get_facial_recognition_param("min_recognition_confidence")
+
+    def __call__(self, frame_rgb, boxes):
+        """(recognized, confidence) for each box."""
+        encodings = face_recognition.face_encodings(
+            frame_rgb,
+            boxes,
+            model=get_facial_recognition_param("face_detection_model"),
+            num_jitters=get_facial_recognition_param("num_jitters"),
+        )
+        distances = self.references.best_distances(encodings)
+        return [
+            (
+                bool(d <= self.tolerance and 1.0 - d >= self.min_confidence),
+                max(0.0, 1.0 - float(d)),
+            )
+            for d in distances
+        ]
+
+
+class DetectionCascade:
+    """Runs the stages that the current frame and recent history call for."""
+
+    def __init__(self, face_detector=None, recognizer=None, clock=time.monotonic):
+        self.gate = FrameGate()
+        self.tracker = FaceTracker()
+        self.face_detector = face_detector
+        self.recognizer = recognizer
+        self.clock = clock
+        self.motion_interval = get_detection_method_param("mediapipe_face", "motion_interval")
+        self.presence_interval = get_detection_method_param(
+            "mediapipe_face", "presence_interval"
+        )
+        self.presence_hold = get_detection_method_param("mediapipe_face", "presence_hold")
+        self.last_signal = None  # Last motion or face
+        self.last_detection = None
+        self.stage_calls = dict.fromkeys(STAGES, 0)
+        self.stage_cpu = dict.fromkeys(STAGES, 0.0)  # Process CPU seconds
+        self.timings = {}  # Wall seconds per stage run for the last frame
+
+    def _timed(self, stage, func, *args):
+        start = time.perf_counter()
+        start_cpu = time.process_time()
+        try:
+            return func(*args)
+        finally:
+            self.stage_cpu[stage] += time.process_time() - start_cpu
+            self.stage_calls[stage] += 1
+            self.timings[stage] = time.perf_counter() - start
+
+    def detection_due(self, now, motion):
+        if self.face_detector is None:
+            return False
+        if motion:
+            interval = self.motion_interval
+        elif self.last_signal is not None and now - self.last_signal <= self.presence_hold:
+            interval = self.presence_interval
+        else:
+            return False
+        return self.last_detection is None or now - self.last_detection >= interval
+
+    def process(self, frame):
+        """
+        Run the cascade on one BGR frame.
+
+        Returns a dict with a bool per method ("motion", "mediapipe_face",
+        "facial_recognition") plus "_"-prefixed details for display.
+        """
+        now = self.clock()
+        self.timings = {}
+        gate = self._timed("gate", self.gate.check, frame)
+        motion = bool(gate.motion_boxes) and not gate.dark
+        ran_detection = detected = False
+        new_tracks = []
+
+        # Dark frames show nothing; the tracks are left to run out
+        if not gate.dark and self.detection_due(now, motion):
+            frame_rgb = self._timed("convert", cv2.cvtColor, frame, cv2.COLOR_BGR2RGB)
+            boxes = self._timed("detect", self.face_detector, frame_rgb)
+            self.last_detection = now
+            ran_detection = True
+            detected = bool(boxes)
+            new_tracks = self.tracker.update(boxes, now)
+            if new_tracks and self.recognizer is not None:
+                matches = self._timed(
+                    "recognize", self.recognizer, frame_rgb, [t.box for t in new_tracks]
+                )
+                for track, (recognized, confidence) in zip(new_tracks, matches):
+                    track.recognized = recognized
+                    track.confidence = confidence
+        if motion or detected:
+            self.last_signal = now
+        self.tracker.expire(now)
+
+        tracks = self.tracker.tracks
+        return {
+            "facial_recognition": any(t.recognized for t in tracks),
+            # Tracks bridge the frames between detections
+            "mediapipe_face": bool(tracks),
+            "motion": motion,
+            "_gate": gate,
+            "_tracks": tracks,
+            "_new_tracks": new_tracks,
+            "_face_detection_ran": ran_detection,
+            "_recognition_confidence": max((t.confidence for t in tracks), default=0.0),
+            "_timings": self.timings,
+        }
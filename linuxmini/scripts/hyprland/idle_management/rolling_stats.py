@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+
+"""
+Bounded rolling statistics for all-day presence detection.
+
+RollingRate holds (timestamp, detected) samples of a time window in
+fixed-size NumPy ring buffers with a running count of detections. Adding a
+sample and reading the rate are O(1): expired samples are dropped from the
+tail as the window moves, so each one is removed exactly once, and nothing
+is rescanned or reallocated per frame.
+
+RollingMean is the count-based equivalent for the last N values (e.g.
+recognition confidences).
+
+RecencyWeightedPresence combines a long and a short window into the
+present/not-present decision the detector reports; the debug visualizer
+and debug/replay_detection.py share it.
+"""
+
+import math
+
+import numpy as np
+
+from config import get_detection_param, get_detection_timing_param
+
+MAX_FPS = 60  # Sample rate the time windows are sized for
+
+
+class RollingRate:
+    """Fraction of positive samples over the last window_seconds."""
+
+    def __init__(self, window_seconds, max_rate=MAX_FPS):
+        self.window = window_seconds
+        self.capacity = max(1, math.ceil(window_seconds * max_rate))
+        self.times = np.zeros(self.capacity, dtype=np.float64)
+        self.values = np.zeros(self.capacity, dtype=np.bool_)
+        self.head = 0  # Index of the oldest sample
+        self.count = 0
+        self.hits = 0
+
+    def _drop_oldest(self):
+        self.hits -= int(self.values[self.head])
+        self.head = (self.head + 1) % self.capacity
+        self.count -= 1
+
+    def expire(self, now):
+        cutoff = now - self.window
+        while self.count and self.times[self.head] < cutoff:
+            self._drop_oldest()
+
+    def add(self, now, detected):
+        self.expire(now)
+        if self.count == self.capacity:
+            # Faster than max_rate: the window is bounded by samples instead of time
+            self._drop_oldest()
+        index = (self.head + self.count) % self.capacity
+        self.times[index] = now
+        self.values[index] = detected
+        self.count += 1
+        self.hits += bool(detected)
+
+    def rate(self):
+        return self.hits / self.count if self.count else 0.0
+
+    def clear(self):
+        self.head = self.count = self.hits = 0
+
+
+class RollingMean:
+    """Mean of the last capacity values."""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.values = np.zeros(capacity, dtype=np.float64)
+        self.next = 0
+        self.count = 0
+        self.total = 0.0
+        self._since_resum = 0
+
+    def add(self, value):
+        if self.count == self.capacity:
+            self.total -= self.values[self.next]
+        else:
+            self.count += 1
+        self.values[self.next] = value
+        self.total += value
+        self.next = (self.next + 1) % self.capacity
+        # Re-add from scratch once per lap so float error can't accumulate
+        self._since_resum += 1
+        if self._since_resum >= self.capacity:
+            self.total = float(self.values[: self.count].sum())
+            self._since_resum = 0
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self.next = self.count = self._since_resum = 0
+        self.total = 0.0
+
+
+class RecencyWeightedPresence:
+    """
+    Present if the recent window is mostly detections, or failing that the
+    whole window reaches the detection threshold.
+    """
+
+    def __init__(self, window_seconds=10, max_rate=MAX_FPS):
+        self.recent_threshold = get_detection_timing_param("recent_window_threshold") or 0.7
+        self.overall_threshold = get_detection_param("threshold") or 0.5
+        self.overall = RollingRate(window_seconds, max_rate)
+        self.recent = RollingRate(
+            get_detection_timing_param("recent_window_duration") or 3, max_rate
+        )
+
+    def add(self, now, detected):
+        self.overall.add(now, detected)
+        self.recent.add(now, detected)
+
+    def evaluate(self):
+        """(overall_rate, recent_rate, decision, reason)."""
+        if not self.overall.count:
+            return 0.0, 0.0, False, "No frame data"
+        overall_rate = self.overall.rate()
+        recent_rate = self.recent.rate()
+        if recent_rate >= self.recent_threshold:
+            reason = f"recent window {recent_rate:.1%} >= {self.recent_threshold:.1%}"
+            return overall_rate, recent_rate, True, reason
+        if overall_rate >= self.overall_threshold:
+            reason = f"overall window {overall_rate:.1%} >= {self.overall_threshold:.1%}"
+            return overall_rate, recent_rate, True, reason
+        return overall_rate, recent_rate, False, "both rates below thresholds"
+
+    def clear(self):
+        self.overall.clear()
+        self.recent.clear()
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+
+"""
+Find which processes hold the webcam devices open, without lsof.
+
+WebcamUsage scans /proc/<pid>/fd links for the video devices. A full scan is
+only needed when a device is opened (the opener is unknown); on close just
+the PIDs already known to hold a device are rechecked. Process names are
+cached per PID, keyed on the process start time so a recycled PID is never
+mistaken for the old process.
+
+Run directly to benchmark the native scan against the lsof path:
+    webcam_usage.py --benchmark [--iterations 20]
+"""
+
+import argparse
+import glob
+import os
+import subprocess
+import sys
+import time
+
+from config import WEBCAM_CONFIG, get_system_command
+
+
+def list_devices():
+    """Current video device paths matching the configured glob."""
+    return sorted(glob.glob(WEBCAM_CONFIG["device_glob"]))
+
+
+def read_process_identity(pid):
+    """(start_time, comm) for a PID, or None if it has exited."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            stat = f.read()
+    except OSError:
+        return None
+    # comm is in parentheses and may itself contain spaces or parentheses
+    comm = stat[stat.index("(") + 1:stat.rindex(")")]
+    start_time = stat[stat.rindex(")") + 2:].split()[19]
+    return start_time, comm
+
+
+def read_cmdline(pid):
+    """A PID's command line joined with spaces ("" if unreadable)."""
+    try:
+        with open(f"/proc/{pid}/cmdline", "rb") as f:
+            return f.read().replace(b"\0", b" ").decode(errors="replace").strip()
+    except OSError:
+        return ""
+
+
+def pid_devices(pid, devices):
+    """The subset of devices a PID has open (empty if gone or not readable)."""
+    fd_dir = f"/proc/{pid}/fd"
+    try:
+        fds = os.listdir(fd_dir)
+    except OSError:
+        return set()
+    found = set()
+    for fd in fds:
+        try:
+            target = os.readlink(f"{fd_dir}/{fd}")
+        except OSError:
+            continue
+        if target in devices:
+            found.add(target)
+    return found
+
+
+class WebcamUsage:
+    """Tracks which processes hold any of the video devices open."""
+
+    def __init__(self, devices=None, excluded_processes=None):
+        self.devices = set(devices if devices is not None else list_devices())
+        excluded = excluded_processes
+        if excluded is None:
+            excluded = WEBCAM_CONFIG["excluded_processes"]
+        self.excluded = [name.lower() for name in excluded]
+        self.users = {}  # pid -> (comm, excluded) of processes holding a device
+        self._identity_cache = {}  # pid -> (start_time, comm, excluded)
+        self._own_pid = str(os.getpid())
+
+    def _identity(self, pid):
+        identity = read_process_identity(pid)
+        if identity is None:
+            self._identity_cache.pop(pid, None)
+            return None
+        cached = self._identity_cache.get(pid)
+        if cached is None or cached[0] != identity[0]:
+            start_time, comm = identity
+            # comm is truncated to 15 chars, so match the command line too
+            names = f"{comm} {read_cmdline(pid)}".lower()
+            excluded = any(name in names for name in self.excluded)
+            cached = (start_time, comm, excluded)
+            self._identity_cache[pid] = cached
+        return cached
+
+    def _check(self, pid):
+        if pid_devices(pid, self.devices):
+            identity = self._identity(pid)
+            if identity is not None:
+                self.users[pid] = identity[1:]
+                return
+        self.users.pop(pid, None)
+
+    def rescan(self):
+        """Scan every process; needed after an open, since the opener is unknown."""
+        live = set()
+        for pid in os.listdir("/proc"):
+            if not pid.isdigit() or pid == self._own_pid:
+                continue
+            live.add(pid)
+            self._check(pid)
+        for pid in list(self.users):
+            if pid not in live:
+                del self.users[pid]
+        # Forget identities of processes that have exited
+        for pid in list(self._identity_cache):
+            if pid not in live:
+                del self._identity_cache[pid]
+
+    def recheck_users(self):
+        """Recheck only the known users; enough after a close."""
+        for pid in list(self.users):
+            self._check(pid)
+
+    def in_use(self):
+        """True if a non-excluded process holds a device."""
+        return any(not excluded for _comm, excluded in self.users.values())
+
+    def active_users(self):
+        """pid -> comm of the non-excluded processes holding a device."""
+        return {pid: comm for pid, (comm, excluded) in self.users.items() if not excluded}
+
+
+def lsof_in_use(devices, excluded_processes):
+    """The lsof-based check linux_webcam_status used before, kept for benchmarking."""
+    try:
+        output = subprocess.check_output(
+            get_system_command("lsof_webcam") + list(devices),
+            stderr=subprocess.DEVNULL,
+            text=True,
+        )
+    except subprocess.CalledProcessError:
+        return False
+    for line in output.strip().split("\n"):
+        if line and not line.startswith("COMMAND"):
+            if not any(p.lower() in line.lower() for p in excluded_processes):
+                return True
+    return False
+
+
+def benchmark(iterations):
+    devices = list_devices()
+    if not devices:
+        print(f"No devices match {WEBCAM_CONFIG['device_glob']}")
+        return 1
+    excluded = WEBCAM_CONFIG["excluded_processes"]
+    usage = WebcamUsage(devices, excluded)
+
+    def timed(fn):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            result = fn()
+        return (time.perf_counter() - start) / iterations * 1000, result
+
+    def full_scan():
+        usage.rescan()
+        return usage.in_use()
+
+    def recheck():
+        usage.recheck_users()
+        return usage.in_use()
+
+    print(f"Devices: {', '.join(devices)} ({iterations} iterations)")
+    rows = [("native full scan (open)", *timed(full_scan)), ("native recheck (close)", *timed(recheck))]
+    try:
+        rows.append(("lsof", *timed(lambda: lsof_in_use(devices, excluded))))
+    except FileNotFoundError:
+        print("lsof not installed, skipping")
+    for name, ms, in_use in rows:
+        print(f"  {name:<26} {ms:8.2f} ms   in use: {in_use}")
+    if usage.users:
+        print(f"  Holders: {usage.users}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Webcam usage detection")
+    parser.add_argument("--benchmark", action="store_true", help="Compare native scan with lsof")
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.benchmark:
+        return benchmark(args.iterations)
+
+    usage = WebcamUsage()
+    usage.rescan()
+    print(f"Devices: {', '.join(sorted(usage.devices)) or 'none'}")
+    print(f"In use: {usage.in_use()} {usage.active_users()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
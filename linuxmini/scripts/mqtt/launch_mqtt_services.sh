@@ -24,11 +24,9 @@ else
 fi
 
 # Determine which service to start (using system Python)
-if [[ "$service" == "mqtt_reports" ]]; then
-    /usr/bin/python3 /home/rash/.config/scripts/mqtt/mqtt_reports.py $debug_arg
-elif [[ "$service" == "mqtt_listener" ]]; then
-    /usr/bin/python3 /home/rash/.config/scripts/mqtt/mqtt_listener.py $debug_arg
+if [[ "$service" == "mqtt_gateway" ]]; then
+    /usr/bin/python3 /home/rash/.config/scripts/mqtt/mqtt_gateway.py $debug_arg
 else
-    echo "Invalid service. Use 'mqtt_reports' or 'mqtt_listener'."
+    echo "Invalid service. Use 'mqtt_gateway'."
     exit 1
 fi
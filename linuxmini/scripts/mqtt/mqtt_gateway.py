@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+import paho.mqtt.client as mqtt  # pip install paho-mqtt
+
+# Add the custom script path to PYTHONPATH
+sys.path.append("/home/rash/.config/scripts")
+from _utils import logging_utils  # noqa: E402
+from _utils import status_bus  # noqa: E402
+
+"""
+One MQTT connection for everything this machine exchanges with Home Assistant
+(replaces mqtt_listener.py and mqtt_reports.py).
+
+Routes are declared in mqtt_gateway.json:
+  inbound:  MQTT topic -> status bus state (e.g. in_office)
+  outbound: status bus state -> MQTT topic (e.g. linux_mini, webcam)
+
+Local state lives on the status bus (status_busd.py), so consumers query it
+with `status_busd.py get <state>` instead of reading files. The gateway keeps
+its own cache of every routed value to dedupe publishes and to resync
+retained topics after a reconnect without touching the filesystem.
+
+Availability: MQTT allows one Last Will per connection, so the gateway has
+a single availability topic (broker.availability_topic), "online" while
+connected and "offline" from the will after a crash or network loss. Home
+Assistant entities should use it as their availability topic. The topics
+of the two old clients (broker.retired_availability_topics) are cleared on
+every connect, so they can't be left retained as "online".
+
+This script is launched by a systemd service.
+The service file is here:
+  /home/rash/.config/systemd/user/mqtt_gateway.service
+
+Status can be checked with:
+  systemctl --user status mqtt_gateway.service
+"""
+
+CONFIG_FILE = Path(__file__).resolve().with_name("mqtt_gateway.json")
+
+# Broker status monitoring
+BROKER_STATUS_TOPIC = "homeassistant/status"  # Home Assistant's broker status topic
+
+BATCH_WINDOW = 0.05  # Outbound changes within this window go out as one batch
+BUS_RETRY_INTERVAL = 2  # Seconds between status bus reconnects (state files are read meanwhile)
+STATS_INTERVAL = 300  # How often stats are logged and sent to devices/<client>/stats
+LATENCY_SAMPLES = 200  # Recent change-to-PUBACK latencies kept for the stats
+
+
+def arg_parser():
+    parser = argparse.ArgumentParser(description="MQTT gateway for Linux")
+    parser.add_argument("--debug", action="store_true", help="Enable debug logging")
+    parser.add_argument("--config", default=str(CONFIG_FILE), help="Mapping file (default: %(default)s)")
+    parser.add_argument("--broker", help="Override the broker host from the mapping file")
+    parser.add_argument("--port", type=int, help="Override the broker port from the mapping file")
+    return parser.parse_args()
+
+
+def configure_logging(args):
+    logging_utils.configure_logging()
+    if args.debug:
+        logging.getLogger().setLevel(logging.DEBUG)
+    else:
+        logging.getLogger().setLevel(logging.WARNING)
+
+
+def load_mapping(path):
+    """Load and check the declarative mapping; raises ValueError on bad routes."""
+    with open(path) as f:
+        mapping = json.load(f)
+    for direction in ("inbound", "outbound"):
+        for route in mapping.get(direction, []):
+            if route["state"] not in status_bus.TOPICS:
+                raise ValueError(f"{direction} route uses unknown state {route['state']!r}")
+            if route.get("qos", 0) not in (0, 1):
+                raise ValueError(f"{direction} route for {route['topic']} has unsupported qos")
+    return mapping
+
+
+def encode_payload(value):
+    return json.dumps(value) if isinstance(value, dict) else value
+
+
+def decode_payload(state, payload):
+    if status_bus.TOPICS[state]["type"] is dict:
+        return json.loads(payload)
+    return payload.strip()
+
+
+class MqttGateway:
+    """
+    Routes values between MQTT and the status bus over a single client.
+
+    Outbound changes are coalesced per topic (only the latest value is sent)
+    and flushed in batches. While the broker is away QoS 0 updates are
+    dropped and QoS 1 ones are left to the retained resync that follows the
+    next CONNACK, which publishes every cached outbound value.
+    """
+
+    def __init__(self, client, mapping):
+        self.client = client
+        self.broker = mapping["broker"]
+        self.inbound = {route["topic"]: route for route in mapping.get("inbound", [])}
+        self.outbound = {}
+        for route in mapping.get("outbound", []):
+            self.outbound.setdefault(route["state"], []).append(route)
+        self.cache = {}  # state -> last value seen in either direction
+        self._cond = threading.Condition()
+        self._pending = {}  # topic -> (payload, qos, retain, time of change)
+        self._inflight = {}  # mid -> time of change
+        self._acked_early = set()  # PUBACKs that arrived before publish() returned
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+        self.counters = {
+            "inbound": 0,  # MQTT messages routed to the status bus
+            "inbound_rejected": 0,  # inbound payloads that failed validation
+            "outbound_changes": 0,  # local state changes seen
+            "coalesced": 0,  # changes replaced by a newer one before sending
+            "published": 0,  # QoS 1 publishes acked (QoS 0 counted when sent)
+            "dropped_offline": 0,  # QoS 0 updates dropped while the broker was away
+            "deferred_offline": 0,  # QoS 1 updates left to the next resync
+            "failed": 0,  # publish() errors
+            "syncs": 0,  # retained resyncs
+        }
+
+    # ----- MQTT side -----
+
+    def on_connect(self, client, userdata, flags, rc):
+        logging.debug(f"on_connect called with rc={rc}, flags={flags}")
+        if rc != 0:
+            logging.error(f'Connection failed. Returned code "{rc}"')
+            return
+        logging.info("Connected OK to MQTT broker")
+
+        topics = [(BROKER_STATUS_TOPIC, 1)] + [
+            (topic, route.get("qos", 0)) for topic, route in self.inbound.items()
+        ]
+        sub_result = client.subscribe(topics)
+        if sub_result[0] != mqtt.MQTT_ERR_SUCCESS:
+            logging.warning(f"Failed to subscribe: {mqtt.error_string(sub_result[0])}")
+
+        availability = self.broker.get("availability_topic")
+        if availability:
+            client.publish(availability, payload="online", qos=1, retain=True)
+        for topic in self.broker.get("retired_availability_topics", []):
+            # An empty retained message deletes the retained one
+            client.publish(topic, payload=None, qos=1, retain=True)
+
+        self.request_sync()
+
+    def on_connect_fail(self, client, userdata):
+        """Called when TCP connection to broker fails."""
+        logging.warning("TCP connection to MQTT broker failed, will retry...")
+
+    def on_disconnect(self, client, userdata, rc):
+        if rc == 0:
+            logging.info("Disconnected cleanly")
+        else:
+            logging.warning(f"Unexpected disconnect (rc={rc}), paho-mqtt will auto-reconnect")
+
+    def on_message(self, client, userdata, message):
+        topic = message.topic
+        payload = message.payload.decode()
+        logging.debug(f"Received message on topic {topic}: {payload}")
+
+        if topic == BROKER_STATUS_TOPIC:
+            if payload == "online":
+                # Home Assistant restarted: make sure it sees our retained state
+                logging.info("Home Assistant came online, resyncing")
+                self.request_sync()
+            return
+
+        route = self.inbound.get(topic)
+        if route is None:
+            logging.debug(f"No inbound route for topic: {topic}")
+            return
+        state = route["state"]
+        try:
+            value = status_bus.validate(state, decode_payload(state, payload))
+        except ValueError as e:
+            logging.warning(f"Rejected {topic} payload: {e}")
+            with self._cond:
+                self.counters["inbound_rejected"] += 1
+            return
+        with self._cond:
+            self.counters["inbound"] += 1
+            self.cache[state] = value
+        try:
+            status_bus.publish(state, value)
+        except (IOError, ValueError) as e:
+            logging.warning(f"Failed to publish {state} locally: {e}")
+
+    def on_publish(self, client, userdata, mid):
+        with self._cond:
+            started = self._inflight.pop(mid, None)
+            if started is None:
+                # Not ours (availability, stats) or acked before publish() returned
+                self._acked_early.add(mid)
+                if len(self._acked_early) > 1000:
+                    self._acked_early.clear()
+                return
+            self._record_ack(started)
+
+    def _record_ack(self, started):
+        self.counters["published"] += 1
+        self.latencies.append(time.monotonic() - started)
+
+    # ----- Local side -----
+
+    def update(self, state, value):
+        """A local state changed; queue its outbound routes."""
+        routes = self.outbound.get(state)
+        if not routes:
+            return
+        now = time.monotonic()
+        with self._cond:
+            if self.cache.get(state) == value:
+                return
+            self.cache[state] = value
+            self.counters["outbound_changes"] += 1
+            for route in routes:
+                self._queue(route, value, now)
+            self._cond.notify()
+
+    def request_sync(self):
+        """Queue every cached outbound value; runs on CONNACK and HA restarts."""
+        now = time.monotonic()
+        with self._cond:
+            self.counters["syncs"] += 1
+            for state, routes in self.outbound.items():
+                if state in self.cache:
+                    for route in routes:
+                        self._queue(route, self.cache[state], now)
+            self._cond.notify()
+
+    def _queue(self, route, value, now):
+        if route["topic"] in self._pending:
+            self.counters["coalesced"] += 1
+        self._pending[route["topic"]] = (
+            encode_payload(value),
+            route.get("qos", 0),
+            route.get("retain", False),
+            now,
+        )
+
+    def run(self):
+        """Publish queued changes in batches."""
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+            # Let a burst of changes land in the same batch
+            time.sleep(BATCH_WINDOW)
+            with self._cond:
+                batch, self._pending = self._pending, {}
+            self._flush(batch)
+
+    def _flush(self, batch):
+        if not self.client.is_connected():
+            with self._cond:
+                for _payload, qos, _retain, _started in batch.values():
+                    key = "deferred_offline" if qos else "dropped_offline"
+                    self.counters[key] += 1
+            logging.debug(f"Broker offline, holding back {len(batch)} updates")
+            return
+
+        logging.debug(f"Publishing batch of {len(batch)}")
+        for topic, (payload, qos, retain, started) in batch.items():
+            result = self.client.publish(topic, payload=payload, qos=qos, retain=retain)
+            with self._cond:
+                if result.rc != mqtt.MQTT_ERR_SUCCESS:
+                    logging.warning(f"Failed to publish {topic}: {mqtt.error_string(result.rc)}")
+                    self.counters["failed"] += 1
+                elif qos == 0 or result.mid in self._acked_early:
+                    self._acked_early.discard(result.mid)
+                    self._record_ack(started)
+                else:
+                    self._inflight[result.mid] = started
+
+    def follow_status_bus(self):
+        """Feed outbound states from the status bus; falls back to its files while it's down."""
+        states = list(self.outbound)
+        while True:
+            try:
+                for state, value in status_bus.subscribe(states):
+                    self.update(state, value)
+            except (OSError, ValueError) as e:
+                logging.debug(f"Status bus unavailable: {e}")
+            for state in states:
+                value = status_bus.read_file(state)
+                if value is not None:
+                    self.update(state, value)
+            time.sleep(BUS_RETRY_INTERVAL)
+
+    def stats(self):
+        with self._cond:
+            latencies = sorted(self.latencies)
+            stats = dict(self.counters, inflight=len(self._inflight), cached=len(self.cache))
+        if latencies:
+            stats["latency_ms"] = {
+                "p50": round(latencies[len(latencies) // 2] * 1000, 1),
+                "max": round(latencies[-1] * 1000, 1),
+                "samples": len(latencies),
+            }
+        return stats
+
+
+def set_mqtt_client(broker):
+    logging.debug("Creating MQTT client...")
+    client = mqtt.Client(client_id=broker["client_id"])
+    if "mqtt_user" in os.environ:
+        client.username_pw_set(
+            username=os.environ["mqtt_user"], password=os.environ["mqtt_password"]
+        )
+    else:
+        # Local test brokers (mqtt_standin.py, a bare mosquitto) run without auth
+        logging.warning("mqtt_user not set, connecting without credentials")
+    availability = broker.get("availability_topic")
+    if availability:
+        client.will_set(availability, payload="offline", qos=1, retain=True)
+    logging.info("MQTT client created successfully")
+    return client
+
+
+def log_stats(client, gateway):
+    stats = gateway.stats()
+    logging.info(f"Gateway stats: {stats}")
+    if client.is_connected():
+        topic = "devices/" + gateway.broker["client_id"] + "/stats"
+        client.publish(topic, payload=json.dumps(stats), qos=0)
+
+
+def main():
+    args = arg_parser()
+    configure_logging(args)
+    logging.info("Starting MQTT Gateway")
+
+    mapping = load_mapping(args.config)
+    broker = mapping["broker"]
+    host = args.broker or broker["host"]
+    port = args.port or broker["port"]
+
+    client = set_mqtt_client(broker)
+    gateway = MqttGateway(client, mapping)
+    client.on_connect = gateway.on_connect
+    client.on_connect_fail = gateway.on_connect_fail
+    client.on_disconnect = gateway.on_disconnect
+    client.on_message = gateway.on_message
+    client.on_publish = gateway.on_publish
+    client.reconnect_delay_set(min_delay=1, max_delay=300)
+
+    # kill -USR1 logs the stats on demand
+    stats_requested = threading.Event()
+    signal.signal(signal.SIGUSR1, lambda *_: stats_requested.set())
+
+    try:
+        # Follow local state before connecting so the first CONNACK can sync it
+        threading.Thread(target=gateway.follow_status_bus, daemon=True).start()
+        threading.Thread(target=gateway.run, daemon=True).start()
+
+        logging.debug(f"Connecting to MQTT broker at {host}:{port}...")
+        client.connect_async(host, port, broker.get("keepalive", 60))
+        client.loop_start()
+
+        while True:
+            stats_requested.wait(STATS_INTERVAL)
+            stats_requested.clear()
+            log_stats(client, gateway)
+
+    except KeyboardInterrupt:
+        logging.info("MQTT Gateway interrupted by user")
+    except Exception as e:
+        logging.error(f"Unhandled error occurred: {e}", exc_info=True)
+    finally:
+        logging.debug("Shutting down MQTT client...")
+        availability = broker.get("availability_topic")
+        if availability:
+            client.publish(availability, payload="offline", qos=1, retain=True)
+        client.loop_stop()
+        client.disconnect()
+        logging.debug("MQTT client shutdown complete")
+
+
+if __name__ == "__main__":
+    main()
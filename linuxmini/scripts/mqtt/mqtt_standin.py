@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+
+"""
+Minimal MQTT 3.1.1 broker for testing mqtt_gateway locally.
+
+Stands in for mosquitto: accepts any client without auth, acks QoS 1
+publishes, keeps retained messages, fans out to subscribers (QoS 0, with
++/# wildcards) and prints every publish it receives. No persistence,
+sessions or QoS 2.
+
+Usage:
+    mqtt_standin.py --port 18830
+    mqtt_gateway.py --broker 127.0.0.1 --port 18830 --debug
+"""
+
+import argparse
+import socketserver
+import struct
+import sys
+import threading
+import time
+
+CONNECT, CONNACK, PUBLISH, PUBACK = 1, 2, 3, 4
+SUBSCRIBE, SUBACK, UNSUBSCRIBE, UNSUBACK = 8, 9, 10, 11
+PINGREQ, PINGRESP, DISCONNECT = 12, 13, 14
+
+
+def encode_length(length):
+    out = bytearray()
+    while True:
+        byte, length = length % 128, length // 128
+        out.append(byte | (0x80 if length else 0))
+        if not length:
+            return bytes(out)
+
+
+def packet(packet_type, flags, body):
+    return bytes([(packet_type << 4) | flags]) + encode_length(len(body)) + body
+
+
+def encode_string(value):
+    data = value.encode()
+    return struct.pack("!H", len(data)) + data
+
+
+def read_string(body, offset):
+    (length,) = struct.unpack_from("!H", body, offset)
+    offset += 2
+    return body[offset:offset + length].decode(), offset + length
+
+
+def topic_matches(pattern, topic):
+    pattern_parts, topic_parts = pattern.split("/"), topic.split("/")
+    for i, part in enumerate(pattern_parts):
+        if part == "#":
+            return True
+        if i >= len(topic_parts) or (part != "+" and part != topic_parts[i]):
+            return False
+    return len(pattern_parts) == len(topic_parts)
+
+
+class Broker:
+    def __init__(self, quiet=False):
+        self.lock = threading.Lock()
+        self.retained = {}
+        self.subscriptions = {}  # handler -> set of patterns
+        self.quiet = quiet
+
+    def log(self, message):
+        if not self.quiet:
+            print(f"{time.strftime('%H:%M:%S')} {message}", flush=True)
+
+    def publish(self, topic, payload, retain):
+        with self.lock:
+            if retain:
+                if payload:
+                    self.retained[topic] = payload
+                else:
+                    self.retained.pop(topic, None)
+            targets = [
+                handler
+                for handler, patterns in self.subscriptions.items()
+                if any(topic_matches(p, topic) for p in patterns)
+            ]
+        for handler in targets:
+            handler.send_publish(topic, payload, retain=False)
+
+
+class ClientHandler(socketserver.BaseRequestHandler):
+    def setup(self):
+        self.broker = self.server.broker
+        self.send_lock = threading.Lock()
+        self.client_id = "?"
+
+    def send(self, data):
+        with self.send_lock:
+            self.request.sendall(data)
+
+    def send_publish(self, topic, payload, retain):
+        try:
+            self.send(packet(PUBLISH, 0x01 if retain else 0, encode_string(topic) + payload))
+        except OSError:
+            pass
+
+    def read_exact(self, count):
+        data = b""
+        while len(data) < count:
+            chunk = self.request.recv(count - len(data))
+            if not chunk:
+                raise ConnectionError
+            data += chunk
+        return data
+
+    def read_packet(self):
+        header = self.read_exact(1)[0]
+        length, multiplier = 0, 1
+        while True:
+            byte = self.read_exact(1)[0]
+            length += (byte & 0x7F) * multiplier
+            multiplier *= 128
+            if not byte & 0x80:
+                break
+        return header >> 4, header & 0x0F, self.read_exact(length)
+
+    def handle(self):
+        try:
+            while True:
+                packet_type, flags, body = self.read_packet()
+                if not self.dispatch(packet_type, flags, body):
+                    return
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            with self.broker.lock:
+                self.broker.subscriptions.pop(self, None)
+            self.broker.log(f"{self.client_id} disconnected")
+
+    def dispatch(self, packet_type, flags, body):
+        if packet_type == CONNECT:
+            # Skip protocol name, level, flags and keepalive to reach the client id
+            _, offset = read_string(body, 0)
+            self.client_id, _ = read_string(body, offset + 4)
+            self.broker.log(f"{self.client_id} connected")
+            self.send(packet(CONNACK, 0, b"\x00\x00"))
+        elif packet_type == PUBLISH:
+            qos, retain = (flags >> 1) & 0x03, bool(flags & 0x01)
+            topic, offset = read_string(body, 0)
+            if qos:
+                (mid,) = struct.unpack_from("!H", body, offset)
+                offset += 2
+                self.send(packet(PUBACK, 0, struct.pack("!H", mid)))
+            payload = body[offset:]
+            self.broker.log(f"{self.client_id} -> {topic}{' (retained)' if retain else ''}: {payload.decode(errors='replace')}")
+            self.broker.publish(topic, payload, retain)
+        elif packet_type == SUBSCRIBE:
+            (mid,) = struct.unpack_from("!H", body, 0)
+            offset, patterns, granted = 2, [], bytearray()
+            while offset < len(body):
+                pattern, offset = read_string(body, offset)
+                granted.append(min(body[offset], 1))
+                offset += 1
+                patterns.append(pattern)
+            with self.broker.lock:
+                self.broker.subscriptions.setdefault(self, set()).update(patterns)
+                retained = [
+                    (topic, payload)
+                    for topic, payload in self.broker.retained.items()
+                    if any(topic_matches(p, topic) for p in patterns)
+                ]
+            self.send(packet(SUBACK, 0, struct.pack("!H", mid) + bytes(granted)))
+            for topic, payload in retained:
+                self.send_publish(topic, payload, retain=True)
+        elif packet_type == UNSUBSCRIBE:
+            (mid,) = struct.unpack_from("!H", body, 0)
+            self.send(packet(UNSUBACK, 0, struct.pack("!H", mid)))
+        elif packet_type == PINGREQ:
+            self.send(packet(PINGRESP, 0, b""))
+        elif packet_type == DISCONNECT:
+            return False
+        return True
+
+
+class StandinServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, address, broker):
+        self.broker = broker
+        super().__init__(address, ClientHandler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Minimal local MQTT broker for testing")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=18830)
+    parser.add_argument("--quiet", action="store_true", help="Don't print publishes")
+    args = parser.parse_args()
+
+    with StandinServer((args.host, args.port), Broker(args.quiet)) as server:
+        print(f"MQTT stand-in listening on {args.host}:{args.port}", flush=True)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
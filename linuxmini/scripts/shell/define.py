@@ -2,16 +2,54 @@
 # ================================================================================ #
 # Define.py - A comprehensive dictionary lookup tool
 # ================================================================================ #
-# This script uses sdcv to look up word definitions in various dictionaries and
+# This script looks up word definitions in various StarDict dictionaries and
 # formats the output for better readability. It supports multiple dictionaries
 # including WordNet, Moby Thesaurus, Urban Dictionary, and Wiktionary.
+#
+# Dictionaries are read in-process (_utils.stardict: mmap'd index, binary
+# search, dictzip random access), so a lookup only touches the dictionaries
+# asked for and takes milliseconds. sdcv is only used when the dictionaries
+# can't be found.
+#
+# A headword index over all KNOWN_LANGUAGES dictionaries (_utils.headword_index,
+# built on first use and rebuilt when a dictionary changes) suggests close
+# spellings when a word misses, completes prefixes (--complete), and drives an
+# fzf browser (-i) whose list and preview are served by this process over a
+# local socket, so moving through candidates doesn't start a new define.py.
+#
+# Batch mode (--batch) looks up a word list from a file or stdin in one
+# process with a pool of forked workers and streams the results in input
+# order, as text or JSON lines. Formatted output is cached in memory (LRU)
+# and on disk, keyed by (word, dictionaries, TEXT_WIDTH); the disk cache is
+# dropped when a dictionary or this script changes.
 # ================================================================================ #
 
 import argparse
+import collections
+import concurrent.futures
+import contextlib
+import difflib
+import hashlib
+import io
+import json
+import multiprocessing
+import os
 import re
+import shutil
+import socketserver
+import sqlite3
+import statistics
 import subprocess
 import sys
 import textwrap
+import threading
+import time
+from pathlib import Path
+
+# Add the custom script path to PYTHONPATH
+sys.path.append("/home/rash/.config/scripts")
+from _utils.headword_index import load_or_build, signature
+from _utils.stardict import StarDictLibrary
 
 # ================================================================================ #
 # ================================ CONFIGURATION ================================== #
@@ -33,6 +71,24 @@ KNOWN_LANGUAGES = {
 # Order for displaying dictionaries
 SORTING_ORDER = ["wordnet", "wiktsv", "urban", "mobythes"]
 
+# Lookup backend: "native" reads the dictionaries directly, "sdcv" runs sdcv,
+# "auto" uses native when the dictionaries are found
+BACKEND = "auto"
+
+HEADWORD_INDEX = Path(
+    os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")
+) / "define" / "headwords.idx"
+SUGGESTIONS = 8  # Close spellings offered when a word has no definition
+COMPLETIONS = 200  # Candidates listed by --complete and the fzf browser
+COMPLETION_CHECKS = 2000  # Edit distances computed per fzf keystroke, at most
+
+BATCH_CACHE = HEADWORD_INDEX.with_name("formatted.sqlite")
+BATCH_LRU_SIZE = 1024
+BATCH_WORKERS = os.cpu_count() or 4
+BATCH_LOOKAHEAD = 4  # Words queued per worker ahead of the output
+
+BENCHMARK_ROUNDS = 20
+
 # ================================================================================ #
 # ========================= DICTIONARY PROCESSOR REGISTRY ======================== #
 # ================================================================================ #
@@ -205,6 +261,187 @@ def run_sdcv(query, requested_dicts=None):
     return output_lines, True
 
 
+_stardict_library = None
+
+
+def stardict_library():
+    """The dictionaries on disk, found once per process and opened on first use."""
+    global _stardict_library
+    if _stardict_library is None:
+        _stardict_library = StarDictLibrary()
+    return _stardict_library
+
+
+def requested_booknames(requested_dicts=None):
+    return [
+        full_name
+        for full_name, short_name in KNOWN_LANGUAGES.items()
+        if not requested_dicts or short_name in requested_dicts
+    ]
+
+
+def native_available(requested_dicts=None):
+    library = stardict_library()
+    return any(name in library for name in requested_booknames(requested_dicts))
+
+
+def parse_entries(entries):
+    """
+    Tag native dictionary entries like parse_sdcv tags sdcv output. The
+    headers come from the entry itself, so no heuristics are needed to tell
+    them apart from definition lines.
+    """
+    parsed = []
+    for entry in entries:
+        current_dict = KNOWN_LANGUAGES[entry.bookname]
+        parsed.append(("#language", f"-->{entry.bookname}"))
+        parsed.append(("#search_term_related", f"-->{entry.headword}"))
+        # sdcv prints the definition after a blank line and ends it with one
+        for line in entry.text.split("\n") + [""]:
+            line = line.rstrip()
+            # Many dictionaries repeat the headword as the first line
+            if line.strip().lower() == entry.headword.lower():
+                parsed.append(("#search_term_related", line))
+            # Special handling for Urban Dictionary - don't treat its lines as POS
+            elif current_dict != "urban" and shared_is_pos_line(line):
+                parsed.append(("#pos", line))
+            else:
+                parsed.append(("#entry_line", line))
+    return parsed
+
+
+def run_native(query, requested_dicts=None):
+    entries = stardict_library().lookup(query, requested_booknames(requested_dicts))
+    return parse_entries(entries), bool(entries)
+
+
+def lookup(search_term, requested_dicts=None, backend=BACKEND):
+    """Search results for process_search_results, from the chosen backend."""
+    if backend == "auto":
+        backend = "native" if native_available(requested_dicts) else "sdcv"
+
+    if backend == "native":
+        parsed, found = run_native(search_term, requested_dicts)
+        return {"stardict": parsed} if found else {}
+
+    sdcv_lines, sdcv_found = run_sdcv([search_term], requested_dicts)
+    if sdcv_found:
+        # Parse the SDCV results
+        return {"sdcv": parse_sdcv(sdcv_lines)}
+    return {}
+
+
+def render_lookup(search_term, requested_dicts=None, backend=BACKEND):
+    """The formatted output for a word, as a string."""
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        process_search_results(
+            search_term, lookup(search_term, requested_dicts, backend)
+        )
+    return output.getvalue()
+
+
+def lookup_formatted(search_term, requested_dicts=None, backend=BACKEND):
+    """(found, formatted output, suggestions when nothing was found) for a word."""
+    if backend == "auto":
+        backend = "native" if native_available(requested_dicts) else "sdcv"
+    search_results = lookup(search_term, requested_dicts, backend)
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        process_search_results(search_term, search_results)
+    suggestions = []
+    if not search_results and backend == "native":
+        suggestions = suggest(search_term, requested_dicts)
+    return bool(search_results), output.getvalue(), suggestions
+
+
+_headword_index = None
+
+
+def headword_index():
+    """The headword index of the known dictionaries, built or refreshed if needed."""
+    global _headword_index
+    if _headword_index is None:
+        library = stardict_library()
+        dictionaries = [
+            library.dictionaries[name]
+            for name in KNOWN_LANGUAGES
+            if name in library
+        ]
+        _headword_index = load_or_build(
+            HEADWORD_INDEX,
+            dictionaries,
+            on_build=lambda: print("Building headword index...", file=sys.stderr),
+        )
+    return _headword_index
+
+
+def suggest(search_term, requested_dicts=None, limit=SUGGESTIONS):
+    """Headwords within a typo or two of search_term, closest first."""
+    booknames = requested_booknames(requested_dicts)
+    return headword_index().fuzzy(search_term, limit, booknames)
+
+
+def search_candidates(query, requested_dicts=None, limit=COMPLETIONS):
+    """
+    Headwords starting with query, then close spellings of it. This runs on
+    every fzf keystroke, so the spelling search is capped and may come back
+    short.
+    """
+    index = headword_index()
+    booknames = requested_booknames(requested_dicts)
+    words = index.prefix(query, limit, booknames)
+    if query and len(words) < limit:
+        words += [
+            word
+            for word in index.fuzzy(
+                query, limit - len(words), booknames, max_checked=COMPLETION_CHECKS
+            )
+            if word not in words
+        ]
+    return words
+
+
+def run_benchmark(search_term, requested_dicts=None, rounds=BENCHMARK_ROUNDS):
+    """Time lookup + formatting with each available backend and compare the output."""
+    global _stardict_library
+    outputs = {}
+    print(f"Looking up '{search_term}' {rounds} times per backend\n")
+    for backend in ("native", "sdcv"):
+        if backend == "native":
+            _stardict_library = None  # First round includes finding and opening
+            if not native_available(requested_dicts):
+                print("native: no known dictionaries found, skipped")
+                continue
+        elif not shutil.which("sdcv"):
+            print("sdcv: not installed, skipped")
+            continue
+
+        samples = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            outputs[backend] = render_lookup(search_term, requested_dicts, backend)
+            samples.append((time.perf_counter() - start) * 1000)
+        print(
+            f"{backend:<7} first {samples[0]:8.2f} ms   median {statistics.median(samples):8.2f} ms"
+            f"   min {min(samples):8.2f} ms"
+        )
+
+    if len(outputs) == 2:
+        if outputs["native"] == outputs["sdcv"]:
+            print("\nFormatted output is identical")
+        else:
+            print("\nFormatted output differs:")
+            sys.stdout.writelines(
+                difflib.unified_diff(
+                    outputs["sdcv"].splitlines(keepends=True),
+                    outputs["native"].splitlines(keepends=True),
+                    "sdcv",
+                    "native",
+                )
+            )
+
+
 # ================================================================================ #
 # =========================== DICTIONARY-SPECIFIC HANDLERS ======================= #
 # ================================================================================ #
@@ -819,7 +1056,7 @@ def process_search_results(search_term, search_results):
     # Group parsed results by dictionary source
     dictionaries = {}
     for source, parsed in search_results.items():
-        if source == "sdcv":
+        if source in ("sdcv", "stardict"):
             # Extract dictionaries from the parsed results
             current_dict = None
             for tag, line in parsed:
@@ -846,22 +1083,382 @@ def process_search_results(search_term, search_results):
             process_parsed(dict_entries)
 
 
+# ================================================================================ #
+# ============================== INTERACTIVE BROWSER ============================= #
+# ================================================================================ #
+
+
+class LookupRequestHandler(socketserver.StreamRequestHandler):
+    """
+    One request per connection: a line "search <query>" answered with
+    candidate headwords, or "define <columns> <word>" answered with the
+    formatted definitions fitted to that width.
+    """
+
+    def handle(self):
+        global TEXT_WIDTH
+        request = self.rfile.readline().decode("utf-8", errors="replace").rstrip("\n")
+        command, _, argument = request.partition(" ")
+        requested_dicts = self.server.requested_dicts
+
+        if command == "search":
+            reply = "".join(
+                f"{word}\n" for word in search_candidates(argument, requested_dicts)
+            )
+        elif command == "define":
+            columns, _, word = argument.partition(" ")
+            text_width = TEXT_WIDTH
+            if columns.isdigit():
+                TEXT_WIDTH = max(int(columns) - 2, 40)
+            try:
+                reply = render_lookup(word, requested_dicts)
+            finally:
+                TEXT_WIDTH = text_width
+        else:
+            reply = f"Unknown request: {request}\n"
+
+        try:
+            self.wfile.write(reply.encode("utf-8"))
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # fzf moved on and killed the preview
+
+
+class LookupServer(socketserver.TCPServer):
+    """Answers the fzf browser from this process, with dictionaries already open."""
+
+    allow_reuse_address = True
+
+    def __init__(self, requested_dicts=None):
+        super().__init__(("127.0.0.1", 0), LookupRequestHandler)
+        self.requested_dicts = requested_dicts
+
+
+def fzf_request(port, request):
+    """
+    Shell command for fzf that sends request (which may hold fzf
+    placeholders) to the lookup server and prints the reply. It only uses
+    bash builtins plus cat, so a preview costs no interpreter start.
+    """
+    return (
+        f"exec 3<>/dev/tcp/127.0.0.1/{port} && printf '%s\\n' {request} >&3 && cat <&3"
+    )
+
+
+def run_interactive(query=None, requested_dicts=None):
+    """Browse headwords in fzf with a live definition preview; print the chosen one."""
+    if not shutil.which("fzf"):
+        print("Error: fzf is not installed")
+        return 1
+
+    server = LookupServer(requested_dicts)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+    query = query or ""
+    search = fzf_request(port, '"search "{q}')
+    preview = fzf_request(port, '"define $FZF_PREVIEW_COLUMNS "{}')
+    try:
+        result = subprocess.run(
+            [
+                "fzf",
+                "--disabled",  # The server does the matching, typos included
+                "--query", query,
+                "--prompt", "define> ",
+                "--bind", f"change:reload:{search}",
+                "--preview", preview,
+                "--preview-window", "right,65%",
+            ],
+            input="".join(f"{word}\n" for word in search_candidates(query, requested_dicts)),
+            stdout=subprocess.PIPE,
+            text=True,
+            # fzf runs reload and preview commands with $SHELL; /dev/tcp needs bash
+            env={**os.environ, "SHELL": shutil.which("bash") or "/bin/bash"},
+        )
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    selection = result.stdout.strip()
+    if result.returncode == 0 and selection:
+        process_search_results(selection, lookup(selection, requested_dicts))
+    return 0
+
+
+# ================================================================================ #
+# ================================== BATCH MODE ================================== #
+# ================================================================================ #
+
+
+class FormattedCache:
+    """
+    Formatted lookups keyed by (word, dictionaries, TEXT_WIDTH, backend): an
+    in-memory LRU in front of a SQLite table. The table remembers what it
+    was filled from and is emptied when that changes.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS formatted (
+            word TEXT NOT NULL,
+            dicts TEXT NOT NULL,
+            width INTEGER NOT NULL,
+            backend TEXT NOT NULL,
+            found INTEGER NOT NULL,
+            output TEXT NOT NULL,
+            suggestions TEXT NOT NULL,
+            PRIMARY KEY (word, dicts, width, backend)
+        );
+        CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+    """
+
+    def __init__(self, path, fingerprint, size=BATCH_LRU_SIZE):
+        self.size = size
+        self.recent = collections.OrderedDict()
+        self.db = None
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self.db = sqlite3.connect(str(path))
+            self.db.executescript(self.SCHEMA)
+            row = self.db.execute(
+                "SELECT value FROM meta WHERE key = 'fingerprint'"
+            ).fetchone()
+            if row is None or row[0] != fingerprint:
+                with self.db:
+                    self.db.execute("DELETE FROM formatted")
+                    self.db.execute(
+                        "INSERT OR REPLACE INTO meta (key, value) VALUES ('fingerprint', ?)",
+                        (fingerprint,),
+                    )
+        except sqlite3.Error as e:
+            print(f"Warning: disk cache disabled ({e})", file=sys.stderr)
+            self.db = None
+
+    def _remember(self, key, value):
+        self.recent[key] = value
+        self.recent.move_to_end(key)
+        if len(self.recent) > self.size:
+            self.recent.popitem(last=False)
+
+    def get(self, key):
+        value = self.recent.get(key)
+        if value is not None:
+            self.recent.move_to_end(key)
+            return value
+        if self.db is None:
+            return None
+        row = self.db.execute(
+            "SELECT found, output, suggestions FROM formatted"
+            " WHERE word = ? AND dicts = ? AND width = ? AND backend = ?",
+            key,
+        ).fetchone()
+        if row is None:
+            return None
+        value = (bool(row[0]), row[1], json.loads(row[2]))
+        self._remember(key, value)
+        return value
+
+    def put(self, key, value):
+        self._remember(key, value)
+        if self.db is not None:
+            found, output, suggestions = value
+            self.db.execute(
+                "INSERT OR REPLACE INTO formatted VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (*key, int(found), output, json.dumps(suggestions)),
+            )
+
+    def close(self):
+        if self.db is not None:
+            self.db.commit()
+            self.db.close()
+
+
+def batch_fingerprint(backend):
+    """What cached output depends on besides its key: the dictionaries and this script."""
+    library = stardict_library()
+    dictionaries = [
+        library.dictionaries[name] for name in KNOWN_LANGUAGES if name in library
+    ]
+    script = Path(__file__).resolve().stat()
+    sources = [backend, signature(dictionaries), script.st_size, script.st_mtime_ns]
+    return hashlib.sha1(json.dumps(sources).encode()).hexdigest()
+
+
+def read_words(source):
+    """Words to look up, one per line; blank lines and # comments are skipped."""
+    stream = sys.stdin if source == "-" else open(source, encoding="utf-8")
+    try:
+        for line in stream:
+            word = line.strip()
+            if word and not word.startswith("#"):
+                yield word
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def write_batch_result(word, result, as_json):
+    found, output, suggestions = result
+    if as_json:
+        record = {"word": word, "found": found, "output": output, "suggestions": suggestions}
+        print(json.dumps(record, ensure_ascii=False))
+    else:
+        print(f"==> {word} <==")
+        print(output, end="")
+        if suggestions:
+            print(f"Did you mean: {', '.join(suggestions)}?")
+        print()
+    sys.stdout.flush()
+
+
+def run_batch(source, requested_dicts=None, backend=BACKEND, as_json=False, workers=BATCH_WORKERS):
+    """
+    Look up every word from source with a pool of forked workers, writing
+    results in input order as they complete. Words are read lazily, with
+    at most BATCH_LOOKAHEAD per worker in flight, so a long or endless
+    list streams.
+    """
+    if backend == "auto":
+        backend = "native" if native_available(requested_dicts) else "sdcv"
+    if backend == "native":
+        # Open everything before forking so workers share the mappings
+        library = stardict_library()
+        for name in requested_booknames(requested_dicts):
+            if name in library:
+                library.dictionaries[name].open()
+        headword_index()
+
+    dicts = ",".join(sorted(set(requested_dicts))) if requested_dicts else "*"
+    cache = FormattedCache(BATCH_CACHE, batch_fingerprint(backend))
+    pending = collections.deque()  # (word, key, result or Future), in input order
+    in_flight = {}
+
+    def emit_first():
+        word, key, result = pending.popleft()
+        if isinstance(result, concurrent.futures.Future):
+            result = result.result()
+            if in_flight.pop(key, None) is not None:
+                cache.put(key, result)
+        write_batch_result(word, result, as_json)
+
+    context = multiprocessing.get_context("fork")
+    try:
+        with concurrent.futures.ProcessPoolExecutor(workers, mp_context=context) as executor:
+            try:
+                for word in read_words(source):
+                    key = (word, dicts, TEXT_WIDTH, backend)
+                    result = cache.get(key) or in_flight.get(key)
+                    if result is None:
+                        result = executor.submit(
+                            lookup_formatted, word, requested_dicts, backend
+                        )
+                        in_flight[key] = result
+                    pending.append((word, key, result))
+
+                    while pending and (
+                        len(pending) > workers * BATCH_LOOKAHEAD
+                        or not isinstance(pending[0][2], concurrent.futures.Future)
+                        or pending[0][2].done()
+                    ):
+                        emit_first()
+                while pending:
+                    emit_first()
+            except BrokenPipeError:
+                # The reader went away (e.g. | head): stop without a traceback
+                for future in in_flight.values():
+                    future.cancel()
+                os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+                return 1
+    finally:
+        cache.close()
+    return 0
+
+
 # ================================================================================ #
 # ================================== MAIN FUNCTION =============================== #
 # ================================================================================ #
 
 
 def main():
+    global TEXT_WIDTH
     parser = argparse.ArgumentParser(
         description="Look up word definitions in various dictionaries"
     )
-    parser.add_argument("word", nargs="?", help="The word to look up")
+    parser.add_argument(
+        "word", nargs="?", help="The word to look up (or prefix, with --complete)"
+    )
     parser.add_argument(
         "--dict",
         dest="dictionaries",
         help="Comma-separated list of dictionaries to use (e.g., urban,oald)",
     )
+    parser.add_argument(
+        "--backend",
+        choices=["auto", "native", "sdcv"],
+        default=BACKEND,
+        help=f"Dictionary lookup backend (default: {BACKEND})",
+    )
+    parser.add_argument(
+        "--benchmark",
+        action="store_true",
+        help="Time the native and sdcv backends for the word and compare their output",
+    )
+    parser.add_argument(
+        "--complete",
+        action="store_true",
+        help="List headwords starting with the word (for shell completion)",
+    )
+    parser.add_argument(
+        "-i",
+        "--interactive",
+        action="store_true",
+        help="Browse headwords in fzf with a definition preview",
+    )
+    parser.add_argument(
+        "--batch",
+        nargs="?",
+        const="-",
+        metavar="FILE",
+        help="Look up every word in FILE (one per line; default: stdin)",
+    )
+    parser.add_argument(
+        "--json",
+        action="store_true",
+        help="With --batch, write one JSON object per word",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=BATCH_WORKERS,
+        help=f"With --batch, number of worker processes (default: {BATCH_WORKERS})",
+    )
+    parser.add_argument(
+        "--width",
+        type=int,
+        default=TEXT_WIDTH,
+        help=f"Output width (default: {TEXT_WIDTH})",
+    )
     args = parser.parse_args()
+    TEXT_WIDTH = args.width
+
+    # If dictionaries are specified, prepare them for filtering
+    requested_dicts = None
+    if args.dictionaries:
+        requested_dicts = [d.strip() for d in args.dictionaries.split(",")]
+
+    if args.batch:
+        sys.exit(
+            run_batch(args.batch, requested_dicts, args.backend, args.json, max(args.workers, 1))
+        )
+
+    if args.complete or args.interactive:
+        if not native_available(requested_dicts):
+            print("Error: no StarDict dictionaries found for the headword index")
+            sys.exit(1)
+        if args.interactive:
+            sys.exit(run_interactive(args.word, requested_dicts))
+        for word in headword_index().prefix(
+            args.word or "", COMPLETIONS, requested_booknames(requested_dicts)
+        ):
+            print(word)
+        return
 
     if args.word:
         search_term = args.word
@@ -873,21 +1470,14 @@ def main():
         parser.print_help()
         sys.exit(1)
 
-    # If dictionaries are specified, prepare them for filtering
-    requested_dicts = None
-    if args.dictionaries:
-        requested_dicts = [d.strip() for d in args.dictionaries.split(",")]
-
-    # Run sdcv with specified dictionaries if any
-    sdcv_lines, sdcv_found = run_sdcv([search_term], requested_dicts)
-    search_results = {}
-
-    if sdcv_found:
-        # Parse the SDCV results
-        parsed_results = parse_sdcv(sdcv_lines)
-        search_results["sdcv"] = parsed_results
+    if args.benchmark:
+        run_benchmark(search_term, requested_dicts)
+        return
 
-    process_search_results(search_term, search_results)
+    _, output, suggestions = lookup_formatted(search_term, requested_dicts, args.backend)
+    print(output, end="")
+    if suggestions:
+        print(f"Did you mean: {', '.join(suggestions)}?")
 
 
 if __name__ == "__main__":
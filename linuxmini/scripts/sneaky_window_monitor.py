@@ -11,8 +11,9 @@ import json
 import subprocess
 import sys
 import time
+from collections import deque
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Deque, Dict, Iterable, List, Optional, Set, Tuple
 
 # Add the hypr-window-ops module to the path
 sys.path.insert(0, str(Path(__file__).parent.parent / "python-tools" / "hypr-window-ops"))
@@ -24,6 +25,16 @@ except ImportError:
     sys.exit(1)
 
 
+# Jump history only ever looks at the last 10 entries, so keep exactly that many
+JUMP_HISTORY_SIZE = 10
+
+# Grid cell size (px) for the per-workspace window index
+INDEX_CELL_SIZE = 256
+
+Rect = Tuple[int, int, int, int]
+JumpHistory = Deque[Tuple[str, int, str, float]]
+
+
 def run_hyprctl(command: List[str]) -> Optional[Dict]:
     """Run a hyprctl command and return the parsed JSON output."""
     try:
@@ -93,6 +104,130 @@ def rectangles_overlap(rect1: Tuple[int, int, int, int], rect2: Tuple[int, int,
     return True
 
 
+def window_rect(window: Dict) -> Rect:
+    """Return the (x, y, width, height) rectangle of a hyprctl client dict."""
+    return (window["at"][0], window["at"][1], window["size"][0], window["size"][1])
+
+
+def window_workspace_id(window: Dict) -> Optional[int]:
+    """Return the workspace ID of a hyprctl client dict."""
+    workspace = window.get("workspace")
+    return workspace.get("id") if isinstance(workspace, dict) else workspace
+
+
+def monitor_workspace_id(monitor: Dict) -> Optional[int]:
+    """Return the active workspace ID of a hyprctl monitor dict."""
+    workspace = monitor.get("activeWorkspace")
+    return workspace.get("id") if isinstance(workspace, dict) else None
+
+
+def new_jump_history() -> JumpHistory:
+    """Create an empty, bounded jump history."""
+    return deque(maxlen=JUMP_HISTORY_SIZE)
+
+
+class WindowRectIndex:
+    """
+    Per-workspace grid index of window rectangles.
+
+    Windows are bucketed into fixed-size grid cells per workspace, so an overlap
+    query only tests the handful of windows sharing cells with the query rect
+    instead of every client. `sync` updates the index incrementally: only
+    windows that appeared, moved, resized or changed workspace are re-bucketed.
+    """
+
+    def __init__(self, cell_size: int = INDEX_CELL_SIZE):
+        self.cell_size = cell_size
+        # {workspace_id: {(cell_x, cell_y): {address, ...}}}
+        self._grid: Dict[Optional[int], Dict[Tuple[int, int], Set[str]]] = {}
+        # {address: (workspace_id, rect)}
+        self._windows: Dict[str, Tuple[Optional[int], Rect]] = {}
+        # {workspace_id: window_count}
+        self._counts: Dict[Optional[int], int] = {}
+
+    def _cells(self, rect: Rect) -> Iterable[Tuple[int, int]]:
+        x, y, w, h = rect
+        size = self.cell_size
+        for cx in range(x // size, (x + max(w, 1) - 1) // size + 1):
+            for cy in range(y // size, (y + max(h, 1) - 1) // size + 1):
+                yield (cx, cy)
+
+    def _insert(self, address: str, workspace_id: Optional[int], rect: Rect) -> None:
+        grid = self._grid.setdefault(workspace_id, {})
+        for cell in self._cells(rect):
+            grid.setdefault(cell, set()).add(address)
+        self._windows[address] = (workspace_id, rect)
+        self._counts[workspace_id] = self._counts.get(workspace_id, 0) + 1
+
+    def _remove(self, address: str) -> None:
+        workspace_id, rect = self._windows.pop(address)
+        grid = self._grid.get(workspace_id, {})
+        for cell in self._cells(rect):
+            bucket = grid.get(cell)
+            if bucket is not None:
+                bucket.discard(address)
+                if not bucket:
+                    del grid[cell]
+        if not grid:
+            self._grid.pop(workspace_id, None)
+        self._counts[workspace_id] -= 1
+        if not self._counts[workspace_id]:
+            del self._counts[workspace_id]
+
+    def sync(self, windows: List[Dict]) -> None:
+        """Bring the index in line with a fresh `hyprctl clients -j` result."""
+        seen = set()
+        for window in windows:
+            address = window.get("address")
+            if not address:
+                continue
+            seen.add(address)
+            entry = (window_workspace_id(window), window_rect(window))
+            if self._windows.get(address) == entry:
+                continue
+            if address in self._windows:
+                self._remove(address)
+            self._insert(address, *entry)
+
+        for address in [a for a in self._windows if a not in seen]:
+            self._remove(address)
+
+    def overlapping(self, workspace_id: Optional[int], rect: Rect) -> List[str]:
+        """Return addresses of windows on a workspace that overlap rect."""
+        grid = self._grid.get(workspace_id)
+        if not grid:
+            return []
+        candidates = set()
+        for cell in self._cells(rect):
+            candidates.update(grid.get(cell, ()))
+        return [
+            address for address in candidates
+            if rectangles_overlap(rect, self._windows[address][1])
+        ]
+
+    def first_overlap(self, workspace_id: Optional[int], rect: Rect, exclude: Optional[str] = None) -> str:
+        """Return the address of a window overlapping rect on a workspace, or ''."""
+        for address in self.overlapping(workspace_id, rect):
+            if address != exclude:
+                return address
+        return ""
+
+    def workspace_count(self, workspace_id: Optional[int], exclude: Optional[str] = None) -> int:
+        """Return the number of indexed windows on a workspace."""
+        count = self._counts.get(workspace_id, 0)
+        if exclude in self._windows and self.workspace_of(exclude) == workspace_id:
+            count -= 1
+        return count
+
+    def workspace_of(self, address: str) -> Optional[int]:
+        """Return the indexed workspace of a window, or None if unknown."""
+        entry = self._windows.get(address)
+        return entry[0] if entry else None
+
+    def __contains__(self, address: str) -> bool:
+        return address in self._windows
+
+
 def calculate_corner_position(monitor: Dict, corner: str, window_size: Tuple[int, int]) -> Tuple[int, int]:
     """
     Calculate the position for a window at a given corner of a monitor.
@@ -193,7 +328,7 @@ def move_window_to_corner(window_address: str, corner: str) -> bool:
 
 
 def detect_bounce_pattern(
-    jump_history: List[Tuple[str, int, str, float]],
+    jump_history: JumpHistory,
     proposed_corner: str,
     proposed_monitor_id: int,
     active_window_address: str,
@@ -207,7 +342,7 @@ def detect_bounce_pattern(
     This is window-aware - it tracks which window caused each jump, not just the corner.
 
     Args:
-        jump_history: List of (corner, monitor_id, active_window_address, timestamp) tuples
+        jump_history: Bounded (corner, monitor_id, active_window_address, timestamp) history
         proposed_corner: The corner we're considering moving to
         proposed_monitor_id: The monitor ID we're considering
         active_window_address: The window we're trying to avoid now
@@ -222,8 +357,9 @@ def detect_bounce_pattern(
             print(f"  [Bounce Check] Not enough history ({len(jump_history)} < 3)")
         return False
 
-    # Use the last 10 entries instead of time-based filtering for more predictable behavior
-    recent_jumps = jump_history[-10:]
+    # The history holds the last JUMP_HISTORY_SIZE entries; use those instead of
+    # time-based filtering for more predictable behavior
+    recent_jumps = list(jump_history)
 
     # Filter jumps to only those on the proposed monitor
     # Since we now track "window at target location", we just filter by monitor ID
@@ -321,7 +457,7 @@ def detect_bounce_pattern(
 
 
 def get_bounce_windows(
-    jump_history: List[Tuple[str, int, str, float]],
+    jump_history: JumpHistory,
     monitor_id: Optional[int] = None,
     time_window: float = 10.0  # Parameter kept for compatibility but not used
 ) -> List[str]:
@@ -331,7 +467,7 @@ def get_bounce_windows(
     Args:
         jump_history: Jump history for this window
         monitor_id: Optional monitor ID to filter by (if None, checks all monitors)
-        time_window: (Deprecated) Not used - we check last 10 entries instead
+        time_window: (Deprecated) Not used - we check the bounded history instead
 
     Returns:
         List of window addresses involved in recent bouncing
@@ -339,8 +475,8 @@ def get_bounce_windows(
     if len(jump_history) < 3:
         return []
 
-    # Use last 10 entries instead of time-based filtering
-    recent_jumps = jump_history[-10:]
+    # Use the bounded history instead of time-based filtering
+    recent_jumps = list(jump_history)
 
     # Filter by monitor if specified
     if monitor_id is not None:
@@ -365,13 +501,42 @@ def get_bounce_windows(
     return []
 
 
+def find_avoided_overlap(
+    window_index: WindowRectIndex,
+    rect: Rect,
+    windows_to_avoid: List[Dict]
+) -> str:
+    """
+    Return the address of the first window to avoid that overlaps rect, or ''.
+
+    Indexed windows are looked up through the spatial index of their workspace;
+    windows the index doesn't know yet are checked directly.
+    """
+    avoid_addresses = set()
+    avoid_workspaces = set()
+    for window in windows_to_avoid:
+        address = window.get("address", "")
+        if address in window_index:
+            avoid_addresses.add(address)
+            avoid_workspaces.add(window_index.workspace_of(address))
+        elif rectangles_overlap(rect, window_rect(window)):
+            return address
+
+    for workspace_id in avoid_workspaces:
+        for address in window_index.overlapping(workspace_id, rect):
+            if address in avoid_addresses:
+                return address
+    return ""
+
+
 def find_alternative_corner(
     sneaky_window: Dict,
     active_window: Dict,
     current_monitor: Dict,
     monitors: List[Dict],
     all_windows: List[Dict],
-    jump_history: List[Tuple[str, int, str, float]],
+    window_index: WindowRectIndex,
+    jump_history: JumpHistory,
     cooldown_positions: Dict[Tuple[str, int], float],
     excluded_corner: str,
     debug: bool = False
@@ -385,6 +550,7 @@ def find_alternative_corner(
         current_monitor: The current monitor dict
         monitors: List of all monitors
         all_windows: List of all windows to check overlap against
+        window_index: Spatial index of all_windows
         jump_history: Jump history for this window
         cooldown_positions: Dict mapping (corner, monitor_id) to expiry timestamp
         excluded_corner: The corner to exclude (the one that would cause bouncing)
@@ -444,21 +610,11 @@ def find_alternative_corner(
         sneaky_rect = (pos_x, pos_y, sneaky_size[0], sneaky_size[1])
 
         # Check overlap with all windows to avoid
-        overlaps = False
-        for window in windows_to_avoid:
-            window_rect = (
-                window["at"][0],
-                window["at"][1],
-                window["size"][0],
-                window["size"][1]
-            )
-            if rectangles_overlap(sneaky_rect, window_rect):
-                overlaps = True
-                if debug:
-                    print(f"    - {corner}: ✗ overlaps with {window.get('address', '')[-8:]}")
-                break
+        overlap_address = find_avoided_overlap(window_index, sneaky_rect, windows_to_avoid)
+        if overlap_address and debug:
+            print(f"    - {corner}: ✗ overlaps with {overlap_address[-8:]}")
 
-        if not overlaps:
+        if not overlap_address:
             if debug:
                 print(f"  [Alternative] ✓ Found on same monitor: {corner}")
             return (corner, current_monitor_id)
@@ -497,21 +653,11 @@ def find_alternative_corner(
             sneaky_rect = (pos_x, pos_y, sneaky_size[0], sneaky_size[1])
 
             # Check overlap with all windows to avoid
-            overlaps = False
-            for window in windows_to_avoid:
-                window_rect = (
-                    window["at"][0],
-                    window["at"][1],
-                    window["size"][0],
-                    window["size"][1]
-                )
-                if rectangles_overlap(sneaky_rect, window_rect):
-                    overlaps = True
-                    if debug:
-                        print(f"    - {corner}: ✗ overlaps with {window.get('address', '')[-8:]}")
-                    break
+            overlap_address = find_avoided_overlap(window_index, sneaky_rect, windows_to_avoid)
+            if overlap_address and debug:
+                print(f"    - {corner}: ✗ overlaps with {overlap_address[-8:]}")
 
-            if not overlaps:
+            if not overlap_address:
                 if debug:
                     print(f"  [Alternative] ✓ Found on monitor {monitor_id}: {corner}")
                 return (corner, monitor_id)
@@ -527,10 +673,10 @@ def execute_corner_move(
     target_monitor: Dict,
     current_monitor_id: int,
     sneaky_pinned: bool,
-    jump_history: Dict[str, List[Tuple[str, int, str, float]]],
+    jump_history: Dict[str, JumpHistory],
     cooldown_positions: Dict[str, Dict[Tuple[str, int], float]],
     sneaky_window: Dict,
-    all_windows: List[Dict],
+    window_index: WindowRectIndex,
     active_window: Optional[Dict] = None,
     is_bounce_recovery: bool = False
 ) -> None:
@@ -546,7 +692,7 @@ def execute_corner_move(
         jump_history: Jump history dictionary
         cooldown_positions: Cooldown tracking per window
         sneaky_window: The sneaky window dict (for size)
-        all_windows: List of all windows to check what's at target location
+        window_index: Spatial index of all windows to check what's at target location
         active_window: Optional active window to restore focus to
         is_bounce_recovery: Whether this is a bounce recovery move (triggers cooldown)
     """
@@ -560,28 +706,12 @@ def execute_corner_move(
     print(f"  [Target] Corner {corner} on monitor {target_monitor_id}: pos ({target_pos_x}, {target_pos_y}), size {sneaky_size}")
 
     # Get the target monitor's active workspace (not the sneaky window's workspace)
-    target_workspace_id = target_monitor.get("activeWorkspace", {}).get("id") if isinstance(target_monitor.get("activeWorkspace"), dict) else None
+    target_workspace_id = monitor_workspace_id(target_monitor)
 
-    window_at_target = ""
-    for window in all_windows:
-        if window.get("address") == sneaky_address:
-            continue  # Skip the sneaky window itself
-
-        # Only consider windows on the target monitor's active workspace
-        window_workspace_id = window.get("workspace", {}).get("id") if isinstance(window.get("workspace"), dict) else window.get("workspace")
-        if window_workspace_id != target_workspace_id:
-            continue
-
-        window_rect = (
-            window["at"][0],
-            window["at"][1],
-            window["size"][0],
-            window["size"][1]
-        )
-        if rectangles_overlap(target_rect, window_rect):
-            window_at_target = window.get("address", "")
-            print(f"  [Target] Window at target: {window_at_target[-8:]} (ws {window_workspace_id}) at ({window['at'][0]}, {window['at'][1]}), size ({window['size'][0]}, {window['size'][1]})")
-            break  # Take the first overlapping window
+    # Only consider windows on the target monitor's active workspace, skipping the sneaky window itself
+    window_at_target = window_index.first_overlap(target_workspace_id, target_rect, exclude=sneaky_address)
+    if window_at_target:
+        print(f"  [Target] Window at target: {window_at_target[-8:]} (ws {target_workspace_id})")
 
     # Now move the window
     if target_monitor_id != current_monitor_id:
@@ -605,6 +735,8 @@ def execute_corner_move(
             window_manager.focus_window(active_window["address"])
 
     # Record the jump with the window at the target location
+    if sneaky_address not in jump_history:
+        jump_history[sneaky_address] = new_jump_history()
     jump_history[sneaky_address].append((corner, target_monitor_id, window_at_target, time.time()))
 
     # If this is a bounce recovery, add cooldown for the positions we were bouncing between
@@ -619,12 +751,36 @@ def execute_corner_move(
             cooldown_expiry = current_time + 8.0
 
             # Mark recent positions as forbidden
-            for corner_name, mon_id, win_addr, _ in jump_history[sneaky_address][-6:]:
+            for corner_name, mon_id, win_addr, _ in list(jump_history[sneaky_address])[-6:]:
                 if win_addr in bounce_windows:
                     position = (corner_name, mon_id)
                     cooldown_positions[sneaky_address][position] = cooldown_expiry
 
 
+def prune_window_state(
+    jump_history: Dict[str, JumpHistory],
+    cooldown_positions: Dict[str, Dict[Tuple[str, int], float]],
+    live_addresses: Set[str],
+    current_time: float
+) -> None:
+    """
+    Drop state for windows that are gone and cooldowns that have expired.
+
+    Keeps memory constant over long uptimes: jump histories are already bounded
+    per window, this bounds the number of windows and cooldown entries tracked.
+    """
+    for address in [a for a in jump_history if a not in live_addresses]:
+        del jump_history[address]
+
+    for address in list(cooldown_positions):
+        if address not in live_addresses:
+            del cooldown_positions[address]
+            continue
+        cooldowns = cooldown_positions[address]
+        for position in [p for p, expiry in cooldowns.items() if expiry <= current_time]:
+            del cooldowns[position]
+
+
 def monitor_sneaky_windows(interval: float = 0.5, debug: bool = True, focus_cooldown: float = 1.0):
     """
     Main monitoring loop that keeps sneaky windows away from the active window.
@@ -636,11 +792,14 @@ def monitor_sneaky_windows(interval: float = 0.5, debug: bool = True, focus_cool
     """
     print("Starting sneaky window monitor..." + (" (debug mode)" if debug else ""))
 
-    # Track jump history per window: {address: [(corner, monitor_id, window_at_location, timestamp), ...]}
-    jump_history = {}
+    # Track jump history per window: {address: deque([(corner, monitor_id, window_at_location, timestamp), ...])}
+    jump_history: Dict[str, JumpHistory] = {}
 
     # Track cooldown positions per window: {address: {(corner, monitor_id): expiry_timestamp}}
-    cooldown_positions = {}
+    cooldown_positions: Dict[str, Dict[Tuple[str, int], float]] = {}
+
+    # Spatial index of all client rects, updated incrementally on each poll
+    window_index = WindowRectIndex()
 
     # Track last active window and when it became active
     last_active_address = None
@@ -650,7 +809,7 @@ def monitor_sneaky_windows(interval: float = 0.5, debug: bool = True, focus_cool
     initial_sneaky_windows = get_sneaky_windows()
     if initial_sneaky_windows:
         monitors = get_monitors()
-        all_windows = run_hyprctl(["clients", "-j"]) or []
+        window_index.sync(run_hyprctl(["clients", "-j"]) or [])
 
         for sneaky in initial_sneaky_windows:
             sneaky_address = sneaky["address"]
@@ -667,37 +826,15 @@ def monitor_sneaky_windows(interval: float = 0.5, debug: bool = True, focus_cool
                 current_corner = monitor_movement.detect_current_corner(sneaky, monitors)
 
                 # Find which window it's currently overlapping (on current monitor's active workspace)
-                sneaky_rect = (
-                    sneaky["at"][0],
-                    sneaky["at"][1],
-                    sneaky["size"][0],
-                    sneaky["size"][1]
+                overlapping_window = window_index.first_overlap(
+                    monitor_workspace_id(current_monitor),
+                    window_rect(sneaky),
+                    exclude=sneaky_address
                 )
 
-                current_workspace_id = current_monitor.get("activeWorkspace", {}).get("id") if isinstance(current_monitor.get("activeWorkspace"), dict) else None
-
-                overlapping_window = ""
-                for window in all_windows:
-                    if window.get("address") == sneaky_address:
-                        continue
-
-                    # Only consider windows on the current monitor's active workspace
-                    window_workspace_id = window.get("workspace", {}).get("id") if isinstance(window.get("workspace"), dict) else window.get("workspace")
-                    if window_workspace_id != current_workspace_id:
-                        continue
-
-                    window_rect = (
-                        window["at"][0],
-                        window["at"][1],
-                        window["size"][0],
-                        window["size"][1]
-                    )
-                    if rectangles_overlap(sneaky_rect, window_rect):
-                        overlapping_window = window.get("address", "")
-                        break
-
                 # Initialize jump history with current position
-                jump_history[sneaky_address] = [(current_corner, sneaky_monitor_id, overlapping_window, time.time())]
+                jump_history[sneaky_address] = new_jump_history()
+                jump_history[sneaky_address].append((current_corner, sneaky_monitor_id, overlapping_window, time.time()))
 
                 if debug:
                     print(f"  [Init] Sneaky window at {current_corner} on monitor {sneaky_monitor_id}, overlapping: {overlapping_window[-8:] if overlapping_window else 'none'}")
@@ -742,6 +879,13 @@ def monitor_sneaky_windows(interval: float = 0.5, debug: bool = True, focus_cool
 
             # Get all windows for overlap checking
             all_windows = run_hyprctl(["clients", "-j"]) or []
+            window_index.sync(all_windows)
+            prune_window_state(
+                jump_history,
+                cooldown_positions,
+                {sneaky["address"] for sneaky in sneaky_windows},
+                current_time
+            )
 
             # Process each sneaky window
             for sneaky in sneaky_windows:
@@ -751,22 +895,8 @@ def monitor_sneaky_windows(interval: float = 0.5, debug: bool = True, focus_cool
                 if sneaky_address == active_window["address"]:
                     continue
 
-                # Get current position
-                sneaky_rect = (
-                    sneaky["at"][0],
-                    sneaky["at"][1],
-                    sneaky["size"][0],
-                    sneaky["size"][1]
-                )
-                active_rect = (
-                    active_window["at"][0],
-                    active_window["at"][1],
-                    active_window["size"][0],
-                    active_window["size"][1]
-                )
-
                 # Check if they overlap
-                if not rectangles_overlap(sneaky_rect, active_rect):
+                if not rectangles_overlap(window_rect(sneaky), window_rect(active_window)):
                     # No overlap, all good
                     continue
 
@@ -782,7 +912,7 @@ def monitor_sneaky_windows(interval: float = 0.5, debug: bool = True, focus_cool
 
                 # Initialize jump history and cooldown for this window if needed
                 if sneaky_address not in jump_history:
-                    jump_history[sneaky_address] = []
+                    jump_history[sneaky_address] = new_jump_history()
                 if sneaky_address not in cooldown_positions:
                     cooldown_positions[sneaky_address] = {}
 
@@ -791,16 +921,12 @@ def monitor_sneaky_windows(interval: float = 0.5, debug: bool = True, focus_cool
 
                 # Check if there's only one window on this workspace (besides sneaky)
                 # If so, skip trying corners and go directly to another monitor
-                current_workspace_id = current_monitor.get("activeWorkspace", {}).get("id") if isinstance(current_monitor.get("activeWorkspace"), dict) else None
-                workspace_windows = [
-                    w for w in all_windows
-                    if (w.get("workspace", {}).get("id") if isinstance(w.get("workspace"), dict) else w.get("workspace")) == current_workspace_id
-                    and w.get("address") != sneaky_address
-                ]
-
-                if len(workspace_windows) <= 1:
+                current_workspace_id = monitor_workspace_id(current_monitor)
+                workspace_window_count = window_index.workspace_count(current_workspace_id, exclude=sneaky_address)
+
+                if workspace_window_count <= 1:
                     # Only one window on this workspace - no point trying corners, move to next monitor
-                    print(f"Only {len(workspace_windows)} window(s) on workspace {current_workspace_id}, moving to next monitor")
+                    print(f"Only {workspace_window_count} window(s) on workspace {current_workspace_id}, moving to next monitor")
                     # Skip to monitor switch logic
                     safe_corner = None
                 else:
@@ -831,6 +957,7 @@ def monitor_sneaky_windows(interval: float = 0.5, debug: bool = True, focus_cool
                             current_monitor,
                             monitors,
                             all_windows,
+                            window_index,
                             jump_history[sneaky_address],
                             cooldown_positions[sneaky_address],
                             safe_corner,
@@ -866,7 +993,7 @@ def monitor_sneaky_windows(interval: float = 0.5, debug: bool = True, focus_cool
                                     jump_history,
                                     cooldown_positions,
                                     sneaky,
-                                    all_windows,
+                                    window_index,
                                     active_window,
                                     is_bounce_recovery=True
                                 )
@@ -882,7 +1009,7 @@ def monitor_sneaky_windows(interval: float = 0.5, debug: bool = True, focus_cool
                                 jump_history,
                                 cooldown_positions,
                                 sneaky,
-                                all_windows,
+                                window_index,
                                 active_window,
                                 is_bounce_recovery=False
                             )
@@ -897,7 +1024,7 @@ def monitor_sneaky_windows(interval: float = 0.5, debug: bool = True, focus_cool
                             jump_history,
                             cooldown_positions,
                             sneaky,
-                            all_windows,
+                            window_index,
                             active_window,
                             is_bounce_recovery=False
                         )
@@ -932,7 +1059,7 @@ def monitor_sneaky_windows(interval: float = 0.5, debug: bool = True, focus_cool
                             jump_history,
                             cooldown_positions,
                             sneaky,
-                            all_windows,
+                            window_index,
                             active_window,
                             is_bounce_recovery=False
                         )